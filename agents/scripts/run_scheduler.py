@@ -43,6 +43,14 @@ async def sync_webhook_failures():
     logger.info("webhook_sync_executed")
 
 
+async def create_audit_checkpoints():
+    """Sela os dias fechados da chain de audit com checkpoints Merkle."""
+    from src.services.audit import get_audit_service
+    
+    created = await get_audit_service().create_checkpoints()
+    logger.info("audit_checkpoints_executed", created=created)
+
+
 async def main():
     from src.services.tasks import TaskScheduler
     
@@ -69,6 +77,13 @@ async def main():
         run_at=time(6, 0)
     )
     
+    # Checkpoints de audit logs às 0h30 (dia anterior fechado)
+    scheduler.add_daily_task(
+        "audit_checkpoints",
+        create_audit_checkpoints,
+        run_at=time(0, 30)
+    )
+    
     # Configurar handler para SIGTERM/SIGINT
     loop = asyncio.get_event_loop()
     
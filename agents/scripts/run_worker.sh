@@ -11,21 +11,11 @@ echo "🔄 Iniciando worker de tasks..."
 
 # Verificar se ARQ está instalado
 if python -c "import arq" 2>/dev/null; then
-    echo "✅ ARQ disponível, usando worker de produção"
-    arq src.services.tasks.task_worker.WorkerSettings
+    echo "✅ ARQ disponível, usando worker de produção (uma fila por prioridade)"
 else
-    echo "⚠️ ARQ não disponível, usando worker local"
-    python -c "
-import asyncio
-from src.services.tasks.task_worker import TaskWorker
-
-async def main():
-    worker = TaskWorker()
-    try:
-        await worker.run()
-    except KeyboardInterrupt:
-        worker.stop()
-
-asyncio.run(main())
-"
+    # A fila local fica na memória da API, que já roda o TaskWorker
+    echo "⚠️ ARQ não disponível: as tasks rodam no worker embutido na API (nada a iniciar aqui)"
+    exit 0
 fi
+
+python -m src.services.tasks.task_worker
@@ -28,6 +28,7 @@ class UsageStatsResponse(BaseModel):
     active_users: int
     requests_by_agent: dict[str, int]
     latency_by_agent: dict[str, float]
+    latency_percentiles_by_agent: dict[str, dict[str, float]] = {}
 
 
 class CostEstimateResponse(BaseModel):
@@ -47,6 +48,9 @@ class TopAgentResponse(BaseModel):
     requests: int
     errors: int
     avg_latency_ms: float
+    p50_latency_ms: Optional[float] = None
+    p95_latency_ms: Optional[float] = None
+    p99_latency_ms: Optional[float] = None
 
 
 class TopToolResponse(BaseModel):
@@ -54,30 +58,39 @@ class TopToolResponse(BaseModel):
     tool: str
     calls: int
     errors: int
+    p50_latency_ms: Optional[float] = None
+    p95_latency_ms: Optional[float] = None
+    p99_latency_ms: Optional[float] = None
 
 
 # ===== ENDPOINTS =====
 
 @router.get("/usage", response_model=UsageStatsResponse)
 async def get_usage_stats(
-    period: str = Query("day", pattern="^(day|week|month)$"),
+    period: str = Query("day", pattern="^(day|week|month|quarter)$"),
     reference_date: Optional[date] = None,
+    source: str = Query("rollups", pattern="^(rollups|columnar)$"),
     auth: dict = Depends(require_permission(Permission.ADMIN_AUDIT))
 ):
     """
     Obtém estatísticas de uso.
     
-    - **period**: day, week, month
+    - **period**: day, week, month, quarter
     - **reference_date**: Data de referência (default: hoje)
+    - **source**: rollups (Redis) ou columnar (Parquet, histórico longo)
     """
     service = get_analytics_service()
     
-    stats = await service.get_usage_report(
-        org_id=auth["organization_id"],
-        branch_id=auth["branch_id"],
-        period=period,
-        reference_date=reference_date
-    )
+    try:
+        stats = await service.get_usage_report(
+            org_id=auth["organization_id"],
+            branch_id=auth["branch_id"],
+            period=period,
+            reference_date=reference_date,
+            source=source
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
     return UsageStatsResponse(
         period_start=stats.period_start,
@@ -88,29 +101,36 @@ async def get_usage_stats(
         error_rate=stats.error_rate,
         active_users=stats.active_users,
         requests_by_agent=stats.requests_by_agent,
-        latency_by_agent=stats.latency_by_agent
+        latency_by_agent=stats.latency_by_agent,
+        latency_percentiles_by_agent=stats.latency_percentiles_by_agent
     )
 
 
 @router.get("/cost", response_model=CostEstimateResponse)
 async def get_cost_estimate(
-    period: str = Query("month", pattern="^(day|week|month)$"),
+    period: str = Query("month", pattern="^(day|week|month|quarter)$"),
     reference_date: Optional[date] = None,
+    source: str = Query("rollups", pattern="^(rollups|columnar)$"),
     auth: dict = Depends(require_permission(Permission.ADMIN_AUDIT))
 ):
     """
     Obtém estimativa de custo.
     
     Baseado em pricing do Claude (ajustar conforme modelo).
+    Relatórios trimestrais: period=quarter&source=columnar.
     """
     service = get_analytics_service()
     
-    cost = await service.get_cost_report(
-        org_id=auth["organization_id"],
-        branch_id=auth["branch_id"],
-        period=period,
-        reference_date=reference_date
-    )
+    try:
+        cost = await service.get_cost_report(
+            org_id=auth["organization_id"],
+            branch_id=auth["branch_id"],
+            period=period,
+            reference_date=reference_date,
+            source=source
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
     return CostEstimateResponse(
         period_start=cost.period_start,
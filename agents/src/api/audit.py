@@ -4,7 +4,7 @@ API endpoints para audit logs.
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Query
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime, date
@@ -47,6 +47,7 @@ class AuditQueryResponse(BaseModel):
     page: int
     page_size: int
     total_pages: int
+    next_cursor: Optional[str] = None
 
 
 class IntegrityCheckResponse(BaseModel):
@@ -81,6 +82,7 @@ async def query_audit_events(
     success: Optional[bool] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
     auth: dict = Depends(require_permission(Permission.ADMIN_AUDIT))
 ) -> AuditQueryResponse:
     """
@@ -94,6 +96,9 @@ async def query_audit_events(
     - actor_id: ID do usuário que executou a ação
     - severity: low, medium, high, critical
     - success: true/false
+    
+    Paginação: use `next_cursor` da resposta como `cursor` da próxima
+    chamada (keyset, estável durante inserções). `page` continua aceito.
     """
     service = get_audit_service()
     
@@ -120,20 +125,25 @@ async def query_audit_events(
         except ValueError:
             raise HTTPException(400, f"Invalid severity: {severity}")
     
-    events, total = await service.query(
-        org_id=auth["organization_id"],
-        branch_id=auth["branch_id"],
-        start_date=datetime.combine(start_date, datetime.min.time()) if start_date else None,
-        end_date=datetime.combine(end_date, datetime.max.time()) if end_date else None,
-        action=action_enum,
-        resource=resource_enum,
-        resource_id=resource_id,
-        actor_id=actor_id,
-        severity=severity_enum,
-        success=success,
-        page=page,
-        page_size=page_size
-    )
+    try:
+        result = await service.query_page(
+            org_id=auth["organization_id"],
+            branch_id=auth["branch_id"],
+            start_date=datetime.combine(start_date, datetime.min.time()) if start_date else None,
+            end_date=datetime.combine(end_date, datetime.max.time()) if end_date else None,
+            action=action_enum,
+            resource=resource_enum,
+            resource_id=resource_id,
+            actor_id=actor_id,
+            severity=severity_enum,
+            success=success,
+            page=page,
+            page_size=page_size,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    events, total = result.events, result.total
     
     total_pages = (total + page_size - 1) // page_size if total > 0 else 0
     
@@ -157,7 +167,8 @@ async def query_audit_events(
         total=total,
         page=page,
         page_size=page_size,
-        total_pages=total_pages
+        total_pages=total_pages,
+        next_cursor=result.next_cursor
     )
 
 
@@ -193,16 +204,42 @@ async def get_audit_event(
     )
 
 
+@router.get("/events/{event_id}/proof")
+async def get_audit_event_proof(
+    event_id: str,
+    auth: dict = Depends(require_permission(Permission.ADMIN_AUDIT))
+) -> dict:
+    """
+    Prova de inclusão (Merkle) de um evento no checkpoint assinado do seu dia.
+    
+    Verificável offline com verify_merkle_proof(leaf, path, checkpoint.root).
+    """
+    service = get_audit_service()
+    
+    proof = await service.get_event_proof(
+        event_id,
+        auth["organization_id"],
+        auth["branch_id"]
+    )
+    
+    if not proof:
+        raise HTTPException(404, "Audit event or checkpoint not found")
+    
+    return proof
+
+
 @router.get("/integrity", response_model=IntegrityCheckResponse)
 async def check_integrity(
     start_date: date,
     end_date: date,
+    deep: bool = False,
     auth: dict = Depends(require_permission(Permission.ADMIN_AUDIT))
 ) -> IntegrityCheckResponse:
     """
     Verifica integridade da chain de audit logs.
     
-    Detecta se houve alteração ou remoção de logs.
+    Detecta se houve alteração ou remoção de logs. Dias com checkpoint
+    Merkle assinado só são re-hasheados se mudaram (ou com deep=true).
     """
     service = get_audit_service()
     
@@ -213,7 +250,8 @@ async def check_integrity(
         auth["organization_id"],
         auth["branch_id"],
         start,
-        end
+        end,
+        deep=deep
     )
     
     return IntegrityCheckResponse(
@@ -228,31 +266,55 @@ async def check_integrity(
 async def export_audit_logs(
     start_date: date,
     end_date: date,
-    format: str = Query("json", pattern="^(json|csv)$"),
+    format: str = Query("json", pattern="^(json|ndjson|csv)$"),
+    resume: Optional[str] = None,
     auth: dict = Depends(require_permission(Permission.ADMIN_AUDIT))
-) -> FileResponse:
+) -> StreamingResponse:
     """
-    Exporta audit logs para compliance.
+    Exporta audit logs para compliance em streaming.
+    
+    Inclui verificação de integridade (feita na mesma passada) no fim do
+    arquivo.
     
-    Inclui verificação de integridade no arquivo.
+    - ndjson: NDJSON gzip, um membro gzip por dia terminando em um
+      registro `checkpoint`. Se a conexão cair, descarte o membro
+      incompleto e chame de novo com `resume=<resume_token>` do último
+      checkpoint recebido.
+    - json: documento JSON único (não retomável). `csv` é aceito como
+      alias de json por compatibilidade.
     """
     service = get_audit_service()
     
     start = datetime.combine(start_date, datetime.min.time())
     end = datetime.combine(end_date, datetime.max.time())
+    export_format = "json" if format == "csv" else format
     
-    filename = await service.export(
-        auth["organization_id"],
-        auth["branch_id"],
-        start,
-        end,
-        format
-    )
+    try:
+        job = await service.start_export(
+            auth["organization_id"],
+            auth["branch_id"],
+            start,
+            end,
+            export_format,
+            resume_token=resume
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    
+    if export_format == "ndjson":
+        media_type = "application/gzip"
+        filename = f"audit_export_{start_date}_{end_date}.ndjson.gz"
+    else:
+        media_type = "application/json"
+        filename = f"audit_export_{start_date}_{end_date}.json"
     
-    return FileResponse(
-        filename,
-        media_type="application/json",
-        filename=f"audit_export_{start_date}_{end_date}.json"
+    return StreamingResponse(
+        service.stream_export(job),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Audit-Export-Id": job.export_id,
+        }
     )
 
 
@@ -0,0 +1,90 @@
+# agents/src/api/documents.py
+"""
+API endpoints para importação de documentos fiscais.
+
+Upload em streaming: o arquivo vai em blocos direto para o spool de
+uploads (services/document_processing/upload_spool), sem base64 e sem o
+SpooledTemporaryFile do UploadFile (que grava tudo em disco antes do
+handler rodar). O spool é o volume /app/uploads do container do Docling.
+"""
+
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from src.services.auth import Permission
+from src.services.document_processing import (
+    MultipartUpload,
+    MultipartUploadError,
+    UploadTooLargeError,
+    get_upload_spool,
+)
+from src.middleware.auth import require_permission
+from src.tools.fiscal.document_importer import DocumentImporterTool
+
+router = APIRouter(prefix="/documents", tags=["Documents"])
+
+
+def _form_bool(value: Optional[str], default: bool) -> bool:
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on", "sim")
+
+
+# ===== ENDPOINTS =====
+
+@router.post("/import")
+async def import_document(
+    request: Request,
+    document_type: str = Query("auto", description="danfe, dacte ou auto"),
+    filename: Optional[str] = Query(None, description="Nome do arquivo (corpo binário)"),
+    validate_sefaz: bool = Query(True),
+    create_record: bool = Query(False),
+    dry_run: bool = Query(True),
+    auth: dict = Depends(require_permission(Permission.DOCUMENT_WRITE))
+) -> dict[str, Any]:
+    """
+    Importa DANFe/DACTe (PDF, XML ou .zip) enviado em streaming.
+
+    Aceita multipart/form-data (um arquivo, mais document_type, dry_run,
+    ... como campos) ou o arquivo como corpo binário (application/pdf,
+    application/xml, application/zip ou application/octet-stream).
+
+    Mesma resposta da tool document_importer; .zip com PDFs retorna
+    task_id (progresso em /api/tasks/{task_id}).
+    """
+    spool = get_upload_spool()
+    content_type = request.headers.get("content-type", "")
+    upload: Optional[MultipartUpload] = None
+
+    try:
+        if content_type.startswith("multipart/form-data"):
+            upload = MultipartUpload(content_type)
+            spooled = await spool.write_stream(upload.file_chunks(request.stream()), "document")
+        else:
+            spooled = await spool.write_stream(request.stream(), filename or "document")
+    except MultipartUploadError as e:
+        raise HTTPException(400, str(e)) from e
+    except UploadTooLargeError as e:
+        raise HTTPException(413, str(e)) from e
+
+    if upload is not None:
+        spooled.filename = upload.filename or spooled.filename
+        document_type = upload.fields.get("document_type", document_type)
+        validate_sefaz = _form_bool(upload.fields.get("validate_sefaz"), validate_sefaz)
+        create_record = _form_bool(upload.fields.get("create_record"), create_record)
+        dry_run = _form_bool(upload.fields.get("dry_run"), dry_run)
+
+    if spooled.size == 0:
+        spooled.remove()
+        raise HTTPException(400, "Nenhum arquivo enviado")
+
+    return await DocumentImporterTool().import_spooled(
+        spooled,
+        document_type=document_type,
+        validate_sefaz=validate_sefaz,
+        create_record=create_record,
+        dry_run=dry_run,
+        organization_id=auth.get("organization_id"),
+        branch_id=auth.get("branch_id")
+    )
@@ -24,6 +24,8 @@ from prometheus_client import (
 
 from src.core.health import get_health_checker, get_full_health_status
 from src.core.observability import get_observability
+from src.services.webhooks import get_webhook_service
+from src.services.document_processing import get_conversion_cache, get_conversion_pool
 
 logger = structlog.get_logger()
 router = APIRouter(prefix="/observability", tags=["observability"])
@@ -241,6 +243,15 @@ async def dashboard_data() -> Dict[str, Any]:
             "uptime": health.get("uptime_seconds", 0)
         },
         "services": services_summary,
+        "latency": obs.get_latency_percentiles(),
+        "webhooks": {
+            **get_webhook_service().engine.get_stats(),
+            "outbox": await get_webhook_service().outbox.get_stats()
+        },
+        "document_conversion": {
+            **get_conversion_pool().get_stats(),
+            "cache": get_conversion_cache().get_stats()
+        },
         "endpoints": {
             "metrics": "/observability/metrics",
             "health": "/health/full",
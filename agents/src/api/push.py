@@ -55,6 +55,7 @@ class SendNotificationRequest(BaseModel):
     actions: list = []
     require_interaction: bool = False
     silent: bool = False
+    urgent: bool = False  # alertas críticos: sem espera de rate limit
 
 
 class SendNotificationResponse(BaseModel):
@@ -187,7 +188,7 @@ async def send_to_user(
         silent=data.silent
     )
     
-    results = await service.broadcast_to_user(user_id, payload)
+    results = await service.broadcast_to_user(user_id, payload, urgent=data.urgent)
     
     success_count = sum(1 for r in results if r.success)
     errors = [r.error for r in results if not r.success and r.error]
@@ -200,6 +201,53 @@ async def send_to_user(
     )
 
 
+@router.post("/send/organization", response_model=SendNotificationResponse)
+async def send_to_organization(
+    data: SendNotificationRequest,
+    auth: dict = Depends(require_permission(Permission.ADMIN_USERS))
+):
+    """
+    Envia notificação para todos dispositivos da filial do usuário.
+    
+    Requer permissão admin:users. Use `urgent` para alertas críticos
+    (ex: escalonamento de War Room).
+    """
+    service = get_push_service()
+    
+    if not service.is_available:
+        raise HTTPException(503, "Push notifications not available")
+    
+    payload = PushPayload(
+        title=data.title,
+        body=data.body,
+        icon=data.icon,
+        badge=data.badge,
+        image=data.image,
+        tag=data.tag,
+        data=data.data,
+        actions=data.actions,
+        require_interaction=data.require_interaction,
+        silent=data.silent
+    )
+    
+    results = await service.broadcast_to_organization(
+        auth["organization_id"],
+        auth["branch_id"],
+        payload,
+        urgent=data.urgent
+    )
+    
+    success_count = sum(1 for r in results if r.success)
+    errors = [r.error for r in results if not r.success and r.error]
+    
+    return SendNotificationResponse(
+        success=success_count > 0,
+        sent_count=success_count,
+        failed_count=len(results) - success_count,
+        errors=errors[:5]
+    )
+
+
 @router.post("/send/me", response_model=SendNotificationResponse)
 async def send_to_self(
     data: SendNotificationRequest,
@@ -2,16 +2,21 @@
 API endpoints para gerenciamento de tasks.
 """
 
-from fastapi import APIRouter, HTTPException
+import json
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Any
 
+from src.services.auth import Permission
 from src.services.tasks import (
     get_task_queue,
     TaskConfig,
     TaskPriority,
     TaskStatus
 )
+from src.middleware.auth import require_permission
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
@@ -59,6 +64,7 @@ class TaskStatusResponse(BaseModel):
     error: Optional[str] = None
     attempts: int = 0
     duration_ms: Optional[float] = None
+    progress: Optional[dict[str, Any]] = None
 
 
 class QueueStatsResponse(BaseModel):
@@ -66,17 +72,26 @@ class QueueStatsResponse(BaseModel):
     backend: str
     pending: Optional[int] = None
     queues: Optional[dict] = None
+    lanes: Optional[dict] = None  # pendentes por fila de prioridade
+    queue_wait: Optional[dict] = None  # espera na fila por prioridade
 
 
 # ===== ENDPOINTS =====
 
 @router.post("/enqueue", response_model=TaskEnqueueResponse, status_code=202)
-async def enqueue_task(data: TaskEnqueueRequest):
+async def enqueue_task(
+    data: TaskEnqueueRequest,
+    auth: dict = Depends(require_permission(Permission.TASK_WRITE))
+):
     """
     Enfileira uma task para execução assíncrona.
     
+    A organização autenticada fica no registro da task (tasks como
+    import_documents_task recusam rodar para outra organização).
+    
     Tasks disponíveis:
     - `process_document_task`: Processa DANFe/DACTe
+    - `import_documents_task`: Importa lote de DANFe/DACTe (diretório ou .zip)
     - `index_documents_task`: Indexa documentos para RAG
     - `deliver_webhook_task`: Entrega webhook com retry
     - `generate_report_task`: Gera relatório
@@ -93,7 +108,8 @@ async def enqueue_task(data: TaskEnqueueRequest):
     config = TaskConfig(
         max_retries=data.max_retries,
         timeout=data.timeout,
-        priority=priority
+        priority=priority,
+        org_id=auth.get("organization_id")
     )
     
     task_id = await queue.enqueue(
@@ -126,7 +142,8 @@ async def get_task_status(task_id: str):
         result=result.result,
         error=result.error,
         attempts=result.attempts,
-        duration_ms=result.duration_ms
+        duration_ms=result.duration_ms,
+        progress=result.progress
     )
 
 
@@ -147,6 +164,9 @@ async def wait_for_task(task_id: str, timeout: int = 60):
     """
     Aguarda conclusão de uma task.
     
+    A requisição fica parada até o evento de conclusão (sem polling
+    no Redis); para acompanhar o progresso, usar /{task_id}/events.
+    
     Args:
         task_id: ID da task
         timeout: Tempo máximo de espera em segundos
@@ -168,7 +188,41 @@ async def wait_for_task(task_id: str, timeout: int = 60):
         result=result.result,
         error=result.error,
         attempts=result.attempts,
-        duration_ms=result.duration_ms
+        duration_ms=result.duration_ms,
+        progress=result.progress
+    )
+
+
+@router.get("/{task_id}/events")
+async def stream_task_events(task_id: str, timeout: int = 600):
+    """
+    Acompanha uma task via Server-Sent Events.
+    
+    Eventos:
+    - `status`: status completo (no início e ao terminar)
+    - `progress`: progresso publicado pela task (ex: importação em lote)
+    - comentário `keepalive` enquanto não há eventos
+    - `timeout`: timeout (segundos) passou antes do fim
+    
+    Returns:
+        200: text/event-stream até a task terminar
+        404: Task não encontrada
+    """
+    queue = get_task_queue()
+    if await queue.get_status(task_id) is None:
+        raise HTTPException(404, f"Task {task_id} não encontrada")
+    
+    async def generate():
+        async for event in queue.watch_events(task_id, timeout=timeout):
+            if event["type"] == "keepalive":
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
@@ -176,6 +230,9 @@ async def wait_for_task(task_id: str, timeout: int = 60):
 async def get_queue_stats():
     """
     Retorna estatísticas das filas de tasks.
+    
+    Inclui pendentes por prioridade e tempo de espera na fila
+    (contagem, média e buckets em ms) por prioridade.
     """
     queue = get_task_queue()
     stats = await queue.get_queue_stats()
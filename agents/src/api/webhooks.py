@@ -2,7 +2,7 @@
 API endpoints para gerenciamento de webhooks.
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
 from pydantic import BaseModel, HttpUrl
 from typing import Optional
 from datetime import datetime
@@ -13,7 +13,7 @@ from src.services.webhooks import (
     EventType,
     WebhookEvent
 )
-from src.services.webhooks.webhook_delivery import WebhookDelivery
+from src.services.webhooks.webhook_delivery import WebhookDelivery, DeliveryStatus
 
 router = APIRouter()
 
@@ -58,6 +58,31 @@ class WebhookTestResponse(BaseModel):
     error: Optional[str]
 
 
+class DeliveryAttemptResponse(BaseModel):
+    """Tentativa de entrega."""
+    timestamp: datetime
+    status_code: Optional[int]
+    error: Optional[str]
+    duration_ms: float
+
+
+class DeliveryResponse(BaseModel):
+    """Schema de resposta de entrega."""
+    id: str
+    event_id: str
+    event_type: str
+    endpoint_id: Optional[str]
+    endpoint_url: str
+    status: str
+    attempts: list[DeliveryAttemptResponse]
+    delivered_at: Optional[datetime]
+
+
+class ReplayDeadResponse(BaseModel):
+    """Schema de resposta de replay do dead-letter."""
+    replayed: int
+
+
 class EventTypeInfo(BaseModel):
     """Informação sobre tipo de evento."""
     type: str
@@ -79,6 +104,27 @@ async def get_org_context(
     return x_organization_id, x_branch_id
 
 
+def _delivery_response(delivery: WebhookDelivery) -> DeliveryResponse:
+    return DeliveryResponse(
+        id=delivery.id,
+        event_id=delivery.event.id,
+        event_type=delivery.event.type.value,
+        endpoint_id=delivery.endpoint_id,
+        endpoint_url=delivery.endpoint_url,
+        status=delivery.status.value,
+        attempts=[
+            DeliveryAttemptResponse(
+                timestamp=a.timestamp,
+                status_code=a.status_code,
+                error=a.error,
+                duration_ms=a.duration_ms
+            )
+            for a in delivery.attempts
+        ],
+        delivered_at=delivery.delivered_at
+    )
+
+
 # ===== ENDPOINTS =====
 
 @router.get("/events", response_model=EventTypesResponse)
@@ -235,3 +281,86 @@ async def test_endpoint(
         response_time_ms=duration,
         error=last_attempt.error if last_attempt else None
     )
+
+
+# ===== ENTREGAS (outbox) =====
+
+@router.get("/deliveries", response_model=list[DeliveryResponse])
+async def list_deliveries(
+    status: Optional[str] = Query(None, description="pending, success, failed, retrying"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    context: tuple[int, int] = Depends(get_org_context)
+):
+    """
+    Lista entregas da organização (mais recentes primeiro).
+    
+    `status=failed` retorna o dead-letter: entregas que esgotaram as
+    tentativas ou foram recusadas (4xx) e podem ser reenviadas.
+    """
+    org_id, _ = context
+    service = get_webhook_service()
+    
+    try:
+        delivery_status = DeliveryStatus(status) if status else None
+    except ValueError:
+        raise HTTPException(400, f"Status inválido: {status}")
+    
+    deliveries = await service.list_deliveries(org_id, delivery_status, limit, offset)
+    return [_delivery_response(d) for d in deliveries]
+
+
+@router.post("/deliveries/replay-dead", response_model=ReplayDeadResponse)
+async def replay_dead_letters(
+    limit: int = Query(100, ge=1, le=1000),
+    context: tuple[int, int] = Depends(get_org_context)
+):
+    """
+    Reenfileira entregas do dead-letter da organização.
+    """
+    org_id, _ = context
+    service = get_webhook_service()
+    
+    replayed = await service.replay_dead_letters(org_id, limit)
+    return ReplayDeadResponse(replayed=replayed)
+
+
+@router.get("/deliveries/{delivery_id}", response_model=DeliveryResponse)
+async def get_delivery(
+    delivery_id: str,
+    context: tuple[int, int] = Depends(get_org_context)
+):
+    """
+    Detalhes de uma entrega, com histórico de tentativas.
+    """
+    org_id, _ = context
+    service = get_webhook_service()
+    
+    delivery = await service.get_delivery(delivery_id)
+    if not delivery:
+        raise HTTPException(404, "Entrega não encontrada")
+    
+    if delivery.organization_id != org_id:
+        raise HTTPException(403, "Acesso negado")
+    
+    return _delivery_response(delivery)
+
+
+@router.post("/deliveries/{delivery_id}/replay", response_model=DeliveryResponse)
+async def replay_delivery(
+    delivery_id: str,
+    context: tuple[int, int] = Depends(get_org_context)
+):
+    """
+    Reenfileira uma entrega com novo ciclo de tentativas.
+    
+    O histórico de tentativas anteriores é preservado.
+    """
+    org_id, _ = context
+    service = get_webhook_service()
+    
+    delivery = await service.replay_delivery(delivery_id, org_id)
+    if not delivery:
+        raise HTTPException(404, "Entrega não encontrada")
+    
+    return _delivery_response(delivery)
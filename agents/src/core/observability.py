@@ -12,6 +12,8 @@ Métricas disponíveis:
 - auracore_voice_duration_seconds: Duração de voz
 - auracore_document_imports_total: Imports de documentos
 - auracore_rag_duration_seconds: Duração de consultas RAG
+- auracore_webhook_deliveries_total: Entregas de webhooks
+- auracore_webhook_queue_lag_seconds: Atraso da fila de webhooks
 """
 
 import time
@@ -115,6 +117,25 @@ DOCUMENT_CHUNKS = Counter(
     ["doc_type"],
 )
 
+# ----- WEBHOOK METRICS -----
+WEBHOOK_DELIVERIES = Counter(
+    "auracore_webhook_deliveries_total",
+    "Tentativas de entrega de webhooks",
+    ["status"],  # success, failed, retry, short_circuit
+)
+
+WEBHOOK_QUEUE_LAG = Histogram(
+    "auracore_webhook_queue_lag_seconds",
+    "Tempo entre o enfileiramento e o início da entrega",
+    buckets=[0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0],
+)
+
+WEBHOOK_QUEUE_DEPTH = Gauge(
+    "auracore_webhook_queue_depth",
+    "Entregas aguardando na fila",
+    ["queue"],  # ready, delayed
+)
+
 # ----- SYSTEM METRICS -----
 ACTIVE_SESSIONS = Gauge(
     "auracore_active_sessions",
@@ -164,6 +185,25 @@ class ObservabilityMiddleware:
     def __init__(self):
         self.settings = get_settings()
         self.enabled = self.settings.enable_observability
+        # Sketches de latência em processo (p50/p95/p99 sem guardar amostras)
+        self._latency_sketches: Dict[tuple, Any] = {}
+    
+    def _observe_latency(self, kind: str, name: str, duration_ms: float) -> None:
+        """Alimenta o sketch de latência de um agent/tool."""
+        # Import tardio: src.services importa src.core
+        from src.services.analytics.sketches import LatencySketch
+        
+        sketch = self._latency_sketches.get((kind, name))
+        if sketch is None:
+            sketch = self._latency_sketches[(kind, name)] = LatencySketch()
+        sketch.add(duration_ms)
+    
+    def get_latency_percentiles(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """p50/p95/p99 (ms) por agent e por tool, desde o início do processo."""
+        result: Dict[str, Dict[str, Dict[str, float]]] = {"agents": {}, "tools": {}}
+        for (kind, name), sketch in self._latency_sketches.items():
+            result["agents" if kind == "agent" else "tools"][name] = sketch.percentiles()
+        return result
     
     # ===== AGENT METHODS =====
     
@@ -209,6 +249,7 @@ class ObservabilityMiddleware:
             # Métricas de sucesso
             duration = time.time() - start_time
             AGENT_LATENCY.labels(agent_name=agent_name).observe(duration)
+            self._observe_latency("agent", agent_name, duration * 1000)
             AGENT_REQUESTS.labels(agent_name=agent_name, status="success").inc()
             
             # Log de sucesso
@@ -263,6 +304,7 @@ class ObservabilityMiddleware:
             if self.enabled:
                 duration = time.perf_counter() - start
                 TOOL_DURATION.labels(tool_name=tool_name).observe(duration)
+                self._observe_latency("tool", tool_name, duration * 1000)
     
     # ===== KNOWLEDGE/RAG METHODS =====
     
@@ -5,6 +5,8 @@ Entry point do servidor de agentes AuraCore.
 Inicializa FastAPI com todas as rotas, middlewares e documentação OpenAPI.
 """
 
+import asyncio
+from typing import Optional
 import structlog
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -26,10 +28,13 @@ from src.api import integrations as integrations_api
 from src.api import push as push_api
 from src.api import analytics as analytics_api
 from src.api import audit as audit_api
+from src.api import documents as documents_api
 from src.services.analytics import get_analytics_service
+from src.services.audit import get_audit_service
 from src.middleware.audit import AuditContextMiddleware
 from src.core.orchestrator import get_orchestrator
 from src.services.webhooks import get_webhook_service
+from src.services.document_processing import get_conversion_pool
 from src.services.tasks import get_task_queue, TaskWorker
 from src.middleware.locale import LocaleMiddleware
 
@@ -129,6 +134,10 @@ TAGS_METADATA = [
         "name": "Audit",
         "description": "Audit logging e compliance (LGPD, SPED)",
     },
+    {
+        "name": "Documents",
+        "description": "Importação de DANFe/DACTe com upload em streaming",
+    },
 ]
 
 
@@ -198,11 +207,29 @@ async def lifespan(app: FastAPI):
     await analytics_service.start()
     logger.info("Analytics service started")
     
+    # Índices de audit para eventos antigos (uma vez; em background)
+    audit_backfill = asyncio.create_task(get_audit_service().backfill_indexes())
+    
+    # Sem ARQ a fila de tasks fica na memória deste processo: o worker
+    # precisa rodar aqui (on-prem sem Redis)
+    task_worker: Optional[TaskWorker] = None
+    task_queue = get_task_queue()
+    if await task_queue.is_local():
+        task_worker = TaskWorker(queue=task_queue)
+        task_worker_run = asyncio.create_task(task_worker.run())
+        logger.info("Local task worker started", concurrency=task_worker.concurrency)
+    
     yield
     
     # Shutdown
+    if task_worker:
+        # Drena antes de parar os serviços que as tasks usam
+        await task_worker.shutdown()
+        await task_worker_run
+    audit_backfill.cancel()
     await analytics_service.stop()
     await webhook_service.stop()
+    get_conversion_pool().shutdown()
     logger.info("Shutting down AuraCore Agents")
 
 
@@ -271,6 +298,7 @@ app.include_router(integrations_api.router, prefix="/v1", tags=["Integrations"])
 app.include_router(push_api.router, prefix="/v1", tags=["Push Notifications"])
 app.include_router(analytics_api.router, prefix="/v1", tags=["Analytics"])
 app.include_router(audit_api.router, prefix="/v1", tags=["Audit"])
+app.include_router(documents_api.router, prefix="/v1", tags=["Documents"])
 
 
 # ===== CUSTOM DOCS =====
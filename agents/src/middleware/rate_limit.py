@@ -1,11 +1,21 @@
 # agents/src/middleware/rate_limit.py
 """
 Rate limiting para APIs.
+
+Algoritmo: GCRA (Generic Cell Rate Algorithm) com três janelas
+(minuto, hora e burst por segundo), verificadas e registradas
+atomicamente em um único script Lua no Redis (1 round-trip).
+
+Cada janela guarda apenas o TAT (theoretical arrival time) em ms,
+então o custo de memória é constante por chave e requests com custo
+maior que 1 (voz, chats longos) consomem proporcionalmente.
 """
 
+import hashlib
 import time
+from collections import OrderedDict
 from typing import Optional, Callable, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import structlog
 
 from fastapi import Request, HTTPException
@@ -17,120 +27,268 @@ from src.services.cache import get_cache
 logger = structlog.get_logger()
 
 
+# KEYS: uma chave por janela
+# ARGV[1]: custo; ARGV[2i], ARGV[2i+1]: limite e período (ms) da janela i
+# Retorno: {allowed, índice da janela, remaining, retry_after_ms, reset_ms}
+GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local cost = tonumber(ARGV[1])
+local new_tats = {}
+local best_idx = 1
+local best_remaining = nil
+local best_reset = 0
+
+for i = 1, #KEYS do
+    local limit = tonumber(ARGV[i * 2])
+    local period = tonumber(ARGV[i * 2 + 1])
+    local interval = period / limit
+    local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + cost * interval
+    local allow_at = new_tat - period
+    if allow_at > now then
+        local remaining = math.floor((period - (tat - now)) / interval)
+        if remaining < 0 then
+            remaining = 0
+        end
+        return {0, i, remaining, math.ceil(allow_at - now), math.ceil(tat - now)}
+    end
+    new_tats[i] = new_tat
+    local remaining = math.floor((period - (new_tat - now)) / interval)
+    if best_remaining == nil or remaining < best_remaining then
+        best_idx = i
+        best_remaining = remaining
+        best_reset = math.ceil(new_tat - now)
+    end
+end
+
+for i = 1, #KEYS do
+    redis.call('SET', KEYS[i], tostring(new_tats[i]), 'PX', math.ceil(new_tats[i] - now))
+end
+
+return {1, best_idx, best_remaining, 0, best_reset}
+"""
+
+
 @dataclass
 class RateLimitConfig:
     """Configuração de rate limit."""
     requests_per_minute: int = 60
     requests_per_hour: int = 1000
-    burst_size: int = 10
+    burst_size: int = 10  # Máximo de requests por segundo
     enabled: bool = True
+    # Custo por prefixo de path (voz e chat consomem mais que 1 request)
+    path_costs: dict[str, int] = field(default_factory=lambda: {
+        "/api/voice": 5,
+        "/chat": 2,
+    })
+    # Máximo de chaves mantidas nos token buckets locais
+    local_max_keys: int = 10000
+
+    def windows(self) -> list[tuple[str, int, int]]:
+        """Retorna (nome, limite, período em ms) de cada janela."""
+        return [
+            ("minute", self.requests_per_minute, 60_000),
+            ("hour", self.requests_per_hour, 3_600_000),
+            ("burst", self.burst_size, 1_000),
+        ]
+
+
+class _TokenBucket:
+    """Token bucket em memória com uma janela por limite."""
+
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, capacities: list[float], now: float):
+        self.tokens = list(capacities)
+        self.updated_at = now
+
+    def refill(self, windows: list[tuple[str, int, int]], now: float) -> None:
+        """Reabastece tokens proporcionalmente ao tempo decorrido."""
+        elapsed = now - self.updated_at
+        if elapsed <= 0:
+            return
+        for i, (_, limit, period_ms) in enumerate(windows):
+            rate = limit / (period_ms / 1000)
+            self.tokens[i] = min(float(limit), self.tokens[i] + elapsed * rate)
+        self.updated_at = now
 
 
 class RateLimiter:
     """
     Rate limiter usando Redis.
-    
-    Algoritmo: Sliding Window Counter (simplificado)
+
+    Algoritmo: GCRA atômico via Lua (minuto, hora, burst em 1 round-trip)
+
+    Mantém também token buckets em processo: como cada pod só consome
+    uma fração do limite global, um bucket local vazio implica limite
+    global estourado, e a request é negada sem ir ao Redis. Quando o
+    Redis está indisponível, os buckets locais são o próprio limitador.
     """
-    
+
     def __init__(self, config: Optional[RateLimitConfig] = None):
         self.config = config or RateLimitConfig()
-    
+        self._script: Optional[Any] = None
+        self._script_client: Optional[Any] = None
+        self._buckets: OrderedDict[str, _TokenBucket] = OrderedDict()
+
     async def is_allowed(
         self,
         key: str,
-        cost: int = 1
+        cost: int = 1,
+        config: Optional[RateLimitConfig] = None
     ) -> tuple[bool, dict[str, Any]]:
         """
-        Verifica se request é permitido.
-        
+        Verifica se request é permitido e registra seu custo.
+
+        Args:
+            key: Identificador do cliente (IP, API key)
+            cost: Peso da request
+            config: Limites específicos (tier da API key); usa o padrão se None
+
         Returns:
             (allowed, info)
         """
-        if not self.config.enabled:
+        config = config or self.config
+        if not config.enabled:
             return True, {"limit": 0, "remaining": 0, "reset": 0, "window": "disabled"}
-        
+
+        windows = config.windows()
+        now = time.time()
+
+        # Pré-check local: nega sem round-trip se este pod já estourou
+        denied = self._local_check(key, cost, windows, now, commit=False)
+        if denied is not None:
+            return False, denied
+
         cache = get_cache()
+        if hasattr(cache, '_use_local') and not cache._use_local:
+            try:
+                result = await self._redis_check(cache, key, cost, windows)
+            except Exception as e:
+                logger.error("rate_limit_script_error", error=str(e))
+            else:
+                if result[0]:
+                    self._local_check(key, cost, windows, now, commit=True)
+                return result
+
+        # Fallback local (Redis indisponível)
+        denied = self._local_check(key, cost, windows, now, commit=True)
+        if denied is not None:
+            return False, denied
+        return True, self._local_info(key, windows, now)
+
+    async def _redis_check(
+        self,
+        cache: Any,
+        key: str,
+        cost: int,
+        windows: list[tuple[str, int, int]]
+    ) -> tuple[bool, dict[str, Any]]:
+        """Executa o script GCRA no Redis."""
+        client = await cache._get_client()
+        if self._script is None or self._script_client is not client:
+            self._script = client.register_script(GCRA_LUA)
+            self._script_client = client
+
+        keys = [cache._make_key(f"ratelimit:{key}:{name}") for name, _, _ in windows]
+        args: list[int] = [cost]
+        for _, limit, period_ms in windows:
+            args.extend([limit, period_ms])
+
+        allowed, idx, remaining, retry_after_ms, reset_ms = await self._script(
+            keys=keys, args=args
+        )
+        name, limit, _ = windows[int(idx) - 1]
         now = time.time()
-        minute_key = f"ratelimit:{key}:minute"
-        hour_key = f"ratelimit:{key}:hour"
-        
-        # Verificar limite por minuto
-        minute_count = await self._get_window_count(cache, minute_key)
-        if minute_count + cost > self.config.requests_per_minute:
-            return False, {
-                "limit": self.config.requests_per_minute,
-                "remaining": max(0, self.config.requests_per_minute - minute_count),
-                "reset": int(now + 60),
-                "window": "minute"
-            }
-        
-        # Verificar limite por hora
-        hour_count = await self._get_window_count(cache, hour_key)
-        if hour_count + cost > self.config.requests_per_hour:
-            return False, {
-                "limit": self.config.requests_per_hour,
-                "remaining": max(0, self.config.requests_per_hour - hour_count),
-                "reset": int(now + 3600),
-                "window": "hour"
-            }
-        
-        # Registrar request
-        await self._record_request(cache, minute_key, 60)
-        await self._record_request(cache, hour_key, 3600)
-        
-        return True, {
-            "limit": self.config.requests_per_minute,
-            "remaining": self.config.requests_per_minute - minute_count - cost,
-            "reset": int(now + 60),
-            "window": "minute"
+        info = {
+            "limit": limit,
+            "remaining": int(remaining),
+            "reset": int(now + int(reset_ms) / 1000),
+            "window": name,
         }
-    
-    async def _get_window_count(
+        if not allowed:
+            info["reset"] = int(now + int(retry_after_ms) / 1000) + 1
+        return bool(allowed), info
+
+    def _get_bucket(
         self,
-        cache: Any,
-        key: str
-    ) -> int:
-        """Conta requests na janela."""
-        count_str = await cache.get(key)
-        return int(count_str) if count_str else 0
-    
-    async def _record_request(
+        key: str,
+        windows: list[tuple[str, int, int]],
+        now: float,
+        max_keys: int
+    ) -> _TokenBucket:
+        """Obtém (ou cria) bucket local da chave, com despejo LRU."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = _TokenBucket([float(limit) for _, limit, _ in windows], now)
+            self._buckets[key] = bucket
+            while len(self._buckets) > max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.refill(windows, now)
+        return bucket
+
+    def _local_check(
         self,
-        cache: Any,
         key: str,
-        window_size: int
-    ) -> None:
-        """Registra request usando operação atômica quando possível."""
-        # Verificar se estamos usando Redis diretamente
-        if hasattr(cache, '_use_local') and not cache._use_local:
-            try:
-                # Redis: usar INCR atômico para evitar race condition
-                client = await cache._get_client()
-                full_key = cache._make_key(key)
-                
-                pipe = client.pipeline()
-                pipe.incr(full_key)
-                pipe.expire(full_key, window_size)
-                await pipe.execute()
-                return
-            except Exception as e:
-                logger.error("rate_limit_atomic_incr_error", error=str(e))
-                # Fallback para método não-atômico
-        
-        # Fallback local (não-atômico, aceito em dev/fallback)
-        count_str = await cache.get(key)
-        count = int(count_str) if count_str else 0
-        await cache.set(key, str(count + 1), ttl=window_size)
+        cost: int,
+        windows: list[tuple[str, int, int]],
+        now: float,
+        commit: bool
+    ) -> Optional[dict[str, Any]]:
+        """
+        Verifica os buckets locais.
+
+        Returns:
+            None se permitido (consumindo tokens se commit), info se negado
+        """
+        bucket = self._get_bucket(key, windows, now, self.config.local_max_keys)
+        for i, (name, limit, period_ms) in enumerate(windows):
+            if bucket.tokens[i] < cost:
+                rate = limit / (period_ms / 1000)
+                wait = (cost - bucket.tokens[i]) / rate
+                return {
+                    "limit": limit,
+                    "remaining": max(0, int(bucket.tokens[i])),
+                    "reset": int(now + wait) + 1,
+                    "window": name,
+                }
+        if commit:
+            for i in range(len(windows)):
+                bucket.tokens[i] -= cost
+        return None
+
+    def _local_info(
+        self,
+        key: str,
+        windows: list[tuple[str, int, int]],
+        now: float
+    ) -> dict[str, Any]:
+        """Monta info da janela mais restritiva do bucket local."""
+        bucket = self._buckets[key]
+        i = min(range(len(windows)), key=lambda j: bucket.tokens[j])
+        name, limit, period_ms = windows[i]
+        rate = limit / (period_ms / 1000)
+        return {
+            "limit": limit,
+            "remaining": max(0, int(bucket.tokens[i])),
+            "reset": int(now + (limit - bucket.tokens[i]) / rate),
+            "window": name,
+        }
 
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """Middleware FastAPI para rate limiting."""
-    
+
     # Paths que não devem ter rate limit
     EXEMPT_PATHS = {
         "/health",
-        "/health/live", 
+        "/health/live",
         "/health/ready",
         "/metrics",
         "/observability/metrics",
@@ -138,18 +296,24 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         "/docs",
         "/openapi.json",
     }
-    
+
+    # TTL do cache local de tiers por API key (segundos)
+    TIER_CACHE_TTL = 60
+
     def __init__(
         self,
         app: Any,
         config: Optional[RateLimitConfig] = None,
-        key_func: Optional[Callable[[Request], str]] = None
+        key_func: Optional[Callable[[Request], str]] = None,
+        cost_func: Optional[Callable[[Request], int]] = None
     ):
         super().__init__(app)
-        self.limiter = RateLimiter(config)
-        self.key_func = key_func or self._default_key
         self.config = config or RateLimitConfig()
-    
+        self.limiter = RateLimiter(self.config)
+        self.key_func = key_func or self._default_key
+        self.cost_func = cost_func or self._default_cost
+        self._tiers: dict[str, tuple[Optional[tuple[str, RateLimitConfig]], float]] = {}
+
     def _default_key(self, request: Request) -> str:
         """Chave padrão: IP do cliente."""
         if request.client:
@@ -159,29 +323,90 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         if forwarded:
             return forwarded.split(",")[0].strip()
         return "unknown"
-    
+
+    def _default_cost(self, request: Request) -> int:
+        """Custo padrão: maior prefixo configurado em path_costs, senão 1."""
+        path = request.url.path
+        best_len = -1
+        cost = 1
+        for prefix, prefix_cost in self.config.path_costs.items():
+            if path.startswith(prefix) and len(prefix) > best_len:
+                best_len = len(prefix)
+                cost = prefix_cost
+        return cost
+
+    async def _resolve_tier(
+        self,
+        request: Request
+    ) -> Optional[tuple[str, RateLimitConfig]]:
+        """
+        Resolve chave e limites a partir da API key do header.
+
+        Usa os limites da própria APIKey (tier), com cache local curto
+        para não consultar o Redis em toda request.
+        """
+        raw_key = request.headers.get("X-API-Key")
+        if not raw_key:
+            return None
+
+        key_hash = hashlib.sha256(raw_key.encode()).hexdigest()
+        now = time.time()
+        cached = self._tiers.get(key_hash)
+        if cached and cached[1] > now:
+            return cached[0]
+
+        tier: Optional[tuple[str, RateLimitConfig]] = None
+        try:
+            data = await get_cache().get_json(f"apikey:hash:{key_hash}")
+        except Exception as e:
+            logger.error("rate_limit_tier_lookup_error", error=str(e))
+            data = None
+        if data:
+            tier = (
+                f"apikey:{data['id']}",
+                RateLimitConfig(
+                    requests_per_minute=data.get("rate_limit_per_minute", self.config.requests_per_minute),
+                    requests_per_hour=data.get("rate_limit_per_hour", self.config.requests_per_hour),
+                    burst_size=self.config.burst_size,
+                    enabled=self.config.enabled,
+                    path_costs=self.config.path_costs,
+                    local_max_keys=self.config.local_max_keys,
+                ),
+            )
+
+        if len(self._tiers) >= self.config.local_max_keys:
+            self._tiers.clear()
+        self._tiers[key_hash] = (tier, now + self.TIER_CACHE_TTL)
+        return tier
+
     async def dispatch(
-        self, 
-        request: Request, 
+        self,
+        request: Request,
         call_next: Callable[[Request], Any]
     ) -> Response:
         # Skip para paths isentos
         if request.url.path in self.EXEMPT_PATHS:
             return await call_next(request)
-        
+
         # Skip se desabilitado
         if not self.config.enabled:
             return await call_next(request)
-        
-        key = self.key_func(request)
-        allowed, info = await self.limiter.is_allowed(key)
-        
+
+        tier = await self._resolve_tier(request)
+        if tier:
+            key, limits = tier
+        else:
+            key, limits = self.key_func(request), None
+        cost = self.cost_func(request)
+        allowed, info = await self.limiter.is_allowed(key, cost=cost, config=limits)
+
         if not allowed:
-            retry_after = info["reset"] - int(time.time())
+            retry_after = max(1, info["reset"] - int(time.time()))
             logger.warning(
-                "rate_limit_exceeded", 
-                key=key, 
+                "rate_limit_exceeded",
+                key=key,
                 path=request.url.path,
+                cost=cost,
                 info=info
             )
             raise HTTPException(
@@ -199,12 +424,12 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                     "Retry-After": str(retry_after)
                 }
             )
-        
+
         response = await call_next(request)
-        
+
         # Adicionar headers de rate limit
         response.headers["X-RateLimit-Limit"] = str(info["limit"])
         response.headers["X-RateLimit-Remaining"] = str(info["remaining"])
         response.headers["X-RateLimit-Reset"] = str(info["reset"])
-        
+
         return response
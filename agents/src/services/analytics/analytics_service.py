@@ -9,11 +9,24 @@ import structlog
 
 from .event_tracker import EventTracker, get_event_tracker
 from .usage_aggregator import UsageAggregator, UsageStats, CostEstimate
+from .columnar_sink import get_columnar_sink
 from .events import EventType, AnalyticsEvent
 
 logger = structlog.get_logger()
 
 
+def _quarter_range(ref: date) -> tuple[datetime, datetime]:
+    """Início e fim do trimestre que contém a data."""
+    first_month = 3 * ((ref.month - 1) // 3) + 1
+    start = datetime.combine(ref.replace(month=first_month, day=1), datetime.min.time())
+    if first_month == 10:
+        next_quarter = ref.replace(year=ref.year+1, month=1, day=1)
+    else:
+        next_quarter = ref.replace(month=first_month+3, day=1)
+    end = datetime.combine(next_quarter - timedelta(days=1), datetime.max.time())
+    return start, end
+
+
 class AnalyticsService:
     """
     Serviço unificado de analytics.
@@ -33,7 +46,12 @@ class AnalyticsService:
     
     def __init__(self):
         self._tracker = get_event_tracker()
-        self._aggregator = UsageAggregator()
+        self._columnar = get_columnar_sink()
+        self._aggregator = UsageAggregator(self._columnar)
+        
+        # Export colunar (Parquet) para consultas de longo prazo
+        if self._columnar:
+            self._tracker.add_callback(self._columnar.add)
         logger.info("analytics_service_initialized")
     
     @property
@@ -44,10 +62,14 @@ class AnalyticsService:
     async def start(self):
         """Inicia serviço."""
         await self._tracker.start()
+        if self._columnar:
+            await self._columnar.start()
     
     async def stop(self):
         """Para serviço."""
         await self._tracker.stop()
+        if self._columnar:
+            await self._columnar.stop()
     
     # ===== TRACKING SHORTCUTS =====
     
@@ -108,8 +130,9 @@ class AnalyticsService:
         self,
         org_id: int,
         branch_id: int,
-        period: str = "day",  # day, week, month
-        reference_date: Optional[date] = None
+        period: str = "day",  # day, week, month, quarter
+        reference_date: Optional[date] = None,
+        source: str = "rollups"  # rollups, columnar
     ) -> UsageStats:
         """Obtém relatório de uso."""
         ref = reference_date or date.today()
@@ -127,17 +150,20 @@ class AnalyticsService:
                 end = datetime.combine(ref.replace(year=ref.year+1, month=1, day=1) - timedelta(days=1), datetime.max.time())
             else:
                 end = datetime.combine(ref.replace(month=ref.month+1, day=1) - timedelta(days=1), datetime.max.time())
+        elif period == "quarter":
+            start, end = _quarter_range(ref)
         else:
             raise ValueError(f"Invalid period: {period}")
         
-        return await self._aggregator.get_period_stats(org_id, branch_id, start, end)
+        return await self._aggregator.get_period_stats(org_id, branch_id, start, end, source)
     
     async def get_cost_report(
         self,
         org_id: int,
         branch_id: int,
         period: str = "month",
-        reference_date: Optional[date] = None
+        reference_date: Optional[date] = None,
+        source: str = "rollups"  # rollups, columnar
     ) -> CostEstimate:
         """Obtém relatório de custo."""
         ref = reference_date or date.today()
@@ -154,10 +180,12 @@ class AnalyticsService:
                 end = datetime.combine(ref.replace(year=ref.year+1, month=1, day=1) - timedelta(days=1), datetime.max.time())
             else:
                 end = datetime.combine(ref.replace(month=ref.month+1, day=1) - timedelta(days=1), datetime.max.time())
+        elif period == "quarter":
+            start, end = _quarter_range(ref)
         else:
             raise ValueError(f"Invalid period: {period}")
         
-        return await self._aggregator.estimate_cost(org_id, branch_id, start, end)
+        return await self._aggregator.estimate_cost(org_id, branch_id, start, end, source)
     
     async def get_top_agents(
         self,
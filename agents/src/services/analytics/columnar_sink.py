@@ -0,0 +1,499 @@
+# agents/src/services/analytics/columnar_sink.py
+"""
+Sink colunar de analytics (Parquet) e modo de consulta offline.
+
+Eventos rastreados são acumulados e gravados em arquivos Parquet
+particionados por organização/dia (partições hive):
+
+    {base}/org_id={org}/day={YYYY-MM-DD}/part-{...}.parquet
+
+O base pode ser um diretório local ou s3://bucket/prefixo (MinIO ou
+qualquer S3 compatível, via ANALYTICS_S3_*). Consultas listam só os
+diretórios day= do período sob org_id={org} (nunca o prefixo inteiro) e
+usam pyarrow.dataset com predicate pushdown (branch/timestamp) e
+agregação vetorizada, produzindo os mesmos contadores dos rollups.
+
+Cada roll cria um part-*.parquet por organização/dia; a compactação
+periódica junta os arquivos de cada dia fechado num único arquivo.
+
+Requer pyarrow (opcional): pip install pyarrow
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Optional
+import structlog
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    pa = None
+
+from .events import AnalyticsEvent
+from .sketches import LatencySketch
+from . import rollups
+
+logger = structlog.get_logger()
+
+
+def _schema() -> "pa.Schema":
+    """Schema dos arquivos (organização e dia ficam nas partições)."""
+    return pa.schema([
+        ("id", pa.string()),
+        ("type", pa.string()),
+        ("timestamp", pa.timestamp("ms")),
+        ("branch_id", pa.int32()),
+        ("user_id", pa.string()),
+        ("session_id", pa.string()),
+        ("agent_name", pa.string()),
+        ("tool_name", pa.string()),
+        ("duration_ms", pa.float64()),
+        ("tokens_input", pa.int64()),
+        ("tokens_output", pa.int64()),
+        ("success", pa.bool_()),
+        ("error_code", pa.string()),
+        ("error_message", pa.string()),
+        ("metadata", pa.string()),
+    ])
+
+
+class ColumnarSink:
+    """
+    Uso:
+        sink = ColumnarSink("/data/analytics")  # ou "s3://analytics/events"
+        tracker.add_callback(sink.add)
+        await sink.start()
+
+        totals = await sink.query_totals(org_id, branch_id, start, end)
+    """
+
+    ROLL_ROWS = 50_000
+    ROLL_INTERVAL = 300  # segundos
+    MAX_BUFFER_SIZE = 4 * ROLL_ROWS  # limite com gravações falhando
+    COMPRESSION = "zstd"
+    COMPACT_INTERVAL = 3600  # segundos
+    COMPACT_LOOKBACK_DAYS = 7  # dias fechados revisitados pela compactação
+
+    def __init__(self, base_uri: str) -> None:
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("pyarrow não instalado: pip install pyarrow")
+
+        self._fs, self._base = self._resolve_filesystem(base_uri)
+        self._buffer: list[AnalyticsEvent] = []
+        self._roll_lock = asyncio.Lock()
+        self._pending_roll: Optional[asyncio.Task] = None
+        self._roll_task: Optional[asyncio.Task] = None
+        self._running = False
+        self._last_compaction = 0.0
+
+        # Contadores
+        self._rolled = 0
+        self._dropped = 0
+        self._roll_errors = 0
+
+        logger.info("columnar_sink_initialized", base=base_uri)
+
+    @staticmethod
+    def _resolve_filesystem(base_uri: str) -> tuple["pafs.FileSystem", str]:
+        if base_uri.startswith("s3://"):
+            endpoint = os.getenv("ANALYTICS_S3_ENDPOINT")  # ex: http://minio:9000
+            fs = pafs.S3FileSystem(
+                access_key=os.getenv("ANALYTICS_S3_ACCESS_KEY"),
+                secret_key=os.getenv("ANALYTICS_S3_SECRET_KEY"),
+                region=os.getenv("ANALYTICS_S3_REGION", "us-east-1"),
+                endpoint_override=endpoint.split("://", 1)[-1] if endpoint else None,
+                scheme="http" if endpoint and endpoint.startswith("http://") else "https",
+            )
+            return fs, base_uri[len("s3://"):].rstrip("/")
+
+        path = os.path.abspath(base_uri)
+        os.makedirs(path, exist_ok=True)
+        return pafs.LocalFileSystem(), path
+
+    # ===== ESCRITA =====
+
+    async def start(self) -> None:
+        """Inicia roll periódico."""
+        if self._running:
+            return
+        self._running = True
+        self._roll_task = asyncio.create_task(self._periodic_roll())
+
+    async def stop(self) -> None:
+        """Para e grava o que restou no buffer."""
+        self._running = False
+        if self._roll_task:
+            self._roll_task.cancel()
+            try:
+                await self._roll_task
+            except asyncio.CancelledError:
+                pass
+        if self._pending_roll:
+            await asyncio.gather(self._pending_roll, return_exceptions=True)
+        await self.roll()
+
+    async def add(self, event: AnalyticsEvent) -> None:
+        """Callback do EventTracker: acumula evento e rola por tamanho."""
+        if len(self._buffer) >= self.MAX_BUFFER_SIZE:
+            self._drop(1)
+            return
+        self._buffer.append(event)
+        if len(self._buffer) >= self.ROLL_ROWS and (
+            self._pending_roll is None or self._pending_roll.done()
+        ):
+            self._pending_roll = asyncio.create_task(self.roll())
+
+    async def _periodic_roll(self) -> None:
+        while self._running:
+            await asyncio.sleep(self.ROLL_INTERVAL)
+            await self.roll()
+            if time.monotonic() - self._last_compaction >= self.COMPACT_INTERVAL:
+                self._last_compaction = time.monotonic()
+                try:
+                    await self.compact()
+                except Exception as e:
+                    logger.error("columnar_sink_compact_error", error=str(e))
+
+    async def roll(self) -> int:
+        """
+        Grava o buffer em arquivos Parquet (um por organização/dia).
+
+        Returns:
+            Quantidade de eventos gravados
+        """
+        async with self._roll_lock:
+            if not self._buffer:
+                return 0
+            events, self._buffer = self._buffer, []
+
+            try:
+                await asyncio.to_thread(self._write, events)
+            except Exception as e:
+                # Devolver ao buffer para a próxima tentativa
+                self._requeue(events)
+                self._roll_errors += 1
+                logger.error("columnar_sink_roll_error", count=len(events), error=str(e))
+                return 0
+
+            self._rolled += len(events)
+            logger.info("columnar_sink_rolled", count=len(events))
+            return len(events)
+
+    def _drop(self, count: int) -> None:
+        """Contabiliza eventos descartados (nunca em silêncio)."""
+        first = self._dropped == 0
+        self._dropped += count
+        if first or self._dropped % 1000 < count:
+            logger.warning("columnar_sink_events_dropped", dropped_total=self._dropped)
+
+    def _requeue(self, events: list[AnalyticsEvent]) -> None:
+        """Devolve um lote que falhou ao início do buffer (descarta excedente antigo)."""
+        self._buffer = events + self._buffer
+        overflow = len(self._buffer) - self.MAX_BUFFER_SIZE
+        if overflow > 0:
+            self._buffer = self._buffer[overflow:]
+            self._drop(overflow)
+
+    def get_stats(self) -> dict:
+        """Estatísticas de gravação."""
+        return {
+            "buffered": len(self._buffer),
+            "rolled": self._rolled,
+            "dropped": self._dropped,
+            "roll_errors": self._roll_errors
+        }
+
+    def _write(self, events: list[AnalyticsEvent]) -> None:
+        groups: dict[tuple[int, str], list[AnalyticsEvent]] = {}
+        for event in events:
+            key = (event.organization_id, event.timestamp.strftime("%Y-%m-%d"))
+            groups.setdefault(key, []).append(event)
+
+        schema = _schema()
+        for (org_id, day), group in groups.items():
+            table = pa.table({
+                "id": [e.id for e in group],
+                "type": [e.type.value for e in group],
+                "timestamp": [e.timestamp for e in group],
+                "branch_id": [e.branch_id for e in group],
+                "user_id": [e.user_id for e in group],
+                "session_id": [e.session_id for e in group],
+                "agent_name": [e.agent_name for e in group],
+                "tool_name": [e.tool_name for e in group],
+                "duration_ms": [e.duration_ms for e in group],
+                "tokens_input": [e.tokens_input for e in group],
+                "tokens_output": [e.tokens_output for e in group],
+                "success": [e.success for e in group],
+                "error_code": [e.error_code for e in group],
+                "error_message": [e.error_message for e in group],
+                "metadata": [json.dumps(e.metadata) if e.metadata else None for e in group],
+            }, schema=schema)
+
+            directory = f"{self._base}/org_id={org_id}/day={day}"
+            self._fs.create_dir(directory, recursive=True)
+            filename = f"part-{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+            pq.write_table(
+                table,
+                f"{directory}/{filename}",
+                filesystem=self._fs,
+                compression=self.COMPRESSION
+            )
+
+    # ===== COMPACTAÇÃO =====
+
+    async def compact(self, before: Optional[date] = None) -> int:
+        """
+        Junta os arquivos de cada dia fechado num único Parquet.
+
+        Revisita os COMPACT_LOOKBACK_DAYS dias anteriores a `before`
+        (default: hoje, UTC) de todas as organizações.
+
+        Returns:
+            Quantidade de dias compactados
+        """
+        return await asyncio.to_thread(self._compact_closed_days, before)
+
+    def _compact_closed_days(self, before: Optional[date] = None) -> int:
+        last = (before or datetime.utcnow().date()) - timedelta(days=1)
+        days = [
+            (last - timedelta(days=offset)).isoformat()
+            for offset in range(self.COMPACT_LOOKBACK_DAYS)
+        ]
+        orgs = self._fs.get_file_info(pafs.FileSelector(self._base, allow_not_found=True))
+
+        compacted = 0
+        for org in orgs:
+            if org.type != pafs.FileType.Directory or not org.base_name.startswith("org_id="):
+                continue
+            for day in days:
+                if self._compact_day(f"{org.path}/day={day}"):
+                    compacted += 1
+
+        if compacted:
+            logger.info("columnar_sink_compacted", days=compacted)
+        return compacted
+
+    def _compact_day(self, directory: str) -> bool:
+        """
+        Compacta um diretório day=.
+
+        O arquivo novo é gravado como .tmp e renomeado para .ready só
+        depois de completo; então os arquivos de origem são apagados e o
+        .ready vira .parquet. Se o processo parar no meio, a próxima
+        execução descarta o .tmp ou conclui o .ready (que já contém os
+        arquivos restantes).
+        """
+        entries = self._fs.get_file_info(pafs.FileSelector(directory, allow_not_found=True))
+        files = [e.path for e in entries if e.type == pafs.FileType.File]
+        parquet = sorted(path for path in files if path.endswith(".parquet"))
+
+        for path in files:
+            if path.endswith(".tmp"):
+                self._fs.delete_file(path)
+        ready = [path for path in files if path.endswith(".ready")]
+        if ready:
+            self._finish_compaction(ready[0], parquet)
+            return True
+        if len(parquet) < 2:
+            return False
+
+        table = ds.dataset(parquet, filesystem=self._fs, format="parquet", schema=_schema()).to_table()
+        target = f"{directory}/compacted-{uuid.uuid4().hex[:8]}.parquet"
+        pq.write_table(
+            table,
+            f"{target}.tmp",
+            filesystem=self._fs,
+            compression=self.COMPRESSION
+        )
+        self._fs.move(f"{target}.tmp", f"{target}.ready")
+        self._finish_compaction(f"{target}.ready", parquet)
+        return True
+
+    def _finish_compaction(self, ready: str, sources: list[str]) -> None:
+        target = ready[:-len(".ready")]
+        for path in sources:
+            if path != target:
+                self._fs.delete_file(path)
+        self._fs.move(ready, target)
+
+    # ===== CONSULTA =====
+
+    async def query_totals(
+        self,
+        org_id: int,
+        branch_id: int,
+        start_date: datetime,
+        end_date: datetime
+    ) -> dict[str, float]:
+        """Contadores no formato dos rollups, calculados sobre os Parquet."""
+        return await asyncio.to_thread(self.aggregate, org_id, branch_id, start_date, end_date)
+
+    def aggregate(
+        self,
+        org_id: int,
+        branch_id: int,
+        start_date: datetime,
+        end_date: datetime
+    ) -> dict[str, float]:
+        """Varredura com pushdown de predicado e agregação vetorizada."""
+        files = self._files_in_range(org_id, start_date, end_date)
+        if not files:
+            return {}
+        dataset = ds.dataset(files, filesystem=self._fs, format="parquet", schema=_schema())
+
+        predicate = (
+            (ds.field("branch_id") == branch_id)
+            & (ds.field("timestamp") >= pa.scalar(start_date, pa.timestamp("ms")))
+            & (ds.field("timestamp") <= pa.scalar(end_date, pa.timestamp("ms")))
+        )
+        table = dataset.to_table(
+            columns=[
+                "type", "agent_name", "tool_name", "user_id",
+                "duration_ms", "tokens_input", "tokens_output",
+            ],
+            filter=predicate,
+        )
+
+        totals: dict[str, float] = {}
+        if table.num_rows == 0:
+            return totals
+
+        def is_in(types: set[str]) -> "pa.ChunkedArray":
+            return pc.is_in(table["type"], value_set=pa.array(sorted(types)))
+
+        # Agent events
+        agents = table.filter(is_in(rollups.AGENT_TYPES))
+        if agents.num_rows:
+            agents = agents.set_column(
+                agents.schema.get_field_index("agent_name"),
+                "agent_name",
+                pc.fill_null(agents["agent_name"], "unknown")
+            )
+            totals["requests"] = agents.num_rows
+            for metric in ("tokens_input", "tokens_output"):
+                total = pc.sum(agents[metric]).as_py()
+                if total:
+                    totals[metric] = total
+            for row in agents.group_by("agent_name").aggregate([
+                ("agent_name", "count"),
+                ("tokens_input", "sum"),
+                ("tokens_output", "sum"),
+            ]).to_pylist():
+                name = row["agent_name"]
+                totals[f"agent:{name}:requests"] = row["agent_name_count"]
+                for metric in ("tokens_input", "tokens_output"):
+                    if row[f"{metric}_sum"]:
+                        totals[f"agent:{name}:{metric}"] = row[f"{metric}_sum"]
+            self._latency_totals(agents, "agent_name", "agent", totals)
+
+        # Errors
+        errors = table.filter(is_in(rollups.ERROR_TYPES))
+        if errors.num_rows:
+            totals["errors"] = errors.num_rows
+            for column, kind in (("agent_name", "agent"), ("tool_name", "tool")):
+                named = errors.filter(pc.is_valid(errors[column]))
+                for row in named.group_by(column).aggregate([(column, "count")]).to_pylist():
+                    totals[f"{kind}:{row[column]}:errors"] = row[f"{column}_count"]
+
+        # Tool events
+        tools = table.filter(is_in(rollups.TOOL_TYPES))
+        if tools.num_rows:
+            tools = tools.set_column(
+                tools.schema.get_field_index("tool_name"),
+                "tool_name",
+                pc.fill_null(tools["tool_name"], "unknown")
+            )
+            for row in tools.group_by("tool_name").aggregate([("tool_name", "count")]).to_pylist():
+                totals[f"tool:{row['tool_name']}:calls"] = row["tool_name_count"]
+            self._latency_totals(tools, "tool_name", "tool", totals)
+
+        # Users
+        users = table.filter(pc.is_valid(table["user_id"]))
+        for row in users.group_by("user_id").aggregate([("user_id", "count")]).to_pylist():
+            totals[f"user:{row['user_id']}:requests"] = row["user_id_count"]
+
+        return totals
+
+    def _files_in_range(
+        self,
+        org_id: int,
+        start_date: datetime,
+        end_date: datetime
+    ) -> list[str]:
+        """Parquet dos dias do período, listando só org_id={org} e seus day= do intervalo."""
+        first = start_date.strftime("%Y-%m-%d")
+        last = end_date.strftime("%Y-%m-%d")
+        days = self._fs.get_file_info(
+            pafs.FileSelector(f"{self._base}/org_id={org_id}", allow_not_found=True)
+        )
+
+        files: list[str] = []
+        for info in days:
+            name, _, day = info.base_name.partition("=")
+            if info.type != pafs.FileType.Directory or name != "day" or not first <= day <= last:
+                continue
+            files.extend(
+                entry.path
+                for entry in self._fs.get_file_info(pafs.FileSelector(info.path))
+                if entry.type == pafs.FileType.File and entry.path.endswith(".parquet")
+            )
+        return sorted(files)
+
+    @staticmethod
+    def _latency_totals(
+        table: "pa.Table",
+        column: str,
+        kind: str,
+        totals: dict[str, float]
+    ) -> None:
+        """Soma/contagem de latência e bins do LatencySketch por nome."""
+        duration = table["duration_ms"]
+        timed = table.filter(pc.and_(pc.is_valid(duration), pc.not_equal(duration, 0)))
+        if not timed.num_rows:
+            return
+
+        for row in timed.group_by(column).aggregate([
+            ("duration_ms", "sum"),
+            ("duration_ms", "count"),
+        ]).to_pylist():
+            totals[f"{kind}:{row[column]}:latency_sum"] = row["duration_ms_sum"]
+            totals[f"{kind}:{row[column]}:latency_count"] = row["duration_ms_count"]
+
+        # Índice do bin, vetorizado: ceil(ln(clamp(x)) / ln(gamma))
+        clamped = pc.min_element_wise(
+            pc.max_element_wise(timed["duration_ms"], LatencySketch.MIN_MS),
+            LatencySketch.MAX_MS
+        )
+        bins = pc.cast(
+            pc.ceil(pc.divide(pc.ln(clamped), LatencySketch._LOG_GAMMA)),
+            pa.int64()
+        )
+        binned = pa.table({column: timed[column], "bin": bins})
+        for row in binned.group_by([column, "bin"]).aggregate([("bin", "count")]).to_pylist():
+            field = f"{kind}:{row[column]}:{LatencySketch.FIELD_PREFIX}{row['bin']}"
+            totals[field] = row["bin_count"]
+
+
+# Singleton (None se não configurado)
+_columnar_sink: Optional[ColumnarSink] = None
+
+
+def get_columnar_sink() -> Optional[ColumnarSink]:
+    """Retorna o sink colunar se ANALYTICS_COLUMNAR_URI estiver definido."""
+    global _columnar_sink
+    if _columnar_sink is None:
+        base_uri = os.getenv("ANALYTICS_COLUMNAR_URI")
+        if not base_uri or not PYARROW_AVAILABLE:
+            return None
+        _columnar_sink = ColumnarSink(base_uri)
+    return _columnar_sink
@@ -1,17 +1,24 @@
 # agents/src/services/analytics/event_tracker.py
 """
 Tracker de eventos com buffer e batch insert.
+
+Ingestão append-only: cada flush faz RPUSH dos eventos (JSON compacto)
+em analytics:log:{org}:{branch}:{dia} e incrementa os rollups por
+hora/dia (ver rollups.py), tudo num único MULTI/EXEC. Não há
+read-modify-write, então pods concorrentes não perdem eventos e o custo
+do flush é proporcional ao lote, não ao dia.
 """
 
 import asyncio
+import json
 import time
 import uuid
 from typing import Optional, Callable, Awaitable
 from datetime import datetime
-from collections import deque
 import structlog
 
 from .events import AnalyticsEvent, EventType
+from . import rollups
 from src.services.cache import get_cache
 
 logger = structlog.get_logger()
@@ -48,16 +55,31 @@ class EventTracker:
     
     BATCH_SIZE = 100
     FLUSH_INTERVAL = 10  # segundos
+    MAX_BUFFER_SIZE = 10000
+    BACKPRESSURE_TIMEOUT = 1.0  # segundos aguardando flush com buffer cheio
+    RETENTION_SECONDS = 604800  # 7 dias
     
     def __init__(self):
         self._cache = get_cache()
-        self._buffer: deque[AnalyticsEvent] = deque(maxlen=1000)
+        self._buffer: list[AnalyticsEvent] = []
         self._flush_task: Optional[asyncio.Task] = None
+        self._pending_flush: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
         self._running = False
         self._callbacks: list[Callable[[AnalyticsEvent], Awaitable[None]]] = []
         
+        # Contadores
+        self._flushed = 0
+        self._dropped = 0
+        self._flush_errors = 0
+        
         logger.info("event_tracker_initialized")
     
+    @staticmethod
+    def day_key(org_id: int, branch_id: int, day: str) -> str:
+        """Lista append-only de eventos de um dia."""
+        return f"analytics:log:{org_id}:{branch_id}:{day}"
+    
     async def start(self):
         """Inicia flush periódico."""
         if self._running:
@@ -79,8 +101,10 @@ class EventTracker:
                 pass
         
         # Flush final
+        if self._pending_flush:
+            await asyncio.gather(self._pending_flush, return_exceptions=True)
         await self._flush()
-        logger.info("event_tracker_stopped")
+        logger.info("event_tracker_stopped", **self.get_stats())
     
     def add_callback(self, callback: Callable[[AnalyticsEvent], Awaitable[None]]):
         """Adiciona callback para eventos (ex: webhook, stream)."""
@@ -124,8 +148,14 @@ class EventTracker:
             metadata=metadata or {}
         )
         
-        # Adicionar ao buffer
-        self._buffer.append(event)
+        # Buffer cheio: aguardar o flush (backpressure) antes de descartar
+        if len(self._buffer) >= self.MAX_BUFFER_SIZE:
+            await self._wait_for_capacity()
+        
+        if len(self._buffer) < self.MAX_BUFFER_SIZE:
+            self._buffer.append(event)
+        else:
+            self._drop(1)
         
         # Callbacks (async)
         for callback in self._callbacks:
@@ -134,9 +164,9 @@ class EventTracker:
             except Exception as e:
                 logger.error("event_callback_error", error=str(e))
         
-        # Flush se buffer cheio
+        # Flush por tamanho
         if len(self._buffer) >= self.BATCH_SIZE:
-            asyncio.create_task(self._flush())
+            self._schedule_flush()
         
         return event
     
@@ -232,40 +262,89 @@ class EventTracker:
             await asyncio.sleep(self.FLUSH_INTERVAL)
             await self._flush()
     
+    def _schedule_flush(self) -> asyncio.Task:
+        """Agenda flush em background (no máximo um pendente)."""
+        if self._pending_flush is None or self._pending_flush.done():
+            self._pending_flush = asyncio.create_task(self._flush())
+        return self._pending_flush
+    
+    async def _wait_for_capacity(self):
+        """Aguarda o flush liberar espaço, por até BACKPRESSURE_TIMEOUT."""
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(self._schedule_flush()),
+                timeout=self.BACKPRESSURE_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            pass
+    
+    def _drop(self, count: int):
+        """Contabiliza eventos descartados (nunca em silêncio)."""
+        first = self._dropped == 0
+        self._dropped += count
+        if first or self._dropped % 1000 < count:
+            logger.warning("analytics_events_dropped", dropped_total=self._dropped)
+    
+    def _requeue(self, events: list[AnalyticsEvent]):
+        """Devolve um lote que falhou ao início do buffer (descarta excedente antigo)."""
+        self._buffer = events + self._buffer
+        overflow = len(self._buffer) - self.MAX_BUFFER_SIZE
+        if overflow > 0:
+            self._buffer = self._buffer[overflow:]
+            self._drop(overflow)
+    
     async def _flush(self):
-        """Persiste eventos do buffer."""
-        if not self._buffer:
-            return
-        
-        # Coletar eventos do buffer
-        events = []
-        while self._buffer:
-            events.append(self._buffer.popleft())
-        
-        if not events:
-            return
-        
-        # Persistir no cache (por organização/dia)
-        by_org_day: dict[str, list[dict]] = {}
-        
-        for event in events:
-            day = event.timestamp.strftime("%Y-%m-%d")
-            key = f"analytics:{event.organization_id}:{day}"
+        """Persiste eventos do buffer (RPUSH + rollups num único round-trip)."""
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            
+            events, self._buffer = self._buffer, []
+            
+            batches: dict[str, list[str]] = {}
+            counters: dict[str, dict[str, float]] = {}
+            ttls: dict[str, int] = {}
+            
+            for event in events:
+                org_id, branch_id = event.organization_id, event.branch_id
+                key = self.day_key(org_id, branch_id, event.timestamp.strftime("%Y-%m-%d"))
+                data = event.to_compact_dict()
+                batches.setdefault(key, []).append(
+                    json.dumps(data, separators=(",", ":"), default=str)
+                )
+                ttls[key] = self.RETENTION_SECONDS
+                
+                increments = rollups.event_increments(data)
+                if not increments:
+                    continue
+                for rollup_key, ttl in (
+                    (rollups.hour_key(org_id, branch_id, event.timestamp), rollups.HOUR_TTL),
+                    (rollups.day_key(org_id, branch_id, event.timestamp), rollups.DAY_TTL),
+                ):
+                    bucket = counters.setdefault(rollup_key, {})
+                    for field, amount in increments.items():
+                        bucket[field] = bucket.get(field, 0) + amount
+                    ttls[rollup_key] = ttl
             
-            if key not in by_org_day:
-                by_org_day[key] = []
-            by_org_day[key].append(event.to_dict())
-        
-        # Salvar batches
-        for key, event_dicts in by_org_day.items():
             try:
-                existing = await self._cache.get_json(key) or []
-                existing.extend(event_dicts)
-                await self._cache.set_json(key, existing, ttl=604800)  # 7 dias
+                await self._cache.write_batch(batches, counters, ttls)
             except Exception as e:
-                logger.error("analytics_flush_error", key=key, error=str(e))
-        
-        logger.debug("analytics_flushed", count=len(events))
+                self._flush_errors += 1
+                self._requeue(events)
+                logger.error("analytics_flush_error", count=len(events), error=str(e))
+                return
+            
+            self._flushed += len(events)
+            logger.debug("analytics_flushed", count=len(events), lists=len(batches))
+    
+    def get_stats(self) -> dict:
+        """Estatísticas de ingestão."""
+        return {
+            "buffered": len(self._buffer),
+            "flushed": self._flushed,
+            "dropped": self._dropped,
+            "flush_errors": self._flush_errors
+        }
 
 
 class DurationTracker:
@@ -3,6 +3,7 @@
 Definição de eventos de analytics.
 """
 
+import json
 from enum import Enum
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -48,7 +49,7 @@ class EventType(str, Enum):
     SYSTEM_ALERT = "system.alert"
 
 
-@dataclass
+@dataclass(slots=True)
 class AnalyticsEvent:
     """
     Evento de analytics.
@@ -113,12 +114,35 @@ class AnalyticsEvent:
             "metadata": self.metadata
         }
     
+    def to_compact_dict(self) -> dict:
+        """Dicionário só com campos preenchidos (success=True é o default)."""
+        data = {
+            "id": self.id,
+            "type": self.type.value,
+            "timestamp": self.timestamp.isoformat(),
+            "organization_id": self.organization_id,
+            "branch_id": self.branch_id,
+        }
+        for name in _OPTIONAL_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        if not self.success:
+            data["success"] = False
+        if self.metadata:
+            data["metadata"] = self.metadata
+        return data
+    
+    def to_json(self) -> str:
+        """Serialização compacta para ingestão (omite campos vazios)."""
+        return json.dumps(self.to_compact_dict(), separators=(",", ":"), default=str)
+    
     @classmethod
     def from_dict(cls, data: dict) -> "AnalyticsEvent":
         """Cria evento a partir de dicionário."""
         return cls(
             id=data["id"],
-            type=EventType(data["type"]),
+            type=_EVENT_TYPES[data["type"]],
             timestamp=datetime.fromisoformat(data["timestamp"]),
             organization_id=data.get("organization_id", 0),
             branch_id=data.get("branch_id", 0),
@@ -134,3 +158,12 @@ class AnalyticsEvent:
             error_message=data.get("error_message"),
             metadata=data.get("metadata", {})
         )
+
+
+_OPTIONAL_FIELDS = (
+    "user_id", "session_id", "agent_name", "tool_name", "duration_ms",
+    "tokens_input", "tokens_output", "error_code", "error_message",
+)
+
+# Lookup direto por valor (mais barato que EventType(value))
+_EVENT_TYPES: dict[str, EventType] = {t.value: t for t in EventType}
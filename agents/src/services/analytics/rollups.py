@@ -0,0 +1,139 @@
+# agents/src/services/analytics/rollups.py
+"""
+Rollups pré-agregados de analytics.
+
+Contadores incrementados na ingestão (HINCRBY) em buckets por
+organização/filial, com granularidade de hora e de dia:
+
+    analytics:rollup:h:{org}:{branch}:{YYYY-MM-DDTHH}
+    analytics:rollup:d:{org}:{branch}:{YYYY-MM-DD}
+
+Campos totais ("requests", "tokens_input", "errors", ...) e por dimensão
+no formato "{tipo}:{nome}:{métrica}" (ex: "agent:fiscal:requests",
+"tool:calculate_icms:calls"). Latências de agents e tools também vão
+para bins de um LatencySketch ("agent:fiscal:q42"), o que permite
+p50/p95/p99 mergeáveis sem guardar amostras. Uma leitura de período
+soma O(buckets) hashes em vez de desserializar eventos brutos.
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional, Union
+
+from .events import EventType
+from .sketches import LatencySketch
+
+Number = Union[int, float]
+
+HOUR_TTL = 86400 * 90
+DAY_TTL = 86400 * 730
+
+AGENT_TYPES = {EventType.AGENT_REQUEST.value, EventType.AGENT_RESPONSE.value}
+ERROR_TYPES = {EventType.AGENT_ERROR.value, EventType.TOOL_ERROR.value}
+TOOL_TYPES = {EventType.TOOL_CALL.value, EventType.TOOL_SUCCESS.value, EventType.TOOL_ERROR.value}
+
+
+def hour_key(org_id: int, branch_id: int, timestamp: datetime) -> str:
+    return f"analytics:rollup:h:{org_id}:{branch_id}:{timestamp.strftime('%Y-%m-%dT%H')}"
+
+
+def day_key(org_id: int, branch_id: int, timestamp: datetime) -> str:
+    return f"analytics:rollup:d:{org_id}:{branch_id}:{timestamp.strftime('%Y-%m-%d')}"
+
+
+def day_of(key: str) -> Optional[str]:
+    """Dia (YYYY-MM-DD) de um bucket diário; None para buckets horários."""
+    if key.startswith("analytics:rollup:d:"):
+        return key.rsplit(":", 1)[1]
+    return None
+
+
+def event_increments(event: dict) -> dict[str, Number]:
+    """
+    Incrementos de rollup de um evento (dict de AnalyticsEvent).
+
+    Floats (somas de latência) usam HINCRBYFLOAT; inteiros, HINCRBY.
+    """
+    increments: dict[str, Number] = {}
+
+    def add(field: str, amount: Number = 1) -> None:
+        increments[field] = increments.get(field, 0) + amount
+
+    event_type = event.get("type", "")
+    duration = event.get("duration_ms")
+
+    # Agent events
+    if event_type in AGENT_TYPES:
+        agent = event.get("agent_name") or "unknown"
+        add("requests")
+        add(f"agent:{agent}:requests")
+
+        for metric in ("tokens_input", "tokens_output"):
+            if event.get(metric):
+                add(metric, int(event[metric]))
+                add(f"agent:{agent}:{metric}", int(event[metric]))
+
+        if duration:
+            add(f"agent:{agent}:latency_sum", float(duration))
+            add(f"agent:{agent}:latency_count")
+            add(f"agent:{agent}:{LatencySketch.field_for(duration)}")
+
+    # Errors
+    if event_type in ERROR_TYPES:
+        add("errors")
+        if event.get("agent_name"):
+            add(f"agent:{event['agent_name']}:errors")
+        if event.get("tool_name"):
+            add(f"tool:{event['tool_name']}:errors")
+
+    # Tool events
+    if event_type in TOOL_TYPES:
+        tool = event.get("tool_name") or "unknown"
+        add(f"tool:{tool}:calls")
+        if duration:
+            add(f"tool:{tool}:latency_sum", float(duration))
+            add(f"tool:{tool}:latency_count")
+            add(f"tool:{tool}:{LatencySketch.field_for(duration)}")
+
+    # Users
+    if event.get("user_id"):
+        add(f"user:{event['user_id']}:requests")
+
+    return increments
+
+
+def bucket_keys(org_id: int, branch_id: int, start: datetime, end: datetime) -> list[str]:
+    """
+    Buckets que cobrem o período: dias inteiros usam o bucket diário,
+    bordas usam buckets horários (resolução de 1 hora).
+    """
+    keys = []
+    current = start.replace(minute=0, second=0, microsecond=0)
+
+    while current <= end:
+        day_start = current.replace(hour=0)
+        next_day = day_start + timedelta(days=1)
+
+        if current == day_start and end >= next_day - timedelta(microseconds=1):
+            keys.append(day_key(org_id, branch_id, current))
+            current = next_day
+        else:
+            keys.append(hour_key(org_id, branch_id, current))
+            current += timedelta(hours=1)
+
+    return keys
+
+
+def merge_counters(counters: list[dict]) -> dict[str, float]:
+    """Soma hashes de rollup (valores vêm do Redis como strings)."""
+    totals: dict[str, float] = {}
+    for counter in counters:
+        for field, value in counter.items():
+            totals[field] = totals.get(field, 0.0) + float(value)
+    return totals
+
+
+def split_field(field: str) -> tuple[str, str, str]:
+    """Ex: "agent:fiscal:requests" -> ("agent", "fiscal", "requests")."""
+    kind, rest = field.split(":", 1)
+    name, metric = rest.rsplit(":", 1)
+    return kind, name, metric
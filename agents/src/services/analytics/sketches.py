@@ -0,0 +1,117 @@
+# agents/src/services/analytics/sketches.py
+"""
+Sketch de quantis de latência (estilo DDSketch / HDR).
+
+Bins logarítmicos com erro relativo limitado (RELATIVE_ACCURACY): o
+valor de um quantil é reportado com no máximo ±2% de erro. O índice é
+limitado a [MIN_MS, MAX_MS], então um sketch tem no máximo ~400 bins
+(poucos KB), independente do volume de amostras.
+
+Sketches são mergeáveis por soma de contadores: entre buckets de
+rollup, dias e pods. Nos rollups cada bin é um campo de hash
+("agent:fiscal:q42") incrementado com HINCRBY.
+"""
+
+import math
+from typing import Optional
+
+
+class LatencySketch:
+    """
+    Uso:
+        sketch = LatencySketch()
+        sketch.add(123.4)
+        sketch.merge(other)
+        sketch.quantile(0.99)
+    """
+
+    __slots__ = ("bins", "count")
+
+    RELATIVE_ACCURACY = 0.02
+    GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    _LOG_GAMMA = math.log(GAMMA)
+
+    # Faixa rastreada (ms); valores fora são fixados nos bins extremos
+    MIN_MS = 0.5
+    MAX_MS = 3_600_000.0
+
+    MIN_INDEX = math.ceil(math.log(MIN_MS) / _LOG_GAMMA)
+    MAX_INDEX = math.ceil(math.log(MAX_MS) / _LOG_GAMMA)
+
+    FIELD_PREFIX = "q"
+
+    def __init__(self) -> None:
+        self.bins: dict[int, int] = {}
+        self.count = 0
+
+    @classmethod
+    def bin_index(cls, value_ms: float) -> int:
+        if value_ms <= cls.MIN_MS:
+            return cls.MIN_INDEX
+        index = math.ceil(math.log(value_ms) / cls._LOG_GAMMA)
+        return min(index, cls.MAX_INDEX)
+
+    @classmethod
+    def bin_value(cls, index: int) -> float:
+        """Valor representativo do bin (erro relativo <= RELATIVE_ACCURACY)."""
+        return 2 * cls.GAMMA ** index / (cls.GAMMA + 1)
+
+    def add(self, value_ms: float, count: int = 1) -> None:
+        index = self.bin_index(value_ms)
+        self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+
+    def merge(self, other: "LatencySketch") -> None:
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantil q em [0, 1] (None se vazio)."""
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return self.bin_value(index)
+        return self.bin_value(max(self.bins))
+
+    def percentiles(self) -> dict[str, float]:
+        """p50/p95/p99 em ms."""
+        if not self.count:
+            return {}
+        return {
+            name: round(self.quantile(q) or 0.0, 2)
+            for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+        }
+
+    # ===== SERIALIZAÇÃO (campos de hash dos rollups) =====
+
+    @classmethod
+    def field_for(cls, value_ms: float) -> str:
+        """Campo do bin de um valor (ex: "q42", "q-17")."""
+        return f"{cls.FIELD_PREFIX}{cls.bin_index(value_ms)}"
+
+    @classmethod
+    def is_field(cls, metric: str) -> bool:
+        return metric.startswith(cls.FIELD_PREFIX) and metric[1:].lstrip("-").isdigit()
+
+    def add_field(self, metric: str, count: float) -> None:
+        """Acumula um campo "q{índice}" lido de um rollup."""
+        index = int(metric[1:])
+        self.bins[index] = self.bins.get(index, 0) + int(count)
+        self.count += int(count)
+
+    def to_fields(self) -> dict[str, int]:
+        return {f"{self.FIELD_PREFIX}{index}": count for index, count in self.bins.items()}
+
+    @classmethod
+    def from_fields(cls, fields: dict) -> "LatencySketch":
+        sketch = cls()
+        for metric, count in fields.items():
+            if cls.is_field(metric):
+                sketch.add_field(metric, float(count))
+        return sketch
@@ -1,14 +1,23 @@
 # agents/src/services/analytics/usage_aggregator.py
 """
 Agregador de métricas de uso.
+
+Estatísticas vêm dos rollups por hora/dia mantidos na ingestão
+(ver rollups.py); eventos brutos ficam só para drill-down. Períodos
+longos, além da retenção do Redis, podem ser consultados nos arquivos
+Parquet do sink colunar (source="columnar", ver columnar_sink.py).
 """
 
+import json
 from typing import Optional
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 import structlog
 
-from .events import EventType
+from .event_tracker import EventTracker
+from .sketches import LatencySketch
+from .columnar_sink import ColumnarSink, get_columnar_sink
+from . import rollups
 from src.services.cache import get_cache
 
 logger = structlog.get_logger()
@@ -30,10 +39,14 @@ class UsageStats:
     requests_by_agent: dict[str, int] = field(default_factory=dict)
     errors_by_agent: dict[str, int] = field(default_factory=dict)
     latency_by_agent: dict[str, float] = field(default_factory=dict)  # média ms
+    tokens_by_agent: dict[str, int] = field(default_factory=dict)
+    latency_percentiles_by_agent: dict[str, dict[str, float]] = field(default_factory=dict)
     
     # Por tool
     calls_by_tool: dict[str, int] = field(default_factory=dict)
     errors_by_tool: dict[str, int] = field(default_factory=dict)
+    latency_by_tool: dict[str, float] = field(default_factory=dict)  # média ms
+    latency_percentiles_by_tool: dict[str, dict[str, float]] = field(default_factory=dict)
     
     # Por usuário
     active_users: int = 0
@@ -102,7 +115,8 @@ class UsageAggregator:
             org_id=1,
             branch_id=1,
             start_date=date(2026, 1, 1),
-            end_date=date(2026, 1, 31)
+            end_date=date(2026, 3, 31),
+            source="columnar"  # varredura dos Parquet (histórico longo)
         )
     """
     
@@ -110,8 +124,15 @@ class UsageAggregator:
     PRICE_INPUT_PER_1M = 3.00   # Claude Sonnet
     PRICE_OUTPUT_PER_1M = 15.00
     
-    def __init__(self):
+    LRANGE_CHUNK_SIZE = 1000
+    HGETALL_CHUNK_SIZE = 500
+    LEGACY_RETENTION_DAYS = 7
+    
+    SOURCES = ("rollups", "columnar")
+    
+    def __init__(self, columnar_sink: Optional[ColumnarSink] = None):
         self._cache = get_cache()
+        self._columnar = columnar_sink or get_columnar_sink()
     
     async def get_daily_stats(
         self,
@@ -120,56 +141,92 @@ class UsageAggregator:
         date: datetime
     ) -> UsageStats:
         """Obtém estatísticas de um dia."""
-        day_str = date.strftime("%Y-%m-%d")
-        key = f"analytics:{org_id}:{day_str}"
+        return await self.get_period_stats(
+            org_id,
+            branch_id,
+            datetime.combine(date, datetime.min.time()),
+            datetime.combine(date, datetime.max.time())
+        )
+    
+    async def get_period_stats(
+        self,
+        org_id: int,
+        branch_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        source: str = "rollups"
+    ) -> UsageStats:
+        """
+        Obtém estatísticas de um período somando rollups (O(buckets)).
         
-        events = await self._cache.get_json(key) or []
+        Dias inteiros usam o bucket diário; bordas, buckets horários.
+        Com source="columnar", os mesmos contadores são calculados sobre
+        os arquivos Parquet (sem limite de retenção do Redis).
+        """
+        if source == "columnar":
+            return await self._get_columnar_stats(org_id, branch_id, start_date, end_date)
+        if source != "rollups":
+            raise ValueError(f"Invalid source: {source}")
         
-        # Filtrar por branch
-        events = [e for e in events if e.get("branch_id") == branch_id]
+        keys = rollups.bucket_keys(org_id, branch_id, start_date, end_date)
         
-        return self._aggregate_events(
-            events,
-            period_start=datetime.combine(date, datetime.min.time()),
-            period_end=datetime.combine(date, datetime.max.time())
-        )
+        counters: list[dict] = []
+        for i in range(0, len(keys), self.HGETALL_CHUNK_SIZE):
+            counters.extend(await self._cache.hgetall_many(keys[i:i + self.HGETALL_CHUNK_SIZE]))
+        
+        totals = rollups.merge_counters(counters)
+        
+        # Dias recentes gravados antes dos rollups: blob legado por org/dia
+        cutoff = (datetime.utcnow() - timedelta(days=self.LEGACY_RETENTION_DAYS)).strftime("%Y-%m-%d")
+        for key, counter in zip(keys, counters):
+            day_str = rollups.day_of(key)
+            if counter or not day_str or day_str < cutoff:
+                continue
+            legacy = await self._cache.get_json(f"analytics:{org_id}:{day_str}") or []
+            for event in legacy:
+                if event.get("branch_id") == branch_id:
+                    for field_name, amount in rollups.event_increments(event).items():
+                        totals[field_name] = totals.get(field_name, 0.0) + amount
+        
+        return self._stats_from_totals(totals, start_date, end_date)
     
-    async def get_period_stats(
+    async def _get_columnar_stats(
         self,
         org_id: int,
         branch_id: int,
         start_date: datetime,
         end_date: datetime
     ) -> UsageStats:
-        """Obtém estatísticas de um período."""
-        all_events = []
+        """Estatísticas a partir do sink colunar."""
+        if self._columnar is None:
+            raise RuntimeError("Sink colunar não configurado (ANALYTICS_COLUMNAR_URI)")
         
-        current = start_date
-        while current <= end_date:
-            day_str = current.strftime("%Y-%m-%d")
-            key = f"analytics:{org_id}:{day_str}"
-            
-            events = await self._cache.get_json(key) or []
-            events = [e for e in events if e.get("branch_id") == branch_id]
-            all_events.extend(events)
-            
-            current += timedelta(days=1)
-        
-        return self._aggregate_events(
-            all_events,
-            period_start=start_date,
-            period_end=end_date
-        )
+        totals = await self._columnar.query_totals(org_id, branch_id, start_date, end_date)
+        return self._stats_from_totals(totals, start_date, end_date)
+    
+    async def get_day_events(
+        self,
+        org_id: int,
+        branch_id: int,
+        date: datetime,
+        offset: int = 0,
+        limit: int = 100
+    ) -> list[dict]:
+        """Drill-down: eventos brutos de um dia (retidos por 7 dias)."""
+        key = EventTracker.day_key(org_id, branch_id, date.strftime("%Y-%m-%d"))
+        values = await self._cache.lrange(key, offset, offset + limit - 1)
+        return [json.loads(v) for v in values]
     
     async def estimate_cost(
         self,
         org_id: int,
         branch_id: int,
         start_date: datetime,
-        end_date: datetime
+        end_date: datetime,
+        source: str = "rollups"
     ) -> CostEstimate:
         """Estima custo do período."""
-        stats = await self.get_period_stats(org_id, branch_id, start_date, end_date)
+        stats = await self.get_period_stats(org_id, branch_id, start_date, end_date, source)
         
         cost_input = (stats.total_tokens_input / 1_000_000) * self.PRICE_INPUT_PER_1M
         cost_output = (stats.total_tokens_output / 1_000_000) * self.PRICE_OUTPUT_PER_1M
@@ -205,7 +262,11 @@ class UsageAggregator:
                 "agent": name,
                 "requests": count,
                 "errors": stats.errors_by_agent.get(name, 0),
-                "avg_latency_ms": stats.latency_by_agent.get(name, 0)
+                "avg_latency_ms": stats.latency_by_agent.get(name, 0),
+                **{
+                    f"{p}_latency_ms": value
+                    for p, value in stats.latency_percentiles_by_agent.get(name, {}).items()
+                }
             }
             for name, count in sorted_agents[:limit]
         ]
@@ -231,7 +292,11 @@ class UsageAggregator:
             {
                 "tool": name,
                 "calls": count,
-                "errors": stats.errors_by_tool.get(name, 0)
+                "errors": stats.errors_by_tool.get(name, 0),
+                **{
+                    f"{p}_latency_ms": value
+                    for p, value in stats.latency_percentiles_by_tool.get(name, {}).items()
+                }
             }
             for name, count in sorted_tools[:limit]
         ]
@@ -242,63 +307,76 @@ class UsageAggregator:
         period_start: datetime,
         period_end: datetime
     ) -> UsageStats:
-        """Agrega lista de eventos em stats."""
+        """Agrega lista de eventos brutos em stats (mesma semântica dos rollups)."""
+        totals: dict[str, float] = {}
+        for event in events:
+            for field_name, amount in rollups.event_increments(event).items():
+                totals[field_name] = totals.get(field_name, 0.0) + amount
+        
+        return self._stats_from_totals(totals, period_start, period_end)
+    
+    def _stats_from_totals(
+        self,
+        totals: dict[str, float],
+        period_start: datetime,
+        period_end: datetime
+    ) -> UsageStats:
+        """Monta UsageStats a partir de contadores de rollup somados."""
         stats = UsageStats(
             period_start=period_start,
-            period_end=period_end
+            period_end=period_end,
+            total_requests=int(totals.get("requests", 0)),
+            total_tokens_input=int(totals.get("tokens_input", 0)),
+            total_tokens_output=int(totals.get("tokens_output", 0)),
+            total_errors=int(totals.get("errors", 0))
         )
         
-        users: set[str] = set()
-        latency_sums: dict[str, list[float]] = {}
+        latency_sums: dict[tuple[str, str], float] = {}
+        latency_counts: dict[tuple[str, str], float] = {}
+        sketches: dict[tuple[str, str], LatencySketch] = {}
         
-        for event in events:
-            event_type = event.get("type", "")
-            
-            # Agent events
-            if event_type in [EventType.AGENT_REQUEST.value, EventType.AGENT_RESPONSE.value]:
-                stats.total_requests += 1
-                
-                agent = event.get("agent_name", "unknown")
-                stats.requests_by_agent[agent] = stats.requests_by_agent.get(agent, 0) + 1
-                
-                if event.get("tokens_input"):
-                    stats.total_tokens_input += event["tokens_input"]
-                if event.get("tokens_output"):
-                    stats.total_tokens_output += event["tokens_output"]
-                
-                if event.get("duration_ms"):
-                    if agent not in latency_sums:
-                        latency_sums[agent] = []
-                    latency_sums[agent].append(event["duration_ms"])
-            
-            # Errors
-            if event_type in [EventType.AGENT_ERROR.value, EventType.TOOL_ERROR.value]:
-                stats.total_errors += 1
-                
-                agent = event.get("agent_name")
-                if agent:
-                    stats.errors_by_agent[agent] = stats.errors_by_agent.get(agent, 0) + 1
-                
-                tool = event.get("tool_name")
-                if tool:
-                    stats.errors_by_tool[tool] = stats.errors_by_tool.get(tool, 0) + 1
+        for field_name, value in totals.items():
+            if ":" not in field_name:
+                continue
+            kind, name, metric = rollups.split_field(field_name)
             
-            # Tool events
-            if event_type in [EventType.TOOL_CALL.value, EventType.TOOL_SUCCESS.value, EventType.TOOL_ERROR.value]:
-                tool = event.get("tool_name", "unknown")
-                stats.calls_by_tool[tool] = stats.calls_by_tool.get(tool, 0) + 1
-            
-            # Users
-            user_id = event.get("user_id")
-            if user_id:
-                users.add(user_id)
-                stats.requests_by_user[user_id] = stats.requests_by_user.get(user_id, 0) + 1
+            if metric == "latency_sum":
+                latency_sums[(kind, name)] = value
+            elif metric == "latency_count":
+                latency_counts[(kind, name)] = value
+            elif LatencySketch.is_field(metric):
+                sketches.setdefault((kind, name), LatencySketch()).add_field(metric, value)
+            elif kind == "agent":
+                if metric == "requests":
+                    stats.requests_by_agent[name] = int(value)
+                elif metric == "errors":
+                    stats.errors_by_agent[name] = int(value)
+                elif metric in ("tokens_input", "tokens_output"):
+                    stats.tokens_by_agent[name] = stats.tokens_by_agent.get(name, 0) + int(value)
+            elif kind == "tool":
+                if metric == "calls":
+                    stats.calls_by_tool[name] = int(value)
+                elif metric == "errors":
+                    stats.errors_by_tool[name] = int(value)
+            elif kind == "user" and metric == "requests":
+                stats.requests_by_user[name] = int(value)
         
         # Calcular médias de latência
-        for agent, latencies in latency_sums.items():
-            if latencies:
-                stats.latency_by_agent[agent] = sum(latencies) / len(latencies)
+        for (kind, name), total in latency_sums.items():
+            count = latency_counts.get((kind, name))
+            if not count:
+                continue
+            if kind == "agent":
+                stats.latency_by_agent[name] = total / count
+            elif kind == "tool":
+                stats.latency_by_tool[name] = total / count
+        
+        for (kind, name), sketch in sketches.items():
+            if kind == "agent":
+                stats.latency_percentiles_by_agent[name] = sketch.percentiles()
+            elif kind == "tool":
+                stats.latency_percentiles_by_tool[name] = sketch.percentiles()
         
-        stats.active_users = len(users)
+        stats.active_users = len(stats.requests_by_user)
         
         return stats
@@ -0,0 +1,407 @@
+# agents/src/services/audit/audit_checkpoints.py
+"""
+Checkpoints Merkle da hash chain de audit logs.
+
+Características:
+- Um checkpoint por organização/filial/dia fechado: raiz Merkle dos
+  hashes dos eventos (na ordem da chain), assinada com HMAC
+- Verificação rápida: em dias com checkpoint válido basta comparar o
+  marcador do dia (tamanho da lista + último hash, gravado a cada
+  append) com o contador e o último hash selados, em O(1); o
+  encadeamento é conferido só entre dias. Dias sem checkpoint ou com
+  marcador diferente são lidos uma vez: encadeamento evento a evento e
+  raiz recalculada comparada com a selada. deep=True lê todos os dias
+- Prova de inclusão de tamanho logarítmico para um evento isolado
+"""
+
+import hashlib
+import hmac
+import json
+import os
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Optional
+import structlog
+
+from .audit_export import ChainVerifier
+
+if TYPE_CHECKING:
+    from .audit_storage import AuditStorage
+
+logger = structlog.get_logger()
+
+
+# ===== MERKLE TREE =====
+#
+# Folhas e nós internos com prefixos distintos (0x00 / 0x01) para evitar
+# colisão entre uma folha e um nó interno. Nó sem par sobe sem alteração.
+
+def _leaf(event_hash: str) -> bytes:
+    return hashlib.sha256(b"\x00" + event_hash.encode()).digest()
+
+
+def _node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def _levels(event_hashes: list[str]) -> list[list[bytes]]:
+    """Níveis da árvore, das folhas até a raiz."""
+    level = [_leaf(h) for h in event_hashes]
+    levels = [level]
+    while len(level) > 1:
+        parent = [_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parent.append(level[-1])
+        levels.append(parent)
+        level = parent
+    return levels
+
+
+def merkle_root(event_hashes: list[str]) -> str:
+    """Raiz Merkle (hex) de uma sequência de hashes de eventos."""
+    if not event_hashes:
+        return hashlib.sha256(b"").hexdigest()
+    return _levels(event_hashes)[-1][0].hex()
+
+
+def merkle_proof(event_hashes: list[str], index: int) -> list[dict]:
+    """
+    Caminho de auditoria da folha `index` até a raiz.
+
+    Returns:
+        Lista de {"hash": hex, "position": "left" | "right"} (irmão a cada nível)
+    """
+    path = []
+    for level in _levels(event_hashes)[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            path.append({
+                "hash": level[sibling].hex(),
+                "position": "left" if sibling < index else "right",
+            })
+        index //= 2
+    return path
+
+
+def verify_merkle_proof(event_hash: str, path: list[dict], root: str) -> bool:
+    """Verifica prova de inclusão (pode ser feito fora do sistema, pelo auditor)."""
+    node = _leaf(event_hash)
+    for step in path:
+        sibling = bytes.fromhex(step["hash"])
+        node = _node(sibling, node) if step["position"] == "left" else _node(node, sibling)
+    return hmac.compare_digest(node.hex(), root)
+
+
+# ===== CHECKPOINTS =====
+
+@dataclass
+class AuditCheckpoint:
+    """Checkpoint assinado de um dia da chain."""
+    organization_id: int
+    branch_id: int
+    day: str
+    count: int
+    root: str
+    first_previous_hash: Optional[str]
+    last_hash: Optional[str]
+    created_at: str
+    signature: str = ""
+
+    def payload(self) -> bytes:
+        """Conteúdo assinado (tudo exceto a assinatura)."""
+        data = asdict(self)
+        data.pop("signature")
+        return json.dumps(data, sort_keys=True).encode()
+
+    def sign(self, secret: bytes) -> None:
+        self.signature = hmac.new(secret, self.payload(), hashlib.sha256).hexdigest()
+
+    def verify_signature(self, secret: bytes) -> bool:
+        expected = hmac.new(secret, self.payload(), hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, self.signature)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AuditCheckpoint":
+        return cls(**data)
+
+
+class AuditCheckpointer:
+    """
+    Cria e usa checkpoints Merkle por dia.
+
+    Uso:
+        checkpointer = AuditCheckpointer(storage)
+
+        # Task agendada (dias fechados)
+        await checkpointer.checkpoint_pending()
+
+        # Verificação rápida de anos de dados
+        is_valid, errors = await checkpointer.verify(org_id, branch_id, start, end)
+
+        # Prova de um evento
+        proof = await checkpointer.prove_event(event_id, org_id, branch_id)
+    """
+
+    # Dias fechados revisitados pela task (recupera execuções perdidas)
+    LOOKBACK_DAYS = 7
+    MGET_CHUNK_SIZE = 500
+
+    def __init__(self, storage: "AuditStorage", secret: Optional[str] = None) -> None:
+        self._storage = storage
+        self._cache = storage._cache
+        self._secret = (
+            secret
+            or os.getenv("AUDIT_CHECKPOINT_SECRET")
+            or os.getenv("JWT_SECRET_KEY", "change-me-in-production")
+        ).encode()
+
+    @staticmethod
+    def _key(org_id: int, branch_id: int, day: str) -> str:
+        return f"audit:checkpoint:{org_id}:{branch_id}:{day}"
+
+    async def get(self, org_id: int, branch_id: int, day: str) -> Optional[AuditCheckpoint]:
+        """Obtém checkpoint de um dia."""
+        data = await self._cache.get_json(self._key(org_id, branch_id, day))
+        return AuditCheckpoint.from_dict(data) if data else None
+
+    async def get_many(
+        self,
+        org_id: int,
+        branch_id: int,
+        days: list[str]
+    ) -> dict[str, AuditCheckpoint]:
+        """Obtém checkpoints de vários dias (MGET em chunks)."""
+        checkpoints: dict[str, AuditCheckpoint] = {}
+        for i in range(0, len(days), self.MGET_CHUNK_SIZE):
+            chunk = days[i:i + self.MGET_CHUNK_SIZE]
+            values = await self._cache.mget([self._key(org_id, branch_id, d) for d in chunk])
+            for day, value in zip(chunk, values):
+                if not value:
+                    continue
+                try:
+                    checkpoints[day] = AuditCheckpoint.from_dict(json.loads(value))
+                except (json.JSONDecodeError, TypeError):
+                    logger.error("audit_checkpoint_corrupt", day=day, org_id=org_id)
+        return checkpoints
+
+    async def create(self, org_id: int, branch_id: int, day: str) -> Optional[AuditCheckpoint]:
+        """
+        Cria checkpoint de um dia (re-hasheia e verifica todos os eventos).
+
+        Checkpoints existentes não são sobrescritos, e um dia com a chain
+        quebrada não é selado.
+
+        Returns:
+            Checkpoint, ou None se o dia está vazio ou inválido
+        """
+        existing = await self.get(org_id, branch_id, day)
+        if existing:
+            return existing
+
+        verifier = ChainVerifier()
+        event_hashes: list[str] = []
+        first_previous_hash: Optional[str] = None
+
+        async for chunk in self._storage.iter_day_events(org_id, branch_id, day):
+            for event in chunk:
+                if not event_hashes:
+                    first_previous_hash = event.previous_hash
+                verifier.feed(event)
+                event_hashes.append(event._calculate_hash())
+
+        if not event_hashes:
+            return None
+
+        if not verifier.is_valid:
+            logger.error(
+                "audit_checkpoint_refused",
+                org_id=org_id,
+                branch_id=branch_id,
+                day=day,
+                errors=verifier.error_count
+            )
+            return None
+
+        checkpoint = AuditCheckpoint(
+            organization_id=org_id,
+            branch_id=branch_id,
+            day=day,
+            count=len(event_hashes),
+            root=merkle_root(event_hashes),
+            first_previous_hash=first_previous_hash,
+            last_hash=verifier.previous_hash,
+            created_at=datetime.utcnow().isoformat(),
+        )
+        checkpoint.sign(self._secret)
+
+        await self._cache.set_json(
+            self._key(org_id, branch_id, day),
+            checkpoint.to_dict(),
+            ttl=self._storage.RETENTION_DAYS * 86400
+        )
+
+        logger.info(
+            "audit_checkpoint_created",
+            org_id=org_id,
+            branch_id=branch_id,
+            day=day,
+            count=checkpoint.count
+        )
+        return checkpoint
+
+    async def checkpoint_pending(self, lookback_days: Optional[int] = None) -> int:
+        """
+        Cria checkpoints dos dias fechados (até ontem) de todas as chains.
+
+        Returns:
+            Quantidade de checkpoints criados
+        """
+        lookback = lookback_days or self.LOOKBACK_DAYS
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        days = self._storage._days(yesterday - timedelta(days=lookback - 1), yesterday)
+
+        created = 0
+        for org_id, branch_id in await self._storage.list_chains():
+            existing = await self.get_many(org_id, branch_id, days)
+            for day in days:
+                if day in existing:
+                    continue
+                if await self.create(org_id, branch_id, day):
+                    created += 1
+
+        logger.info("audit_checkpoints_pending_done", created=created)
+        return created
+
+    async def verify(
+        self,
+        org_id: int,
+        branch_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        deep: bool = False
+    ) -> tuple[bool, list[str]]:
+        """
+        Verifica a chain usando checkpoints.
+
+        Dias com checkpoint de assinatura válida cujo marcador ainda é o
+        selado (nenhum append desde o checkpoint) entram só no
+        encadeamento com o dia anterior, sem leitura dos eventos. Dias
+        sem checkpoint, com marcador diferente (ou todos, com deep=True)
+        são lidos numa única passada: encadeamento evento a evento e raiz
+        Merkle recalculada comparada com a selada. Edição direta de um
+        evento no Redis não passa pelo append nem muda o marcador: só
+        deep=True a detecta.
+
+        Returns:
+            (is_valid, list of error messages)
+        """
+        verifier = ChainVerifier()
+        days = self._storage._days(start_date, end_date)
+        checkpoints = await self.get_many(org_id, branch_id, days)
+        markers = await self._storage.get_day_markers(
+            org_id, branch_id, [day for day in days if day in checkpoints]
+        )
+        full_days = 0
+
+        for day in days:
+            checkpoint = checkpoints.get(day)
+
+            if checkpoint and not checkpoint.verify_signature(self._secret):
+                verifier.add_error(f"Day {day}: Invalid checkpoint signature")
+                checkpoint = None
+
+            sealed_marker = (
+                self._storage.day_marker(checkpoint.count, checkpoint.last_hash)
+                if checkpoint else None
+            )
+            if checkpoint and not deep and markers.get(day) == sealed_marker:
+                verifier.feed_segment(
+                    f"Day {day}",
+                    checkpoint.first_previous_hash,
+                    checkpoint.last_hash,
+                    checkpoint.count
+                )
+                continue
+
+            full_days += 1
+            errors_before = verifier.error_count
+            event_hashes: list[str] = []
+            async for chunk in self._storage.iter_day_events(org_id, branch_id, day):
+                for event in chunk:
+                    verifier.feed(event)
+                    event_hashes.append(event._calculate_hash())
+
+            if not checkpoint:
+                continue
+            if not hmac.compare_digest(merkle_root(event_hashes), checkpoint.root):
+                verifier.add_error(f"Day {day}: Content changed since checkpoint")
+            elif day not in markers and verifier.error_count == errors_before:
+                # Dia gravado antes dos marcadores: próximas verificações em O(1)
+                await self._storage.set_day_marker(org_id, branch_id, day, sealed_marker)
+
+        logger.info(
+            "audit_chain_verified",
+            org_id=org_id,
+            branch_id=branch_id,
+            days=len(days),
+            full_days=full_days,
+            valid=verifier.is_valid
+        )
+        return verifier.is_valid, verifier.errors
+
+    async def prove_event(
+        self,
+        event_id: str,
+        org_id: int,
+        branch_id: int
+    ) -> Optional[dict]:
+        """
+        Gera prova de inclusão de um evento no checkpoint do seu dia.
+
+        A folha é o hash recalculado do conteúdo atual do evento: se o
+        evento foi alterado após o checkpoint, a prova não fecha na raiz.
+
+        Returns:
+            Prova (com o checkpoint assinado), ou None se evento/checkpoint não existe
+        """
+        event = await self._storage.get_by_id(event_id, org_id, branch_id)
+        if not event:
+            return None
+
+        day = event.timestamp.strftime("%Y-%m-%d")
+        checkpoint = await self.get(org_id, branch_id, day)
+        if not checkpoint:
+            return None
+
+        event_hashes: list[str] = []
+        index = -1
+        async for chunk in self._storage.iter_day_events(org_id, branch_id, day):
+            for other in chunk:
+                if other.id == event_id:
+                    index = len(event_hashes)
+                event_hashes.append(other.hash or "")
+
+        if index < 0:
+            return None
+
+        leaf = event._calculate_hash()
+        event_hashes[index] = leaf
+
+        return {
+            "event_id": event_id,
+            "day": day,
+            "index": index,
+            "leaf": leaf,
+            "path": merkle_proof(event_hashes, index),
+            "checkpoint": checkpoint.to_dict(),
+        }
+
+    def verify_proof(self, proof: dict) -> bool:
+        """Verifica prova de inclusão e a assinatura do checkpoint."""
+        checkpoint = AuditCheckpoint.from_dict(proof["checkpoint"])
+        return checkpoint.verify_signature(self._secret) and verify_merkle_proof(
+            proof["leaf"], proof["path"], checkpoint.root
+        )
@@ -0,0 +1,203 @@
+# agents/src/services/audit/audit_codec.py
+"""
+Codec binário de eventos de auditoria.
+
+Formato de um registro (little-endian, sem dependências externas):
+
+    <I tamanho do payload>
+    <B versão> <i organization_id> <i branch_id> <B flags>
+    16 strings, cada uma <I tamanho> + UTF-8 (NULL_LENGTH = None)
+
+As strings seguem STRING_FIELDS; old_value/new_value/metadata vão como
+JSON compacto. Enums são gravados pelo valor (estável entre versões).
+
+decode_batch percorre um buffer inteiro com struct.unpack_from sobre um
+memoryview: nenhum registro é copiado antes de virar objeto. Um registro
+com payload corrompido é registrado em log e pulado pelo frame; um frame
+final incompleto (escrita interrompida) é cortado por complete_length
+antes do próximo append.
+"""
+
+import json
+import struct
+from datetime import datetime
+from typing import Iterator, Union
+import structlog
+
+from .audit_events import AuditEvent, _ACTIONS, _RESOURCES, _SEVERITIES
+
+logger = structlog.get_logger()
+
+VERSION = 1
+NULL_LENGTH = 0xFFFFFFFF
+
+_FRAME = struct.Struct("<I")
+_HEADER = struct.Struct("<BiiB")
+_LENGTH = struct.Struct("<I")
+
+_FLAG_SUCCESS = 0x01
+
+STRING_FIELDS = (
+    "id",
+    "timestamp",
+    "action",
+    "resource",
+    "resource_id",
+    "actor_id",
+    "actor_type",
+    "actor_ip",
+    "actor_user_agent",
+    "severity",
+    "error_message",
+    "old_value",
+    "new_value",
+    "metadata",
+    "hash",
+    "previous_hash",
+)
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def _json(value) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def encode(event: AuditEvent) -> bytes:
+    """Serializa um evento num registro com frame de tamanho."""
+    strings = (
+        event.id,
+        event.timestamp.isoformat(),
+        event.action.value,
+        event.resource.value,
+        event.resource_id,
+        event.actor_id,
+        event.actor_type,
+        event.actor_ip,
+        event.actor_user_agent,
+        event.severity.value,
+        event.error_message,
+        _json(event.old_value) if event.old_value is not None else None,
+        _json(event.new_value) if event.new_value is not None else None,
+        _json(event.metadata) if event.metadata else None,
+        event.hash,
+        event.previous_hash,
+    )
+
+    parts = [_HEADER.pack(
+        VERSION,
+        event.organization_id,
+        event.branch_id,
+        _FLAG_SUCCESS if event.success else 0
+    )]
+    for value in strings:
+        if value is None:
+            parts.append(_LENGTH.pack(NULL_LENGTH))
+        else:
+            raw = value.encode()
+            parts.append(_LENGTH.pack(len(raw)))
+            parts.append(raw)
+
+    payload = b"".join(parts)
+    return _FRAME.pack(len(payload)) + payload
+
+
+def encode_many(events: list[AuditEvent]) -> bytes:
+    """Serializa vários eventos (registros concatenados)."""
+    return b"".join(encode(event) for event in events)
+
+
+def _decode_payload(view: memoryview, offset: int) -> AuditEvent:
+    version, org_id, branch_id, flags = _HEADER.unpack_from(view, offset)
+    if version != VERSION:
+        raise ValueError(f"Unsupported audit record version: {version}")
+    offset += _HEADER.size
+
+    strings = []
+    for _ in STRING_FIELDS:
+        (length,) = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+        if length == NULL_LENGTH:
+            strings.append(None)
+        else:
+            strings.append(str(view[offset:offset + length], "utf-8"))
+            offset += length
+
+    (
+        event_id, timestamp, action, resource, resource_id, actor_id,
+        actor_type, actor_ip, actor_user_agent, severity, error_message,
+        old_value, new_value, metadata, event_hash, previous_hash,
+    ) = strings
+
+    return AuditEvent.restore(
+        hash=event_hash,
+        id=event_id,
+        timestamp=datetime.fromisoformat(timestamp),
+        organization_id=org_id,
+        branch_id=branch_id,
+        action=_ACTIONS[action],
+        resource=_RESOURCES[resource],
+        resource_id=resource_id,
+        actor_id=actor_id,
+        actor_type=actor_type,
+        actor_ip=actor_ip,
+        actor_user_agent=actor_user_agent,
+        severity=_SEVERITIES[severity],
+        success=bool(flags & _FLAG_SUCCESS),
+        error_message=error_message,
+        old_value=json.loads(old_value) if old_value is not None else None,
+        new_value=json.loads(new_value) if new_value is not None else None,
+        metadata=json.loads(metadata) if metadata is not None else {},
+        previous_hash=previous_hash,
+    )
+
+
+def decode(data: Buffer) -> AuditEvent:
+    """Desserializa um único registro."""
+    view = memoryview(data)
+    (length,) = _FRAME.unpack_from(view, 0)
+    if _FRAME.size + length > len(view):
+        raise ValueError("Truncated audit record")
+    return _decode_payload(view, _FRAME.size)
+
+
+def complete_length(data: Buffer) -> int:
+    """Tamanho do prefixo com frames completos (lê só os tamanhos)."""
+    view = memoryview(data)
+    offset = 0
+    total = len(view)
+
+    while offset + _FRAME.size <= total:
+        (length,) = _FRAME.unpack_from(view, offset)
+        end = offset + _FRAME.size + length
+        if end > total:
+            break
+        offset = end
+    return offset
+
+
+def decode_batch(data: Buffer) -> Iterator[AuditEvent]:
+    """
+    Itera registros de um buffer (ex: segmento inteiro lido do disco).
+
+    Um registro final incompleto (escrita interrompida) é ignorado; um
+    registro ilegível é registrado em log e a leitura segue no próximo frame.
+    """
+    view = memoryview(data)
+    offset = 0
+    total = len(view)
+
+    while offset + _FRAME.size <= total:
+        (length,) = _FRAME.unpack_from(view, offset)
+        start = offset + _FRAME.size
+        if start + length > total:
+            logger.error("audit_record_truncated", offset=offset)
+            return
+        try:
+            # O payload fica limitado ao frame: lixo não invade o próximo
+            event = _decode_payload(view[:start + length], start)
+        except (struct.error, UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+            logger.error("audit_record_corrupt", offset=offset, error=str(e))
+        else:
+            yield event
+        offset = start + length
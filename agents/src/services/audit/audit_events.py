@@ -6,11 +6,15 @@ Definição de eventos de auditoria.
 from enum import Enum
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 import hashlib
 import json
 
 
+# Marca de hash ainda não calculado (None significa "sem hash")
+_HASH_PENDING: Any = object()
+
+
 class AuditAction(str, Enum):
     """Ações auditáveis."""
     
@@ -112,13 +116,16 @@ class AuditSeverity(str, Enum):
     CRITICAL = "critical"
 
 
-@dataclass
+@dataclass(slots=True)
 class AuditEvent:
     """
     Evento de auditoria imutável.
     
     Uma vez criado, não pode ser alterado.
     O hash garante integridade.
+    
+    O hash é calculado sob demanda (primeiro acesso) e então fixado;
+    eventos lidos do storage mantêm o hash gravado sem recalcular.
     """
     
     # Identificação
@@ -151,12 +158,26 @@ class AuditEvent:
     metadata: dict = field(default_factory=dict)
     
     # Integridade
-    hash: Optional[str] = field(default=None, init=False)
     previous_hash: Optional[str] = None
+    _hash: Any = field(default=_HASH_PENDING, init=False, repr=False, compare=False)
+    
+    @property
+    def hash(self) -> Optional[str]:
+        """Hash SHA-256 do evento (calculado no primeiro acesso)."""
+        if self._hash is _HASH_PENDING:
+            self._hash = self._calculate_hash()
+        return self._hash
     
-    def __post_init__(self) -> None:
-        """Calcula hash após criação."""
-        self.hash = self._calculate_hash()
+    @hash.setter
+    def hash(self, value: Optional[str]) -> None:
+        self._hash = value
+    
+    @classmethod
+    def restore(cls, hash: Optional[str], **fields: Any) -> "AuditEvent":
+        """Recria evento persistido com o hash original (não recalcula)."""
+        event = cls(**fields)
+        event._hash = hash
+        return event
     
     def _calculate_hash(self) -> str:
         """Calcula hash SHA-256 do evento."""
@@ -207,20 +228,26 @@ class AuditEvent:
     
     @classmethod
     def from_dict(cls, data: dict) -> "AuditEvent":
-        """Cria evento a partir de dicionário."""
-        event = cls(
+        """
+        Cria evento a partir de dicionário.
+        
+        Valores de enum inválidos levantam KeyError.
+        """
+        # Restaurar hash original (não recalcular)
+        return cls.restore(
+            hash=data.get("hash"),
             id=data["id"],
             timestamp=datetime.fromisoformat(data["timestamp"]),
             organization_id=data.get("organization_id", 0),
             branch_id=data.get("branch_id", 0),
-            action=AuditAction(data["action"]),
-            resource=AuditResource(data["resource"]),
+            action=_ACTIONS[data["action"]],
+            resource=_RESOURCES[data["resource"]],
             resource_id=data.get("resource_id"),
             actor_id=data.get("actor_id"),
             actor_type=data.get("actor_type", "user"),
             actor_ip=data.get("actor_ip"),
             actor_user_agent=data.get("actor_user_agent"),
-            severity=AuditSeverity(data.get("severity", "low")),
+            severity=_SEVERITIES[data.get("severity", "low")],
             success=data.get("success", True),
             error_message=data.get("error_message"),
             old_value=data.get("old_value"),
@@ -228,11 +255,12 @@ class AuditEvent:
             metadata=data.get("metadata", {}),
             previous_hash=data.get("previous_hash")
         )
-        
-        # Restaurar hash original (não recalcular)
-        event.hash = data.get("hash")
-        
-        return event
+
+
+# Lookup direto por valor (mais barato que Enum(value) em leituras em lote)
+_ACTIONS: dict[str, AuditAction] = {a.value: a for a in AuditAction}
+_RESOURCES: dict[str, AuditResource] = {r.value: r for r in AuditResource}
+_SEVERITIES: dict[str, AuditSeverity] = {s.value: s for s in AuditSeverity}
 
 
 # Mapeamento de severidade por ação
@@ -0,0 +1,380 @@
+# agents/src/services/audit/audit_export.py
+"""
+Export de audit logs para compliance em streaming.
+
+Características:
+- Uma única passada: itera partições diárias, verifica a hash chain
+  incrementalmente e serializa em blocos (memória constante)
+- NDJSON + gzip (um membro gzip por dia) ou JSON em streaming
+- Checkpoints por dia para retomar exports longos (ex: SPED de 5 anos)
+"""
+
+import json
+import os
+import tempfile
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+import structlog
+
+from .audit_events import AuditEvent
+
+if TYPE_CHECKING:
+    from .audit_storage import AuditStorage
+
+logger = structlog.get_logger()
+
+
+class ChainVerifier:
+    """
+    Verificação incremental da hash chain.
+
+    Uso:
+        verifier = ChainVerifier()
+        for event in events:  # ordem da chain
+            verifier.feed(event)
+        verifier.is_valid, verifier.errors
+    """
+
+    # Limite de mensagens guardadas (o total fica em error_count)
+    MAX_REPORTED_ERRORS = 1000
+
+    def __init__(
+        self,
+        previous_hash: Optional[str] = None,
+        errors: Optional[list[str]] = None,
+        error_count: int = 0,
+        checked: int = 0
+    ) -> None:
+        self.previous_hash = previous_hash
+        self.errors: list[str] = errors or []
+        self.error_count = error_count
+        self.checked = checked
+
+    @property
+    def is_valid(self) -> bool:
+        return self.error_count == 0
+
+    def add_error(self, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < self.MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+    def feed(self, event: AuditEvent) -> bool:
+        """Verifica um evento. Returns: True se íntegro e encadeado."""
+        ok = True
+
+        # Verificar hash próprio
+        if not event.verify_integrity():
+            self.add_error(f"Event {event.id}: Hash mismatch")
+            ok = False
+
+        # Verificar chain
+        if self.previous_hash and event.previous_hash != self.previous_hash:
+            self.add_error(f"Event {event.id}: Chain broken")
+            ok = False
+
+        self.previous_hash = event.hash
+        self.checked += 1
+        return ok
+
+    def feed_segment(
+        self,
+        label: str,
+        first_previous_hash: Optional[str],
+        last_hash: Optional[str],
+        count: int
+    ) -> bool:
+        """
+        Avança sobre um segmento já verificado (ex: checkpoint assinado),
+        checando apenas o encadeamento com o segmento anterior.
+        """
+        ok = True
+        if self.previous_hash and first_previous_hash != self.previous_hash:
+            self.add_error(f"{label}: Chain broken")
+            ok = False
+
+        self.previous_hash = last_hash
+        self.checked += count
+        return ok
+
+    def to_dict(self) -> dict:
+        return {
+            "previous_hash": self.previous_hash,
+            "errors": self.errors,
+            "error_count": self.error_count,
+            "checked": self.checked,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChainVerifier":
+        return cls(
+            previous_hash=data.get("previous_hash"),
+            errors=data.get("errors", []),
+            error_count=data.get("error_count", 0),
+            checked=data.get("checked", 0),
+        )
+
+
+@dataclass
+class ExportJob:
+    """Estado de um export (persistido como checkpoint ao fim de cada dia)."""
+    export_id: str
+    organization_id: int
+    branch_id: int
+    period_start: datetime
+    period_end: datetime
+    export_format: str = "ndjson"
+    next_day: Optional[str] = None  # Próximo dia a exportar (YYYY-MM-DD)
+    total_events: int = 0
+    verifier: ChainVerifier = field(default_factory=ChainVerifier)
+    resumed_from: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "export_id": self.export_id,
+            "organization_id": self.organization_id,
+            "branch_id": self.branch_id,
+            "period_start": self.period_start.isoformat(),
+            "period_end": self.period_end.isoformat(),
+            "export_format": self.export_format,
+            "next_day": self.next_day,
+            "total_events": self.total_events,
+            "verifier": self.verifier.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ExportJob":
+        return cls(
+            export_id=data["export_id"],
+            organization_id=data["organization_id"],
+            branch_id=data["branch_id"],
+            period_start=datetime.fromisoformat(data["period_start"]),
+            period_end=datetime.fromisoformat(data["period_end"]),
+            export_format=data.get("export_format", "ndjson"),
+            next_day=data.get("next_day"),
+            total_events=data.get("total_events", 0),
+            verifier=ChainVerifier.from_dict(data.get("verifier", {})),
+        )
+
+
+class AuditExporter:
+    """
+    Exportador em streaming.
+
+    Uso:
+        exporter = AuditExporter(storage)
+        job = await exporter.start(org_id, branch_id, start, end, "ndjson")
+        async for chunk in exporter.stream(job):
+            ...
+
+        # Retomar após falha (somente ndjson)
+        job = await exporter.start(org_id, branch_id, start, end, resume_token=token)
+
+    Formato ndjson: cada dia é um membro gzip completo terminado por um
+    registro {"type": "checkpoint", "resume_token": ...}; um cliente
+    interrompido descarta o membro incompleto e retoma com o token do
+    último checkpoint recebido.
+    """
+
+    FORMATS = ("ndjson", "json")
+    CHUNK_SIZE = 64 * 1024
+    CHECKPOINT_TTL = 86400 * 7
+
+    def __init__(self, storage: "AuditStorage") -> None:
+        self._storage = storage
+        self._cache = storage._cache
+
+    @staticmethod
+    def _checkpoint_key(resume_token: str) -> str:
+        return f"audit:export:{resume_token}"
+
+    async def start(
+        self,
+        org_id: int,
+        branch_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        export_format: str = "ndjson",
+        resume_token: Optional[str] = None
+    ) -> ExportJob:
+        """
+        Cria (ou retoma) um export.
+
+        Raises:
+            ValueError: Formato inválido ou checkpoint inexistente/de outro tenant
+        """
+        if export_format not in self.FORMATS:
+            raise ValueError(f"Invalid export format: {export_format}")
+
+        if not resume_token:
+            return ExportJob(
+                export_id=str(uuid.uuid4()),
+                organization_id=org_id,
+                branch_id=branch_id,
+                period_start=start_date,
+                period_end=end_date,
+                export_format=export_format,
+                next_day=start_date.strftime("%Y-%m-%d"),
+            )
+
+        if export_format != "ndjson":
+            raise ValueError("Only ndjson exports can be resumed")
+
+        data = await self._cache.get_json(self._checkpoint_key(resume_token))
+        if not data:
+            raise ValueError(f"Export checkpoint not found: {resume_token}")
+
+        job = ExportJob.from_dict(data)
+        if job.organization_id != org_id or job.branch_id != branch_id:
+            raise ValueError(f"Export checkpoint not found: {resume_token}")
+
+        job.resumed_from = job.next_day
+        return job
+
+    async def stream(self, job: ExportJob) -> AsyncIterator[bytes]:
+        """Gera o export em blocos de bytes."""
+        if job.export_format == "json":
+            async for chunk in self._stream_json(job):
+                yield chunk
+        else:
+            async for chunk in self._stream_ndjson(job):
+                yield chunk
+
+        logger.info(
+            "audit_exported",
+            export_id=job.export_id,
+            org_id=job.organization_id,
+            branch_id=job.branch_id,
+            events_count=job.total_events,
+            chain_valid=job.verifier.is_valid
+        )
+
+    async def to_file(self, job: ExportJob, directory: Optional[str] = None) -> str:
+        """Grava o export em arquivo, em blocos. Returns: path do arquivo."""
+        suffix = ".ndjson.gz" if job.export_format == "ndjson" else ".json"
+        filename = os.path.join(
+            directory or tempfile.gettempdir(),
+            f"audit_export_{job.organization_id}_{job.branch_id}_{job.export_id[:8]}{suffix}"
+        )
+
+        with open(filename, "wb") as f:
+            async for chunk in self.stream(job):
+                f.write(chunk)
+
+        return filename
+
+    # ===== HELPERS =====
+
+    def _days(self, job: ExportJob) -> list[str]:
+        """Dias restantes do export (a partir de next_day)."""
+        first = datetime.strptime(job.next_day, "%Y-%m-%d") if job.next_day else job.period_start
+        days = []
+        current = first
+        while current.date() <= job.period_end.date():
+            days.append(current.strftime("%Y-%m-%d"))
+            current += timedelta(days=1)
+        return days
+
+    def _header(self, job: ExportJob) -> dict:
+        return {
+            "export_id": job.export_id,
+            "export_timestamp": datetime.utcnow().isoformat(),
+            "organization_id": job.organization_id,
+            "branch_id": job.branch_id,
+            "period_start": job.period_start.isoformat(),
+            "period_end": job.period_end.isoformat(),
+        }
+
+    def _integrity(self, job: ExportJob) -> dict:
+        return {
+            "valid": job.verifier.is_valid,
+            "errors": job.verifier.errors,
+            "error_count": job.verifier.error_count,
+        }
+
+    async def _day_events(self, job: ExportJob, day: str) -> AsyncIterator[AuditEvent]:
+        """Eventos do dia, já verificados na chain."""
+        async for chunk in self._storage.iter_day_events(
+            job.organization_id, job.branch_id, day
+        ):
+            for event in chunk:
+                job.verifier.feed(event)
+                job.total_events += 1
+                yield event
+
+    async def _save_checkpoint(self, job: ExportJob) -> str:
+        """Grava o estado após um dia completo. Returns: resume_token."""
+        resume_token = f"{job.export_id}:{job.next_day}"
+        await self._cache.set_json(
+            self._checkpoint_key(resume_token),
+            job.to_dict(),
+            ttl=self.CHECKPOINT_TTL
+        )
+        return resume_token
+
+    async def _stream_ndjson(self, job: ExportJob) -> AsyncIterator[bytes]:
+        def line(record: dict) -> bytes:
+            return (json.dumps(record, separators=(",", ":"), default=str) + "\n").encode()
+
+        compressor = zlib.compressobj(wbits=31)  # gzip
+        buffer = bytearray(compressor.compress(line({
+            "type": "header", **self._header(job), "resumed_from": job.resumed_from
+        })))
+
+        days = self._days(job)
+        for i, day in enumerate(days):
+            async for event in self._day_events(job, day):
+                buffer += compressor.compress(line({"type": "event", "event": event.to_dict()}))
+                if len(buffer) >= self.CHUNK_SIZE:
+                    yield bytes(buffer)
+                    buffer.clear()
+
+            job.next_day = days[i + 1] if i + 1 < len(days) else None
+            resume_token = await self._save_checkpoint(job) if job.next_day else None
+            buffer += compressor.compress(line({
+                "type": "checkpoint",
+                "export_id": job.export_id,
+                "day": day,
+                "next_day": job.next_day,
+                "total_events": job.total_events,
+                "resume_token": resume_token,
+            }))
+
+            # Fecha o membro gzip do dia: o que foi recebido até aqui é retomável
+            buffer += compressor.flush(zlib.Z_FINISH)
+            yield bytes(buffer)
+            buffer.clear()
+            compressor = zlib.compressobj(wbits=31)
+
+        buffer += compressor.compress(line({
+            "type": "trailer",
+            "export_id": job.export_id,
+            "total_events": job.total_events,
+            "last_hash": job.verifier.previous_hash,
+            "chain_integrity": self._integrity(job),
+        }))
+        buffer += compressor.flush(zlib.Z_FINISH)
+        yield bytes(buffer)
+
+    async def _stream_json(self, job: ExportJob) -> AsyncIterator[bytes]:
+        header = json.dumps(self._header(job), default=str)
+        buffer = bytearray((header[:-1] + ', "events": [').encode())
+
+        first = True
+        for day in self._days(job):
+            async for event in self._day_events(job, day):
+                if not first:
+                    buffer += b","
+                first = False
+                buffer += json.dumps(event.to_dict(), default=str).encode()
+                if len(buffer) >= self.CHUNK_SIZE:
+                    yield bytes(buffer)
+                    buffer.clear()
+
+        buffer += b'], "total_events": %d, "chain_integrity": ' % job.total_events
+        buffer += json.dumps(self._integrity(job)).encode()
+        buffer += b"}"
+        yield bytes(buffer)
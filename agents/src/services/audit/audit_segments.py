@@ -0,0 +1,180 @@
+# agents/src/services/audit/audit_segments.py
+"""
+Segmentos locais append-only para audit logs.
+
+Um arquivo binário por organização/filial/dia (ver audit_codec.py):
+
+    {base_dir}/{org_id}/{branch_id}/{YYYY-MM-DD}.seg
+
+Usado como backend de retenção longa (5 anos) quando o Redis não deve
+guardar todo o histórico, ou em instalações on-premise sem Redis.
+Arquivos são abertos apenas em modo append; nada é reescrito. A única
+exceção é um registro final incompleto (processo morto no meio de uma
+escrita): no primeiro append ao arquivo ele é cortado, para que o
+próximo registro não fique colado ao lixo.
+
+Segmentos NDJSON antigos ({YYYY-MM-DD}.ndjson) continuam legíveis: num
+dia com os dois formatos, o NDJSON vem primeiro (gravado antes).
+"""
+
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Optional
+import structlog
+
+from .audit_events import AuditEvent
+from . import audit_codec
+
+logger = structlog.get_logger()
+
+
+class AuditSegmentStore:
+    """
+    Store de segmentos diários em disco.
+
+    Uso:
+        store = AuditSegmentStore("/data/audit")
+        await store.append(event)
+        for event in store.iter_day_events(1, 1, "2026-01-15"):
+            ...
+    """
+
+    def __init__(self, base_dir: str) -> None:
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        # Segmentos já conferidos quanto a cauda incompleta neste processo
+        self._checked: set[Path] = set()
+        logger.info("audit_segment_store_initialized", base_dir=str(self.base_dir))
+
+    def segment_path(self, org_id: int, branch_id: int, day: str) -> Path:
+        """Caminho do segmento de um dia."""
+        return self.base_dir / str(org_id) / str(branch_id) / f"{day}.seg"
+
+    def legacy_path(self, org_id: int, branch_id: int, day: str) -> Path:
+        """Caminho do segmento NDJSON antigo (somente leitura)."""
+        return self.base_dir / str(org_id) / str(branch_id) / f"{day}.ndjson"
+
+    async def append(self, event: AuditEvent) -> None:
+        """Adiciona evento ao segmento do seu dia."""
+        path = self.segment_path(
+            event.organization_id,
+            event.branch_id,
+            event.timestamp.strftime("%Y-%m-%d")
+        )
+        await asyncio.to_thread(self._append_record, path, audit_codec.encode(event))
+
+    def _append_record(self, path: Path, record: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path not in self._checked:
+            self._truncate_torn_tail(path)
+            self._checked.add(path)
+        with open(path, "ab") as f:
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _truncate_torn_tail(path: Path) -> None:
+        """Corta um frame final incompleto de uma escrita interrompida."""
+        if not path.exists():
+            return
+        with open(path, "r+b") as f:
+            data = f.read()
+            valid = audit_codec.complete_length(data)
+            if valid == len(data):
+                return
+            f.truncate(valid)
+            f.flush()
+            os.fsync(f.fileno())
+        logger.warning(
+            "audit_segment_torn_tail_truncated",
+            path=str(path),
+            dropped_bytes=len(data) - valid
+        )
+
+    def has_day(self, org_id: int, branch_id: int, day: str) -> bool:
+        """Verifica se existe segmento para o dia."""
+        return (
+            self.segment_path(org_id, branch_id, day).exists()
+            or self.legacy_path(org_id, branch_id, day).exists()
+        )
+
+    def iter_day_events(self, org_id: int, branch_id: int, day: str) -> Iterator[AuditEvent]:
+        """Itera eventos de um dia na ordem de escrita (bloqueante)."""
+        legacy = self.legacy_path(org_id, branch_id, day)
+        if legacy.exists():
+            with open(legacy, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield AuditEvent.from_dict(json.loads(line))
+                    except (json.JSONDecodeError, KeyError, ValueError):
+                        logger.error("audit_segment_corrupt_line", path=str(legacy))
+
+        path = self.segment_path(org_id, branch_id, day)
+        if path.exists():
+            # Um read por dia; registros decodificados direto do buffer
+            yield from audit_codec.decode_batch(path.read_bytes())
+
+    def iter_day(self, org_id: int, branch_id: int, day: str) -> Iterator[dict]:
+        """Itera eventos de um dia como dicts (bloqueante)."""
+        for event in self.iter_day_events(org_id, branch_id, day):
+            yield event.to_dict()
+
+    async def read_day(self, org_id: int, branch_id: int, day: str) -> list[AuditEvent]:
+        """Lê todos os eventos de um dia fora do event loop."""
+        return await asyncio.to_thread(
+            lambda: list(self.iter_day_events(org_id, branch_id, day))
+        )
+
+    async def iter_day_chunks(
+        self,
+        org_id: int,
+        branch_id: int,
+        day: str,
+        chunk_size: int = 500
+    ) -> AsyncIterator[list[AuditEvent]]:
+        """Itera um dia em blocos, lendo o arquivo fora do event loop."""
+        events = self.iter_day_events(org_id, branch_id, day)
+
+        def next_chunk() -> list[AuditEvent]:
+            chunk = []
+            for event in events:
+                chunk.append(event)
+                if len(chunk) >= chunk_size:
+                    break
+            return chunk
+
+        while True:
+            chunk = await asyncio.to_thread(next_chunk)
+            if not chunk:
+                return
+            yield chunk
+
+    def list_chains(self) -> list[tuple[int, int]]:
+        """Chains (org_id, branch_id) com segmentos em disco."""
+        return sorted(
+            (int(branch_dir.parent.name), int(branch_dir.name))
+            for branch_dir in self.base_dir.glob("*/*")
+            if branch_dir.is_dir()
+            and branch_dir.name.isdigit()
+            and branch_dir.parent.name.isdigit()
+        )
+
+    def last_event(self, org_id: int, branch_id: int) -> Optional[AuditEvent]:
+        """Último evento gravado da chain (segmento mais recente)."""
+        tenant_dir = self.base_dir / str(org_id) / str(branch_id)
+        if not tenant_dir.exists():
+            return None
+        days = {path.stem for path in tenant_dir.iterdir() if path.suffix in (".seg", ".ndjson")}
+        for day in sorted(days, reverse=True):
+            last = None
+            for event in self.iter_day_events(org_id, branch_id, day):
+                last = event
+            if last:
+                return last
+        return None
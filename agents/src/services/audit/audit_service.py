@@ -4,7 +4,7 @@ Serviço principal de auditoria.
 """
 
 import uuid
-from typing import Optional
+from typing import AsyncIterator, Optional
 from datetime import datetime
 from contextvars import ContextVar
 import structlog
@@ -16,7 +16,8 @@ from .audit_events import (
     AuditSeverity,
     ACTION_SEVERITY
 )
-from .audit_storage import AuditStorage, AuditQuery
+from .audit_storage import AuditStorage, AuditQuery, AuditPage
+from .audit_export import AuditExporter, ExportJob
 
 logger = structlog.get_logger()
 
@@ -72,6 +73,7 @@ class AuditService:
     
     def __init__(self) -> None:
         self._storage = AuditStorage()
+        self._exporter = AuditExporter(self._storage)
         logger.info("audit_service_initialized")
     
     async def log(
@@ -177,6 +179,46 @@ class AuditService:
         
         return await self._storage.query(query)
     
+    async def query_page(
+        self,
+        org_id: int,
+        branch_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        action: Optional[AuditAction] = None,
+        resource: Optional[AuditResource] = None,
+        resource_id: Optional[str] = None,
+        actor_id: Optional[str] = None,
+        severity: Optional[AuditSeverity] = None,
+        success: Optional[bool] = None,
+        page: int = 1,
+        page_size: int = 50,
+        cursor: Optional[str] = None
+    ) -> AuditPage:
+        """
+        Busca eventos com filtros e paginação por cursor.
+        
+        Raises:
+            ValueError: Se o cursor for inválido
+        """
+        query = AuditQuery(
+            organization_id=org_id,
+            branch_id=branch_id,
+            start_date=start_date,
+            end_date=end_date,
+            action=action,
+            resource=resource,
+            resource_id=resource_id,
+            actor_id=actor_id,
+            severity=severity,
+            success=success,
+            page=page,
+            page_size=page_size,
+            cursor=cursor
+        )
+        
+        return await self._storage.query_page(query)
+    
     async def get_event(
         self,
         event_id: str,
@@ -191,13 +233,40 @@ class AuditService:
         org_id: int,
         branch_id: int,
         start_date: datetime,
-        end_date: datetime
+        end_date: datetime,
+        deep: bool = False
     ) -> tuple[bool, list[str]]:
-        """Verifica integridade da chain."""
+        """Verifica integridade da chain (via checkpoints, ou completa se deep)."""
         return await self._storage.verify_chain_integrity(
-            org_id, branch_id, start_date, end_date
+            org_id, branch_id, start_date, end_date, deep=deep
         )
     
+    async def get_event_proof(
+        self,
+        event_id: str,
+        org_id: int,
+        branch_id: int
+    ) -> Optional[dict]:
+        """Prova de inclusão de um evento no checkpoint Merkle do seu dia."""
+        return await self._storage.checkpoints.prove_event(event_id, org_id, branch_id)
+    
+    async def backfill_indexes(self) -> int:
+        """
+        Indexa eventos anteriores aos índices secundários (startup).
+        
+        Falha só é logada: a API segue atendendo e o backfill é
+        retomado no próximo startup.
+        """
+        try:
+            return await self._storage.backfill_indexes()
+        except Exception as e:
+            logger.error("audit_index_backfill_failed", error=str(e))
+            return 0
+    
+    async def create_checkpoints(self) -> int:
+        """Cria checkpoints dos dias fechados (task agendada)."""
+        return await self._storage.checkpoints.checkpoint_pending()
+    
     async def export(
         self,
         org_id: int,
@@ -211,6 +280,29 @@ class AuditService:
             org_id, branch_id, start_date, end_date, export_format
         )
     
+    async def start_export(
+        self,
+        org_id: int,
+        branch_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        export_format: str = "ndjson",
+        resume_token: Optional[str] = None
+    ) -> ExportJob:
+        """
+        Prepara export em streaming (novo ou retomado de um checkpoint).
+        
+        Raises:
+            ValueError: Formato inválido ou checkpoint não encontrado
+        """
+        return await self._exporter.start(
+            org_id, branch_id, start_date, end_date, export_format, resume_token
+        )
+    
+    def stream_export(self, job: ExportJob) -> AsyncIterator[bytes]:
+        """Gera o export em blocos (verificando a chain na mesma passada)."""
+        return self._exporter.stream(job)
+    
     # ===== SHORTCUTS =====
     
     async def log_login(
@@ -3,23 +3,75 @@
 Storage para audit logs.
 
 Características:
-- Append-only (imutável)
-- Hash chain para integridade
-- Retenção configurável
+- Append-only (imutável): RPUSH por dia/tenant, sem read-modify-write
+- Hash chain para integridade (append com compare-and-swap do head)
+- Checkpoints Merkle diários para verificação rápida: cada append
+  grava o marcador do dia (tamanho da lista + último hash), comparado
+  em O(1) com o selado no checkpoint
+- Retenção configurável (segmentos locais opcionais para 5 anos)
 - Export para compliance
+- Backfill único dos índices e do registro de chains para eventos
+  gravados antes deles (backfill_indexes, chamado no startup)
 """
 
-from typing import Optional
+import asyncio
+import base64
+import hashlib
+import json
+import os
+from typing import Any, AsyncIterator, Optional
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 import structlog
 
 from .audit_events import AuditEvent, AuditAction, AuditResource, AuditSeverity
+from .audit_segments import AuditSegmentStore
+from .audit_export import AuditExporter
+from .audit_checkpoints import AuditCheckpointer
 from src.services.cache import get_cache
 
 logger = structlog.get_logger()
 
 
+# Append atômico: só grava se o head da chain ainda for o esperado e se
+# o dia do evento não for anterior ao do head (a partição por dia segue
+# a ordem da chain).
+# KEYS: head, lista do dia, evento, marcador do dia, timestamp do head,
+#       índices...
+# ARGV: previous_hash esperado, novo hash, event_id, event_json, ttl,
+#       score, score mínimo dos índices, timestamp ISO do evento
+# Retorno: {1, tamanho da lista} ou {0, head atual, timestamp do head}
+APPEND_LUA = """
+local head = redis.call('GET', KEYS[1])
+local head_ts = redis.call('GET', KEYS[5])
+if (head and head ~= ARGV[1])
+    or (head_ts and string.sub(head_ts, 1, 10) > string.sub(ARGV[8], 1, 10)) then
+    return {0, head or '', head_ts or ''}
+end
+local ttl = tonumber(ARGV[5])
+redis.call('SET', KEYS[3], ARGV[4], 'EX', ttl)
+local length = redis.call('RPUSH', KEYS[2], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ttl)
+redis.call('SET', KEYS[4], length .. ':' .. ARGV[2], 'EX', ttl)
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ttl)
+redis.call('SET', KEYS[5], ARGV[8], 'EX', ttl)
+for i = 6, #KEYS do
+    redis.call('ZADD', KEYS[i], ARGV[6], ARGV[3])
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', '(' .. ARGV[7])
+    redis.call('EXPIRE', KEYS[i], ttl)
+end
+return {1, length}
+"""
+
+# Epoch para scores dos índices (timestamps naive em UTC)
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _score(timestamp: datetime) -> float:
+    """Score de um timestamp nos índices (segundos desde epoch)."""
+    return (timestamp - _EPOCH).total_seconds()
+
+
 @dataclass
 class AuditQuery:
     """Query para buscar audit logs."""
@@ -36,15 +88,40 @@ class AuditQuery:
     severity: Optional[AuditSeverity] = None
     success: Optional[bool] = None
     
-    # Paginação
+    # Paginação (cursor tem precedência sobre page)
     page: int = 1
     page_size: int = 50
+    cursor: Optional[str] = None
     
     @property
     def offset(self) -> int:
         return (self.page - 1) * self.page_size
 
 
+@dataclass
+class AuditPage:
+    """Página de resultados de uma query."""
+    events: list[AuditEvent]
+    total: int
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(score: float, skip: int) -> str:
+    """Cursor opaco: score do último item + empates já retornados."""
+    raw = f"{score!r}:{skip}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    """Decodifica cursor. Raises ValueError se inválido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, skip = base64.urlsafe_b64decode(padded).decode().split(":")
+        return float(score), int(skip)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
 class AuditStorage:
     """
     Storage para audit logs com hash chain.
@@ -54,41 +131,95 @@ class AuditStorage:
     """
     
     RETENTION_DAYS = 365 * 5  # 5 anos (requisito fiscal BR)
+    MAX_APPEND_RETRIES = 10
+    MGET_CHUNK_SIZE = 500
+    
+    # Planejamento de query: se o índice mais seletivo tem até
+    # SCAN_THRESHOLD eventos no período, filtra em memória; senão
+    # intersecta os índices no Redis (resultado cacheado por alguns segundos)
+    SCAN_THRESHOLD = 1000
+    INTERSECTION_TTL = 10
     
-    def __init__(self) -> None:
+    # Registro das chains existentes (usado pela task de checkpoints)
+    CHAINS_KEY = "audit:chains"
+    
+    # Backfill dos índices: marcador de concluído e lock entre pods
+    INDEX_BACKFILL_KEY = "audit:migrations:indexes"
+    INDEX_BACKFILL_LOCK_TTL = 3600
+    
+    def __init__(self, segment_dir: Optional[str] = None) -> None:
         self._cache = get_cache()
         self._last_hash: dict[tuple[int, int], str] = {}  # (org_id, branch_id) -> last_hash
+        self._head_timestamp: dict[tuple[int, int], Optional[datetime]] = {}
+        self._locks: dict[tuple[int, int], asyncio.Lock] = {}
+        self._append_script: Optional[Any] = None
+        self._append_script_client: Optional[Any] = None
+        
+        # Segmentos locais para retenção longa (opcional)
+        segment_dir = segment_dir or os.getenv("AUDIT_SEGMENT_DIR")
+        self._segments = AuditSegmentStore(segment_dir) if segment_dir else None
+        
+        self.checkpoints = AuditCheckpointer(self)
     
     async def append(self, event: AuditEvent) -> AuditEvent:
         """
         Adiciona evento ao log (append-only).
         
         O evento recebe o hash do evento anterior para formar a chain.
+        Se outro writer avançou a chain entre a leitura do head e a
+        gravação, o hash é recalculado sobre o novo head e o append
+        é repetido, então a chain nunca bifurca.
+        
+        Um evento com dia anterior ao do head (relógio atrasado, evento
+        em voo na virada do dia) recebe o timestamp do head antes do
+        hash: a partição por dia sempre segue a ordem da chain.
         """
-        # Obter último hash da chain
         chain_key = (event.organization_id, event.branch_id)
-        
-        if chain_key not in self._last_hash:
-            # Buscar último hash do storage
-            last_event = await self._get_last_event(
-                event.organization_id,
-                event.branch_id
-            )
-            if last_event:
-                self._last_hash[chain_key] = last_event.hash or ""
-        
-        # Atribuir previous_hash
-        event.previous_hash = self._last_hash.get(chain_key)
-        
-        # Recalcular hash com previous_hash
-        event.hash = event._calculate_hash()
-        
-        # Persistir
-        await self._persist_event(event)
-        
-        # Atualizar último hash
-        if event.hash:
-            self._last_hash[chain_key] = event.hash
+        lock = self._locks.setdefault(chain_key, asyncio.Lock())
+        
+        async with lock:
+            if chain_key not in self._last_hash:
+                (
+                    self._last_hash[chain_key],
+                    self._head_timestamp[chain_key],
+                ) = await self._get_chain_head(event.organization_id, event.branch_id)
+                await self._cache.sadd(
+                    self.CHAINS_KEY,
+                    f"{event.organization_id}:{event.branch_id}"
+                )
+            
+            for _ in range(self.MAX_APPEND_RETRIES):
+                head_timestamp = self._head_timestamp.get(chain_key)
+                if head_timestamp and head_timestamp.date() > event.timestamp.date():
+                    event.timestamp = head_timestamp
+                
+                # Atribuir previous_hash e recalcular hash
+                event.previous_hash = self._last_hash[chain_key] or None
+                event.hash = event._calculate_hash()
+                
+                stored, current_head, current_timestamp = await self._persist_event(event)
+                if stored:
+                    break
+                
+                # Chain avançou em outro pod: tentar de novo sobre o head atual
+                self._last_hash[chain_key] = current_head
+                if current_timestamp:
+                    self._head_timestamp[chain_key] = current_timestamp
+            else:
+                raise RuntimeError(
+                    f"Audit chain contention: could not append event {event.id}"
+                )
+            
+            # Atualizar último hash
+            self._last_hash[chain_key] = event.hash or ""
+            self._head_timestamp[chain_key] = event.timestamp
+            
+            # Ainda sob o lock: o segmento segue a ordem da chain
+            if self._segments:
+                try:
+                    await self._segments.append(event)
+                except Exception as e:
+                    logger.error("audit_segment_append_error", event_id=event.id, error=str(e))
         
         logger.info(
             "audit_event_stored",
@@ -106,42 +237,73 @@ class AuditStorage:
         Returns:
             (events, total_count)
         """
-        # Buscar todos eventos do período
-        all_events = await self._get_events_by_date_range(
-            query.organization_id,
-            query.branch_id,
-            query.start_date or datetime.utcnow() - timedelta(days=30),
-            query.end_date or datetime.utcnow()
+        page = await self.query_page(query)
+        return page.events, page.total
+    
+    async def query_page(self, query: AuditQuery) -> AuditPage:
+        """
+        Busca eventos usando os índices secundários.
+        
+        Ordem: timestamp desc. Suporta paginação por offset (page) ou
+        keyset (cursor); o total vem de ZCOUNT, sem desserializar eventos.
+        """
+        org_id, branch_id = query.organization_id, query.branch_id
+        min_score = _score(query.start_date or datetime.utcnow() - timedelta(days=30))
+        max_score = _score(query.end_date or datetime.utcnow())
+        
+        # Total considera o período inteiro; a página começa no cursor
+        page_max = max_score
+        skip = query.offset
+        if query.cursor:
+            cursor_score, skip = decode_cursor(query.cursor)
+            page_max = min(max_score, cursor_score)
+        
+        index_keys = [
+            self._index_key(org_id, branch_id, name, value)
+            for name, value in self._query_filters(query)
+        ] or [self._index_key(org_id, branch_id)]
+        
+        # Plano: contar cada índice no período e escolher o mais seletivo
+        counts = [
+            await self._cache.zcount(key, min_score, max_score)
+            for key in index_keys
+        ]
+        smallest = min(range(len(index_keys)), key=lambda i: counts[i])
+        
+        if len(index_keys) == 1:
+            plan_key = index_keys[0]
+        elif counts[smallest] <= self.SCAN_THRESHOLD:
+            return await self._query_scan(
+                query, index_keys[smallest], min_score, max_score, page_max, skip
+            )
+        else:
+            plan_key = await self._intersect(org_id, branch_id, index_keys)
+        
+        total = await self._cache.zcount(plan_key, min_score, max_score)
+        items = await self._cache.zrevrangebyscore(
+            plan_key,
+            page_max,
+            min_score,
+            offset=skip,
+            count=query.page_size,
+            withscores=True
+        )
+        
+        events = await self._get_events_by_ids(
+            [member for member, _ in items], org_id, branch_id
         )
         
-        # Aplicar filtros
-        filtered = []
-        for event in all_events:
-            if query.action and event.action != query.action:
-                continue
-            if query.resource and event.resource != query.resource:
-                continue
-            if query.resource_id and event.resource_id != query.resource_id:
-                continue
-            if query.actor_id and event.actor_id != query.actor_id:
-                continue
-            if query.severity and event.severity != query.severity:
-                continue
-            if query.success is not None and event.success != query.success:
-                continue
-            filtered.append(event)
-        
-        total = len(filtered)
-        
-        # Ordenar por timestamp desc
-        filtered.sort(key=lambda e: e.timestamp, reverse=True)
-        
-        # Paginar
-        start = query.offset
-        end = start + query.page_size
-        page_events = filtered[start:end]
-        
-        return page_events, total
+        count_above = 0
+        if len(items) == query.page_size:
+            count_above = await self._cache.zcount(
+                plan_key, f"({items[-1][1]!r}", page_max
+            )
+        
+        return AuditPage(
+            events=events,
+            total=total,
+            next_cursor=self._next_cursor(items, query.page_size, skip, count_above)
+        )
     
     async def get_by_id(
         self,
@@ -168,40 +330,31 @@ class AuditStorage:
         org_id: int,
         branch_id: int,
         start_date: datetime,
-        end_date: datetime
+        end_date: datetime,
+        deep: bool = False
     ) -> tuple[bool, list[str]]:
         """
         Verifica integridade da chain de audit logs.
         
+        Dias com checkpoint Merkle assinado e marcador inalterado desde o
+        selo custam O(1); os demais são lidos uma vez. deep=True re-hasheia
+        e encadeia evento a evento todo o período (detecta edição direta
+        no Redis, que não passa pelo append).
+        
         Returns:
             (is_valid, list of error messages)
         """
-        events, _ = await self.query(AuditQuery(
-            organization_id=org_id,
-            branch_id=branch_id,
-            start_date=start_date,
-            end_date=end_date,
-            page_size=10000
-        ))
-        
-        # Ordenar por timestamp asc
-        events.sort(key=lambda e: e.timestamp)
-        
-        errors: list[str] = []
-        previous_hash: Optional[str] = None
-        
-        for event in events:
-            # Verificar hash próprio
-            if not event.verify_integrity():
-                errors.append(f"Event {event.id}: Hash mismatch")
-            
-            # Verificar chain
-            if previous_hash and event.previous_hash != previous_hash:
-                errors.append(f"Event {event.id}: Chain broken")
-            
-            previous_hash = event.hash
-        
-        return len(errors) == 0, errors
+        return await self.checkpoints.verify(
+            org_id, branch_id, start_date, end_date, deep=deep
+        )
+    
+    async def list_chains(self) -> list[tuple[int, int]]:
+        """Chains (org_id, branch_id) com eventos registrados."""
+        chains = []
+        for member in await self._cache.smembers(self.CHAINS_KEY):
+            org_id, branch_id = member.split(":")
+            chains.append((int(org_id), int(branch_id)))
+        return sorted(chains)
     
     async def export_for_compliance(
         self,
@@ -214,114 +367,509 @@ class AuditStorage:
         """
         Exporta logs para compliance (LGPD, auditoria).
         
+        Gravado em blocos numa única passada, com a verificação da chain
+        feita durante a leitura. Para download direto, use AuditExporter.stream.
+        
         Returns:
             Path do arquivo exportado
         """
-        import json
-        import uuid
+        # csv nunca foi suportado de fato: mantém o JSON como antes
+        if export_format not in AuditExporter.FORMATS:
+            export_format = "json"
         
-        events, _ = await self.query(AuditQuery(
-            organization_id=org_id,
+        exporter = AuditExporter(self)
+        job = await exporter.start(org_id, branch_id, start_date, end_date, export_format)
+        filename = await exporter.to_file(job)
+        
+        logger.info(
+            "audit_export_file_written",
+            org_id=org_id,
             branch_id=branch_id,
-            start_date=start_date,
-            end_date=end_date,
-            page_size=100000
-        ))
-        
-        # Verificar integridade antes de exportar
-        is_valid, errors = await self.verify_chain_integrity(
-            org_id, branch_id, start_date, end_date
+            events_count=job.total_events,
+            filename=filename
         )
         
-        export_data = {
-            "export_id": str(uuid.uuid4()),
-            "export_timestamp": datetime.utcnow().isoformat(),
-            "organization_id": org_id,
-            "branch_id": branch_id,
-            "period_start": start_date.isoformat(),
-            "period_end": end_date.isoformat(),
-            "total_events": len(events),
-            "chain_integrity": {
-                "valid": is_valid,
-                "errors": errors
-            },
-            "events": [e.to_dict() for e in events]
-        }
-        
-        # Salvar arquivo
-        filename = f"/tmp/audit_export_{org_id}_{branch_id}_{uuid.uuid4().hex[:8]}.json"
-        
-        with open(filename, "w") as f:
-            json.dump(export_data, f, indent=2)
+        return filename
+    
+    async def rebuild_indexes(
+        self,
+        org_id: int,
+        branch_id: int,
+        start_date: datetime,
+        end_date: datetime
+    ) -> int:
+        """
+        Reconstrói índices secundários a partir das listas diárias.
+        
+        Returns:
+            Quantidade de eventos indexados
+        """
+        indexed = 0
+        for day in self._days(start_date, end_date):
+            indexed += await self._index_day(org_id, branch_id, day)
         
         logger.info(
-            "audit_exported",
+            "audit_indexes_rebuilt",
             org_id=org_id,
             branch_id=branch_id,
-            events_count=len(events),
-            filename=filename
+            events=indexed
         )
+        return indexed
+    
+    async def backfill_indexes(self) -> int:
+        """
+        Indexa eventos gravados antes dos índices secundários (uma vez).
         
-        return filename
+        query_page só lê os índices: sem o backfill, eventos antigos somem
+        de /v1/audit/events. Descobre as chains e os dias pelas chaves
+        existentes (audit:log, audit:day antigo, audit:head e segmentos
+        locais), registra as chains em CHAINS_KEY e indexa cada dia. Um
+        lock evita trabalho duplicado entre pods; o marcador final torna
+        as chamadas seguintes no-op.
+        
+        Returns:
+            Quantidade de eventos indexados (0 se já feito ou em andamento)
+        """
+        if await self._cache.exists(self.INDEX_BACKFILL_KEY):
+            return 0
+        lock_key = f"{self.INDEX_BACKFILL_KEY}:lock"
+        if not await self._cache.set_if_absent(
+            lock_key, str(os.getpid()), ttl=self.INDEX_BACKFILL_LOCK_TTL
+        ):
+            return 0
+        
+        try:
+            chains = await self._discover_days()
+            indexed = 0
+            for (org_id, branch_id), days in sorted(chains.items()):
+                await self._cache.sadd(self.CHAINS_KEY, f"{org_id}:{branch_id}")
+                for day in sorted(days):
+                    indexed += await self._index_day(org_id, branch_id, day)
+            
+            await self._cache.set(
+                self.INDEX_BACKFILL_KEY, datetime.utcnow().isoformat(), ttl=None
+            )
+            logger.info("audit_indexes_backfilled", chains=len(chains), events=indexed)
+            return indexed
+        finally:
+            await self._cache.delete(lock_key)
+    
+    async def _discover_days(self) -> dict[tuple[int, int], set[str]]:
+        """Chains existentes e os dias com eventos no Redis."""
+        chains: dict[tuple[int, int], set[str]] = {}
+        
+        for pattern in ("audit:log:*", "audit:day:*"):
+            async for key in self._cache.scan_keys(pattern):
+                parts = key.split(":")
+                if len(parts) == 5 and parts[2].isdigit() and parts[3].isdigit():
+                    chains.setdefault((int(parts[2]), int(parts[3])), set()).add(parts[4])
+        
+        async for key in self._cache.scan_keys("audit:head:*"):
+            parts = key.split(":")
+            if len(parts) == 4 and parts[2].isdigit() and parts[3].isdigit():
+                chains.setdefault((int(parts[2]), int(parts[3])), set())
+        
+        # Dias só em segmento não têm evento no Redis para indexar
+        if self._segments:
+            for chain in await asyncio.to_thread(self._segments.list_chains):
+                chains.setdefault(chain, set())
+        
+        return chains
+    
+    async def _index_day(self, org_id: int, branch_id: int, day: str) -> int:
+        """Registra os eventos de um dia nos índices (idempotente)."""
+        ttl = self.RETENTION_DAYS * 86400
+        mappings: dict[str, dict[str, float]] = {}
+        indexed = 0
+        
+        async for chunk in self.iter_day_events(org_id, branch_id, day):
+            for event in chunk:
+                score = _score(event.timestamp)
+                for key in self._event_index_keys(event):
+                    mappings.setdefault(key, {})[event.id] = score
+                indexed += 1
+        
+        for key, mapping in mappings.items():
+            await self._cache.zadd(key, mapping, ttl=ttl)
+        return indexed
+    
+    # ===== ÍNDICES =====
+    
+    @staticmethod
+    def _index_key(
+        org_id: int,
+        branch_id: int,
+        name: Optional[str] = None,
+        value: Optional[str] = None
+    ) -> str:
+        """Sorted set (score = timestamp) de um valor de campo, ou de todos."""
+        if name is None:
+            return f"audit:idx:{org_id}:{branch_id}:all"
+        return f"audit:idx:{org_id}:{branch_id}:{name}:{value}"
+    
+    def _event_index_keys(self, event: AuditEvent) -> list[str]:
+        """Índices onde o evento deve ser registrado."""
+        org_id, branch_id = event.organization_id, event.branch_id
+        keys = [
+            self._index_key(org_id, branch_id),
+            self._index_key(org_id, branch_id, "action", event.action.value),
+            self._index_key(org_id, branch_id, "resource", event.resource.value),
+            self._index_key(org_id, branch_id, "severity", event.severity.value),
+            self._index_key(org_id, branch_id, "success", "1" if event.success else "0"),
+        ]
+        if event.resource_id:
+            keys.append(self._index_key(org_id, branch_id, "resource_id", event.resource_id))
+        if event.actor_id:
+            keys.append(self._index_key(org_id, branch_id, "actor_id", event.actor_id))
+        return keys
+    
+    @staticmethod
+    def _query_filters(query: AuditQuery) -> list[tuple[str, str]]:
+        """Filtros da query como (campo, valor) indexados."""
+        filters: list[tuple[str, str]] = []
+        if query.action:
+            filters.append(("action", query.action.value))
+        if query.resource:
+            filters.append(("resource", query.resource.value))
+        if query.resource_id:
+            filters.append(("resource_id", query.resource_id))
+        if query.actor_id:
+            filters.append(("actor_id", query.actor_id))
+        if query.severity:
+            filters.append(("severity", query.severity.value))
+        if query.success is not None:
+            filters.append(("success", "1" if query.success else "0"))
+        return filters
+    
+    @staticmethod
+    def _matches(event: AuditEvent, query: AuditQuery) -> bool:
+        """Aplica os filtros da query a um evento."""
+        if query.action and event.action != query.action:
+            return False
+        if query.resource and event.resource != query.resource:
+            return False
+        if query.resource_id and event.resource_id != query.resource_id:
+            return False
+        if query.actor_id and event.actor_id != query.actor_id:
+            return False
+        if query.severity and event.severity != query.severity:
+            return False
+        if query.success is not None and event.success != query.success:
+            return False
+        return True
+    
+    async def _intersect(self, org_id: int, branch_id: int, index_keys: list[str]) -> str:
+        """Intersecta índices no Redis; resultado reaproveitado por INTERSECTION_TTL."""
+        digest = hashlib.sha1("|".join(sorted(index_keys)).encode()).hexdigest()[:16]
+        dest = f"audit:tmp:{org_id}:{branch_id}:{digest}"
+        if not await self._cache.exists(dest):
+            await self._cache.zinterstore(dest, index_keys, ttl=self.INTERSECTION_TTL)
+        return dest
+    
+    async def _query_scan(
+        self,
+        query: AuditQuery,
+        index_key: str,
+        min_score: float,
+        max_score: float,
+        page_max: float,
+        skip: int
+    ) -> AuditPage:
+        """Plano para índice seletivo: busca seus eventos e filtra o resto em memória."""
+        items = await self._cache.zrevrangebyscore(
+            index_key, max_score, min_score, withscores=True
+        )
+        events = await self._get_events_by_ids(
+            [member for member, _ in items],
+            query.organization_id,
+            query.branch_id
+        )
+        scores = {member: score for member, score in items}
+        matched = [
+            (event, scores[event.id]) for event in events
+            if self._matches(event, query)
+        ]
+        remaining = [(event, score) for event, score in matched if score <= page_max]
+        page = remaining[skip:skip + query.page_size]
+        
+        count_above = 0
+        if page:
+            count_above = sum(1 for _, score in remaining if score > page[-1][1])
+        
+        return AuditPage(
+            events=[event for event, _ in page],
+            total=len(matched),
+            next_cursor=self._next_cursor(
+                [(event.id, score) for event, score in page],
+                query.page_size,
+                skip,
+                count_above
+            )
+        )
+    
+    @staticmethod
+    def _next_cursor(
+        items: list[tuple[str, float]],
+        page_size: int,
+        skip: int,
+        count_above: int
+    ) -> Optional[str]:
+        """
+        Cursor da próxima página (None se esta foi a última).
+        
+        count_above é quantos itens do intervalo têm score maior que o
+        último da página; o restante já retornado são empates nesse score.
+        """
+        if len(items) < page_size:
+            return None
+        
+        last_score = items[-1][1]
+        return encode_cursor(last_score, skip + len(items) - count_above)
     
     # ===== HELPERS =====
     
-    async def _persist_event(self, event: AuditEvent) -> None:
-        """Persiste evento no storage."""
-        # Por ID
-        await self._cache.set_json(
-            f"audit:event:{event.id}",
-            event.to_dict(),
+    @staticmethod
+    def _head_key(org_id: int, branch_id: int) -> str:
+        return f"audit:head:{org_id}:{branch_id}"
+    
+    @staticmethod
+    def _head_timestamp_key(org_id: int, branch_id: int) -> str:
+        return f"audit:headts:{org_id}:{branch_id}"
+    
+    @staticmethod
+    def _day_list_key(org_id: int, branch_id: int, day: str) -> str:
+        return f"audit:log:{org_id}:{branch_id}:{day}"
+    
+    @staticmethod
+    def _day_marker_key(org_id: int, branch_id: int, day: str) -> str:
+        return f"audit:mark:{org_id}:{branch_id}:{day}"
+    
+    @staticmethod
+    def day_marker(count: int, last_hash: Optional[str]) -> str:
+        """Marcador de versão de um dia: eventos na lista e hash do último."""
+        return f"{count}:{last_hash or ''}"
+    
+    async def get_day_markers(
+        self,
+        org_id: int,
+        branch_id: int,
+        days: list[str]
+    ) -> dict[str, str]:
+        """Marcadores gravados pelos appends (MGET em chunks; dias sem marcador ficam de fora)."""
+        markers: dict[str, str] = {}
+        for i in range(0, len(days), self.MGET_CHUNK_SIZE):
+            chunk = days[i:i + self.MGET_CHUNK_SIZE]
+            values = await self._cache.mget(
+                [self._day_marker_key(org_id, branch_id, day) for day in chunk]
+            )
+            markers.update({day: value for day, value in zip(chunk, values) if value})
+        return markers
+    
+    async def set_day_marker(self, org_id: int, branch_id: int, day: str, marker: str) -> None:
+        """Grava o marcador de um dia anterior aos marcadores (já verificado)."""
+        await self._cache.set(
+            self._day_marker_key(org_id, branch_id, day),
+            marker,
             ttl=self.RETENTION_DAYS * 86400
         )
+    
+    @staticmethod
+    def _legacy_day_key(org_id: int, branch_id: int, day: str) -> str:
+        # Índice antigo (array JSON reescrito a cada evento), somente leitura
+        return f"audit:day:{org_id}:{branch_id}:{day}"
+    
+    async def _persist_event(
+        self,
+        event: AuditEvent
+    ) -> tuple[bool, str, Optional[datetime]]:
+        """
+        Persiste evento no storage.
         
-        # Por data (índice)
-        day = event.timestamp.strftime("%Y-%m-%d")
-        day_key = f"audit:day:{event.organization_id}:{event.branch_id}:{day}"
+        Não grava se o head mudou ou se o dia do head é posterior ao do
+        evento.
         
-        day_events = await self._cache.get_json(day_key) or []
-        day_events.append(event.id)
-        await self._cache.set_json(day_key, day_events, ttl=self.RETENTION_DAYS * 86400)
+        Returns:
+            (stored, current_head, head_timestamp) - os dois últimos só
+            são relevantes se não gravou
+        """
+        ttl = self.RETENTION_DAYS * 86400
+        day = event.timestamp.strftime("%Y-%m-%d")
+        head_key = self._head_key(event.organization_id, event.branch_id)
+        head_ts_key = self._head_timestamp_key(event.organization_id, event.branch_id)
+        timestamp = event.timestamp.isoformat()
+        day_key = self._day_list_key(event.organization_id, event.branch_id, day)
+        marker_key = self._day_marker_key(event.organization_id, event.branch_id, day)
+        event_key = f"audit:event:{event.id}"
+        event_json = json.dumps(event.to_dict(), default=str)
+        expected = event.previous_hash or ""
+        score = _score(event.timestamp)
+        index_keys = self._event_index_keys(event)
+        
+        cache = self._cache
+        client = await cache._get_client()
+        if not cache._use_local:
+            if self._append_script is None or self._append_script_client is not client:
+                self._append_script = client.register_script(APPEND_LUA)
+                self._append_script_client = client
+            
+            stored, value, *rest = await self._append_script(
+                keys=[
+                    cache._make_key(head_key),
+                    cache._make_key(day_key),
+                    cache._make_key(event_key),
+                    cache._make_key(marker_key),
+                    cache._make_key(head_ts_key),
+                    *[cache._make_key(k) for k in index_keys],
+                ],
+                args=[
+                    expected,
+                    event.hash or "",
+                    event.id,
+                    event_json,
+                    ttl,
+                    score,
+                    score - ttl,
+                    timestamp,
+                ]
+            )
+            if stored:
+                return True, "", None
+            head_ts = str(rest[0]) if rest else ""
+            return False, str(value), datetime.fromisoformat(head_ts) if head_ts else None
+        
+        # Fallback local: a lock por chain garante exclusão no processo
+        head = await cache.get(head_key)
+        head_ts = await cache.get(head_ts_key)
+        if (head is not None and head != expected) or (head_ts and head_ts[:10] > timestamp[:10]):
+            return False, head or "", datetime.fromisoformat(head_ts) if head_ts else None
+        await cache.set(event_key, event_json, ttl=ttl)
+        length = await cache.rpush(day_key, event.id, ttl=ttl)
+        await cache.set(marker_key, self.day_marker(length, event.hash), ttl=ttl)
+        await cache.set(head_key, event.hash or "", ttl=ttl)
+        await cache.set(head_ts_key, timestamp, ttl=ttl)
+        for key in index_keys:
+            await cache.zadd(key, {event.id: score}, ttl=ttl)
+        return True, "", None
+    
+    async def _get_chain_head(
+        self,
+        org_id: int,
+        branch_id: int
+    ) -> tuple[str, Optional[datetime]]:
+        """Obtém hash ("" se vazia) e timestamp do último evento da chain."""
+        head = await self._cache.get(self._head_key(org_id, branch_id))
+        if head is not None:
+            head_ts = await self._cache.get(self._head_timestamp_key(org_id, branch_id))
+            return head, datetime.fromisoformat(head_ts) if head_ts else None
+        
+        last_event = await self._get_last_event(org_id, branch_id)
+        if last_event:
+            return last_event.hash or "", last_event.timestamp
+        
+        if self._segments:
+            last = await asyncio.to_thread(self._segments.last_event, org_id, branch_id)
+            if last:
+                return last.hash or "", last.timestamp
+        
+        return "", None
     
     async def _get_last_event(
         self,
         org_id: int,
         branch_id: int
     ) -> Optional[AuditEvent]:
-        """Obtém último evento da chain."""
-        # Buscar do dia atual
+        """Obtém último evento da chain (dia atual)."""
         today = datetime.utcnow().strftime("%Y-%m-%d")
-        day_key = f"audit:day:{org_id}:{branch_id}:{today}"
         
-        event_ids = await self._cache.get_json(day_key) or []
+        event_ids = await self._cache.lrange(
+            self._day_list_key(org_id, branch_id, today), -1, -1
+        )
+        if not event_ids:
+            event_ids = await self._cache.get_json(
+                self._legacy_day_key(org_id, branch_id, today)
+            ) or []
         
         if event_ids:
             return await self.get_by_id(event_ids[-1], org_id, branch_id)
         
         return None
     
-    async def _get_events_by_date_range(
+    async def iter_day_events(
         self,
         org_id: int,
         branch_id: int,
-        start: datetime,
-        end: datetime
+        day: str
+    ) -> AsyncIterator[list[AuditEvent]]:
+        """Itera eventos de um dia na ordem da chain, em blocos de MGET_CHUNK_SIZE."""
+        list_key = self._day_list_key(org_id, branch_id, day)
+        length = await self._cache.llen(list_key)
+        
+        if length:
+            for start in range(0, length, self.MGET_CHUNK_SIZE):
+                event_ids = await self._cache.lrange(
+                    list_key, start, start + self.MGET_CHUNK_SIZE - 1
+                )
+                yield await self._get_events_by_ids(event_ids, org_id, branch_id)
+            return
+        
+        legacy_ids = await self._cache.get_json(
+            self._legacy_day_key(org_id, branch_id, day)
+        ) or []
+        if legacy_ids:
+            yield await self._get_events_by_ids(legacy_ids, org_id, branch_id)
+            return
+        
+        # Dia expirado no Redis: ler do segmento local, se houver
+        if self._segments and self._segments.has_day(org_id, branch_id, day):
+            async for chunk in self._segments.iter_day_chunks(
+                org_id, branch_id, day, self.MGET_CHUNK_SIZE
+            ):
+                yield chunk
+    
+    async def _get_day_events(
+        self,
+        org_id: int,
+        branch_id: int,
+        day: str
     ) -> list[AuditEvent]:
-        """Obtém eventos por range de data."""
+        """Obtém eventos de um dia na ordem da chain."""
+        events: list[AuditEvent] = []
+        async for chunk in self.iter_day_events(org_id, branch_id, day):
+            events.extend(chunk)
+        return events
+    
+    async def _get_events_by_ids(
+        self,
+        event_ids: list[str],
+        org_id: int,
+        branch_id: int
+    ) -> list[AuditEvent]:
+        """Busca eventos em lote (MGET em chunks), mantendo a ordem."""
         events: list[AuditEvent] = []
-        current = start
         
-        while current <= end:
-            day = current.strftime("%Y-%m-%d")
-            day_key = f"audit:day:{org_id}:{branch_id}:{day}"
+        for i in range(0, len(event_ids), self.MGET_CHUNK_SIZE):
+            chunk = event_ids[i:i + self.MGET_CHUNK_SIZE]
+            values = await self._cache.mget([f"audit:event:{eid}" for eid in chunk])
             
-            event_ids = await self._cache.get_json(day_key) or []
-            
-            for event_id in event_ids:
-                event = await self.get_by_id(event_id, org_id, branch_id)
-                if event:
+            for value in values:
+                if not value:
+                    continue
+                try:
+                    event = AuditEvent.from_dict(json.loads(value))
+                except (json.JSONDecodeError, KeyError, ValueError):
+                    continue
+                # Verificar multi-tenancy
+                if event.organization_id == org_id and event.branch_id == branch_id:
                     events.append(event)
-            
-            current += timedelta(days=1)
         
         return events
+    
+    @staticmethod
+    def _days(start: datetime, end: datetime) -> list[str]:
+        """Partições diárias (YYYY-MM-DD) do período."""
+        days = []
+        current = start
+        while current.date() <= end.date():
+            days.append(current.strftime("%Y-%m-%d"))
+            current += timedelta(days=1)
+        return days
@@ -59,13 +59,21 @@ class ComplianceChecker:
         self,
         org_id: int,
         branch_id: int,
-        days: int = 30
+        days: int = 30,
+        deep: bool = False
     ) -> tuple[bool, list[str]]:
-        """Verifica integridade da chain de audit."""
+        """
+        Verifica integridade da chain de audit.
+        
+        Usa os checkpoints Merkle diários: só dias sem checkpoint ou
+        alterados são re-hasheados (deep=True re-hasheia tudo).
+        """
         start = datetime.utcnow() - timedelta(days=days)
         end = datetime.utcnow()
         
-        return await self._audit.verify_integrity(org_id, branch_id, start, end)
+        return await self._audit.verify_integrity(
+            org_id, branch_id, start, end, deep=deep
+        )
 
 
 class LGPDCompliance(ComplianceChecker):
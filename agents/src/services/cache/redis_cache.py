@@ -6,12 +6,16 @@ Features:
 - TTL configurável
 - Serialização JSON automática
 - Fallback para cache local se Redis indisponível
+- Pub/sub (notificações at-most-once entre processos)
 - Métricas de hit/miss
 """
 
+import asyncio
+import fnmatch
 import json
 import time
-from typing import Optional, Any
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Any, Set
 import structlog
 
 logger = structlog.get_logger()
@@ -24,12 +28,23 @@ except ImportError:
     logger.warning("redis não instalado, usando cache local")
 
 
+class _LocalStream:
+    """Stream em memória com consumer groups (fallback de Redis Streams)."""
+    
+    def __init__(self) -> None:
+        self.entries: list[tuple[str, dict[str, str]]] = []
+        self.groups: dict[str, dict[str, Any]] = {}
+        self.sequence = 0
+        self.changed = asyncio.Event()
+
+
 class LocalCache:
     """Cache local em memória (fallback)."""
     
     def __init__(self, max_size: int = 1000):
         self._cache: dict[str, tuple[Any, float]] = {}
         self._max_size = max_size
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
     
     async def get(self, key: str) -> Optional[str]:
         if key in self._cache:
@@ -39,7 +54,7 @@ class LocalCache:
             del self._cache[key]
         return None
     
-    async def set(self, key: str, value: str, ex: int = 3600) -> bool:
+    async def set(self, key: str, value: str, ex: Optional[int] = 3600) -> bool:
         if len(self._cache) >= self._max_size:
             # Limpar 10% dos itens mais antigos
             sorted_keys = sorted(
@@ -48,7 +63,7 @@ class LocalCache:
             )
             for k in sorted_keys[:int(self._max_size * 0.1)]:
                 del self._cache[k]
-        self._cache[key] = (value, time.time() + ex)
+        self._cache[key] = (value, time.time() + (ex or 86400 * 365 * 10))
         return True
     
     async def delete(self, key: str) -> bool:
@@ -60,6 +75,311 @@ class LocalCache:
     async def exists(self, key: str) -> bool:
         return await self.get(key) is not None
     
+    # ===== ESTRUTURAS (listas, sorted sets) =====
+    
+    def _get_structure(self, key: str, kind: type, create: bool = False) -> Any:
+        entry = self._cache.get(key)
+        if entry is not None and entry[1] <= time.time():
+            del self._cache[key]
+            entry = None
+        if entry is None:
+            if not create:
+                return None
+            entry = (kind(), time.time() + 86400 * 365 * 10)
+            self._cache[key] = entry
+        return entry[0] if isinstance(entry[0], kind) else None
+    
+    def _get_list(self, key: str, create: bool = False) -> Optional[list[str]]:
+        return self._get_structure(key, list, create)
+    
+    def _get_zset(self, key: str, create: bool = False) -> Optional[dict[str, float]]:
+        return self._get_structure(key, dict, create)
+    
+    def _get_set(self, key: str, create: bool = False) -> Optional[Set[str]]:
+        return self._get_structure(key, set, create)
+    
+    def _get_hash(self, key: str, create: bool = False) -> Optional[dict[str, Any]]:
+        return self._get_structure(key, dict, create)
+    
+    def _get_stream(self, key: str, create: bool = False) -> Optional[_LocalStream]:
+        return self._get_structure(key, _LocalStream, create)
+    
+    async def rpush(self, key: str, *values: str) -> int:
+        items = self._get_list(key, create=True)
+        if items is None:
+            return 0
+        items.extend(values)
+        return len(items)
+    
+    async def lrange(self, key: str, start: int, end: int) -> list[str]:
+        items = self._get_list(key) or []
+        stop = len(items) + end + 1 if end < 0 else end + 1
+        return items[start:stop]
+    
+    async def llen(self, key: str) -> int:
+        return len(self._get_list(key) or [])
+    
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        fields = self._get_hash(key, create=True)
+        if fields is None:
+            return 0
+        fields[field] = int(fields.get(field, 0)) + amount
+        return fields[field]
+    
+    async def hincrbyfloat(self, key: str, field: str, amount: float = 1.0) -> float:
+        fields = self._get_hash(key, create=True)
+        if fields is None:
+            return 0.0
+        fields[field] = float(fields.get(field, 0)) + amount
+        return fields[field]
+    
+    async def hgetall(self, key: str) -> dict[str, str]:
+        return {f: str(v) for f, v in (self._get_hash(key) or {}).items()}
+    
+    async def hset(self, key: str, mapping: dict[str, Any]) -> int:
+        fields = self._get_hash(key, create=True)
+        if fields is None:
+            return 0
+        added = sum(1 for f in mapping if f not in fields)
+        fields.update(mapping)
+        return added
+    
+    async def sadd(self, key: str, *values: str) -> int:
+        members = self._get_set(key, create=True)
+        if members is None:
+            return 0
+        added = len(set(values) - members)
+        members.update(values)
+        return added
+    
+    async def srem(self, key: str, *values: str) -> int:
+        members = self._get_set(key)
+        if not members:
+            return 0
+        removed = len(members & set(values))
+        members.difference_update(values)
+        return removed
+    
+    async def smembers(self, key: str) -> Set[str]:
+        return set(self._get_set(key) or ())
+    
+    async def sunion(self, *keys: str) -> Set[str]:
+        result: Set[str] = set()
+        for key in keys:
+            result |= self._get_set(key) or set()
+        return result
+    
+    async def zadd(self, key: str, mapping: dict[str, float]) -> int:
+        members = self._get_zset(key, create=True)
+        if members is None:
+            return 0
+        added = sum(1 for m in mapping if m not in members)
+        members.update(mapping)
+        return added
+    
+    @staticmethod
+    def _score_bound(value: Any) -> tuple[float, bool]:
+        """Converte limite estilo Redis ('-inf', '(1.5', 2) em (valor, exclusivo)."""
+        if isinstance(value, str):
+            exclusive = value.startswith("(")
+            return float(value.lstrip("(")), exclusive
+        return float(value), False
+    
+    def _zrange(self, key: str, min_score: Any, max_score: Any) -> list[tuple[str, float]]:
+        members = self._get_zset(key) or {}
+        low, low_ex = self._score_bound(min_score)
+        high, high_ex = self._score_bound(max_score)
+        return sorted(
+            (
+                (m, sc) for m, sc in members.items()
+                if (sc > low if low_ex else sc >= low)
+                and (sc < high if high_ex else sc <= high)
+            ),
+            key=lambda item: (item[1], item[0])
+        )
+    
+    async def zcount(self, key: str, min: Any, max: Any) -> int:
+        return len(self._zrange(key, min, max))
+    
+    async def zcard(self, key: str) -> int:
+        return len(self._get_zset(key) or {})
+    
+    async def zrevrangebyscore(
+        self,
+        key: str,
+        max: Any,
+        min: Any,
+        start: Optional[int] = None,
+        num: Optional[int] = None,
+        withscores: bool = False
+    ) -> list[Any]:
+        items = list(reversed(self._zrange(key, min, max)))
+        if start is not None and num is not None:
+            items = items[start:start + num]
+        return items if withscores else [m for m, _ in items]
+    
+    async def zinterstore(self, dest: str, keys: list[str], aggregate: Optional[str] = None) -> int:
+        sets = [self._get_zset(k) or {} for k in keys]
+        result: dict[str, float] = {}
+        if sets:
+            smallest = min(sets, key=len)
+            for member, score in smallest.items():
+                if all(member in other for other in sets):
+                    result[member] = min(other[member] for other in sets)
+        self._cache[dest] = (result, time.time() + 86400 * 365 * 10)
+        return len(result)
+    
+    async def zrangebyscore(
+        self,
+        key: str,
+        min: Any,
+        max: Any,
+        start: Optional[int] = None,
+        num: Optional[int] = None,
+        withscores: bool = False
+    ) -> list[Any]:
+        items = self._zrange(key, min, max)
+        if start is not None and num is not None:
+            items = items[start:start + num]
+        return items if withscores else [m for m, _ in items]
+    
+    async def zrem(self, key: str, *members: str) -> int:
+        zset = self._get_zset(key) or {}
+        removed = [m for m in members if m in zset]
+        for m in removed:
+            del zset[m]
+        return len(removed)
+    
+    async def zremrangebyscore(self, key: str, min: Any, max: Any) -> int:
+        members = self._get_zset(key) or {}
+        removed = [m for m, _ in self._zrange(key, min, max)]
+        for m in removed:
+            del members[m]
+        return len(removed)
+    
+    # ===== PUB/SUB =====
+    
+    async def publish(self, channel: str, message: str) -> int:
+        subscribers = self._subscribers.get(channel, ())
+        for queue in subscribers:
+            queue.put_nowait(message)
+        return len(subscribers)
+    
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(channel, set()).add(queue)
+        return queue
+    
+    def unsubscribe(self, channel: str, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(channel)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[channel]
+    
+    # ===== STREAMS =====
+    
+    async def xadd(self, key: str, fields: dict[str, str], maxlen: Optional[int] = None) -> str:
+        stream = self._get_stream(key, create=True)
+        stream.sequence += 1
+        entry_id = f"{int(time.time() * 1000)}-{stream.sequence}"
+        stream.entries.append((entry_id, dict(fields)))
+        stream.changed.set()
+        return entry_id
+    
+    async def xgroup_create(self, key: str, group: str, id: str = "0", mkstream: bool = False) -> bool:
+        stream = self._get_stream(key, create=mkstream)
+        if stream is None:
+            raise ValueError(f"Stream {key} não existe")
+        if group in stream.groups:
+            raise ValueError("BUSYGROUP Consumer Group name already exists")
+        stream.groups[group] = {
+            "next": 0 if id == "0" else len(stream.entries),
+            "pending": {},
+        }
+        return True
+    
+    async def xreadgroup(
+        self,
+        groupname: str,
+        consumername: str,
+        streams: dict[str, str],
+        count: Optional[int] = None,
+        block: Optional[int] = None
+    ) -> list[Any]:
+        result = []
+        for key in streams:
+            stream = self._get_stream(key)
+            if stream is None or groupname not in stream.groups:
+                continue
+            group = stream.groups[groupname]
+            
+            if group["next"] >= len(stream.entries) and block is not None:
+                stream.changed.clear()
+                try:
+                    await asyncio.wait_for(stream.changed.wait(), block / 1000)
+                except asyncio.TimeoutError:
+                    pass
+            
+            end = len(stream.entries) if count is None else group["next"] + count
+            batch = stream.entries[group["next"]:end]
+            group["next"] += len(batch)
+            now = time.time() * 1000
+            for entry_id, _ in batch:
+                group["pending"][entry_id] = (consumername, now)
+            if batch:
+                result.append([key, batch])
+        return result
+    
+    async def xack(self, key: str, groupname: str, *ids: str) -> int:
+        stream = self._get_stream(key)
+        if stream is None or groupname not in stream.groups:
+            return 0
+        pending = stream.groups[groupname]["pending"]
+        acked = [i for i in ids if pending.pop(i, None) is not None]
+        return len(acked)
+    
+    async def xautoclaim(
+        self,
+        key: str,
+        groupname: str,
+        consumername: str,
+        min_idle_time: int,
+        start_id: str = "0-0",
+        count: Optional[int] = None
+    ) -> list[Any]:
+        stream = self._get_stream(key)
+        if stream is None or groupname not in stream.groups:
+            return ["0-0", [], []]
+        pending = stream.groups[groupname]["pending"]
+        entries = dict(stream.entries)
+        now = time.time() * 1000
+        claimed = []
+        for entry_id, (_, delivered_at) in list(pending.items()):
+            if count is not None and len(claimed) >= count:
+                break
+            if now - delivered_at >= min_idle_time:
+                pending[entry_id] = (consumername, now)
+                claimed.append((entry_id, entries.get(entry_id, {})))
+        return ["0-0", claimed, []]
+    
+    async def xpending_count(self, key: str, groupname: str) -> int:
+        stream = self._get_stream(key)
+        if stream is None or groupname not in stream.groups:
+            return 0
+        return len(stream.groups[groupname]["pending"])
+    
+    async def xlen(self, key: str) -> int:
+        stream = self._get_stream(key)
+        return len(stream.entries) if stream else 0
+    
+    async def expire(self, key: str, seconds: int) -> bool:
+        if key in self._cache:
+            value, _ = self._cache[key]
+            self._cache[key] = (value, time.time() + seconds)
+            return True
+        return False
+    
     async def flushdb(self) -> bool:
         self._cache.clear()
         return True
@@ -164,9 +484,9 @@ class RedisCache:
         self,
         key: str,
         value: str,
-        ttl: int = 3600
+        ttl: Optional[int] = 3600
     ) -> bool:
-        """Define valor no cache com TTL."""
+        """Define valor no cache com TTL (None = sem expiração)."""
         client = await self._get_client()
         full_key = self._make_key(key)
         
@@ -191,6 +511,30 @@ class RedisCache:
             logger.error("cache_delete_error", key=key, error=str(e))
             return False
     
+    async def set_if_absent(self, key: str, value: str, ttl: Optional[int] = 3600) -> bool:
+        """SET NX: grava só se a chave não existir. Returns: True se gravou."""
+        client = await self._get_client()
+        full_key = self._make_key(key)
+        
+        if self._use_local:
+            if await client.get(full_key) is not None:
+                return False
+            return await client.set(full_key, value, ex=ttl)
+        
+        return bool(await client.set(full_key, value, ex=ttl, nx=True))
+    
+    async def delete_many(self, keys: list[str]) -> int:
+        """Remove várias chaves num único comando."""
+        if not keys:
+            return 0
+        client = await self._get_client()
+        full_keys = [self._make_key(k) for k in keys]
+        
+        if self._use_local:
+            return sum([await client.delete(k) for k in full_keys])
+        
+        return int(await client.delete(*full_keys))
+    
     async def exists(self, key: str) -> bool:
         """Verifica se chave existe."""
         client = await self._get_client()
@@ -213,7 +557,7 @@ class RedisCache:
         self,
         key: str,
         value: Any,
-        ttl: int = 3600
+        ttl: Optional[int] = 3600
     ) -> bool:
         """Define objeto JSON no cache."""
         try:
@@ -235,18 +579,465 @@ class RedisCache:
         
         return await client.mget(full_keys)
     
-    async def mset(self, mapping: dict[str, str], ttl: int = 3600) -> bool:
-        """Define múltiplos valores."""
+    async def mset(self, mapping: dict[str, str], ttl: Optional[int] = 3600) -> bool:
+        """Define múltiplos valores (um pipeline com SET EX por chave)."""
         try:
+            client = await self._get_client()
+            if self._use_local:
+                for key, value in mapping.items():
+                    await self.set(key, value, ttl)
+                return True
+            
+            pipe = client.pipeline(transaction=False)
             for key, value in mapping.items():
-                await self.set(key, value, ttl)
+                pipe.set(self._make_key(key), value, ex=ttl)
+            await pipe.execute()
             return True
         except Exception as e:
             logger.error("cache_mset_error", error=str(e))
             return False
     
+    # ===== LISTAS (append-only) =====
+    
+    async def rpush(
+        self,
+        key: str,
+        *values: str,
+        ttl: Optional[int] = None
+    ) -> int:
+        """
+        Adiciona valores ao final de uma lista.
+        
+        Returns:
+            Tamanho da lista após o append (0 em caso de erro)
+        """
+        client = await self._get_client()
+        full_key = self._make_key(key)
+        
+        try:
+            if self._use_local:
+                length = await client.rpush(full_key, *values)
+                if ttl:
+                    await client.expire(full_key, ttl)
+                return length
+            
+            pipe = client.pipeline(transaction=False)
+            pipe.rpush(full_key, *values)
+            if ttl:
+                pipe.expire(full_key, ttl)
+            results = await pipe.execute()
+            return int(results[0])
+        except Exception as e:
+            logger.error("cache_rpush_error", key=key, error=str(e))
+            return 0
+    
+    async def write_batch(
+        self,
+        lists: Optional[dict[str, list[str]]] = None,
+        counters: Optional[dict[str, dict[str, float]]] = None,
+        ttls: Optional[dict[str, int]] = None
+    ) -> bool:
+        """
+        Grava num único round-trip (MULTI/EXEC): RPUSH em listas e
+        HINCRBY/HINCRBYFLOAT em hashes de contadores.
+        
+        Diferente de rpush, propaga exceções: como o lote é atômico,
+        quem chama pode re-enfileirá-lo sem contar em dobro.
+        
+        Args:
+            lists: key -> valores a anexar
+            counters: key -> {field: incremento} (float usa HINCRBYFLOAT)
+            ttls: key -> TTL em segundos
+        """
+        lists = lists or {}
+        counters = counters or {}
+        ttls = ttls or {}
+        client = await self._get_client()
+        
+        if self._use_local:
+            for key, values in lists.items():
+                await client.rpush(self._make_key(key), *values)
+            for key, increments in counters.items():
+                for field, amount in increments.items():
+                    if isinstance(amount, float):
+                        await client.hincrbyfloat(self._make_key(key), field, amount)
+                    else:
+                        await client.hincrby(self._make_key(key), field, amount)
+            for key, ttl in ttls.items():
+                await client.expire(self._make_key(key), ttl)
+            return True
+        
+        pipe = client.pipeline(transaction=True)
+        for key, values in lists.items():
+            pipe.rpush(self._make_key(key), *values)
+        for key, increments in counters.items():
+            full_key = self._make_key(key)
+            for field, amount in increments.items():
+                if isinstance(amount, float):
+                    pipe.hincrbyfloat(full_key, field, amount)
+                else:
+                    pipe.hincrby(full_key, field, amount)
+        for key, ttl in ttls.items():
+            pipe.expire(self._make_key(key), ttl)
+        await pipe.execute()
+        return True
+    
+    async def lrange(self, key: str, start: int = 0, end: int = -1) -> list[str]:
+        """Obtém fatia de uma lista (end inclusivo, -1 = até o fim)."""
+        client = await self._get_client()
+        return await client.lrange(self._make_key(key), start, end)
+    
+    async def llen(self, key: str) -> int:
+        """Retorna tamanho de uma lista."""
+        client = await self._get_client()
+        return await client.llen(self._make_key(key))
+    
+    # ===== HASHES (contadores) =====
+    
+    async def hgetall(self, key: str) -> dict[str, str]:
+        """Retorna todos os campos de um hash."""
+        client = await self._get_client()
+        return await client.hgetall(self._make_key(key))
+    
+    async def hset(
+        self,
+        key: str,
+        mapping: dict[str, Any],
+        ttl: Optional[int] = None
+    ) -> int:
+        """Grava só os campos informados de um hash. Returns: campos novos."""
+        client = await self._get_client()
+        full_key = self._make_key(key)
+        
+        if self._use_local:
+            added = await client.hset(full_key, mapping)
+            if ttl:
+                await client.expire(full_key, ttl)
+            return added
+        
+        pipe = client.pipeline(transaction=False)
+        pipe.hset(full_key, mapping=mapping)
+        if ttl:
+            pipe.expire(full_key, ttl)
+        results = await pipe.execute()
+        return int(results[0])
+    
+    async def hgetall_many(self, keys: list[str]) -> list[dict[str, str]]:
+        """HGETALL de várias chaves num único pipeline."""
+        client = await self._get_client()
+        
+        if self._use_local:
+            return [await client.hgetall(self._make_key(k)) for k in keys]
+        
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(self._make_key(key))
+        return await pipe.execute()
+    
+    # ===== SETS =====
+    
+    async def sadd(self, key: str, *values: str, ttl: Optional[int] = None) -> int:
+        """Adiciona membros a um set. Returns: quantos eram novos."""
+        client = await self._get_client()
+        full_key = self._make_key(key)
+        
+        try:
+            added = await client.sadd(full_key, *values)
+            if ttl:
+                await client.expire(full_key, ttl)
+            return int(added)
+        except Exception as e:
+            logger.error("cache_sadd_error", key=key, error=str(e))
+            return 0
+    
+    async def srem(self, key: str, *values: str) -> int:
+        """Remove membros de um set."""
+        client = await self._get_client()
+        return int(await client.srem(self._make_key(key), *values))
+    
+    async def smembers(self, key: str) -> Set[str]:
+        """Retorna todos os membros de um set."""
+        client = await self._get_client()
+        return set(await client.smembers(self._make_key(key)))
+    
+    async def sunion(self, keys: list[str]) -> Set[str]:
+        """União de vários sets num único comando."""
+        if not keys:
+            return set()
+        client = await self._get_client()
+        return set(await client.sunion(*[self._make_key(k) for k in keys]))
+    
+    # ===== SORTED SETS (índices por score) =====
+    
+    async def zadd(
+        self,
+        key: str,
+        mapping: dict[str, float],
+        ttl: Optional[int] = None
+    ) -> int:
+        """Adiciona membros com score a um sorted set."""
+        client = await self._get_client()
+        full_key = self._make_key(key)
+        
+        try:
+            if self._use_local:
+                added = await client.zadd(full_key, mapping)
+                if ttl:
+                    await client.expire(full_key, ttl)
+                return added
+            
+            pipe = client.pipeline(transaction=False)
+            pipe.zadd(full_key, mapping)
+            if ttl:
+                pipe.expire(full_key, ttl)
+            results = await pipe.execute()
+            return int(results[0])
+        except Exception as e:
+            logger.error("cache_zadd_error", key=key, error=str(e))
+            return 0
+    
+    async def zcount(self, key: str, min_score: Any, max_score: Any) -> int:
+        """Conta membros com score no intervalo."""
+        client = await self._get_client()
+        return await client.zcount(self._make_key(key), min_score, max_score)
+    
+    async def zcard(self, key: str) -> int:
+        """Retorna tamanho de um sorted set."""
+        client = await self._get_client()
+        return await client.zcard(self._make_key(key))
+    
+    async def zrevrangebyscore(
+        self,
+        key: str,
+        max_score: Any,
+        min_score: Any,
+        offset: int = 0,
+        count: Optional[int] = None,
+        withscores: bool = False
+    ) -> list[Any]:
+        """Membros em ordem decrescente de score, com paginação opcional."""
+        client = await self._get_client()
+        if count is None:
+            return await client.zrevrangebyscore(
+                self._make_key(key), max_score, min_score, withscores=withscores
+            )
+        return await client.zrevrangebyscore(
+            self._make_key(key),
+            max_score,
+            min_score,
+            start=offset,
+            num=count,
+            withscores=withscores
+        )
+    
+    async def zrangebyscore(
+        self,
+        key: str,
+        min_score: Any,
+        max_score: Any,
+        offset: int = 0,
+        count: Optional[int] = None,
+        withscores: bool = False
+    ) -> list[Any]:
+        """Membros em ordem crescente de score, com paginação opcional."""
+        client = await self._get_client()
+        if count is None:
+            return await client.zrangebyscore(
+                self._make_key(key), min_score, max_score, withscores=withscores
+            )
+        return await client.zrangebyscore(
+            self._make_key(key),
+            min_score,
+            max_score,
+            start=offset,
+            num=count,
+            withscores=withscores
+        )
+    
+    async def zrem(self, key: str, *members: str) -> int:
+        """Remove membros de um sorted set. Returns: quantos existiam."""
+        client = await self._get_client()
+        return int(await client.zrem(self._make_key(key), *members))
+    
+    async def zremrangebyscore(self, key: str, min_score: Any, max_score: Any) -> int:
+        """Remove membros com score no intervalo (ex: expirados)."""
+        client = await self._get_client()
+        return int(await client.zremrangebyscore(self._make_key(key), min_score, max_score))
+    
+    async def zinterstore(
+        self,
+        dest: str,
+        keys: list[str],
+        ttl: Optional[int] = None
+    ) -> int:
+        """Interseção de sorted sets em dest (score = mínimo)."""
+        client = await self._get_client()
+        full_dest = self._make_key(dest)
+        full_keys = [self._make_key(k) for k in keys]
+        
+        count = await client.zinterstore(full_dest, full_keys, aggregate="MIN")
+        if ttl:
+            await client.expire(full_dest, ttl)
+        return count
+    
+    # ===== STREAMS (filas duráveis com consumer groups) =====
+    
+    async def xadd(
+        self,
+        key: str,
+        fields: dict[str, str],
+        maxlen: Optional[int] = None
+    ) -> str:
+        """Adiciona entrada ao stream. Returns: ID da entrada."""
+        client = await self._get_client()
+        if self._use_local:
+            return await client.xadd(self._make_key(key), fields)
+        return await client.xadd(
+            self._make_key(key), fields, maxlen=maxlen, approximate=True
+        )
+    
+    async def xgroup_create(self, key: str, group: str, start_id: str = "0") -> bool:
+        """
+        Cria consumer group (e o stream, se preciso).
+        
+        Returns:
+            False se o grupo já existia
+        """
+        client = await self._get_client()
+        try:
+            await client.xgroup_create(self._make_key(key), group, id=start_id, mkstream=True)
+            return True
+        except Exception as e:
+            if "BUSYGROUP" in str(e):
+                return False
+            raise
+    
+    async def xreadgroup(
+        self,
+        key: str,
+        group: str,
+        consumer: str,
+        count: int = 100,
+        block_ms: Optional[int] = None
+    ) -> list[tuple[str, dict[str, str]]]:
+        """Lê entradas novas para o consumer (ID ">"). Returns: [(id, campos)]."""
+        client = await self._get_client()
+        full_key = self._make_key(key)
+        response = await client.xreadgroup(
+            group, consumer, {full_key: ">"}, count=count, block=block_ms
+        )
+        entries: list[tuple[str, dict[str, str]]] = []
+        for _, stream_entries in response or []:
+            entries.extend((entry_id, fields) for entry_id, fields in stream_entries)
+        return entries
+    
+    async def xack(self, key: str, group: str, *ids: str) -> int:
+        """Confirma processamento de entradas."""
+        if not ids:
+            return 0
+        client = await self._get_client()
+        return int(await client.xack(self._make_key(key), group, *ids))
+    
+    async def xautoclaim(
+        self,
+        key: str,
+        group: str,
+        consumer: str,
+        min_idle_ms: int,
+        count: int = 100
+    ) -> list[tuple[str, dict[str, str]]]:
+        """Assume entradas pendentes há mais de min_idle_ms (consumer morto)."""
+        client = await self._get_client()
+        response = await client.xautoclaim(
+            self._make_key(key), group, consumer, min_idle_ms, start_id="0-0", count=count
+        )
+        return [(entry_id, fields) for entry_id, fields in response[1] if fields]
+    
+    async def xstream_stats(self, key: str, group: str) -> dict[str, int]:
+        """Tamanho do stream e entradas pendentes (entregues e não confirmadas)."""
+        client = await self._get_client()
+        full_key = self._make_key(key)
+        if self._use_local:
+            return {
+                "length": await client.xlen(full_key),
+                "pending": await client.xpending_count(full_key, group),
+            }
+        try:
+            pending = await client.xpending(full_key, group)
+            return {
+                "length": await client.xlen(full_key),
+                "pending": int(pending.get("pending", 0)),
+            }
+        except Exception:
+            return {"length": 0, "pending": 0}
+    
+    # ===== PUB/SUB =====
+    
+    async def publish(self, channel: str, message: str) -> int:
+        """Publica mensagem no canal. Returns: assinantes que receberam."""
+        client = await self._get_client()
+        return await client.publish(self._make_key(channel), message)
+    
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[AsyncIterator[str]]:
+        """
+        Assina um canal enquanto o contexto estiver aberto.
+        
+        A assinatura já está ativa ao entrar no contexto: mensagens
+        publicadas depois disso são entregues pelo iterador. Entrega
+        at-most-once (quem estava desconectado perde a mensagem).
+        
+        Uso:
+            async with cache.subscribe("tasks:events") as messages:
+                async for message in messages:
+                    ...
+        """
+        client = await self._get_client()
+        full_key = self._make_key(channel)
+        
+        if self._use_local:
+            queue = client.subscribe(full_key)
+            
+            async def local_messages() -> AsyncIterator[str]:
+                while True:
+                    yield await queue.get()
+            
+            try:
+                yield local_messages()
+            finally:
+                client.unsubscribe(full_key, queue)
+            return
+        
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(full_key)
+        try:
+            yield (
+                message["data"]
+                async for message in pubsub.listen()
+                if message["type"] == "message"
+            )
+        finally:
+            try:
+                await pubsub.unsubscribe(full_key)
+            finally:
+                await pubsub.reset()
+    
     # ===== PATTERN MATCHING =====
     
+    async def scan_keys(self, pattern: str) -> AsyncIterator[str]:
+        """Chaves (sem prefixo) que correspondem ao padrão glob, via SCAN."""
+        client = await self._get_client()
+        full_pattern = self._make_key(pattern)
+        
+        if self._use_local:
+            for key in list(self._local_cache._cache):
+                if fnmatch.fnmatchcase(key, full_pattern):
+                    yield key[len(self.prefix):]
+            return
+        
+        async for key in client.scan_iter(match=full_pattern, count=1000):
+            yield key[len(self.prefix):]
+    
     async def delete_pattern(self, pattern: str) -> int:
         """Remove todas as chaves que correspondem ao padrão."""
         client = await self._get_client()
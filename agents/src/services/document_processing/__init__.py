@@ -1,5 +1,23 @@
 """Serviço de processamento de documentos com Docling."""
 
+from src.services.document_processing.conversion_cache import (
+    ConversionCache,
+    get_conversion_cache,
+)
+from src.services.document_processing.conversion_pool import (
+    ConversionPool,
+    get_conversion_pool,
+)
+from src.services.document_processing.upload_spool import (
+    SpooledFile,
+    UploadSpool,
+    UploadTooLargeError,
+    get_upload_spool,
+)
+from src.services.document_processing.multipart_upload import (
+    MultipartUpload,
+    MultipartUploadError,
+)
 from src.services.document_processing.docling_processor import (
     DoclingProcessor,
     ProcessedDocument,
@@ -16,6 +34,19 @@ from src.services.document_processing.dacte_extractor import (
     DacteData,
     DacteExtractionResult,
 )
+from src.services.document_processing.bulk_importer import (
+    BulkDocumentImporter,
+    BulkImportItem,
+    BulkImportResult,
+    ImportSourceNotAllowedError,
+    resolve_import_source,
+)
+from src.services.document_processing.fiscal_xml import (
+    FiscalXmlParser,
+    FiscalXmlResult,
+    is_xml_source,
+    is_zip_source,
+)
 
 __all__ = [
     # Docling Processor
@@ -23,6 +54,19 @@ __all__ = [
     "ProcessedDocument",
     "ProcessingOptions",
     "get_docling_processor",
+    # Pool de conversão
+    "ConversionPool",
+    "get_conversion_pool",
+    # Cache de resultados
+    "ConversionCache",
+    "get_conversion_cache",
+    # Spool de uploads
+    "UploadSpool",
+    "SpooledFile",
+    "UploadTooLargeError",
+    "get_upload_spool",
+    "MultipartUpload",
+    "MultipartUploadError",
     # DANFe Extractor
     "DanfeExtractor",
     "DanfeData",
@@ -31,4 +75,15 @@ __all__ = [
     "DacteExtractor",
     "DacteData",
     "DacteExtractionResult",
+    # XML NF-e / CT-e
+    "FiscalXmlParser",
+    "FiscalXmlResult",
+    "is_xml_source",
+    "is_zip_source",
+    # Importação em lote
+    "BulkDocumentImporter",
+    "BulkImportItem",
+    "BulkImportResult",
+    "ImportSourceNotAllowedError",
+    "resolve_import_source",
 ]
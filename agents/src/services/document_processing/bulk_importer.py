@@ -0,0 +1,326 @@
+"""
+Importação em lote de documentos fiscais.
+
+Fechamento de mês chega com milhares de DANFe/DACTe (PDF ou XML) de uma
+vez; importar um por chamada custava uma ida e volta no chat por
+arquivo. Aqui um diretório ou .zip é importado inteiro:
+
+- PDFs vão para o pool de conversão (um processo por worker) e a
+  extração roda em paralelo, limitada por BULK_IMPORT_CONCURRENCY
+- XMLs autorizados são lidos direto pelo FiscalXmlParser (sem OCR)
+- document_type="auto" converte o PDF uma vez e escolhe o extrator
+  pela chave de acesso (modelo 57 = CT-e)
+- Documentos repetidos (mesma chave_acesso) são marcados como duplicados
+- Progresso reportado por callback (usado pela task de importação)
+- A origem precisa ser um .zip enviado ao spool de uploads ou estar em
+  DOCUMENT_IMPORT_DIRS (resolve_import_source): a task é enfileirável
+  pela API
+
+Configuração:
+    BULK_IMPORT_CONCURRENCY   documentos em paralelo (default: 2x workers do pool)
+    DOCUMENT_IMPORT_DIRS      diretórios liberados para importação, separados
+                              por ":" (default: nenhum, só o spool)
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import zipfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Literal, Optional
+
+from src.core.observability import get_logger
+from src.services.document_processing.conversion_pool import ConversionPool
+from src.services.document_processing.dacte_extractor import DacteExtractor
+from src.services.document_processing.danfe_extractor import DanfeExtractor
+from src.services.document_processing.docling_processor import (
+    DoclingProcessor,
+    get_docling_processor,
+)
+from src.services.document_processing.fiscal_xml import FiscalXmlParser
+from src.services.document_processing.upload_spool import UploadSpool, get_upload_spool
+
+logger = get_logger(__name__)
+
+BULK_EXTENSIONS = (".pdf", ".xml")
+
+ItemStatus = Literal["imported", "duplicate", "failed"]
+ProgressCallback = Callable[[dict[str, Any]], Awaitable[None]]
+
+# Status do item -> contador de progresso
+_PROGRESS_KEYS = {"imported": "imported", "duplicate": "duplicates", "failed": "failed"}
+
+
+class ImportSourceNotAllowedError(ValueError):
+    """Origem do lote não liberada (ou task de outra organização)."""
+
+
+def resolve_import_source(path: str, spool: Optional[UploadSpool] = None) -> str:
+    """
+    Caminho real da origem do lote, se liberada.
+
+    No spool (uploads pendentes de todas as organizações) só um .zip
+    enviado, nunca a raiz nem um subdiretório; diretórios apenas sob
+    DOCUMENT_IMPORT_DIRS.
+
+    Args:
+        path: Diretório ou .zip informado
+        spool: Spool de uploads (default: get_upload_spool())
+
+    Raises:
+        ImportSourceNotAllowedError: origem não liberada
+    """
+    resolved = Path(path).resolve()
+    spool = spool or get_upload_spool()
+    if spool.contains(str(resolved)):
+        if resolved.suffix.lower() == ".zip" and resolved.is_file():
+            return str(resolved)
+        raise ImportSourceNotAllowedError(f"No spool, apenas um .zip enviado: {path}")
+
+    roots = [
+        Path(root) for root in os.getenv("DOCUMENT_IMPORT_DIRS", "").split(os.pathsep) if root
+    ]
+    if not any(resolved.is_relative_to(root.resolve()) for root in roots):
+        raise ImportSourceNotAllowedError(f"Origem fora dos diretórios de importação: {path}")
+    return str(resolved)
+
+
+@dataclass
+class BulkImportItem:
+    """Resultado de um documento do lote."""
+    file: str
+    status: ItemStatus
+    document_type: Optional[str] = None
+    source: Optional[str] = None  # pdf ou xml
+    chave_acesso: Optional[str] = None
+    numero: Optional[str] = None
+    emitente_cnpj: Optional[str] = None
+    valor_total: Optional[float] = None
+    confidence_score: Optional[float] = None
+    warnings: list[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class BulkImportResult:
+    """Resultado do lote."""
+    total: int
+    items: list[BulkImportItem] = field(default_factory=list)
+    duration_ms: float = 0.0
+
+    def count(self, status: ItemStatus) -> int:
+        return sum(1 for item in self.items if item.status == status)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "total": self.total,
+            "imported": self.count("imported"),
+            "duplicates": self.count("duplicate"),
+            "failed": self.count("failed"),
+            "duration_ms": round(self.duration_ms, 2),
+            "documents": [asdict(item) for item in self.items],
+        }
+
+
+class BulkDocumentImporter:
+    """
+    Importa todos os PDFs/XMLs de um diretório ou .zip.
+
+    Uso:
+        importer = BulkDocumentImporter()
+        result = await importer.import_path("/uploads/dactes_janeiro.zip", "dacte")
+        print(result.to_dict()["imported"])
+    """
+
+    CONCURRENCY = int(os.getenv("BULK_IMPORT_CONCURRENCY", str(ConversionPool.WORKERS * 2)))
+
+    def __init__(
+        self,
+        processor: Optional[DoclingProcessor] = None,
+        concurrency: Optional[int] = None
+    ):
+        self.processor = processor or get_docling_processor()
+        self.danfe_extractor = DanfeExtractor(self.processor)
+        self.dacte_extractor = DacteExtractor(self.processor)
+        self.xml_parser = FiscalXmlParser()
+        self.concurrency = concurrency or self.CONCURRENCY
+
+    async def import_path(
+        self,
+        path: str,
+        document_type: str = "auto",
+        on_progress: Optional[ProgressCallback] = None
+    ) -> BulkImportResult:
+        """
+        Importa um diretório (recursivo) ou arquivo .zip.
+
+        Args:
+            path: Diretório ou .zip com PDFs/XMLs
+            document_type: "danfe", "dacte" ou "auto" (vale para os PDFs)
+            on_progress: Chamado a cada documento com os contadores do lote
+
+        Raises:
+            FileNotFoundError: path não existe
+            zipfile.BadZipFile: .zip inválido
+        """
+        if os.path.isdir(path):
+            return await self._import_files(
+                await asyncio.to_thread(collect_files, path), path, document_type, on_progress
+            )
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+
+        # .zip: extrair PDFs/XMLs para um diretório temporário (o Docling
+        # trabalha com arquivos e os workers do pool não leem o zip)
+        with tempfile.TemporaryDirectory(prefix="bulk_import_") as tmp_dir:
+            files = await asyncio.to_thread(extract_zip, path, tmp_dir)
+            return await self._import_files(files, tmp_dir, document_type, on_progress)
+
+    async def _import_files(
+        self,
+        files: list[str],
+        root: str,
+        document_type: str,
+        on_progress: Optional[ProgressCallback]
+    ) -> BulkImportResult:
+        start = time.perf_counter()
+        result = BulkImportResult(total=len(files))
+        items: list[Optional[BulkImportItem]] = [None] * len(files)
+        seen: dict[str, str] = {}
+        progress = {"total": len(files), "processed": 0, "imported": 0, "duplicates": 0, "failed": 0}
+        next_index = 0
+
+        logger.info(
+            "bulk_import_started",
+            extra={"total": len(files), "concurrency": self.concurrency}
+        )
+
+        async def worker() -> None:
+            nonlocal next_index
+            while next_index < len(files):
+                index = next_index
+                next_index += 1
+                file_path = files[index]
+
+                item = await self._import_file(file_path, document_type)
+                item.file = os.path.relpath(file_path, root)
+
+                # Sem await entre a checagem e o registro: seguro no event loop
+                if item.status == "imported" and item.chave_acesso:
+                    first = seen.setdefault(item.chave_acesso, item.file)
+                    if first != item.file:
+                        item.status = "duplicate"
+                        item.error = f"Mesma chave de {first}"
+
+                items[index] = item
+                progress["processed"] += 1
+                progress[_PROGRESS_KEYS[item.status]] += 1
+                if on_progress is not None:
+                    await on_progress(dict(progress))
+
+        await asyncio.gather(
+            *(worker() for _ in range(min(self.concurrency, len(files)) or 1))
+        )
+
+        # Ordem original dos arquivos no resultado
+        result.items = [item for item in items if item is not None]
+        result.duration_ms = (time.perf_counter() - start) * 1000
+
+        logger.info(
+            "bulk_import_completed",
+            extra={**progress, "duration_ms": round(result.duration_ms, 2)}
+        )
+        return result
+
+    async def _import_file(self, file_path: str, document_type: str) -> BulkImportItem:
+        """Importa um arquivo; erros viram item com status failed."""
+        try:
+            if file_path.lower().endswith(".xml"):
+                return await self._import_xml(file_path)
+            return await self._import_pdf(file_path, document_type)
+        except Exception as e:
+            logger.warning(
+                "bulk_import_file_error",
+                extra={"file_path": file_path, "error": str(e)}
+            )
+            return BulkImportItem(file=file_path, status="failed", error=str(e))
+
+    async def _import_xml(self, file_path: str) -> BulkImportItem:
+        def parse():
+            with open(file_path, "rb") as f:
+                return self.xml_parser.parse(f, file_path)
+
+        parsed = await asyncio.to_thread(parse)
+        if not parsed.success:
+            return BulkImportItem(file=file_path, status="failed", source="xml", error=parsed.error)
+
+        return _item_from_data(
+            file_path, "danfe" if parsed.kind == "nfe" else "dacte", "xml", parsed.data
+        )
+
+    async def _import_pdf(self, file_path: str, document_type: str) -> BulkImportItem:
+        doc = await self.processor.process_file(file_path)
+        if not doc.success:
+            return BulkImportItem(file=file_path, status="failed", source="pdf", error=doc.error)
+
+        if document_type == "auto":
+            # Chave modelo 57 no texto = DACTe (um DACTe também cita
+            # chaves de NF-e, por isso checar o CT-e primeiro)
+            is_cte = self.dacte_extractor._extract_chave_acesso(doc.text) is not None
+            document_type = "dacte" if is_cte else "danfe"
+
+        extractor = self.dacte_extractor if document_type == "dacte" else self.danfe_extractor
+        extracted = await extractor.extract_from_document(doc)
+        if not extracted.success or extracted.data is None:
+            return BulkImportItem(
+                file=file_path,
+                status="failed",
+                document_type=document_type,
+                source="pdf",
+                error=extracted.error or "Erro na extração"
+            )
+
+        return _item_from_data(file_path, document_type, "pdf", extracted.data)
+
+
+def _item_from_data(file_path: str, document_type: str, source: str, data: Any) -> BulkImportItem:
+    """BulkImportItem a partir de DanfeData/DacteData."""
+    total = data.valor_total if document_type == "danfe" else data.valor_total_servico
+    return BulkImportItem(
+        file=file_path,
+        status="imported",
+        document_type=document_type,
+        source=source,
+        chave_acesso=data.chave_acesso or None,
+        numero=data.numero or None,
+        emitente_cnpj=data.emitente.cnpj if data.emitente else None,
+        valor_total=float(total),
+        confidence_score=data.confidence_score,
+        warnings=list(data.warnings),
+    )
+
+
+def collect_files(directory: str) -> list[str]:
+    """PDFs/XMLs do diretório (recursivo), em ordem de nome."""
+    return sorted(
+        str(path)
+        for path in Path(directory).rglob("*")
+        if path.is_file() and path.suffix.lower() in BULK_EXTENSIONS
+    )
+
+
+def extract_zip(zip_path: str, target_dir: str) -> list[str]:
+    """
+    Extrai os PDFs/XMLs do .zip para target_dir.
+
+    ZipFile.extract normaliza os nomes (sem caminhos absolutos ou "..").
+    """
+    files = []
+    with zipfile.ZipFile(zip_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(BULK_EXTENSIONS):
+                continue
+            files.append(archive.extract(info, target_dir))
+    return sorted(files)
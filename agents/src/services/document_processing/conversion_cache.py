@@ -0,0 +1,201 @@
+"""
+Cache de resultados de conversão Docling por conteúdo.
+
+O mesmo DANFe/DACTe costuma ser enviado várias vezes (retentativas,
+validação seguida de importação, reimportações) e cada envio refazia o
+OCR completo. O resultado (texto, markdown, tabelas, metadados) fica em
+disco, comprimido, indexado por sha256 dos bytes + opções do pipeline:
+
+    {DOCLING_CACHE_DIR}/results/{hash[:2]}/{chave}.json.gz
+
+- Gravação atômica (arquivo temporário + rename): vários processos ou
+  pods podem compartilhar o diretório
+- Limite de tamanho com despejo LRU (mtime é atualizado a cada acerto)
+- Chave inclui CACHE_VERSION: mudar o formato do resultado invalida tudo
+
+Configuração:
+    DOCLING_CACHE_DIR            diretório base (default: /tmp/docling_cache)
+    DOCLING_RESULT_CACHE_MB      tamanho máximo (default: 512)
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from src.core.observability import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_VERSION = 1
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: str) -> str:
+    """sha256 do arquivo, lido em blocos."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    """
+    Cache LRU em disco de resultados de conversão.
+
+    Uso:
+        cache = get_conversion_cache()
+        key = cache.key(file_sha256(path), options)
+
+        result = await cache.get(key)
+        if result is None:
+            result = ...  # converter
+            await cache.put(key, result)
+    """
+
+    MAX_MB = int(os.getenv("DOCLING_RESULT_CACHE_MB", "512"))
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None):
+        self.root = Path(cache_dir) / "results"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or self.MAX_MB * 1024 * 1024
+
+        # Estimativa do tamanho em disco (recalculada a cada despejo)
+        self._total_bytes: Optional[int] = None
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    @staticmethod
+    def key(content_hash: str, options: Any = None) -> str:
+        """Chave = hash do conteúdo + hash das opções do pipeline."""
+        if is_dataclass(options):
+            options = asdict(options)
+        fingerprint = json.dumps(
+            {"v": CACHE_VERSION, "options": options}, sort_keys=True, default=str
+        )
+        options_hash = hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+        return f"{content_hash}-{options_hash}"
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json.gz"
+
+    def _read(self, key: str) -> Optional[dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            # Arquivo truncado/corrompido: descartar
+            logger.warning("conversion_cache_corrupt", extra={"key": key, "error": str(e)})
+            path.unlink(missing_ok=True)
+            return None
+
+        # Marca de uso para o LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _write(self, key: str, data: dict[str, Any]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        payload = gzip.compress(
+            json.dumps(data, ensure_ascii=False, default=str).encode("utf-8"),
+            compresslevel=6
+        )
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        if self._total_bytes is None:
+            self._total_bytes = self._scan_size()
+        else:
+            self._total_bytes += len(payload)
+
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.root.glob("*/*.json.gz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        """Remove os menos usados até 90% do limite."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+
+        self._total_bytes = total
+        self._stats["evictions"] += removed
+        logger.info(
+            "conversion_cache_evicted",
+            extra={"removed": removed, "total_bytes": total}
+        )
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Resultado em cache, ou None."""
+        data = await asyncio.to_thread(self._read, key)
+        self._stats["hits" if data is not None else "misses"] += 1
+        return data
+
+    async def put(self, key: str, data: dict[str, Any]) -> None:
+        """Grava resultado (falhas de disco são apenas registradas)."""
+        try:
+            await asyncio.to_thread(self._write, key, data)
+            self._stats["writes"] += 1
+        except OSError as e:
+            logger.warning("conversion_cache_write_error", extra={"key": key, "error": str(e)})
+
+    def get_stats(self) -> dict[str, Any]:
+        """Métricas do cache."""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Singleton
+_cache: Optional[ConversionCache] = None
+
+
+def get_conversion_cache() -> ConversionCache:
+    """Retorna instância singleton."""
+    global _cache
+    if _cache is None:
+        _cache = ConversionCache(os.getenv("DOCLING_CACHE_DIR", "/tmp/docling_cache"))
+    return _cache
@@ -0,0 +1,212 @@
+"""
+Pool de processos para conversão de documentos.
+
+A conversão Docling (OCR + modelos de estrutura de tabela) é CPU-bound e
+leva segundos por página: rodando dentro do event loop, um DACTe escaneado
+de 20 páginas travava a API inteira. Aqui cada job roda num processo
+separado e a coroutine apenas aguarda o future.
+
+- Workers com DocumentConverter já carregado (initializer do pool)
+- No máximo um job por worker submetido; os demais aguardam na fila do
+  processo principal, então o timeout mede só a execução
+- Timeout por job: o pool é reciclado (processos terminados) e os jobs
+  que estavam no pool reciclado são reenviados uma vez
+- max_tasks_per_child recicla cada worker após N documentos, limitando
+  o crescimento de memória dos modelos
+- Métricas de fila: em execução, profundidade da fila, concluídos,
+  falhas, timeouts e reciclagens
+
+Configuração:
+    DOCLING_WORKERS              processos (default: min(4, CPUs))
+    DOCLING_JOB_TIMEOUT          segundos por documento (default: 300)
+    DOCLING_MAX_TASKS_PER_CHILD  documentos por worker (default: 50)
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, TypeVar
+
+from src.core.observability import get_logger
+from src.workers.docling_worker import init_worker
+
+logger = get_logger(__name__)
+
+R = TypeVar("R")
+
+
+class ConversionPool:
+    """
+    Pool de processos com timeout por job e reciclagem de workers.
+
+    Uso:
+        pool = get_conversion_pool()
+        data = await pool.run(convert_document, "/tmp/dacte.pdf", True)
+
+    `fn` e seus argumentos são enviados por pickle: use funções de módulo
+    importáveis sem carregar a aplicação (ver src.workers).
+    """
+
+    WORKERS = int(os.getenv("DOCLING_WORKERS", str(min(4, os.cpu_count() or 1))))
+    JOB_TIMEOUT = float(os.getenv("DOCLING_JOB_TIMEOUT", "300"))
+    MAX_TASKS_PER_CHILD = int(os.getenv("DOCLING_MAX_TASKS_PER_CHILD", "50"))
+
+    def __init__(
+        self,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: tuple = (),
+        workers: Optional[int] = None,
+        job_timeout: Optional[float] = None,
+        max_tasks_per_child: Optional[int] = None
+    ):
+        self.initializer = initializer
+        self.initargs = initargs
+        self.workers = workers or self.WORKERS
+        self.job_timeout = job_timeout or self.JOB_TIMEOUT
+        self.max_tasks_per_child = max_tasks_per_child or self.MAX_TASKS_PER_CHILD
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._generation = 0
+        # Semáforo por event loop (como no fan-out)
+        self._semaphores: dict[int, asyncio.Semaphore] = {}
+        self._queued = 0
+        self._running = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "recycles": 0,
+            "total_ms": 0.0,
+        }
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop_id = id(asyncio.get_running_loop())
+        semaphore = self._semaphores.get(loop_id)
+        if semaphore is None:
+            semaphore = self._semaphores[loop_id] = asyncio.Semaphore(self.workers)
+        return semaphore
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: max_tasks_per_child não é compatível com fork, e o
+            # processo filho não herda threads/locks do event loop
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+                initargs=self.initargs,
+                max_tasks_per_child=self.max_tasks_per_child
+            )
+            self._generation += 1
+        return self._executor
+
+    def _recycle(self, generation: int, reason: str) -> None:
+        """Termina os processos do pool (uma vez por geração)."""
+        if generation != self._generation or self._executor is None:
+            return
+
+        executor, self._executor = self._executor, None
+        # ProcessPoolExecutor não cancela um job em execução: terminar os
+        # processos faz os futures pendentes falharem com BrokenProcessPool
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False)
+
+        self._stats["recycles"] += 1
+        logger.warning(
+            "conversion_pool_recycled",
+            extra={"reason": reason, "running": self._running}
+        )
+
+    async def run(
+        self,
+        fn: Callable[..., R],
+        *args: Any,
+        timeout: Optional[float] = None
+    ) -> R:
+        """
+        Executa `fn(*args)` num worker.
+
+        Raises:
+            TimeoutError: Job excedeu o timeout (o pool é reciclado)
+            BrokenProcessPool: Worker morreu duas vezes no mesmo job
+        """
+        timeout = timeout or self.job_timeout
+        self._stats["submitted"] += 1
+        start = time.perf_counter()
+
+        self._queued += 1
+        try:
+            await self._semaphore().acquire()
+        finally:
+            self._queued -= 1
+
+        self._running += 1
+        try:
+            for attempt in range(2):
+                executor = self._get_executor()
+                generation = self._generation
+                future = asyncio.wrap_future(executor.submit(fn, *args))
+
+                try:
+                    result = await asyncio.wait_for(future, timeout)
+                except asyncio.TimeoutError:
+                    self._stats["timeouts"] += 1
+                    self._recycle(generation, "timeout")
+                    raise TimeoutError(f"Conversão excedeu {timeout:.0f}s")
+                except BrokenProcessPool:
+                    # Pool reciclado por outro job ou worker morto (ex: OOM)
+                    self._recycle(generation, "broken")
+                    if attempt:
+                        raise
+                    continue
+
+                self._stats["completed"] += 1
+                return result
+        except BaseException:
+            self._stats["failed"] += 1
+            raise
+        finally:
+            self._running -= 1
+            self._semaphore().release()
+            self._stats["total_ms"] += (time.perf_counter() - start) * 1000
+
+    def get_stats(self) -> dict[str, Any]:
+        """Métricas do pool."""
+        finished = self._stats["completed"] + self._stats["failed"]
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queue_depth": self._queued,
+            "submitted": self._stats["submitted"],
+            "completed": self._stats["completed"],
+            "failed": self._stats["failed"],
+            "timeouts": self._stats["timeouts"],
+            "recycles": self._stats["recycles"],
+            "avg_ms": round(self._stats["total_ms"] / finished, 2) if finished else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        """Encerra o pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Singleton
+_pool: Optional[ConversionPool] = None
+
+
+def get_conversion_pool() -> ConversionPool:
+    """Retorna instância singleton (workers com converter Docling aquecido)."""
+    global _pool
+    if _pool is None:
+        _pool = ConversionPool(
+            initializer=init_worker,
+            initargs=(os.getenv("DOCLING_CACHE_DIR", "/tmp/docling_cache"),)
+        )
+    return _pool
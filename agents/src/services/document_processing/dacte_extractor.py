@@ -13,19 +13,62 @@ Extrai:
 @module services/document_processing/dacte_extractor
 """
 
-import re
 import asyncio
 import atexit
-from typing import Optional, List
+from typing import Optional, List, Union
 from dataclasses import dataclass, field
 from decimal import Decimal
 from concurrent.futures import ThreadPoolExecutor
 
 from src.core.observability import get_logger
 from .docling_processor import DoclingProcessor, ProcessedDocument, get_docling_processor
+from .text_index import (
+    CFOP_RE,
+    CNPJ_RE,
+    DATA_EMISSAO_RE,
+    DOCUMENTO_RE,
+    NOME_RE,
+    NUMERO_CTE_RE,
+    PESO_RE,
+    PLACA_RE,
+    PRODUTO_PREDOMINANTE_RE,
+    RNTRC_RE,
+    SERIE_RE,
+    UF_RE,
+    VALOR_CARGA_RE,
+    VALOR_ICMS_RE,
+    VALOR_PRESTACAO_RE,
+    VALOR_RECEBER_RE,
+    VALOR_TOTAL_SERVICO_RE,
+    VOLUMES_RE,
+    TextIndex,
+    only_digits,
+)
 
 logger = get_logger(__name__)
 
+# Texto bruto ou já indexado (o índice é construído uma vez por documento)
+IndexedText = Union[str, TextIndex]
+
+# Emitente costuma estar no cabeçalho
+_HEADER_CHARS = 2000
+
+# Participante -> rótulo; seção termina no próximo participante ou DADOS
+_PARTICIPANTE_LABELS = {
+    "REMETENTE": "REM",
+    "DESTINATÁRIO": "DEST",
+    "EXPEDIDOR": "EXPED",
+    "RECEBEDOR": "RECEB",
+}
+_PARTICIPANTE_STOPS = ("REM", "DEST", "EXPED", "RECEB", "DADOS")
+
+_VALOR_FIELDS = (
+    ("total", VALOR_TOTAL_SERVICO_RE),
+    ("receber", VALOR_RECEBER_RE),
+    ("icms", VALOR_ICMS_RE),
+    ("prestacao", VALOR_PRESTACAO_RE),
+)
+
 # Executor com cleanup automático
 _executor: Optional[ThreadPoolExecutor] = None
 
@@ -166,12 +209,17 @@ class DacteExtractor:
         """
         self.processor = processor or get_docling_processor()
 
-    async def extract_from_file(self, file_path: str) -> DacteExtractionResult:
+    async def extract_from_file(
+        self,
+        file_path: str,
+        content_hash: Optional[str] = None
+    ) -> DacteExtractionResult:
         """
         Extrai dados de arquivo DACTe PDF.
 
         Args:
             file_path: Caminho do arquivo PDF
+            content_hash: sha256 do conteúdo, se já calculado (ex: upload no spool)
 
         Returns:
             DacteExtractionResult com dados extraídos
@@ -179,7 +227,7 @@ class DacteExtractor:
         logger.info("extracting_dacte", file_path=file_path)
 
         # Processar com Docling
-        doc_result = await self.processor.process_file(file_path)
+        doc_result = await self.processor.process_file(file_path, content_hash=content_hash)
 
         if not doc_result.success:
             return DacteExtractionResult(
@@ -187,6 +235,13 @@ class DacteExtractor:
                 error=doc_result.error,
             )
 
+        return await self.extract_from_document(doc_result)
+
+    async def extract_from_document(
+        self,
+        doc_result: ProcessedDocument,
+    ) -> DacteExtractionResult:
+        """Extrai dados de um documento já convertido pelo Docling."""
         # Extrair dados em thread separada (não bloqueia event loop)
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(
@@ -220,16 +275,12 @@ class DacteExtractor:
                 error=doc_result.error,
             )
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            _get_executor(),
-            self._extract_data,
-            doc_result,
-        )
+        return await self.extract_from_document(doc_result)
 
     def _extract_data(self, doc_result: ProcessedDocument) -> DacteExtractionResult:
         """Extrai dados do documento processado (sync)."""
-        text = doc_result.text
+        # Rótulos localizados uma vez; cada campo lê só o seu trecho
+        text = TextIndex(doc_result.text)
         warnings: List[str] = []
 
         # Extrair chave de acesso (44 dígitos, modelo 57)
@@ -307,211 +358,140 @@ class DacteExtractor:
 
         return DacteExtractionResult(success=True, data=data)
 
-    def _extract_chave_acesso(self, text: str) -> Optional[str]:
+    def _extract_chave_acesso(self, text: IndexedText) -> Optional[str]:
         """Extrai chave de acesso (44 dígitos, modelo 57 = CTe)."""
-        patterns = [
-            r"\b(\d{44})\b",
-            r"CHAVE\s*(?:DE\s*)?ACESSO[:\s]*(\d[\d\s]{42,54})",
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                chave = re.sub(r"\s", "", match.group(1))
-                if len(chave) == 44 and chave.isdigit():
-                    # CTe começa com código UF + AAMM + modelo 57
-                    if chave[20:22] == "57":  # Modelo 57 = CTe
-                        return chave
-        return None
-
-    def _extract_numero_serie(self, text: str) -> tuple[Optional[str], Optional[str]]:
+        return TextIndex.of(text).chave_acesso(modelo="57")
+
+    def _extract_numero_serie(self, text: IndexedText) -> tuple[Optional[str], Optional[str]]:
         """Extrai número e série do CTe."""
-        numero_match = re.search(r"CT-?[eE]\s*N[ºÚU°]?\s*[:.]?\s*(\d{1,9})", text)
+        index = TextIndex.of(text)
+
+        numero_match = NUMERO_CTE_RE.search(index.text)
         numero = numero_match.group(1) if numero_match else None
 
-        serie_match = re.search(r"S[ÉE]RIE\s*[:.]?\s*(\d{1,3})", text, re.IGNORECASE)
+        serie_match = index.match_first(SERIE_RE, "SERIE")
         serie = serie_match.group(1) if serie_match else None
 
         return numero, serie
 
-    def _extract_cfop(self, text: str) -> Optional[str]:
+    def _extract_cfop(self, text: IndexedText) -> Optional[str]:
         """Extrai CFOP."""
-        match = re.search(r"CFOP\s*[:.]?\s*(\d{4})", text)
+        match = TextIndex.of(text).match_first(CFOP_RE, "CFOP")
         return match.group(1) if match else None
 
-    def _extract_emitente(self, text: str) -> Optional[DacteEmitente]:
+    def _extract_emitente(self, text: IndexedText) -> Optional[DacteEmitente]:
         """Extrai dados da transportadora."""
-        cnpj_match = re.search(
-            r"TRANSPORTADOR.*?CNPJ[:\s]*(\d{2}[.\s]?\d{3}[.\s]?\d{3}[/\s]?\d{4}[-\s]?\d{2})",
-            text,
-            re.IGNORECASE | re.DOTALL,
-        )
+        index = TextIndex.of(text)
+
+        cnpj_match = None
+        transportador = next(index.positions("TRANSP"), None)
+        if transportador:
+            cnpj_match = index.match_first(CNPJ_RE, "DOC", start=transportador[1])
 
         if not cnpj_match:
-            # Tentar padrão alternativo
-            cnpj_match = re.search(
-                r"CNPJ[:\s]*(\d{2}[.\s]?\d{3}[.\s]?\d{3}[/\s]?\d{4}[-\s]?\d{2})",
-                text[:2000],  # Primeiros 2000 chars (emitente geralmente no topo)
-                re.IGNORECASE,
-            )
+            # Emitente geralmente no topo (primeiros 2000 chars)
+            cnpj_match = index.match_first(CNPJ_RE, "DOC", 0, _HEADER_CHARS)
 
         if not cnpj_match:
             return None
 
-        cnpj = re.sub(r"[.\-/\s]", "", cnpj_match.group(1))
-
         # Tentar extrair razão social
-        razao_match = re.search(
-            r"(?:RAZ[ÃA]O\s*SOCIAL|NOME)[:\s]*([^\n]+)",
-            text[:2000],
-            re.IGNORECASE,
-        )
+        razao_match = index.match_first(NOME_RE, "NOME", 0, _HEADER_CHARS)
         razao_social = razao_match.group(1).strip() if razao_match else ""
 
         return DacteEmitente(
-            cnpj=cnpj,
+            cnpj=only_digits(cnpj_match.group(1)),
             razao_social=razao_social,
         )
 
     def _extract_participante(
         self,
-        text: str,
+        text: IndexedText,
         tipo: str,
     ) -> Optional[DacteParticipante]:
         """Extrai dados de remetente ou destinatário."""
-        # Procurar seção
-        pattern = rf"{tipo}.*?(?=REMETENTE|DESTINATÁRIO|EXPEDIDOR|RECEBEDOR|DADOS|$)"
-        section = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        index = TextIndex.of(text)
+        section = index.section(_PARTICIPANTE_LABELS[tipo], stops=_PARTICIPANTE_STOPS)
 
         if not section:
             return None
 
-        section_text = section.group(0)
-
         # CNPJ/CPF
-        doc_match = re.search(
-            r"(?:CNPJ|CPF)[:\s]*(\d[\d.\-/\s]{10,18})",
-            section_text,
-            re.IGNORECASE,
-        )
+        doc_match = index.match_first(DOCUMENTO_RE, "DOC", *section)
 
         if not doc_match:
             return None
 
-        documento = re.sub(r"[.\-/\s]", "", doc_match.group(1))
-
         # Nome
-        nome_match = re.search(
-            r"(?:RAZ[ÃA]O\s*SOCIAL|NOME)[:\s]*([^\n]+)",
-            section_text,
-            re.IGNORECASE,
-        )
+        nome_match = index.match_first(NOME_RE, "NOME", *section)
         nome = nome_match.group(1).strip() if nome_match else ""
 
         return DacteParticipante(
-            documento=documento,
+            documento=only_digits(doc_match.group(1)),
             nome=nome,
         )
 
     def _extract_carga(
         self,
-        text: str,
+        text: IndexedText,
         tables: List[dict],
     ) -> Optional[DacteCarga]:
         """Extrai informações da carga."""
+        index = TextIndex.of(text)
         carga = DacteCarga()
 
         # Produto predominante
-        prod_match = re.search(
-            r"PRODUTO\s*PREDOMINANTE[:\s]*([^\n]+)",
-            text,
-            re.IGNORECASE,
-        )
+        prod_match = index.match_first(PRODUTO_PREDOMINANTE_RE, "PRODUTO")
         if prod_match:
             carga.produto_predominante = prod_match.group(1).strip()
 
         # Valor da carga
-        valor_match = re.search(
-            r"VALOR\s*(?:DA\s*)?(?:TOTAL\s*)?(?:DA\s*)?CARGA[:\s]*R?\$?\s*([\d.,]+)",
-            text,
-            re.IGNORECASE,
-        )
-        if valor_match:
-            try:
-                carga.valor_carga = Decimal(
-                    valor_match.group(1).replace(".", "").replace(",", ".")
-                )
-            except Exception:
-                pass
+        valor_carga = index.money(VALOR_CARGA_RE)
+        if valor_carga is not None:
+            carga.valor_carga = valor_carga
 
         # Peso bruto
-        peso_match = re.search(
-            r"PESO\s*(?:BRUTO|TOTAL)[:\s]*([\d.,]+)\s*(?:KG)?",
-            text,
-            re.IGNORECASE,
-        )
-        if peso_match:
-            try:
-                carga.peso_bruto = Decimal(
-                    peso_match.group(1).replace(".", "").replace(",", ".")
-                )
-            except Exception:
-                pass
+        peso_bruto = index.money(PESO_RE, "PESO")
+        if peso_bruto is not None:
+            carga.peso_bruto = peso_bruto
 
         # Quantidade de volumes
-        vol_match = re.search(
-            r"(?:QTD|QUANTIDADE)\s*(?:DE\s*)?VOLUMES?[:\s]*(\d+)",
-            text,
-            re.IGNORECASE,
-        )
+        vol_match = index.match_first(VOLUMES_RE, "VOLUMES")
         if vol_match:
             carga.quantidade_volumes = int(vol_match.group(1))
 
         return carga
 
-    def _extract_valores(self, text: str) -> dict[str, Decimal]:
+    def _extract_valores(self, text: IndexedText) -> dict[str, Decimal]:
         """Extrai valores do frete."""
+        index = TextIndex.of(text)
         valores: dict[str, Decimal] = {}
 
-        patterns = {
-            "total": r"VALOR\s*TOTAL\s*(?:DO\s*)?(?:SERVI[ÇC]O|FRETE)[:\s]*R?\$?\s*([\d.,]+)",
-            "receber": r"VALOR\s*(?:A\s*)?RECEBER[:\s]*R?\$?\s*([\d.,]+)",
-            "icms": r"VALOR\s*(?:DO\s*)?ICMS[:\s]*R?\$?\s*([\d.,]+)",
-            "prestacao": r"VALOR\s*(?:DA\s*)?PRESTA[ÇC][ÃA]O[:\s]*R?\$?\s*([\d.,]+)",
-        }
-
-        for key, pattern in patterns.items():
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    valores[key] = Decimal(
-                        match.group(1).replace(".", "").replace(",", ".")
-                    )
-                except Exception:
-                    pass
+        for key, pattern in _VALOR_FIELDS:
+            valor = index.money(pattern)
+            if valor is not None:
+                valores[key] = valor
 
         return valores
 
-    def _extract_veiculo(self, text: str) -> Optional[DacteVeiculo]:
+    def _extract_veiculo(self, text: IndexedText) -> Optional[DacteVeiculo]:
         """Extrai dados do veículo."""
+        index = TextIndex.of(text)
+
         # Placa (formatos: ABC-1234 ou ABC1D23)
-        placa_match = re.search(
-            r"PLACA[:\s]*([A-Z]{3}[-\s]?\d{4}|[A-Z]{3}\d[A-Z]\d{2})",
-            text,
-            re.IGNORECASE,
-        )
+        placa_match = index.match_first(PLACA_RE, "PLACA")
 
         if not placa_match:
             return None
 
         placa = placa_match.group(1).upper().replace("-", "").replace(" ", "")
 
-        # UF do veículo
-        uf_match = re.search(r"PLACA.*?UF[:\s]*([A-Z]{2})", text, re.IGNORECASE)
+        # UF do veículo (mesma linha da placa)
+        uf_match = index.search_in_line(UF_RE, "PLACA")
         uf = uf_match.group(1) if uf_match else None
 
         # RNTRC
-        rntrc_match = re.search(r"RNTRC[:\s]*(\d+)", text, re.IGNORECASE)
+        rntrc_match = index.match_first(RNTRC_RE, "RNTRC")
         rntrc = rntrc_match.group(1) if rntrc_match else None
 
         return DacteVeiculo(
@@ -520,44 +500,26 @@ class DacteExtractor:
             rntrc=rntrc,
         )
 
-    def _extract_nfes_vinculadas(self, text: str) -> List[str]:
-        """Extrai chaves de NFe vinculadas."""
-        nfes: List[str] = []
-
-        # Procurar chaves de 44 dígitos que começam com modelo 55 (NFe)
-        for match in re.finditer(r"\b(\d{44})\b", text):
-            chave = match.group(1)
-            if chave[20:22] == "55":  # Modelo 55 = NFe
-                nfes.append(chave)
+    def _extract_nfes_vinculadas(self, text: IndexedText) -> List[str]:
+        """Extrai chaves de NFe vinculadas (modelo 55), sem duplicatas."""
+        chaves = TextIndex.of(text).chaves
+        return list(dict.fromkeys(chave for chave in chaves if chave[20:22] == "55"))
 
-        return list(set(nfes))  # Remover duplicatas
-
-    def _extract_percurso(self, text: str) -> tuple[Optional[str], Optional[str]]:
+    def _extract_percurso(self, text: IndexedText) -> tuple[Optional[str], Optional[str]]:
         """Extrai UF de início e fim do percurso."""
-        inicio_match = re.search(
-            r"(?:INÍCIO|ORIGEM|IN[IÍ]CIO\s*DA\s*PRESTA[ÇC][ÃA]O).*?UF[:\s]*([A-Z]{2})",
-            text,
-            re.IGNORECASE,
-        )
+        index = TextIndex.of(text)
 
-        fim_match = re.search(
-            r"(?:T[ÉE]RMINO|DESTINO|FIM\s*DA\s*PRESTA[ÇC][ÃA]O).*?UF[:\s]*([A-Z]{2})",
-            text,
-            re.IGNORECASE,
-        )
+        inicio_match = index.search_in_line(UF_RE, "INICIO")
+        fim_match = index.search_in_line(UF_RE, "FIM")
 
         uf_inicio = inicio_match.group(1) if inicio_match else None
         uf_fim = fim_match.group(1) if fim_match else None
 
         return uf_inicio, uf_fim
 
-    def _extract_data_emissao(self, text: str) -> Optional[str]:
+    def _extract_data_emissao(self, text: IndexedText) -> Optional[str]:
         """Extrai data de emissão."""
-        match = re.search(
-            r"DATA\s*(?:DE\s*)?EMISS[ÃA]O[:\s]*(\d{2}[/.\-]\d{2}[/.\-]\d{2,4})",
-            text,
-            re.IGNORECASE,
-        )
+        match = TextIndex.of(text).match_first(DATA_EMISSAO_RE, "DATA")
         return match.group(1) if match else None
 
     def _calculate_confidence(
@@ -10,10 +10,9 @@ Extrai:
 - Data de emissão e saída
 """
 
-import re
 import asyncio
 import atexit
-from typing import Optional, List
+from typing import Optional, List, Union
 from dataclasses import dataclass, field
 from decimal import Decimal
 from concurrent.futures import ThreadPoolExecutor
@@ -24,9 +23,43 @@ from src.services.document_processing.docling_processor import (
     ProcessedDocument,
     get_docling_processor,
 )
+from src.services.document_processing.text_index import (
+    BASE_ICMS_RE,
+    CNPJ_RE,
+    DATA_EMISSAO_RE,
+    DATA_SAIDA_RE,
+    DESCONTO_RE,
+    DOCUMENTO_RE,
+    NUMERO_NFE_RE,
+    SERIE_RE,
+    VALOR_FRETE_RE,
+    VALOR_ICMS_RE,
+    VALOR_IPI_RE,
+    VALOR_PRODUTOS_RE,
+    VALOR_SEGURO_RE,
+    VALOR_TOTAL_NOTA_RE,
+    TextIndex,
+    normalize_numero,
+    only_digits,
+)
 
 logger = get_logger(__name__)
 
+# Texto bruto ou já indexado (o índice é construído uma vez por documento)
+IndexedText = Union[str, TextIndex]
+
+# Campo -> (padrão, rótulo onde o padrão é ancorado)
+_VALOR_FIELDS = (
+    ("produtos", VALOR_PRODUTOS_RE, "VALOR"),
+    ("frete", VALOR_FRETE_RE, "VALOR"),
+    ("seguro", VALOR_SEGURO_RE, "VALOR"),
+    ("desconto", DESCONTO_RE, "DESCONTO"),
+    ("total", VALOR_TOTAL_NOTA_RE, "VALOR"),
+    ("icms_base", BASE_ICMS_RE, "BASE"),
+    ("icms_valor", VALOR_ICMS_RE, "VALOR"),
+    ("ipi", VALOR_IPI_RE, "VALOR"),
+)
+
 # Module-level executor singleton com cleanup automático
 _executor: Optional[ThreadPoolExecutor] = None
 
@@ -153,12 +186,17 @@ class DanfeExtractor:
     def __init__(self, processor: Optional[DoclingProcessor] = None):
         self.processor = processor or get_docling_processor()
     
-    async def extract_from_file(self, file_path: str) -> DanfeExtractionResult:
+    async def extract_from_file(
+        self,
+        file_path: str,
+        content_hash: Optional[str] = None
+    ) -> DanfeExtractionResult:
         """
         Extrai dados de arquivo DANFe PDF.
         
         Args:
             file_path: Caminho do arquivo PDF
+            content_hash: sha256 do conteúdo, se já calculado (ex: upload no spool)
             
         Returns:
             DanfeExtractionResult com dados extraídos
@@ -166,7 +204,7 @@ class DanfeExtractor:
         logger.info("extracting_danfe", extra={"file_path": file_path})
         
         # Processar com Docling
-        doc_result = await self.processor.process_file(file_path)
+        doc_result = await self.processor.process_file(file_path, content_hash=content_hash)
         
         if not doc_result.success:
             return DanfeExtractionResult(
@@ -174,6 +212,18 @@ class DanfeExtractor:
                 error=doc_result.error
             )
         
+        return await self.extract_from_document(doc_result)
+    
+    async def extract_from_document(
+        self,
+        doc_result: ProcessedDocument
+    ) -> DanfeExtractionResult:
+        """
+        Extrai dados de um documento já convertido pelo Docling.
+        
+        Permite converter uma vez e escolher o extrator depois
+        (ex: importação em lote com document_type="auto").
+        """
         # Extrair dados em thread separada para não bloquear event loop
         # _extract_data é CPU-bound (regex), então usamos executor
         loop = asyncio.get_event_loop()
@@ -206,17 +256,12 @@ class DanfeExtractor:
                 error=doc_result.error
             )
         
-        # Extrair dados em thread separada para não bloquear event loop
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            _get_executor(),
-            self._extract_data,
-            doc_result
-        )
+        return await self.extract_from_document(doc_result)
     
     def _extract_data(self, doc_result: ProcessedDocument) -> DanfeExtractionResult:
         """Extrai dados do documento processado."""
-        text = doc_result.text
+        # Rótulos localizados uma vez; cada campo lê só o seu trecho
+        text = TextIndex(doc_result.text)
         warnings: List[str] = []
         
         # Extrair chave de acesso (44 dígitos)
@@ -287,104 +332,66 @@ class DanfeExtractor:
             data=data
         )
     
-    def _extract_chave_acesso(self, text: str) -> Optional[str]:
+    def _extract_chave_acesso(self, text: IndexedText) -> Optional[str]:
         """Extrai chave de acesso (44 dígitos)."""
-        patterns = [
-            r'\b(\d{44})\b',  # 44 dígitos juntos
-            r'(\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4})',
-            r'CHAVE\s*(?:DE\s*)?ACESSO[:\s]*(\d[\d\s]{42,54})',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                chave = re.sub(r'\s', '', match.group(1))
-                if len(chave) == 44 and chave.isdigit():
-                    return chave
-        
-        return None
+        return TextIndex.of(text).chave_acesso()
     
-    def _extract_numero_serie(self, text: str) -> tuple[Optional[str], Optional[str]]:
+    def _extract_numero_serie(self, text: IndexedText) -> tuple[Optional[str], Optional[str]]:
         """Extrai número e série da NFe."""
-        numero_match = re.search(r'N[ºÚU°]?\s*[:.]?\s*(\d{1,9})', text, re.IGNORECASE)
-        numero = numero_match.group(1) if numero_match else None
+        index = TextIndex.of(text)
+        
+        numero_match = NUMERO_NFE_RE.search(index.text)
+        numero = normalize_numero(numero_match.group(1)) if numero_match else None
         
-        serie_match = re.search(r'S[ÉE]RIE\s*[:.]?\s*(\d{1,3})', text, re.IGNORECASE)
+        serie_match = index.match_first(SERIE_RE, "SERIE")
         serie = serie_match.group(1) if serie_match else None
         
         return numero, serie
     
-    def _extract_emitente(self, text: str) -> Optional[DanfeEmitente]:
+    def _extract_cnpj(self, text: IndexedText) -> Optional[str]:
+        """Primeiro CNPJ do documento (emitente), sem formatação."""
+        match = TextIndex.of(text).match_first(CNPJ_RE, "DOC")
+        return only_digits(match.group(1)) if match else None
+    
+    def _extract_emitente(self, text: IndexedText) -> Optional[DanfeEmitente]:
         """Extrai dados do emitente."""
-        cnpj_match = re.search(
-            r'CNPJ[:\s]*(\d{2}[.\s]?\d{3}[.\s]?\d{3}[/\s]?\d{4}[-\s]?\d{2})',
-            text,
-            re.IGNORECASE
-        )
+        cnpj = self._extract_cnpj(text)
         
-        if not cnpj_match:
+        if not cnpj:
             return None
         
-        cnpj = re.sub(r'[.\-/\s]', '', cnpj_match.group(1))
-        
         return DanfeEmitente(
             cnpj=cnpj,
             razao_social=""  # Extrair razão social requer análise mais complexa
         )
     
-    def _extract_destinatario(self, text: str) -> Optional[DanfeDestinatario]:
+    def _extract_destinatario(self, text: IndexedText) -> Optional[DanfeDestinatario]:
         """Extrai dados do destinatário."""
-        dest_section = re.search(
-            r'DESTINAT[ÁA]RIO.*?(?=DADOS|PRODUTO|VALOR|$)',
-            text,
-            re.IGNORECASE | re.DOTALL
-        )
+        index = TextIndex.of(text)
+        section = index.section("DEST", stops=("DADOS", "PRODUTO", "VALOR"))
         
-        if not dest_section:
+        if not section:
             return None
         
-        section_text = dest_section.group(0)
-        
-        doc_match = re.search(
-            r'(?:CNPJ|CPF)[:\s]*(\d[\d.\-/\s]{10,18})',
-            section_text,
-            re.IGNORECASE
-        )
+        doc_match = index.match_first(DOCUMENTO_RE, "DOC", *section)
         
         if not doc_match:
             return None
         
-        documento = re.sub(r'[.\-/\s]', '', doc_match.group(1))
-        
         return DanfeDestinatario(
-            documento=documento,
+            documento=only_digits(doc_match.group(1)),
             nome=""  # Extrair nome requer análise mais complexa
         )
     
-    def _extract_valores(self, text: str) -> dict[str, Decimal]:
+    def _extract_valores(self, text: IndexedText) -> dict[str, Decimal]:
         """Extrai valores monetários."""
+        index = TextIndex.of(text)
         valores: dict[str, Decimal] = {}
         
-        patterns = {
-            "produtos": r'VALOR\s*(?:TOTAL\s*)?(?:DOS\s*)?PRODUTOS[:\s]*R?\$?\s*([\d.,]+)',
-            "frete": r'VALOR\s*(?:DO\s*)?FRETE[:\s]*R?\$?\s*([\d.,]+)',
-            "seguro": r'VALOR\s*(?:DO\s*)?SEGURO[:\s]*R?\$?\s*([\d.,]+)',
-            "desconto": r'(?:VALOR\s*)?DESCONTO[:\s]*R?\$?\s*([\d.,]+)',
-            "total": r'VALOR\s*TOTAL\s*(?:DA\s*)?(?:NOTA|NF)[:\s]*R?\$?\s*([\d.,]+)',
-            "icms_base": r'BASE\s*(?:DE\s*)?C[ÁA]LC(?:ULO)?\s*(?:DO\s*)?ICMS[:\s]*R?\$?\s*([\d.,]+)',
-            "icms_valor": r'VALOR\s*(?:DO\s*)?ICMS[:\s]*R?\$?\s*([\d.,]+)',
-            "ipi": r'VALOR\s*(?:DO\s*)?IPI[:\s]*R?\$?\s*([\d.,]+)',
-        }
-        
-        for key, pattern in patterns.items():
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                valor_str = match.group(1)
-                valor_str = valor_str.replace('.', '').replace(',', '.')
-                try:
-                    valores[key] = Decimal(valor_str)
-                except Exception:
-                    pass
+        for key, pattern, label in _VALOR_FIELDS:
+            valor = index.money(pattern, label)
+            if valor is not None:
+                valores[key] = valor
         
         return valores
     
@@ -419,10 +426,10 @@ class DanfeExtractor:
         
         return itens
     
-    def _extract_data_documento(self, text: str, tipo: str) -> Optional[str]:
-        """Extrai data do documento."""
-        pattern = rf'DATA\s*(?:DE\s*)?{tipo}[:\s]*(\d{{2}}[/.\-]\d{{2}}[/.\-]\d{{2,4}})'
-        match = re.search(pattern, text, re.IGNORECASE)
+    def _extract_data_documento(self, text: IndexedText, tipo: str) -> Optional[str]:
+        """Extrai data do documento ("emissão" ou "saída")."""
+        pattern = DATA_EMISSAO_RE if tipo == "emissão" else DATA_SAIDA_RE
+        match = TextIndex.of(text).match_first(pattern, "DATA")
         return match.group(1) if match else None
     
     def _calculate_confidence(
@@ -9,29 +9,45 @@ Suporta:
 - Imagens (PNG, JPG)
 - DOCX
 - HTML
+
+A conversão roda no pool de processos (conversion_pool): process_file
+apenas aguarda o resultado e não bloqueia o event loop. Resultados ficam
+no cache por conteúdo (conversion_cache): reenviar o mesmo arquivo não
+refaz o OCR. Conteúdo em memória vai para o spool de uploads
+(upload_spool), o mesmo diretório montado no container do Docling.
 """
 
+import asyncio
+import hashlib
 import os
-import tempfile
-from typing import Optional, List, Literal
+from typing import Optional, List, Literal, Union
 from dataclasses import dataclass, field
 from pathlib import Path
 
 from src.core.observability import get_logger
+from src.services.document_processing.conversion_cache import (
+    ConversionCache,
+    file_sha256,
+    get_conversion_cache,
+)
+from src.services.document_processing.conversion_pool import (
+    ConversionPool,
+    get_conversion_pool,
+)
+from src.services.document_processing.upload_spool import (
+    UploadSpool,
+    get_upload_spool,
+)
+from src.workers.docling_worker import (
+    DOCLING_AVAILABLE,
+    DocumentConverter,
+    build_converter,
+    convert_document,
+)
 
 logger = get_logger(__name__)
 
-# Tentar importar Docling
-try:
-    from docling.document_converter import DocumentConverter
-    from docling.datamodel.base_models import InputFormat
-    from docling.datamodel.pipeline_options import PdfPipelineOptions
-    DOCLING_AVAILABLE = True
-except ImportError:
-    DOCLING_AVAILABLE = False
-    DocumentConverter = None
-    InputFormat = None
-    PdfPipelineOptions = None
+if not DOCLING_AVAILABLE:
     logger.warning("Docling not available. Install with: pip install docling")
 
 
@@ -66,18 +82,30 @@ class DoclingProcessor:
         result = await processor.process_file("/path/to/document.pdf")
     """
     
-    def __init__(self, cache_dir: Optional[str] = None):
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        pool: Optional[ConversionPool] = None,
+        result_cache: Optional[ConversionCache] = None,
+        spool: Optional[UploadSpool] = None
+    ):
         """
         Inicializa o processador.
         
         Args:
             cache_dir: Diretório para cache de modelos
+            pool: Pool de conversão (default: singleton compartilhado)
+            result_cache: Cache de resultados (default: singleton compartilhado)
+            spool: Diretório de uploads (default: singleton compartilhado)
         """
         self.cache_dir = cache_dir or os.getenv(
             "DOCLING_CACHE_DIR", 
             "/tmp/docling_cache"
         )
         self._converter: Optional[DocumentConverter] = None
+        self._pool = pool or get_conversion_pool()
+        self._result_cache = result_cache or get_conversion_cache()
+        self._spool = spool or get_upload_spool()
         
         # Criar diretório de cache
         Path(self.cache_dir).mkdir(parents=True, exist_ok=True)
@@ -91,27 +119,47 @@ class DoclingProcessor:
         )
     
     def _get_converter(self) -> "DocumentConverter":
-        """Retorna converter (lazy initialization)."""
+        """Retorna converter no processo atual (lazy initialization)."""
         if not DOCLING_AVAILABLE:
             raise RuntimeError("Docling não está instalado")
         
         if self._converter is None:
-            # Configurar pipeline para PDFs
-            pipeline_options = PdfPipelineOptions()
-            pipeline_options.do_ocr = True
-            pipeline_options.do_table_structure = True
-            
-            self._converter = DocumentConverter(
-                allowed_formats=[InputFormat.PDF, InputFormat.IMAGE],
-                pipeline_options=pipeline_options
-            )
+            self._converter = build_converter()
         
         return self._converter
     
+    async def _cached(
+        self,
+        cache_key: str,
+        file_path: str
+    ) -> Optional[ProcessedDocument]:
+        """Resultado em cache, com metadados do arquivo atual."""
+        data = await self._result_cache.get(cache_key)
+        if data is None:
+            return None
+        
+        logger.info(
+            "document_cache_hit",
+            extra={"file_path": file_path, "cache_key": cache_key}
+        )
+        return ProcessedDocument(
+            success=True,
+            text=data["text"],
+            markdown=data["markdown"],
+            tables=data["tables"],
+            metadata={
+                **data["metadata"],
+                "file_path": file_path,
+                "file_name": os.path.basename(file_path),
+                "cache_hit": True
+            }
+        )
+    
     async def process_file(
         self,
         file_path: str,
-        options: Optional[ProcessingOptions] = None
+        options: Optional[ProcessingOptions] = None,
+        content_hash: Optional[str] = None
     ) -> ProcessedDocument:
         """
         Processa um arquivo de documento.
@@ -119,6 +167,7 @@ class DoclingProcessor:
         Args:
             file_path: Caminho do arquivo
             options: Opções de processamento
+            content_hash: sha256 do conteúdo, se já calculado
             
         Returns:
             ProcessedDocument com texto extraído e tabelas
@@ -127,48 +176,41 @@ class DoclingProcessor:
         
         logger.info("processing_document", extra={"file_path": file_path})
         
-        if not DOCLING_AVAILABLE:
+        if not os.path.exists(file_path):
             return ProcessedDocument(
                 success=False,
                 text="",
                 markdown="",
                 tables=[],
                 metadata={},
-                error="Docling não está instalado. Execute: pip install docling"
+                error=f"Arquivo não encontrado: {file_path}"
             )
         
-        if not os.path.exists(file_path):
+        content_hash = content_hash or await asyncio.to_thread(file_sha256, file_path)
+        cache_key = self._result_cache.key(content_hash, options)
+        cached = await self._cached(cache_key, file_path)
+        if cached is not None:
+            return cached
+        
+        if not DOCLING_AVAILABLE:
             return ProcessedDocument(
                 success=False,
                 text="",
                 markdown="",
                 tables=[],
                 metadata={},
-                error=f"Arquivo não encontrado: {file_path}"
+                error="Docling não está instalado. Execute: pip install docling"
             )
         
         try:
-            converter = self._get_converter()
-            
-            # Processar documento
-            result = converter.convert(file_path)
-            
-            # Extrair texto
-            text = result.document.export_to_text()
-            markdown = result.document.export_to_markdown()
+            # Processar documento num worker do pool
+            converted = await self._pool.run(
+                convert_document, file_path, options.extract_tables
+            )
             
-            # Extrair tabelas
-            tables = []
-            if options.extract_tables:
-                for table in result.document.tables:
-                    table_data = {
-                        "rows": len(table.data),
-                        "cols": len(table.data[0]) if table.data else 0,
-                        "data": table.data,
-                    }
-                    if hasattr(table, 'caption'):
-                        table_data["caption"] = table.caption
-                    tables.append(table_data)
+            text = converted["text"]
+            markdown = converted["markdown"]
+            tables = converted["tables"]
             
             # Metadados
             metadata = {
@@ -177,8 +219,8 @@ class DoclingProcessor:
                 "tables_count": len(tables),
                 "text_length": len(text)
             }
-            if hasattr(result.document, 'num_pages'):
-                metadata["pages"] = result.document.num_pages
+            if converted["pages"] is not None:
+                metadata["pages"] = converted["pages"]
             
             logger.info(
                 "document_processed",
@@ -190,6 +232,13 @@ class DoclingProcessor:
                 }
             )
             
+            await self._result_cache.put(cache_key, {
+                "text": text,
+                "markdown": markdown,
+                "tables": tables,
+                "metadata": metadata
+            })
+            
             return ProcessedDocument(
                 success=True,
                 text=text,
@@ -214,33 +263,41 @@ class DoclingProcessor:
     
     async def process_bytes(
         self,
-        content: bytes,
+        content: Union[bytes, memoryview],
         filename: str,
         options: Optional[ProcessingOptions] = None
     ) -> ProcessedDocument:
         """
         Processa documento a partir de bytes.
         
+        Uploads grandes devem ir direto para o spool (UploadSpool.write_stream
+        / write_base64) e usar process_file: aqui o conteúdo já está em memória.
+        
         Args:
-            content: Conteúdo do arquivo em bytes
+            content: Conteúdo do arquivo (bytes ou memoryview)
             filename: Nome do arquivo (para determinar tipo)
             options: Opções de processamento
             
         Returns:
             ProcessedDocument
         """
-        # Salvar em arquivo temporário
-        suffix = Path(filename).suffix
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-            tmp.write(content)
-            tmp_path = tmp.name
+        options = options or ProcessingOptions()
+        
+        # Reenvio do mesmo arquivo: responder do cache sem gravar em disco
+        content_hash = hashlib.sha256(content).hexdigest()
+        cached = await self._cached(self._result_cache.key(content_hash, options), filename)
+        if cached is not None:
+            return cached
+        
+        # Gravar uma vez no spool (sem cópia do conteúdo, hash reaproveitado)
+        spooled = await asyncio.to_thread(
+            self._spool.write_bytes, content, filename, content_hash
+        )
         
         try:
-            return await self.process_file(tmp_path, options)
+            return await self.process_file(spooled.path, options, content_hash)
         finally:
-            # Limpar arquivo temporário
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+            await asyncio.to_thread(spooled.remove)
 
 
 # Singleton
@@ -0,0 +1,534 @@
+"""
+Importação de NF-e/CT-e a partir do XML autorizado.
+
+A maior parte dos documentos recebidos também chega como XML
+(procNFe/nfeProc, cteProc). Ler o XML dispensa OCR e regex: os campos
+vêm exatos do schema, então o resultado tem confiança 1.0 e é gerado
+em microssegundos em vez de segundos.
+
+- Parser em streaming (iterparse): cada bloco (ide, emit, det, ...) é
+  lido ao fechar e descartado em seguida; memória constante mesmo em
+  notas com milhares de itens
+- Produz os mesmos DanfeData/DacteData dos extratores de PDF
+- Lotes em .zip são lidos membro a membro, sem extrair para disco
+
+Uso:
+    parser = FiscalXmlParser()
+    result = parser.parse(xml_bytes)
+    if result.success and result.kind == "nfe":
+        print(result.data.chave_acesso)
+
+    for result in parser.iter_zip("/tmp/xmls_janeiro.zip"):
+        ...
+
+@module services/document_processing/fiscal_xml
+"""
+
+import io
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import BinaryIO, Callable, Iterator, Literal, Optional, Union
+from xml.etree.ElementTree import Element, ParseError
+
+from src.core.observability import get_logger
+from .danfe_extractor import DanfeData, DanfeDestinatario, DanfeEmitente, DanfeItem
+from .dacte_extractor import (
+    DacteCarga,
+    DacteData,
+    DacteEmitente,
+    DacteParticipante,
+    DacteVeiculo,
+)
+
+logger = get_logger(__name__)
+
+# defusedxml bloqueia entidades externas e expansão de entidades
+try:
+    from defusedxml import DefusedXmlException as FiscalXmlSecurityError
+    from defusedxml.ElementTree import iterparse
+    DEFUSEDXML_AVAILABLE = True
+except ImportError:
+    from xml.etree.ElementTree import iterparse
+    DEFUSEDXML_AVAILABLE = False
+
+    class FiscalXmlSecurityError(ValueError):  # type: ignore[no-redef]
+        """XML com construções bloqueadas (entidades, DTD); sem defusedxml nunca é lançado."""
+
+
+FiscalXmlKind = Literal["nfe", "cte"]
+
+XmlSource = Union[bytes, str, BinaryIO]
+
+TIPO_CTE = {"0": "NORMAL", "1": "COMPLEMENTAR", "2": "ANULACAO", "3": "SUBSTITUTO"}
+
+MODAL_CTE = {
+    "01": "RODOVIARIO",
+    "02": "AEREO",
+    "03": "AQUAVIARIO",
+    "04": "FERROVIARIO",
+    "05": "DUTOVIARIO",
+    "06": "MULTIMODAL",
+}
+
+# cStat de autorização (100) e autorização fora de prazo (150)
+AUTHORIZED_STATUS = {"100", "150"}
+
+
+@dataclass
+class FiscalXmlResult:
+    """Resultado da leitura de um XML fiscal."""
+
+    success: bool
+    kind: Optional[FiscalXmlKind] = None
+    data: Optional[Union[DanfeData, DacteData]] = None
+    error: Optional[str] = None
+    source: Optional[str] = None  # Nome do arquivo (lotes)
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+
+def _local(tag: str) -> str:
+    """Nome da tag sem namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _find(elem: Optional[Element], *path: str) -> Optional[Element]:
+    """Filho por caminho de nomes locais (ignora namespace)."""
+    for name in path:
+        if elem is None:
+            return None
+        elem = next((child for child in elem if _local(child.tag) == name), None)
+    return elem
+
+
+def _text(elem: Optional[Element], *path: str) -> Optional[str]:
+    node = _find(elem, *path)
+    if node is None or node.text is None:
+        return None
+    return node.text.strip() or None
+
+
+def _decimal(elem: Optional[Element], *path: str) -> Decimal:
+    value = _text(elem, *path)
+    try:
+        return Decimal(value) if value else Decimal("0")
+    except InvalidOperation:
+        return Decimal("0")
+
+
+def _date(value: Optional[str]) -> Optional[str]:
+    """Data do XML (ISO, com ou sem hora) no formato dos extratores (dd/mm/aaaa)."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value[:10]).strftime("%d/%m/%Y")
+    except ValueError:
+        return value
+
+
+def _document(elem: Optional[Element]) -> str:
+    return _text(elem, "CNPJ") or _text(elem, "CPF") or _text(elem, "idEstrangeiro") or ""
+
+
+def _address(ender: Optional[Element]) -> Optional[str]:
+    if ender is None:
+        return None
+    street = ", ".join(p for p in (_text(ender, "xLgr"), _text(ender, "nro")) if p)
+    parts = [p for p in (street, _text(ender, "xCpl"), _text(ender, "xBairro")) if p]
+    return " - ".join(parts) or None
+
+
+def _first_child(elem: Optional[Element]) -> Optional[Element]:
+    """Primeiro filho (ex: ICMS00/ICMS20/... dentro de ICMS)."""
+    if elem is None:
+        return None
+    return next(iter(elem), None)
+
+
+def _chave_from_id(value: Optional[str]) -> str:
+    """Id="NFe3524..." / "CTe3524..." -> 44 dígitos."""
+    digits = "".join(c for c in (value or "") if c.isdigit())
+    return digits if len(digits) == 44 else ""
+
+
+# ============================================================================
+# PARSER
+# ============================================================================
+
+
+class FiscalXmlParser:
+    """
+    Leitor de XML de NF-e (modelo 55/65) e CT-e (modelo 57/67).
+
+    Aceita o documento com ou sem protocolo (procNFe/nfeProc, cteProc,
+    NFe, CTe); sem protocolo de autorização, o resultado traz um warning.
+    """
+
+    def parse(self, source: XmlSource, source_name: Optional[str] = None) -> FiscalXmlResult:
+        """
+        Lê um XML fiscal.
+
+        Args:
+            source: Conteúdo (bytes/str) ou arquivo binário aberto
+            source_name: Nome para mensagens e lotes
+
+        Returns:
+            FiscalXmlResult com DanfeData (kind="nfe") ou DacteData (kind="cte")
+        """
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+
+        try:
+            result = self._parse_stream(source)
+        except (ParseError, FiscalXmlSecurityError) as e:
+            return FiscalXmlResult(success=False, error=f"XML inválido: {e}", source=source_name)
+
+        result.source = source_name
+        return result
+
+    def iter_zip(self, source: Union[str, BinaryIO]) -> Iterator[FiscalXmlResult]:
+        """
+        Lê todos os XMLs de um .zip (inclusive em subpastas), um por vez.
+
+        Args:
+            source: Caminho do .zip ou arquivo binário aberto
+        """
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(".xml"):
+                    continue
+                with archive.open(info) as member:
+                    yield self.parse(member, info.filename)
+
+    # ------------------------------------------------------------------
+    # Streaming
+    # ------------------------------------------------------------------
+
+    def _parse_stream(self, stream: BinaryIO) -> FiscalXmlResult:
+        kind: Optional[FiscalXmlKind] = None
+        state: dict = {"itens": [], "nfes": [], "warnings": []}
+        handlers: dict[str, Callable[..., None]] = {}
+
+        for event, elem in iterparse(stream, events=("start", "end")):
+            name = _local(elem.tag)
+
+            if event == "start":
+                # O primeiro infNFe/infCte define o tipo (no CT-e, infDoc
+                # também tem infNFe, mas aparece depois de infCte)
+                if kind is None and name in ("infNFe", "infCte"):
+                    kind = "nfe" if name == "infNFe" else "cte"
+                    state["chave"] = _chave_from_id(elem.get("Id"))
+                    handlers = self._NFE_HANDLERS if kind == "nfe" else self._CTE_HANDLERS
+                continue
+
+            handler = handlers.get(name)
+            if handler is not None:
+                handler(self, elem, state)
+                # Bloco lido: liberar a subárvore
+                elem.clear()
+
+        if kind is None:
+            return FiscalXmlResult(success=False, error="XML não é NF-e nem CT-e")
+
+        if not state.get("protocolo"):
+            state["warnings"].append("XML sem protocolo de autorização")
+        elif state.get("cstat") not in AUTHORIZED_STATUS:
+            state["warnings"].append(
+                f"Protocolo com status {state.get('cstat')}: {state.get('xmotivo') or ''}".strip()
+            )
+
+        if not state.get("chave"):
+            return FiscalXmlResult(success=False, kind=kind, error="Chave de acesso não encontrada")
+
+        data = self._build_nfe(state) if kind == "nfe" else self._build_cte(state)
+        return FiscalXmlResult(success=True, kind=kind, data=data)
+
+    # ------------------------------------------------------------------
+    # Blocos comuns
+    # ------------------------------------------------------------------
+
+    def _on_prot(self, elem: Element, state: dict) -> None:
+        """infProt (protNFe/protCTe)."""
+        state["protocolo"] = _text(elem, "nProt")
+        state["cstat"] = _text(elem, "cStat")
+        state["xmotivo"] = _text(elem, "xMotivo")
+        chave = _text(elem, "chNFe") or _text(elem, "chCTe")
+        if chave and not state.get("chave"):
+            state["chave"] = chave
+
+    # ------------------------------------------------------------------
+    # NF-e
+    # ------------------------------------------------------------------
+
+    def _on_nfe_ide(self, elem: Element, state: dict) -> None:
+        state["numero"] = _text(elem, "nNF")
+        state["serie"] = _text(elem, "serie")
+        state["data_emissao"] = _date(_text(elem, "dhEmi") or _text(elem, "dEmi"))
+        state["data_saida"] = _date(_text(elem, "dhSaiEnt") or _text(elem, "dSaiEnt"))
+
+    def _on_nfe_emit(self, elem: Element, state: dict) -> None:
+        ender = _find(elem, "enderEmit")
+        state["emitente"] = DanfeEmitente(
+            cnpj=_document(elem),
+            razao_social=_text(elem, "xNome") or "",
+            nome_fantasia=_text(elem, "xFant"),
+            inscricao_estadual=_text(elem, "IE"),
+            endereco=_address(ender),
+            municipio=_text(ender, "xMun"),
+            uf=_text(ender, "UF"),
+        )
+
+    def _on_nfe_dest(self, elem: Element, state: dict) -> None:
+        ender = _find(elem, "enderDest")
+        state["destinatario"] = DanfeDestinatario(
+            documento=_document(elem),
+            nome=_text(elem, "xNome") or "",
+            inscricao_estadual=_text(elem, "IE"),
+            endereco=_address(ender),
+            municipio=_text(ender, "xMun"),
+            uf=_text(ender, "UF"),
+        )
+
+    def _on_nfe_det(self, elem: Element, state: dict) -> None:
+        prod = _find(elem, "prod")
+        icms = _first_child(_find(elem, "imposto", "ICMS"))
+        state["itens"].append(
+            DanfeItem(
+                codigo=_text(prod, "cProd") or "",
+                descricao=_text(prod, "xProd") or "",
+                ncm=_text(prod, "NCM") or "",
+                cfop=_text(prod, "CFOP") or "",
+                unidade=_text(prod, "uCom") or "",
+                quantidade=_decimal(prod, "qCom"),
+                valor_unitario=_decimal(prod, "vUnCom"),
+                valor_total=_decimal(prod, "vProd"),
+                icms_base=_decimal(icms, "vBC") if _text(icms, "vBC") else None,
+                icms_valor=_decimal(icms, "vICMS") if _text(icms, "vICMS") else None,
+                icms_aliquota=_decimal(icms, "pICMS") if _text(icms, "pICMS") else None,
+            )
+        )
+
+    def _on_nfe_icmstot(self, elem: Element, state: dict) -> None:
+        state["totais"] = {
+            "valor_produtos": _decimal(elem, "vProd"),
+            "valor_frete": _decimal(elem, "vFrete"),
+            "valor_seguro": _decimal(elem, "vSeg"),
+            "valor_desconto": _decimal(elem, "vDesc"),
+            "valor_total": _decimal(elem, "vNF"),
+            "icms_base": _decimal(elem, "vBC"),
+            "icms_valor": _decimal(elem, "vICMS"),
+            "ipi_valor": _decimal(elem, "vIPI"),
+            "pis_valor": _decimal(elem, "vPIS"),
+            "cofins_valor": _decimal(elem, "vCOFINS"),
+        }
+
+    def _on_nfe_transp(self, elem: Element, state: dict) -> None:
+        transporta = _find(elem, "transporta")
+        state["modalidade_frete"] = _text(elem, "modFrete")
+        state["transportador_cnpj"] = _document(transporta) or None
+        state["transportador_nome"] = _text(transporta, "xNome")
+        state["placa_veiculo"] = _text(elem, "veicTransp", "placa")
+
+    def _on_nfe_inf_adic(self, elem: Element, state: dict) -> None:
+        state["informacoes_complementares"] = _text(elem, "infCpl")
+
+    def _build_nfe(self, state: dict) -> DanfeData:
+        return DanfeData(
+            chave_acesso=state["chave"],
+            numero=state.get("numero") or "",
+            serie=state.get("serie") or "",
+            data_emissao=state.get("data_emissao") or "",
+            data_saida=state.get("data_saida"),
+            emitente=state.get("emitente"),
+            destinatario=state.get("destinatario"),
+            itens=state["itens"],
+            modalidade_frete=state.get("modalidade_frete"),
+            transportador_cnpj=state.get("transportador_cnpj"),
+            transportador_nome=state.get("transportador_nome"),
+            placa_veiculo=state.get("placa_veiculo"),
+            informacoes_complementares=state.get("informacoes_complementares"),
+            confidence_score=1.0,
+            warnings=state["warnings"],
+            **state.get("totais", {}),
+        )
+
+    _NFE_HANDLERS: dict[str, Callable[..., None]] = {
+        "ide": _on_nfe_ide,
+        "emit": _on_nfe_emit,
+        "dest": _on_nfe_dest,
+        "det": _on_nfe_det,
+        "ICMSTot": _on_nfe_icmstot,
+        "transp": _on_nfe_transp,
+        "infAdic": _on_nfe_inf_adic,
+        "infProt": _on_prot,
+    }
+
+    # ------------------------------------------------------------------
+    # CT-e
+    # ------------------------------------------------------------------
+
+    def _on_cte_ide(self, elem: Element, state: dict) -> None:
+        state["numero"] = _text(elem, "nCT")
+        state["serie"] = _text(elem, "serie")
+        state["data_emissao"] = _date(_text(elem, "dhEmi") or _text(elem, "dEmi"))
+        state["cfop"] = _text(elem, "CFOP")
+        state["natureza_operacao"] = _text(elem, "natOp")
+        state["tipo_cte"] = TIPO_CTE.get(_text(elem, "tpCTe") or "0", "NORMAL")
+        state["modal"] = MODAL_CTE.get(_text(elem, "modal") or "01", "RODOVIARIO")
+        state["uf_inicio"] = _text(elem, "UFIni")
+        state["uf_fim"] = _text(elem, "UFFim")
+        state["municipio_inicio"] = _text(elem, "xMunIni")
+        state["municipio_fim"] = _text(elem, "xMunFim")
+
+    def _on_cte_emit(self, elem: Element, state: dict) -> None:
+        ender = _find(elem, "enderEmit")
+        state["emitente"] = DacteEmitente(
+            cnpj=_document(elem),
+            razao_social=_text(elem, "xNome") or "",
+            nome_fantasia=_text(elem, "xFant"),
+            inscricao_estadual=_text(elem, "IE"),
+            endereco=_address(ender),
+            municipio=_text(ender, "xMun"),
+            uf=_text(ender, "UF"),
+        )
+
+    @staticmethod
+    def _participante(elem: Element, ender_tag: str) -> DacteParticipante:
+        ender = _find(elem, ender_tag)
+        return DacteParticipante(
+            documento=_document(elem),
+            nome=_text(elem, "xNome") or "",
+            inscricao_estadual=_text(elem, "IE"),
+            endereco=_address(ender),
+            municipio=_text(ender, "xMun"),
+            uf=_text(ender, "UF"),
+        )
+
+    def _on_cte_rem(self, elem: Element, state: dict) -> None:
+        state["remetente"] = self._participante(elem, "enderReme")
+
+    def _on_cte_dest(self, elem: Element, state: dict) -> None:
+        state["destinatario"] = self._participante(elem, "enderDest")
+
+    def _on_cte_exped(self, elem: Element, state: dict) -> None:
+        state["expedidor"] = self._participante(elem, "enderExped")
+
+    def _on_cte_receb(self, elem: Element, state: dict) -> None:
+        state["recebedor"] = self._participante(elem, "enderReceb")
+
+    def _on_cte_vprest(self, elem: Element, state: dict) -> None:
+        state["valor_total_servico"] = _decimal(elem, "vTPrest")
+        state["valor_receber"] = _decimal(elem, "vRec")
+
+    def _on_cte_imp(self, elem: Element, state: dict) -> None:
+        icms = _first_child(_find(elem, "ICMS"))
+        state["valor_icms"] = _decimal(icms, "vICMS")
+        state["valor_icms_st"] = _decimal(icms, "vICMSSTRet")
+
+    def _on_cte_inf_carga(self, elem: Element, state: dict) -> None:
+        carga = DacteCarga(
+            produto_predominante=_text(elem, "proPred"),
+            valor_carga=_decimal(elem, "vCarga"),
+        )
+        for inf_q in (child for child in elem if _local(child.tag) == "infQ"):
+            unidade = _text(inf_q, "cUnid")
+            medida = (_text(inf_q, "tpMed") or "").upper()
+            quantidade = _decimal(inf_q, "qCarga")
+            # cUnid: 00=M3, 01=KG, 02=TON, 03=UNIDADE
+            if "CUBAD" in medida or unidade == "00":
+                carga.peso_cubado = quantidade
+            elif unidade == "03":
+                carga.quantidade_volumes = int(quantidade)
+            elif unidade in ("01", "02") and carga.peso_bruto == 0:
+                carga.peso_bruto = quantidade * 1000 if unidade == "02" else quantidade
+        state["carga"] = carga
+
+    def _on_cte_inf_doc(self, elem: Element, state: dict) -> None:
+        for inf_nfe in (child for child in elem if _local(child.tag) == "infNFe"):
+            chave = _text(inf_nfe, "chave")
+            if chave:
+                state["nfes"].append(chave)
+
+    def _on_cte_inf_modal(self, elem: Element, state: dict) -> None:
+        rodo = _find(elem, "rodo")
+        veic = _find(rodo, "veic")
+        placa = _text(veic, "placa")
+        if placa:
+            state["veiculo"] = DacteVeiculo(
+                placa=placa,
+                uf=_text(veic, "UF"),
+                rntrc=_text(rodo, "RNTRC"),
+                tipo=_text(veic, "tpRod"),
+            )
+
+    def _build_cte(self, state: dict) -> DacteData:
+        return DacteData(
+            chave_acesso=state["chave"],
+            numero=state.get("numero") or "",
+            serie=state.get("serie") or "",
+            data_emissao=state.get("data_emissao") or "",
+            cfop=state.get("cfop"),
+            natureza_operacao=state.get("natureza_operacao"),
+            tipo_cte=state.get("tipo_cte", "NORMAL"),
+            modal=state.get("modal", "RODOVIARIO"),
+            emitente=state.get("emitente"),
+            remetente=state.get("remetente"),
+            destinatario=state.get("destinatario"),
+            expedidor=state.get("expedidor"),
+            recebedor=state.get("recebedor"),
+            carga=state.get("carga"),
+            nfes_vinculadas=state["nfes"],
+            valor_total_servico=state.get("valor_total_servico", Decimal("0")),
+            valor_receber=state.get("valor_receber", Decimal("0")),
+            valor_icms=state.get("valor_icms", Decimal("0")),
+            valor_icms_st=state.get("valor_icms_st", Decimal("0")),
+            veiculo=state.get("veiculo"),
+            uf_inicio=state.get("uf_inicio"),
+            uf_fim=state.get("uf_fim"),
+            municipio_inicio=state.get("municipio_inicio"),
+            municipio_fim=state.get("municipio_fim"),
+            confidence_score=1.0,
+            warnings=state["warnings"],
+        )
+
+    _CTE_HANDLERS: dict[str, Callable[..., None]] = {
+        "ide": _on_cte_ide,
+        "emit": _on_cte_emit,
+        "rem": _on_cte_rem,
+        "dest": _on_cte_dest,
+        "exped": _on_cte_exped,
+        "receb": _on_cte_receb,
+        "vPrest": _on_cte_vprest,
+        "imp": _on_cte_imp,
+        "infCarga": _on_cte_inf_carga,
+        "infDoc": _on_cte_inf_doc,
+        "infModal": _on_cte_inf_modal,
+        "infProt": _on_prot,
+    }
+
+
+def looks_like_xml(content: bytes) -> bool:
+    """Heurística barata: conteúdo parece XML (e não PDF)."""
+    head = content[:64].lstrip(b"\xef\xbb\xbf \t\r\n")
+    return head.startswith(b"<")
+
+
+def is_xml_source(file_path: Optional[str], content: Optional[bytes]) -> bool:
+    """Arquivo/conteúdo é um XML fiscal (extensão ou primeiros bytes)."""
+    if content is not None:
+        return looks_like_xml(content)
+    return bool(file_path) and file_path.lower().endswith(".xml")
+
+
+def is_zip_source(file_path: Optional[str], content: Optional[bytes]) -> bool:
+    """Arquivo/conteúdo é um .zip (lote de XMLs)."""
+    if content is not None:
+        return content[:4] == b"PK\x03\x04"
+    return bool(file_path) and file_path.lower().endswith(".zip")
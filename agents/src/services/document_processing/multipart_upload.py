@@ -0,0 +1,111 @@
+"""
+Parser multipart em streaming para uploads de documentos.
+
+Lê o corpo multipart/form-data bloco a bloco e entrega os dados da
+parte de arquivo direto para o spool (UploadSpool.write_stream), sem o
+SpooledTemporaryFile do UploadFile. Campos de texto pequenos
+(document_type, dry_run, ...) ficam em `fields`.
+
+@module services/document_processing/multipart_upload
+"""
+
+from typing import AsyncIterator, Optional
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+# Campos de texto aceitos no multipart (sobrescrevem os query params)
+FORM_FIELDS = {"document_type", "validate_sefaz", "create_record", "dry_run"}
+MAX_FIELD_BYTES = 1024
+
+
+class MultipartUploadError(ValueError):
+    """Corpo multipart inválido (boundary, campos ou mais de um arquivo)."""
+
+
+class MultipartUpload:
+    """
+    Parser multipart em streaming.
+
+    Os dados da parte de arquivo saem como memoryview do bloco recebido
+    (sem cópia); campos de texto pequenos ficam em `fields`.
+    """
+
+    def __init__(self, content_type: str):
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise MultipartUploadError("Boundary ausente no multipart")
+
+        self.fields: dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self._pending: list[memoryview] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._field_name: Optional[str] = None
+        self._field_data = bytearray()
+        self._in_file = False
+
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+    def _on_part_begin(self) -> None:
+        self._disposition = b""
+        self._field_name = None
+        self._field_data = bytearray()
+        self._in_file = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        if b"filename" in options:
+            if self.filename is not None:
+                raise MultipartUploadError("Envie um arquivo por requisição")
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self._in_file = True
+        else:
+            self._field_name = options.get(b"name", b"").decode("utf-8", "replace")
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._pending.append(memoryview(data)[start:end])
+        elif self._field_name in FORM_FIELDS:
+            self._field_data += data[start:end]
+            if len(self._field_data) > MAX_FIELD_BYTES:
+                raise MultipartUploadError(f"Campo {self._field_name} muito longo")
+
+    def _on_part_end(self) -> None:
+        if self._field_name in FORM_FIELDS:
+            self.fields[self._field_name] = self._field_data.decode("utf-8", "replace")
+        self._in_file = False
+
+    async def file_chunks(self, stream: AsyncIterator[bytes]) -> AsyncIterator[memoryview]:
+        """Blocos da parte de arquivo, à medida que chegam."""
+        try:
+            async for chunk in stream:
+                self._parser.write(chunk)
+                pending, self._pending = self._pending, []
+                for piece in pending:
+                    yield piece
+            self._parser.finalize()
+        except MultipartParseError as e:
+            raise MultipartUploadError(f"Multipart inválido: {e}") from e
@@ -0,0 +1,310 @@
+"""
+Índice de rótulos para extração de campos de DANFe/DACTe.
+
+Os extratores rodavam dezenas de re.search com padrões inline sobre o
+texto inteiro, um campo por vez. Aqui:
+
+- Todos os padrões são compilados na importação do módulo
+- As posições de cada rótulo (DESTINATÁRIO, VALOR, PLACA, CFOP, ...)
+  são localizadas sob demanda, uma única vez, e reaproveitadas por
+  todos os campos que dependem dele
+- A busca de rótulos roda sem IGNORECASE sobre o texto em maiúsculas
+  (bem mais rápido no `re`); IGNORECASE só se upper() mudar o tamanho
+- Cada campo é lido com Pattern.match/search ancorado na posição do
+  rótulo e limitado à seção (pos/endpos), sem fatiar o texto
+
+Uso:
+    index = TextIndex.of(doc.text)
+    span = index.section("DEST", stops=("DADOS", "PRODUTO", "VALOR"))
+    valor = index.match_first(VALOR_TOTAL_NOTA_RE, "VALOR")
+
+@module services/document_processing/text_index
+"""
+
+import bisect
+import heapq
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Iterator, Optional, Union
+
+# ============================================================================
+# RÓTULOS (indexados sob demanda)
+# ============================================================================
+
+# Nome -> padrões do rótulo, em maiúsculas. Alternativas ficam em padrões
+# separados: cada um começa por um literal, que o `re` localiza com busca
+# rápida; "A|B" num padrão só testa o texto posição a posição.
+_LABELS = {
+    "CHAVE": r"CHAVE",
+    "DEST": r"DESTINAT[ÁA]RIO",
+    "REM": r"REMETENTE",
+    "EXPED": r"EXPEDIDOR",
+    "RECEB": r"RECEBEDOR",
+    "TRANSP": r"TRANSPORTADOR",
+    "DADOS": r"DADOS",
+    "PRODUTO": r"PRODUTO",
+    "VALOR": r"VALOR",
+    "DESCONTO": r"DESCONTO",
+    "BASE": r"BASE",
+    "PESO": r"PESO",
+    "VOLUMES": (r"QTD", r"QUANTIDADE"),
+    "DATA": r"DATA",
+    "SERIE": r"S[ÉE]RIE",
+    "CFOP": r"CFOP",
+    "DOC": (r"CNPJ", r"CPF"),
+    "NOME": (r"RAZ[ÃA]O\s*SOCIAL", r"NOME"),
+    "PLACA": r"PLACA",
+    "RNTRC": r"RNTRC",
+    "INICIO": (r"IN[IÍ]CIO", r"ORIGEM"),
+    "FIM": (r"T[ÉE]RMINO", r"DESTINO", r"FIM\s*DA\s*PRESTA[ÇC][ÃA]O"),
+}
+
+# Nome -> [(sobre text.upper(), sobre o texto original), ...]
+_LABEL_RES = {
+    name: [
+        (re.compile(pattern), re.compile(pattern, re.IGNORECASE))
+        for pattern in ((patterns,) if isinstance(patterns, str) else patterns)
+    ]
+    for name, patterns in _LABELS.items()
+}
+
+CHAVE_44_RE = re.compile(r"\b([0-9]{44})\b")
+
+# ============================================================================
+# CAMPOS (ancorados no rótulo com .match)
+# ============================================================================
+
+_I = re.IGNORECASE
+_MONEY = r"[:\s]*R?\$?\s*([\d.,]+)"
+_CNPJ = r"(\d{2}[.\s]?\d{3}[.\s]?\d{3}[/\s]?\d{4}[-\s]?\d{2})"
+
+CHAVE_ESPACADA_RE = re.compile(r"(\d{4}(?:\s*\d{4}){10})")
+CHAVE_ROTULO_RE = re.compile(r"CHAVE\s*(?:DE\s*)?ACESSO[:\s]*(\d[\d\s]{42,54})", _I)
+
+CNPJ_RE = re.compile(r"CNPJ[:\s]*" + _CNPJ, _I)
+DOCUMENTO_RE = re.compile(r"(?:CNPJ|CPF)[:\s]*(\d[\d.\-/\s]{10,18})", _I)
+NOME_RE = re.compile(r"(?:RAZ[ÃA]O\s*SOCIAL|NOME)[:\s]*([^\n]+)", _I)
+SERIE_RE = re.compile(r"S[ÉE]RIE\s*[:.]?\s*(\d{1,3})", _I)
+CFOP_RE = re.compile(r"CFOP\s*[:.]?\s*(\d{4})")
+DATA_EMISSAO_RE = re.compile(r"DATA\s*(?:D[AE]\s*)?EMISS[ÃA]O[:\s]*(\d{2}[/.\-]\d{2}[/.\-]\d{2,4})", _I)
+DATA_SAIDA_RE = re.compile(r"DATA\s*(?:D[AE]\s*)?SA[ÍI]DA[:\s]*(\d{2}[/.\-]\d{2}[/.\-]\d{2,4})", _I)
+UF_RE = re.compile(r"UF[:\s]*([A-Z]{2})", _I)
+
+# DANFe
+# Número impresso com pontos (000.004.512) ou corrido
+NUMERO_NFE_RE = re.compile(r"N[ºÚU°]?\s*[:.]?\s*(\d{3}(?:\.\d{3}){2}|\d{1,9})", _I)
+VALOR_PRODUTOS_RE = re.compile(r"VALOR\s*(?:TOTAL\s*)?(?:DOS\s*)?PRODUTOS" + _MONEY, _I)
+VALOR_FRETE_RE = re.compile(r"VALOR\s*(?:DO\s*)?FRETE" + _MONEY, _I)
+VALOR_SEGURO_RE = re.compile(r"VALOR\s*(?:DO\s*)?SEGURO" + _MONEY, _I)
+DESCONTO_RE = re.compile(r"DESCONTO" + _MONEY, _I)
+VALOR_TOTAL_NOTA_RE = re.compile(r"VALOR\s*TOTAL\s*(?:DA\s*)?(?:NOTA|NF)" + _MONEY, _I)
+BASE_ICMS_RE = re.compile(r"BASE\s*(?:DE\s*)?C[ÁA]LC(?:ULO)?\s*(?:DO\s*)?ICMS" + _MONEY, _I)
+VALOR_ICMS_RE = re.compile(r"VALOR\s*(?:DO\s*)?ICMS" + _MONEY, _I)
+VALOR_IPI_RE = re.compile(r"VALOR\s*(?:DO\s*)?IPI" + _MONEY, _I)
+
+# DACTe
+NUMERO_CTE_RE = re.compile(r"CT-?[eE]\s*N[ºÚU°]?\s*[:.]?\s*(\d{1,9})")
+VALOR_TOTAL_SERVICO_RE = re.compile(r"VALOR\s*TOTAL\s*(?:DO\s*)?(?:SERVI[ÇC]O|FRETE)" + _MONEY, _I)
+VALOR_RECEBER_RE = re.compile(r"VALOR\s*(?:A\s*)?RECEBER" + _MONEY, _I)
+VALOR_PRESTACAO_RE = re.compile(r"VALOR\s*(?:DA\s*)?PRESTA[ÇC][ÃA]O" + _MONEY, _I)
+VALOR_CARGA_RE = re.compile(r"VALOR\s*(?:DA\s*)?(?:TOTAL\s*)?(?:DA\s*)?CARGA" + _MONEY, _I)
+PRODUTO_PREDOMINANTE_RE = re.compile(r"PRODUTO\s*PREDOMINANTE[:\s]*([^\n]+)", _I)
+PESO_RE = re.compile(r"PESO\s*(?:BRUTO|TOTAL)[:\s]*([\d.,]+)", _I)
+VOLUMES_RE = re.compile(r"(?:QTD|QUANTIDADE)\s*(?:DE\s*)?VOLUMES?[:\s]*(\d+)", _I)
+PLACA_RE = re.compile(r"PLACA[:\s]*([A-Z]{3}[-\s]?\d{4}|[A-Z]{3}\d[A-Z]\d{2})", _I)
+RNTRC_RE = re.compile(r"RNTRC[:\s]*(\d+)", _I)
+
+_NON_DIGITS_RE = re.compile(r"[.\-/\s]")
+_SPACES_RE = re.compile(r"\s")
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+
+def only_digits(value: str) -> str:
+    """Remove pontuação e espaços de CNPJ/CPF."""
+    return _NON_DIGITS_RE.sub("", value)
+
+
+def parse_money(value: str) -> Optional[Decimal]:
+    """Valor no formato brasileiro (1.234,56) para Decimal."""
+    try:
+        return Decimal(value.replace(".", "").replace(",", "."))
+    except InvalidOperation:
+        return None
+
+
+def normalize_numero(value: str) -> str:
+    """Número do documento sem pontos e zeros à esquerda (como no XML)."""
+    return value.replace(".", "").lstrip("0") or "0"
+
+
+def normalize_chave(value: str) -> Optional[str]:
+    """Chave sem espaços, se tiver 44 dígitos."""
+    chave = _SPACES_RE.sub("", value)
+    return chave if len(chave) == 44 and chave.isdigit() else None
+
+
+# ============================================================================
+# ÍNDICE
+# ============================================================================
+
+
+class TextIndex:
+    """
+    Posições dos rótulos de um texto, calculadas sob demanda.
+
+    Cada rótulo é varrido só até onde alguma consulta precisou (a maioria
+    dos campos usa a primeira ocorrência); as posições já encontradas
+    ficam em cache para os campos seguintes.
+    """
+
+    __slots__ = ("text", "_upper", "_spans", "_pending", "_chaves")
+
+    def __init__(self, text: str):
+        self.text = text
+        self._upper: Optional[str] = None
+        # Rótulo -> ocorrências já encontradas, em ordem
+        self._spans: dict[str, list[tuple[int, int]]] = {}
+        # Rótulo -> varredura ainda não concluída
+        self._pending: dict[str, Iterator[tuple[int, int]]] = {}
+        self._chaves: Optional[list[str]] = None
+
+    def _scan(self, label: str) -> Iterator[tuple[int, int]]:
+        if self._upper is None:
+            upper = self.text.upper()
+            # upper() pode mudar o tamanho ("ß" -> "SS"): posições não valeriam
+            self._upper = upper if len(upper) == len(self.text) else ""
+
+        scans = [
+            (match.span() for match in (
+                upper_re.finditer(self._upper) if self._upper
+                else ignorecase_re.finditer(self.text)
+            ))
+            for upper_re, ignorecase_re in _LABEL_RES[label]
+        ]
+        return scans[0] if len(scans) == 1 else heapq.merge(*scans)
+
+    def positions(
+        self,
+        label: str,
+        start: int = 0,
+        end: Optional[int] = None
+    ) -> Iterator[tuple[int, int]]:
+        """Ocorrências de um rótulo dentro de [start, end)."""
+        spans = self._spans.get(label)
+        if spans is None:
+            spans = self._spans[label] = []
+            self._pending[label] = self._scan(label)
+
+        index = bisect.bisect_left(spans, (start,))
+        while True:
+            if index < len(spans):
+                span = spans[index]
+                index += 1
+            else:
+                pending = self._pending.get(label)
+                span = next(pending, None) if pending is not None else None
+                if span is None:
+                    self._pending.pop(label, None)
+                    return
+                spans.append(span)
+                index += 1
+                if span[0] < start:
+                    continue
+            if end is not None and span[0] >= end:
+                return
+            yield span
+
+    def spans(self, label: str) -> list[tuple[int, int]]:
+        """Todas as ocorrências do rótulo, (início, fim) em ordem."""
+        return list(self.positions(label))
+
+    @property
+    def chaves(self) -> list[str]:
+        """Sequências de 44 dígitos (candidatas a chave de acesso)."""
+        if self._chaves is None:
+            self._chaves = CHAVE_44_RE.findall(self.text)
+        return self._chaves
+
+    @classmethod
+    def of(cls, text: Union[str, "TextIndex"]) -> "TextIndex":
+        """Reaproveita o índice se já construído."""
+        return text if isinstance(text, TextIndex) else cls(text)
+
+    def match_first(
+        self,
+        pattern: re.Pattern,
+        label: str,
+        start: int = 0,
+        end: Optional[int] = None
+    ) -> Optional[re.Match]:
+        """Primeiro match de `pattern` ancorado numa ocorrência do rótulo."""
+        endpos = len(self.text) if end is None else end
+        for label_start, _ in self.positions(label, start, end):
+            match = pattern.match(self.text, label_start, endpos)
+            if match:
+                return match
+        return None
+
+    def section(self, label: str, stops: tuple[str, ...]) -> Optional[tuple[int, int]]:
+        """
+        Trecho do primeiro rótulo até o próximo rótulo de parada (ou o fim).
+        """
+        first = next(self.positions(label), None)
+        if first is None:
+            return None
+
+        end = len(self.text)
+        for stop in stops:
+            for stop_start, _ in self.positions(stop, first[1]):
+                end = min(end, stop_start)
+                break
+        return first[0], end
+
+    def line_end(self, pos: int) -> int:
+        """Fim da linha que contém `pos`."""
+        end = self.text.find("\n", pos)
+        return len(self.text) if end == -1 else end
+
+    def search_in_line(self, pattern: re.Pattern, label: str) -> Optional[re.Match]:
+        """Primeiro match na mesma linha, após uma ocorrência do rótulo."""
+        for _, label_end in self.positions(label):
+            match = pattern.search(self.text, label_end, self.line_end(label_end))
+            if match:
+                return match
+        return None
+
+    def chave_acesso(self, modelo: Optional[str] = None) -> Optional[str]:
+        """
+        Chave de acesso: 44 dígitos juntos, em grupos de 4 ou após o rótulo.
+
+        Args:
+            modelo: "55" (NF-e) ou "57" (CT-e) para filtrar pelo modelo
+        """
+        def accept(chave: Optional[str]) -> bool:
+            return chave is not None and (modelo is None or chave[20:22] == modelo)
+
+        # finditer para parar na primeira chave aceita
+        chaves = self._chaves if self._chaves is not None else (
+            match.group(1) for match in CHAVE_44_RE.finditer(self.text)
+        )
+        for chave in chaves:
+            if accept(chave):
+                return chave
+
+        match = CHAVE_ESPACADA_RE.search(self.text)
+        if match and accept(normalize_chave(match.group(1))):
+            return normalize_chave(match.group(1))
+
+        match = self.match_first(CHAVE_ROTULO_RE, "CHAVE")
+        if match and accept(normalize_chave(match.group(1))):
+            return normalize_chave(match.group(1))
+        return None
+
+    def money(self, pattern: re.Pattern, label: str = "VALOR") -> Optional[Decimal]:
+        """Valor monetário do primeiro match ancorado no rótulo."""
+        match = self.match_first(pattern, label)
+        return parse_money(match.group(1)) if match else None
@@ -0,0 +1,247 @@
+"""
+Spool de uploads de documentos.
+
+PDFs escaneados chegam com dezenas de MB e passavam por três cópias em
+memória: o base64 do payload, os bytes decodificados e o
+NamedTemporaryFile do DoclingProcessor. Aqui o arquivo vai para disco
+em blocos, uma única vez, com o sha256 calculado durante a escrita (a
+chave do cache de conversão sai de graça):
+
+- write_stream: corpo da requisição / parte multipart, bloco a bloco
+- write_base64: base64 decodificado em blocos, sem materializar os bytes
+- write_bytes: bytes/memoryview já em memória, sem cópia intermediária
+
+O arquivo é gravado como .part e renomeado no fim: quem lê o diretório
+(o container do Docling) nunca vê arquivo pela metade. O diretório é o
+volume montado em /app/uploads no container do Docling
+(docker/docling/docker-compose.yml); SpooledFile.relative_path serve
+como file_path do POST /process.
+
+Configuração:
+    DOCUMENT_UPLOAD_DIR       diretório do spool (default: /tmp/auracore_uploads)
+    DOCUMENT_UPLOAD_MAX_MB    tamanho máximo por arquivo (default: 100)
+
+@module services/document_processing/upload_spool
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Optional, Union
+
+from src.core.observability import get_logger
+
+logger = get_logger(__name__)
+
+# Bytes iniciais guardados para detectar o tipo (PDF, XML, zip)
+HEAD_BYTES = 64
+
+# Extensão pelo conteúdo; o nome enviado só vale se não reconhecido
+_MAGIC_SUFFIXES = ((b"%PDF", ".pdf"), (b"PK\x03\x04", ".zip"), (b"<", ".xml"))
+
+
+class UploadTooLargeError(ValueError):
+    """Upload excede DOCUMENT_UPLOAD_MAX_MB."""
+
+
+@dataclass
+class SpooledFile:
+    """Arquivo gravado no spool."""
+    path: str
+    relative_path: str  # file_path para o serviço Docling (/app/uploads)
+    filename: str  # nome original enviado
+    size: int
+    sha256: str
+    head: bytes  # primeiros bytes, para detectar o tipo sem reler
+
+    def remove(self) -> None:
+        """Remove o arquivo (ignora se já removido)."""
+        Path(self.path).unlink(missing_ok=True)
+
+
+def detect_suffix(head: bytes, filename: str) -> str:
+    """Extensão do arquivo: pelo conteúdo, senão pelo nome enviado."""
+    stripped = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+    for magic, suffix in _MAGIC_SUFFIXES:
+        if stripped.startswith(magic):
+            return suffix
+    suffix = Path(filename).suffix.lower()
+    return suffix if suffix[1:].isalnum() else ""
+
+
+class _SpoolWriter:
+    """Escrita de um arquivo .part com sha256 e limite de tamanho."""
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int,
+        filename: str,
+        sha256: Optional[str] = None
+    ):
+        fd, self.part_path = tempfile.mkstemp(prefix="upload_", suffix=".part", dir=root)
+        self.file = os.fdopen(fd, "wb")
+        self.root = root
+        self.max_bytes = max_bytes
+        self.filename = os.path.basename(filename or "document")
+        # Hash já calculado pelo chamador: não recalcular
+        self.sha256 = sha256
+        self.digest = hashlib.sha256() if sha256 is None else None
+        self.size = 0
+        self.head = b""
+
+    def write(self, chunk: Union[bytes, memoryview]) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLargeError(
+                f"Arquivo excede {self.max_bytes // (1024 * 1024)}MB"
+            )
+        if len(self.head) < HEAD_BYTES:
+            self.head += bytes(chunk[:HEAD_BYTES - len(self.head)])
+        if self.digest is not None:
+            self.digest.update(chunk)
+        self.file.write(chunk)
+
+    def finish(self) -> SpooledFile:
+        self.file.close()
+        name = f"{uuid.uuid4().hex}{detect_suffix(self.head, self.filename)}"
+        path = self.root / name
+        os.replace(self.part_path, path)
+        return SpooledFile(
+            path=str(path),
+            relative_path=name,
+            filename=self.filename,
+            size=self.size,
+            sha256=self.sha256 or self.digest.hexdigest(),
+            head=self.head,
+        )
+
+    def abort(self) -> None:
+        self.file.close()
+        Path(self.part_path).unlink(missing_ok=True)
+
+
+class UploadSpool:
+    """
+    Diretório de uploads compartilhado com o Docling.
+
+    Uso:
+        spool = get_upload_spool()
+        spooled = await spool.write_stream(request.stream(), "danfe.pdf")
+        result = await processor.process_file(spooled.path, content_hash=spooled.sha256)
+        spooled.remove()
+    """
+
+    # Bloco de decodificação do base64 (múltiplo de 4 caracteres)
+    BASE64_CHUNK = 4 * 1024 * 1024
+    MAX_BYTES = int(os.getenv("DOCUMENT_UPLOAD_MAX_MB", "100")) * 1024 * 1024
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        """
+        Inicializa o spool (cria o diretório se necessário).
+
+        Args:
+            root: Diretório do spool (default: DOCUMENT_UPLOAD_DIR)
+            max_bytes: Tamanho máximo por arquivo
+        """
+        self.root = Path(
+            root or os.getenv("DOCUMENT_UPLOAD_DIR", "/tmp/auracore_uploads")
+        )
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or self.MAX_BYTES
+
+    def contains(self, path: str) -> bool:
+        """path (resolvido, sem .. nem symlinks) está dentro do spool."""
+        return Path(path).resolve().is_relative_to(self.root.resolve())
+    
+    async def write_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str
+    ) -> SpooledFile:
+        """
+        Grava um stream de blocos (ex: request.stream()).
+
+        Raises:
+            UploadTooLargeError: stream maior que max_bytes
+        """
+        writer = await asyncio.to_thread(_SpoolWriter, self.root, self.max_bytes, filename)
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    await asyncio.to_thread(writer.write, chunk)
+            spooled = await asyncio.to_thread(writer.finish)
+        except BaseException:
+            await asyncio.to_thread(writer.abort)
+            raise
+
+        logger.info(
+            "upload_spooled",
+            extra={"file_name": spooled.filename, "size": spooled.size, "path": spooled.path}
+        )
+        return spooled
+
+    def write_base64(self, data: str, filename: str) -> SpooledFile:
+        """
+        Decodifica base64 direto para o spool, em blocos (sync).
+
+        Raises:
+            ValueError: base64 inválido
+            UploadTooLargeError: conteúdo maior que max_bytes
+        """
+        # Quebras de linha (base64 MIME) desalinham os blocos de 4
+        data = data.strip()
+        if any(ws in data for ws in "\n\r\t "):
+            data = "".join(data.split())
+
+        writer = _SpoolWriter(self.root, self.max_bytes, filename)
+        try:
+            for start in range(0, len(data), self.BASE64_CHUNK):
+                writer.write(base64.b64decode(data[start:start + self.BASE64_CHUNK], validate=True))
+            return writer.finish()
+        except binascii.Error as e:
+            writer.abort()
+            raise ValueError(f"Base64 inválido: {e}") from e
+        except BaseException:
+            writer.abort()
+            raise
+
+    def write_bytes(
+        self,
+        content: Union[bytes, memoryview],
+        filename: str,
+        sha256: Optional[str] = None
+    ) -> SpooledFile:
+        """
+        Grava conteúdo já em memória (sync).
+
+        Args:
+            content: bytes ou memoryview (gravado sem cópia)
+            filename: Nome original (extensão usada se o conteúdo não for reconhecido)
+            sha256: Hash já calculado pelo chamador
+        """
+        writer = _SpoolWriter(self.root, self.max_bytes, filename, sha256)
+        try:
+            writer.write(content)
+            return writer.finish()
+        except BaseException:
+            writer.abort()
+            raise
+
+
+# Singleton
+_spool: Optional[UploadSpool] = None
+
+
+def get_upload_spool() -> UploadSpool:
+    """Retorna instância singleton do spool."""
+    global _spool
+    if _spool is None:
+        _spool = UploadSpool()
+    return _spool
@@ -0,0 +1,182 @@
+# agents/src/services/fanout.py
+"""
+Executor compartilhado de fan-out (um envio para muitos destinos).
+
+Usado por IntegrationHub.broadcast e pelos broadcasts de push:
+- Concorrência limitada (MAX_CONCURRENCY envios simultâneos no processo)
+- Chamadas bloqueantes de SDK (ex: pywebpush) num pool de threads
+  dedicado, fora do event loop
+- Rate limit por chave (provider/integração/host) com token bucket;
+  envios urgentes não esperam: consomem tokens futuros
+- Resultados agregados na ordem dos destinos; exceções viram resultado
+  via on_error em vez de abortar o lote
+"""
+
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Iterable, Optional, TypeVar
+import structlog
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# (chave, limite por minuto; <= 0 = sem limite)
+RateLimit = tuple[str, int]
+
+
+class TokenBucket:
+    """Token bucket assíncrono: `rate` tokens/s, até `burst` acumulados."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, urgent: bool = False) -> None:
+        """Consome um token, esperando se preciso (urgente nunca espera)."""
+        self._refill(time.monotonic())
+        self._tokens -= 1
+        if self._tokens >= 0 or urgent:
+            return
+        # Token reservado: esperar o tempo de reposição do déficit
+        await asyncio.sleep(-self._tokens / self.rate)
+
+
+class FanOutExecutor:
+    """
+    Fan-out com concorrência limitada e rate limit por chave.
+
+    Uso:
+        fanout = get_fanout_executor()
+
+        results = await fanout.map(
+            subscriptions,
+            send_one,
+            limit=lambda sub: ("webpush:fcm.googleapis.com", 6000),
+            on_error=lambda sub, e: SendResult(success=False, ...),
+            urgent=True
+        )
+
+        response = await fanout.run_blocking(webpush, **kwargs)
+    """
+
+    MAX_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "200"))
+    BLOCKING_THREADS = int(os.getenv("FANOUT_THREADS", "32"))
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        blocking_threads: Optional[int] = None
+    ) -> None:
+        self.max_concurrency = max_concurrency or self.MAX_CONCURRENCY
+        self._executor = ThreadPoolExecutor(
+            max_workers=blocking_threads or self.BLOCKING_THREADS,
+            thread_name_prefix="fanout"
+        )
+        self._buckets: dict[str, TokenBucket] = {}
+        # Semáforo por event loop (testes e workers podem ter loops distintos)
+        self._semaphores: dict[int, asyncio.Semaphore] = {}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop_id = id(asyncio.get_running_loop())
+        semaphore = self._semaphores.get(loop_id)
+        if semaphore is None:
+            semaphore = self._semaphores[loop_id] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    def _bucket(self, limit: RateLimit) -> Optional[TokenBucket]:
+        key, per_minute = limit
+        if per_minute <= 0:
+            return None
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.burst != per_minute:
+            # Burst de um minuto: um broadcast cabe inteiro se dentro do limite
+            bucket = self._buckets[key] = TokenBucket(per_minute / 60, per_minute)
+        return bucket
+
+    async def run_blocking(self, fn: Callable[..., R], *args: Any, **kwargs: Any) -> R:
+        """Executa chamada bloqueante no pool de threads do fan-out."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    async def map(
+        self,
+        items: Iterable[T],
+        fn: Callable[[T], Awaitable[R]],
+        *,
+        on_error: Callable[[T, Exception], R],
+        limit: Optional[Callable[[T], Optional[RateLimit]]] = None,
+        urgent: bool = False,
+        timeout: Optional[float] = None
+    ) -> list[R]:
+        """
+        Aplica `fn` a todos os itens concorrentemente.
+
+        Args:
+            items: Destinos
+            fn: Envio para um destino
+            on_error: Converte exceção (ou timeout) de um destino em resultado
+            limit: (chave, limite/minuto) do destino; None ou limite <= 0
+                para não limitar
+            urgent: Não esperar rate limit (alertas críticos)
+            timeout: Tempo máximo por destino, em segundos
+
+        Returns:
+            Resultados na mesma ordem de `items`
+        """
+        semaphore = self._semaphore()
+
+        async def run_one(item: T) -> R:
+            try:
+                rate_limit = limit(item) if limit else None
+                bucket = self._bucket(rate_limit) if rate_limit is not None else None
+                if bucket is not None:
+                    await bucket.acquire(urgent)
+                async with semaphore:
+                    if timeout is None:
+                        return await fn(item)
+                    return await asyncio.wait_for(fn(item), timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                return on_error(item, e)
+
+        items = list(items)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run_one(item) for item in items))
+
+        logger.debug(
+            "fanout_completed",
+            targets=len(items),
+            urgent=urgent,
+            duration_ms=round((time.perf_counter() - start) * 1000, 2)
+        )
+        return results
+
+    def shutdown(self) -> None:
+        """Encerra o pool de threads."""
+        self._executor.shutdown(wait=False)
+
+
+# Singleton
+_fanout_executor: Optional[FanOutExecutor] = None
+
+
+def get_fanout_executor() -> FanOutExecutor:
+    """Retorna instância singleton."""
+    global _fanout_executor
+    if _fanout_executor is None:
+        _fanout_executor = FanOutExecutor()
+    return _fanout_executor
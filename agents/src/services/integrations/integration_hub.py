@@ -1,8 +1,13 @@
 # agents/src/services/integrations/integration_hub.py
 """
 Hub central de integrações.
+
+Broadcasts usam o FanOutExecutor compartilhado: envios concorrentes,
+limitados por integração (rate_limit_per_minute) e sem espera de rate
+limit para mensagens URGENT.
 """
 
+import json
 import uuid
 from typing import Optional, Type
 from datetime import datetime
@@ -23,6 +28,7 @@ from .providers import (
     WebhookProvider
 )
 from src.services.cache import get_cache
+from src.services.fanout import get_fanout_executor
 
 logger = structlog.get_logger()
 
@@ -68,6 +74,8 @@ class IntegrationHub:
         )
     """
     
+    BROADCAST_TIMEOUT = 10.0
+    
     def __init__(self):
         self._cache = get_cache()
         self._providers: dict[str, IntegrationProvider] = {}
@@ -121,6 +129,10 @@ class IntegrationHub:
         if not data:
             return None
         
+        return self._config_from_dict(data)
+    
+    @staticmethod
+    def _config_from_dict(data: dict) -> IntegrationConfig:
         return IntegrationConfig(
             id=data["id"],
             type=IntegrationType(data["type"]),
@@ -146,10 +158,16 @@ class IntegrationHub:
         index_key = f"integration:index:{org_id}"
         integration_ids = await self._cache.get_json(index_key) or []
         
+        if not integration_ids:
+            return []
+        
+        # Um único MGET para todas as integrações do índice
+        values = await self._cache.mget([f"integration:{i}" for i in integration_ids])
+        
         integrations = []
-        for integration_id in integration_ids:
-            config = await self.get_integration(integration_id)
-            if config:
+        for value in values:
+            if value:
+                config = self._config_from_dict(json.loads(value))
                 # Filtros
                 if branch_id and config.branch_id != branch_id:
                     continue
@@ -248,9 +266,30 @@ class IntegrationHub:
                 error="Integration is inactive"
             )
         
+        return await self._send(
+            config,
+            recipient=recipient,
+            content=content,
+            subject=subject,
+            content_type=content_type,
+            priority=priority,
+            metadata=metadata
+        )
+    
+    async def _send(
+        self,
+        config: IntegrationConfig,
+        recipient: str,
+        content: str,
+        subject: Optional[str] = None,
+        content_type: str = "text",
+        priority: MessagePriority = MessagePriority.NORMAL,
+        metadata: Optional[dict] = None
+    ) -> SendResult:
+        """Envia mensagem com a configuração já carregada."""
         message = Message(
             id=str(uuid.uuid4()),
-            integration_id=integration_id,
+            integration_id=config.id,
             recipient=recipient,
             subject=subject,
             content=content,
@@ -275,29 +314,58 @@ class IntegrationHub:
         priority: MessagePriority = MessagePriority.NORMAL,
         integration_types: Optional[list[IntegrationType]] = None
     ) -> list[SendResult]:
-        """Envia para todas integrações da organização."""
+        """
+        Envia para todas integrações da organização, concorrentemente.
+        
+        Integrações inativas ou sem `default_recipient` são ignoradas.
+        Uma falha (ou exceção) de um provider não afeta os demais.
+        
+        Returns:
+            Um resultado por integração notificada
+        """
         integrations = await self.list_integrations(org_id)
         
         if integration_types:
             integrations = [i for i in integrations if i.type in integration_types]
         
-        results = []
-        for integration in integrations:
-            if integration.is_active:
-                # Determinar recipient padrão
-                recipient = integration.settings.get("default_recipient", "")
-                
-                if recipient:
-                    result = await self.send_message(
-                        integration_id=integration.id,
-                        recipient=recipient,
-                        content=content,
-                        subject=subject,
-                        priority=priority
-                    )
-                    results.append(result)
-        
-        return results
+        # Determinar recipient padrão
+        targets = [
+            i for i in integrations
+            if i.is_active and i.settings.get("default_recipient")
+        ]
+        
+        async def send(config: IntegrationConfig) -> SendResult:
+            return await self._send(
+                config,
+                recipient=config.settings["default_recipient"],
+                content=content,
+                subject=subject,
+                priority=priority
+            )
+        
+        def on_error(config: IntegrationConfig, error: Exception) -> SendResult:
+            logger.error(
+                "integration_broadcast_error",
+                integration_id=config.id,
+                integration_type=config.type.value,
+                error=str(error) or type(error).__name__
+            )
+            return SendResult(
+                success=False,
+                message_id="",
+                error=str(error) or type(error).__name__
+            )
+        
+        return await get_fanout_executor().map(
+            targets,
+            send,
+            on_error=on_error,
+            limit=lambda config: (
+                f"{config.type.value}:{config.id}", config.rate_limit_per_minute
+            ),
+            urgent=priority == MessagePriority.URGENT,
+            timeout=self.BROADCAST_TIMEOUT
+        )
     
     # ===== TESTE DE CONEXÃO =====
     
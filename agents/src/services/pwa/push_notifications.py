@@ -6,13 +6,25 @@ Features:
 - VAPID keys
 - Subscription management
 - Send notifications
-- Batch sending
+- Batch sending (fan-out concorrente; pywebpush roda fora do event loop)
+- Índices em sets (usuário, organização/filial) com leitura em lote
+- Índice de unicidade por hash do endpoint (sem duplicatas no registro)
+
+Chaves:
+    push:sub:{id}                 JSON da subscription
+    push:user:{user_id}:subs      set de IDs do usuário
+    push:org:{org}:{branch}       set de IDs da filial
+    push:endpoint:{sha256}        ID da subscription dona do endpoint
+    push:subs:activity            sorted set (score = último uso)
 """
 
+import hashlib
 import os
 import json
+import time
 import uuid
 from typing import Optional
+from urllib.parse import urlsplit
 from dataclasses import dataclass, field
 from datetime import datetime
 import structlog
@@ -25,6 +37,7 @@ except ImportError:
     WebPushException = Exception  # Fallback type
 
 from src.services.cache import get_cache
+from src.services.fanout import get_fanout_executor
 
 logger = structlog.get_logger()
 
@@ -99,6 +112,12 @@ class PushNotificationService:
         )
     """
     
+    # Limite por serviço de push (FCM, Mozilla, Apple...), por minuto
+    PUSH_HOST_RATE_PER_MINUTE = int(os.getenv("PUSH_HOST_RATE_PER_MINUTE", "60000"))
+    SEND_TIMEOUT = 10.0
+    SUBSCRIPTION_TTL = 2592000  # 30 dias
+    ACTIVITY_KEY = "push:subs:activity"
+    
     def __init__(
         self,
         vapid_private_key: Optional[str] = None,
@@ -139,7 +158,14 @@ class PushNotificationService:
         keys: dict,
         user_agent: Optional[str] = None
     ) -> PushSubscription:
-        """Registra nova subscription."""
+        """
+        Registra nova subscription.
+        
+        O endpoint é único: registrar de novo o mesmo endpoint para o mesmo
+        usuário/filial atualiza e retorna a subscription existente; se o
+        endpoint pertencia a outro usuário (troca de login no dispositivo),
+        a subscription antiga é removida.
+        """
         subscription = PushSubscription(
             id=str(uuid.uuid4()),
             user_id=user_id,
@@ -150,11 +176,45 @@ class PushNotificationService:
             user_agent=user_agent
         )
         
-        # Salvar no cache
+        endpoint_key = self._endpoint_key(endpoint)
+        if not await self._cache.set_if_absent(
+            endpoint_key, subscription.id, ttl=self.SUBSCRIPTION_TTL
+        ):
+            existing_id = await self._cache.get(endpoint_key)
+            existing = await self.get_subscription(existing_id) if existing_id else None
+            
+            if existing and (existing.user_id, existing.organization_id, existing.branch_id) == (
+                user_id, org_id, branch_id
+            ):
+                existing.keys = keys
+                existing.user_agent = user_agent or existing.user_agent
+                await self._save_subscription(existing)
+                # TTL renovado: a atividade acompanha para o cleanup
+                await self._cache.zadd(self.ACTIVITY_KEY, {existing.id: time.time()})
+                logger.info(
+                    "push_subscription_refreshed",
+                    subscription_id=existing.id,
+                    user_id=user_id
+                )
+                return existing
+            
+            if existing:
+                await self.unregister_subscriptions([existing.id])
+        
+        # Salvar no cache (registro + índice de endpoint)
         await self._save_subscription(subscription)
         
-        # Adicionar ao índice do usuário
-        await self._add_to_user_index(user_id, subscription.id)
+        # Dono sem TTL: o cleanup ainda acha os índices depois que o registro expira
+        await self._cache.set(
+            self._owner_key(subscription.id),
+            json.dumps([user_id, org_id, branch_id]),
+            ttl=None
+        )
+        
+        # Adicionar aos índices do usuário, da filial e de atividade
+        await self._cache.sadd(self._user_index_key(user_id), subscription.id)
+        await self._cache.sadd(self._org_index_key(org_id, branch_id), subscription.id)
+        await self._cache.zadd(self.ACTIVITY_KEY, {subscription.id: time.time()})
         
         logger.info(
             "push_subscription_registered",
@@ -171,6 +231,10 @@ class PushNotificationService:
         if not data:
             return None
         
+        return self._subscription_from_dict(data)
+    
+    @staticmethod
+    def _subscription_from_dict(data: dict) -> PushSubscription:
         return PushSubscription(
             id=data["id"],
             user_id=data["user_id"],
@@ -184,36 +248,85 @@ class PushNotificationService:
         )
     
     async def get_user_subscriptions(self, user_id: str) -> list[PushSubscription]:
-        """Obtém todas subscriptions de um usuário."""
-        index = await self._cache.get_json(f"push:user:{user_id}")
-        
-        if not index:
-            return []
+        """Obtém todas subscriptions de um usuário (SMEMBERS + MGET)."""
+        index_key = self._user_index_key(user_id)
+        subscription_ids = await self._cache.smembers(index_key)
         
-        subscriptions = []
-        for sub_id in index.get("subscription_ids", []):
-            sub = await self.get_subscription(sub_id)
-            if sub:
-                subscriptions.append(sub)
+        if not subscription_ids:
+            subscription_ids = await self._migrate_user_index(user_id)
         
-        return subscriptions
+        return await self._load_subscriptions(sorted(subscription_ids), index_key)
+    
+    async def get_organization_subscriptions(
+        self,
+        org_id: int,
+        branch_id: int
+    ) -> list[PushSubscription]:
+        """Obtém todas subscriptions de uma filial (SMEMBERS + MGET)."""
+        index_key = self._org_index_key(org_id, branch_id)
+        subscription_ids = await self._cache.smembers(index_key)
+        return await self._load_subscriptions(sorted(subscription_ids), index_key)
     
     async def unregister_subscription(self, subscription_id: str) -> bool:
         """Remove subscription."""
-        subscription = await self.get_subscription(subscription_id)
+        return await self.unregister_subscriptions([subscription_id]) == 1
+    
+    async def unregister_subscriptions(self, subscription_ids: list[str]) -> int:
+        """
+        Remove várias subscriptions em lote.
         
-        if not subscription:
-            return False
+        IDs cujo registro já expirou saem dos sets de usuário/filial pelo
+        dono gravado à parte (_owner_key), que não expira.
         
-        # Remover do cache
-        await self._cache.delete(f"push:sub:{subscription_id}")
+        Returns:
+            Quantas existiam
+        """
+        if not subscription_ids:
+            return 0
+        
+        subscriptions = await self._load_subscriptions(subscription_ids)
+        subscription_owners = await self._cache.mget(
+            [self._owner_key(i) for i in subscription_ids]
+        )
+        
+        # Índice de endpoint só é removido se ainda aponta para a removida
+        # (duplicatas legadas compartilham o endpoint com a que fica)
+        endpoint_keys = [self._endpoint_key(s.endpoint) for s in subscriptions]
+        owners = await self._cache.mget(endpoint_keys) if endpoint_keys else []
+        removing = set(subscription_ids)
+        
+        # Registros e índices de endpoint num único DEL
+        await self._cache.delete_many(
+            [self._sub_key(i) for i in subscription_ids]
+            + [self._owner_key(i) for i in subscription_ids]
+            + [key for key, owner in zip(endpoint_keys, owners) if owner in removing]
+        )
         
-        # Remover do índice do usuário
-        await self._remove_from_user_index(subscription.user_id, subscription_id)
+        # Um SREM por índice afetado
+        # (registros legados não têm dono gravado; vêm do próprio registro)
+        owners = {
+            s.id: (s.user_id, s.organization_id, s.branch_id) for s in subscriptions
+        }
+        for subscription_id, owner in zip(subscription_ids, subscription_owners):
+            if owner:
+                owners.setdefault(subscription_id, tuple(json.loads(owner)))
+        by_index: dict[str, list[str]] = {}
+        for subscription_id, (user_id, org_id, branch_id) in owners.items():
+            by_index.setdefault(self._user_index_key(user_id), []).append(subscription_id)
+            by_index.setdefault(
+                self._org_index_key(org_id, branch_id), []
+            ).append(subscription_id)
+        for index_key, ids in by_index.items():
+            await self._cache.srem(index_key, *ids)
+        await self._cache.zrem(self.ACTIVITY_KEY, *subscription_ids)
         
-        logger.info("push_subscription_unregistered", subscription_id=subscription_id)
+        logger.info(
+            "push_subscriptions_unregistered",
+            count=len(subscriptions),
+            subscription_ids=subscription_ids[:10]
+        )
         
-        return True
+        return len(subscriptions)
     
     # ===== SEND NOTIFICATIONS =====
     
@@ -244,52 +357,80 @@ class PushNotificationService:
     async def broadcast_to_user(
         self,
         user_id: str,
-        payload: PushPayload
+        payload: PushPayload,
+        urgent: bool = False
     ) -> list[SendResult]:
         """Envia notificação para todos dispositivos de um usuário."""
         subscriptions = await self.get_user_subscriptions(user_id)
-        
-        results = []
-        for subscription in subscriptions:
-            result = await self._send_to_subscription(subscription, payload)
-            results.append(result)
-            
-            # Remover subscriptions inválidas
-            if not result.success and result.status_code in [404, 410]:
-                await self.unregister_subscription(subscription.id)
-        
-        return results
+        return await self._broadcast(subscriptions, payload, urgent)
     
     async def broadcast_to_organization(
         self,
         org_id: int,
         branch_id: int,
-        payload: PushPayload
+        payload: PushPayload,
+        urgent: bool = False
     ) -> list[SendResult]:
-        """Envia notificação para todos usuários de uma filial."""
-        # Em produção, buscar do banco de dados
-        # Por simplificidade, retornando lista vazia
-        return []
+        """
+        Envia notificação para todos dispositivos de uma filial.
+        
+        Args:
+            urgent: Alertas críticos (ex: War Room) não esperam rate limit
+        """
+        subscriptions = await self.get_organization_subscriptions(org_id, branch_id)
+        return await self._broadcast(subscriptions, payload, urgent)
     
-    async def _send_to_subscription(
+    async def _broadcast(
         self,
-        subscription: PushSubscription,
-        payload: PushPayload
-    ) -> SendResult:
-        """Envia para uma subscription específica."""
-        if not WEBPUSH_AVAILABLE:
+        subscriptions: list[PushSubscription],
+        payload: PushPayload,
+        urgent: bool
+    ) -> list[SendResult]:
+        """Fan-out concorrente para as subscriptions (payload serializado uma vez)."""
+        if not subscriptions:
+            return []
+        
+        payload_json = self._payload_json(payload)
+        
+        async def send(subscription: PushSubscription) -> SendResult:
+            return await self._send_to_subscription(
+                subscription, payload, payload_json, touch=False
+            )
+        
+        def on_error(subscription: PushSubscription, error: Exception) -> SendResult:
             return SendResult(
                 success=False,
                 subscription_id=subscription.id,
-                error="pywebpush not installed"
+                error=str(error) or type(error).__name__
             )
         
-        subscription_info = {
-            "endpoint": subscription.endpoint,
-            "keys": subscription.keys
-        }
+        results = await get_fanout_executor().map(
+            subscriptions,
+            send,
+            on_error=on_error,
+            limit=lambda subscription: (
+                f"webpush:{urlsplit(subscription.endpoint).netloc}",
+                self.PUSH_HOST_RATE_PER_MINUTE
+            ),
+            urgent=urgent,
+            timeout=self.SEND_TIMEOUT
+        )
         
-        payload_json = json.dumps({
+        # Atualizar last_used em lote
+        delivered = {r.subscription_id for r in results if r.success}
+        await self._touch([s for s in subscriptions if s.id in delivered])
+        
+        # Remover subscriptions inválidas em lote
+        await self.unregister_subscriptions([
+            r.subscription_id for r in results
+            if not r.success and r.status_code in [404, 410]
+        ])
+        
+        return results
+    
+    @staticmethod
+    def _payload_json(payload: PushPayload) -> str:
+        return json.dumps({
             "title": payload.title,
             "body": payload.body,
             "icon": payload.icon or "/icons/icon-192x192.png",
@@ -301,9 +442,39 @@ class PushNotificationService:
             "requireInteraction": payload.require_interaction,
             "silent": payload.silent
         })
+    
+    async def _send_to_subscription(
+        self,
+        subscription: PushSubscription,
+        payload: PushPayload,
+        payload_json: Optional[str] = None,
+        touch: bool = True
+    ) -> SendResult:
+        """
+        Envia para uma subscription específica.
+        
+        Args:
+            touch: Atualizar last_used agora (broadcasts atualizam em lote)
+        """
+        if not WEBPUSH_AVAILABLE:
+            return SendResult(
+                success=False,
+                subscription_id=subscription.id,
+                error="pywebpush not installed"
+            )
+        
+        subscription_info = {
+            "endpoint": subscription.endpoint,
+            "keys": subscription.keys
+        }
+        
+        if payload_json is None:
+            payload_json = self._payload_json(payload)
         
         try:
-            response = webpush(
+            # pywebpush é síncrono: rodar no pool de threads do fan-out
+            response = await get_fanout_executor().run_blocking(
+                webpush,
                 subscription_info=subscription_info,
                 data=payload_json,
                 vapid_private_key=self._private_key,
@@ -311,8 +482,8 @@ class PushNotificationService:
             )
             
             # Atualizar last_used
-            subscription.last_used_at = datetime.utcnow()
-            await self._save_subscription(subscription)
+            if touch:
+                await self._touch([subscription])
             
             logger.info(
                 "push_notification_sent",
@@ -327,18 +498,21 @@ class PushNotificationService:
             )
             
         except WebPushException as e:
+            # requests.Response com 4xx/5xx é falsy: comparar com None
+            response = getattr(e, "response", None)
+            status_code = response.status_code if response is not None else None
             logger.error(
                 "push_notification_failed",
                 subscription_id=subscription.id,
                 error=str(e),
-                status_code=e.response.status_code if hasattr(e, 'response') and e.response else None
+                status_code=status_code
             )
             
             return SendResult(
                 success=False,
                 subscription_id=subscription.id,
                 error=str(e),
-                status_code=e.response.status_code if hasattr(e, 'response') and e.response else None
+                status_code=status_code
             )
         except Exception as e:
             logger.error(
@@ -355,43 +529,100 @@ class PushNotificationService:
     
     # ===== HELPERS =====
     
+    @staticmethod
+    def _sub_key(subscription_id: str) -> str:
+        return f"push:sub:{subscription_id}"
+    
+    @staticmethod
+    def _owner_key(subscription_id: str) -> str:
+        return f"push:sub:{subscription_id}:owner"
+    
+    @staticmethod
+    def _user_index_key(user_id: str) -> str:
+        return f"push:user:{user_id}:subs"
+    
+    @staticmethod
+    def _endpoint_key(endpoint: str) -> str:
+        return f"push:endpoint:{hashlib.sha256(endpoint.encode()).hexdigest()}"
+    
+    def _records(self, subscription: PushSubscription) -> dict[str, str]:
+        """Registro da subscription e entrada do índice de endpoint."""
+        return {
+            self._sub_key(subscription.id): json.dumps(self._subscription_to_dict(subscription)),
+            self._endpoint_key(subscription.endpoint): subscription.id,
+        }
+    
     async def _save_subscription(self, subscription: PushSubscription):
-        """Salva subscription no cache."""
-        await self._cache.set_json(
-            f"push:sub:{subscription.id}",
-            {
-                "id": subscription.id,
-                "user_id": subscription.user_id,
-                "organization_id": subscription.organization_id,
-                "branch_id": subscription.branch_id,
-                "endpoint": subscription.endpoint,
-                "keys": subscription.keys,
-                "user_agent": subscription.user_agent,
-                "created_at": subscription.created_at.isoformat(),
-                "last_used_at": subscription.last_used_at.isoformat() if subscription.last_used_at else None
-            },
-            ttl=2592000  # 30 dias
+        """Salva subscription no cache (renova o TTL do índice de endpoint)."""
+        await self._cache.mset(self._records(subscription), ttl=self.SUBSCRIPTION_TTL)
+    
+    async def _touch(self, subscriptions: list[PushSubscription]) -> None:
+        """Marca uso: um pipeline de SETs e um ZADD para o lote."""
+        if not subscriptions:
+            return
+        now = datetime.utcnow()
+        records: dict[str, str] = {}
+        for subscription in subscriptions:
+            subscription.last_used_at = now
+            records.update(self._records(subscription))
+        await self._cache.mset(records, ttl=self.SUBSCRIPTION_TTL)
+        await self._cache.zadd(
+            self.ACTIVITY_KEY, {s.id: now.timestamp() for s in subscriptions}
         )
     
-    async def _add_to_user_index(self, user_id: str, subscription_id: str):
-        """Adiciona subscription ao índice do usuário."""
-        index = await self._cache.get_json(f"push:user:{user_id}")
+    @staticmethod
+    def _subscription_to_dict(subscription: PushSubscription) -> dict:
+        return {
+            "id": subscription.id,
+            "user_id": subscription.user_id,
+            "organization_id": subscription.organization_id,
+            "branch_id": subscription.branch_id,
+            "endpoint": subscription.endpoint,
+            "keys": subscription.keys,
+            "user_agent": subscription.user_agent,
+            "created_at": subscription.created_at.isoformat(),
+            "last_used_at": subscription.last_used_at.isoformat() if subscription.last_used_at else None
+        }
+    
+    @staticmethod
+    def _org_index_key(org_id: int, branch_id: int) -> str:
+        return f"push:org:{org_id}:{branch_id}"
+    
+    async def _load_subscriptions(
+        self,
+        subscription_ids: list[str],
+        index_key: Optional[str] = None
+    ) -> list[PushSubscription]:
+        """
+        Carrega várias subscriptions num único MGET.
         
-        if not index:
-            index = {"subscription_ids": []}
+        Args:
+            index_key: Set de onde vieram os IDs; IDs cujo registro expirou
+                são removidos dele
+        """
+        if not subscription_ids:
+            return []
+        values = await self._cache.mget([self._sub_key(i) for i in subscription_ids])
         
-        if subscription_id not in index["subscription_ids"]:
-            index["subscription_ids"].append(subscription_id)
+        expired = [i for i, value in zip(subscription_ids, values) if not value]
+        if expired and index_key:
+            await self._cache.srem(index_key, *expired)
         
-        await self._cache.set_json(f"push:user:{user_id}", index, ttl=2592000)
+        return [
+            self._subscription_from_dict(json.loads(value))
+            for value in values if value
+        ]
     
-    async def _remove_from_user_index(self, user_id: str, subscription_id: str):
-        """Remove subscription do índice do usuário."""
-        index = await self._cache.get_json(f"push:user:{user_id}")
-        
-        if index and subscription_id in index.get("subscription_ids", []):
-            index["subscription_ids"].remove(subscription_id)
-            await self._cache.set_json(f"push:user:{user_id}", index, ttl=2592000)
+    async def _migrate_user_index(self, user_id: str) -> set[str]:
+        """Converte o índice legado (JSON em push:user:{id}) para set."""
+        legacy_key = f"push:user:{user_id}"
+        index = await self._cache.get_json(legacy_key)
+        subscription_ids = set((index or {}).get("subscription_ids", []))
+        if subscription_ids:
+            await self._cache.sadd(self._user_index_key(user_id), *subscription_ids)
+        if index is not None:
+            await self._cache.delete(legacy_key)
+        return subscription_ids
 
 
 # Singleton
@@ -23,18 +23,38 @@ class SubscriptionManager:
     - Estatísticas
     """
     
-    SUBSCRIPTION_MAX_AGE_DAYS = 90
-    
     def __init__(self):
         self._cache = get_cache()
         self._push_service = get_push_service()
     
+    CLEANUP_BATCH = 500
+    
     async def cleanup_expired(self) -> int:
-        """Remove subscriptions antigas não utilizadas."""
-        # Em produção, iterar sobre todas subscriptions no banco
-        # Por simplificidade, retornando 0
-        logger.info("subscription_cleanup_completed", removed=0)
-        return 0
+        """
+        Remove subscriptions não utilizadas há SUBSCRIPTION_TTL.
+        
+        O corte é o próprio TTL do registro: toda subscription cujo
+        registro já expirou é removida também dos índices. Lê o sorted set
+        de atividade (score = último uso) em lotes e remove cada lote com
+        uma única chamada a unregister_subscriptions.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self._push_service.SUBSCRIPTION_TTL)
+        removed = 0
+        
+        while True:
+            stale_ids = await self._cache.zrangebyscore(
+                self._push_service.ACTIVITY_KEY,
+                0,
+                cutoff.timestamp(),
+                0,
+                self.CLEANUP_BATCH
+            )
+            if not stale_ids:
+                break
+            removed += await self._push_service.unregister_subscriptions(stale_ids)
+        
+        logger.info("subscription_cleanup_completed", removed=removed)
+        return removed
     
     async def deduplicate_user_subscriptions(self, user_id: str) -> int:
         """Remove subscriptions duplicadas de um usuário."""
@@ -43,18 +63,15 @@ class SubscriptionManager:
         # Agrupar por endpoint
         by_endpoint: dict[str, list[PushSubscription]] = {}
         for sub in subscriptions:
-            if sub.endpoint not in by_endpoint:
-                by_endpoint[sub.endpoint] = []
-            by_endpoint[sub.endpoint].append(sub)
+            by_endpoint.setdefault(sub.endpoint, []).append(sub)
         
-        removed = 0
-        for endpoint, subs in by_endpoint.items():
-            if len(subs) > 1:
-                # Manter a mais recente
-                subs.sort(key=lambda s: s.created_at, reverse=True)
-                for old_sub in subs[1:]:
-                    await self._push_service.unregister_subscription(old_sub.id)
-                    removed += 1
+        # Manter a mais recente de cada endpoint
+        duplicate_ids: list[str] = []
+        for subs in by_endpoint.values():
+            subs.sort(key=lambda s: s.created_at, reverse=True)
+            duplicate_ids.extend(s.id for s in subs[1:])
+        
+        removed = await self._push_service.unregister_subscriptions(duplicate_ids)
         
         if removed > 0:
             logger.info(
@@ -66,11 +83,27 @@ class SubscriptionManager:
         return removed
     
     async def get_stats(self, org_id: int, branch_id: int) -> dict:
-        """Retorna estatísticas de subscriptions."""
-        # Em produção, buscar do banco
+        """Retorna estatísticas de subscriptions da filial."""
+        subscriptions = await self._push_service.get_organization_subscriptions(
+            org_id, branch_id
+        )
+        now = datetime.utcnow()
+        
+        def active_since(days: int) -> int:
+            cutoff = now - timedelta(days=days)
+            return sum(
+                1 for s in subscriptions
+                if (s.last_used_at or s.created_at) >= cutoff
+            )
+        
+        by_user_agent: dict[str, int] = {}
+        for s in subscriptions:
+            agent = s.user_agent or "unknown"
+            by_user_agent[agent] = by_user_agent.get(agent, 0) + 1
+        
         return {
-            "total_subscriptions": 0,
-            "active_last_7_days": 0,
-            "active_last_30_days": 0,
-            "by_user_agent": {}
+            "total_subscriptions": len(subscriptions),
+            "active_last_7_days": active_since(7),
+            "active_last_30_days": active_since(30),
+            "by_user_agent": by_user_agent
         }
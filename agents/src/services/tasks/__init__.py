@@ -4,6 +4,7 @@ from .task_queue import TaskQueue, get_task_queue, TaskStatus, TaskPriority, Tas
 from .task_worker import TaskWorker
 from .task_definitions import (
     process_document_task,
+    import_documents_task,
     index_documents_task,
     deliver_webhook_task,
     generate_report_task,
@@ -22,6 +23,7 @@ __all__ = [
     "TaskWorker",
     "TaskScheduler",
     "process_document_task",
+    "import_documents_task",
     "index_documents_task",
     "deliver_webhook_task",
     "generate_report_task",
@@ -0,0 +1,157 @@
+"""
+Fila local com prioridade e justiça entre tenants.
+
+Substitui o asyncio.Queue FIFO do fallback local da TaskQueue, onde um
+webhook CRITICAL esperava atrás de um lote de indexação:
+
+- Prioridade estrita: sempre sai a task da maior prioridade pendente
+- Dentro da mesma prioridade, round-robin entre tenants (organizações):
+  um lote de mil tasks de uma org não trava as outras
+- Envelhecimento por item: a cada aging_seconds de espera a task ganha
+  AGING_STEP pontos de prioridade. Compara-se a próxima task de cada
+  prioridade, então um lote LOW envelhecido passa um a um, e só na
+  frente das tasks que ainda não o superam (LOW nunca fica parada para
+  sempre, CRITICAL recém-chegada não espera o lote inteiro)
+
+Mesma interface usada do asyncio.Queue (get, put_nowait, task_done,
+qsize), então o TaskWorker não muda.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Optional
+
+
+class FairPriorityQueue:
+    """
+    Fila por prioridade com round-robin de tenants.
+
+    Uso:
+        queue = FairPriorityQueue()
+        queue.put_nowait(item, priority=20, tenant="org-1")
+        item = await queue.get()
+    """
+
+    AGING_SECONDS = float(os.getenv("TASK_PRIORITY_AGING_SECONDS", "300"))
+    # Pontos ganhos a cada aging_seconds (TaskPriority: 0, 5, 10, 20):
+    # LOW passa NORMAL nova após 1x, HIGH após 2x e CRITICAL após 4x
+    AGING_STEP = 5
+
+    def __init__(self, aging_seconds: Optional[float] = None):
+        self.aging_seconds = aging_seconds or self.AGING_SECONDS
+        # prioridade -> tenant -> deque[(enqueued_at, item)]
+        self._lanes: dict[int, dict[str, deque]] = {}
+        # prioridade -> ordem de atendimento dos tenants
+        self._turns: dict[int, deque] = {}
+        self._size = 0
+        self._unfinished = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def put_nowait(self, item: Any, priority: int = 0, tenant: str = "default") -> None:
+        """Enfileira item na prioridade e tenant indicados."""
+        tenants = self._lanes.setdefault(int(priority), {})
+        if tenant not in tenants:
+            tenants[tenant] = deque()
+            self._turns.setdefault(int(priority), deque()).append(tenant)
+        tenants[tenant].append((time.monotonic(), item))
+
+        self._size += 1
+        self._unfinished += 1
+        self._wakeup_next()
+
+    async def put(self, item: Any, priority: int = 0, tenant: str = "default") -> None:
+        self.put_nowait(item, priority, tenant)
+
+    def get_nowait(self) -> Any:
+        """
+        Próximo item (sem esperar).
+
+        Raises:
+            asyncio.QueueEmpty: fila vazia
+        """
+        if not self._size:
+            raise asyncio.QueueEmpty()
+
+        priority = self._next_priority()
+        turns = self._turns[priority]
+        tenants = self._lanes[priority]
+
+        tenant = turns.popleft()
+        _, item = tenants[tenant].popleft()
+        if tenants[tenant]:
+            turns.append(tenant)
+        else:
+            del tenants[tenant]
+            if not tenants:
+                del self._lanes[priority]
+                del self._turns[priority]
+
+        self._size -= 1
+        return item
+
+    async def get(self) -> Any:
+        """Próximo item, esperando se a fila estiver vazia."""
+        while not self._size:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+                # Acordado e cancelado ao mesmo tempo: passar a vez
+                if self._size and not waiter.cancelled():
+                    self._wakeup_next()
+                raise
+        return self.get_nowait()
+
+    def task_done(self) -> None:
+        if self._unfinished <= 0:
+            raise ValueError("task_done() chamado mais vezes que get()")
+        self._unfinished -= 1
+
+    def stats(self) -> dict[int, dict[str, Any]]:
+        """Pendentes por prioridade: itens, tenants e maior espera (s)."""
+        now = time.monotonic()
+        return {
+            priority: {
+                "pending": sum(len(items) for items in tenants.values()),
+                "tenants": len(tenants),
+                "oldest_wait_s": round(now - self._oldest(priority), 3),
+            }
+            for priority, tenants in sorted(self._lanes.items(), reverse=True)
+        }
+
+    def _next_priority(self) -> int:
+        """Prioridade cuja próxima task tem a maior prioridade efetiva."""
+        now = time.monotonic()
+
+        def effective(priority: int) -> tuple[float, int]:
+            # Próxima task da prioridade: cabeça do tenant da vez
+            tenant = self._turns[priority][0]
+            waited = now - self._lanes[priority][tenant][0][0]
+            # Empate: vence a prioridade original maior
+            return priority + waited / self.aging_seconds * self.AGING_STEP, priority
+
+        return max(self._lanes, key=effective)
+
+    def _oldest(self, priority: int) -> float:
+        return min(items[0][0] for items in self._lanes[priority].values())
+
+    def _wakeup_next(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
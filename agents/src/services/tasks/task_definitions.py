@@ -5,11 +5,16 @@ Cada task é uma função async que será executada pelo worker.
 """
 
 import asyncio
+import os
+import time
 from typing import Any, Optional
 import structlog
 
 logger = structlog.get_logger()
 
+# Intervalo mínimo entre gravações de progresso (segundos)
+PROGRESS_INTERVAL = 1.0
+
 
 # ===== DOCUMENT PROCESSING =====
 
@@ -75,6 +80,116 @@ async def process_document_task(
         raise
 
 
+async def import_documents_task(
+    ctx: dict,
+    _task_id: str,
+    source_path: str,
+    document_type: str = "auto",
+    org_id: Optional[int] = None,
+    branch_id: Optional[int] = None
+) -> dict:
+    """
+    Importa em lote todos os PDFs/XMLs de um diretório ou .zip.
+    
+    O progresso (processados, importados, duplicados, falhas) é gravado
+    na task e consultado via TaskQueue.get_status. Para lotes grandes,
+    enfileirar com TaskConfig(timeout=...) compatível com o volume.
+    
+    A task é enfileirável pela API: source_path precisa ser um .zip do
+    spool de uploads ou estar em DOCUMENT_IMPORT_DIRS, e só o .zip do
+    spool (upload temporário) é apagado ao final. A organização que
+    enfileirou (registro da task) precisa existir e ser a de org_id.
+    
+    Args:
+        source_path: Diretório ou arquivo .zip
+        document_type: danfe, dacte ou auto
+        org_id: ID da organização
+        branch_id: ID da filial
+    
+    Returns:
+        Contadores do lote e resultado por documento
+    
+    Raises:
+        ImportSourceNotAllowedError: source_path não liberado ou task de
+            outra organização
+    """
+    logger.info(
+        "task_import_documents_start",
+        task_id=_task_id,
+        source_path=source_path,
+        document_type=document_type
+    )
+    
+    from src.services.document_processing import (
+        BulkDocumentImporter,
+        ImportSourceNotAllowedError,
+        get_upload_spool,
+        resolve_import_source,
+    )
+    from src.services.tasks.task_queue import get_task_queue
+    
+    queue = get_task_queue()
+    
+    # Antes de qualquer leitura: task de uma organização autenticada e
+    # caminho real numa origem liberada
+    task_data = await queue.get_task_data(_task_id) or {}
+    owner = task_data.get("org_id")
+    if owner is None or (org_id is not None and org_id != owner):
+        raise ImportSourceNotAllowedError(
+            f"Task {_task_id} sem organização de origem ou de outra organização"
+        )
+    org_id = owner
+    spool = get_upload_spool()
+    source_path = resolve_import_source(source_path, spool)
+    last_update = 0.0
+    
+    async def on_progress(progress: dict) -> None:
+        nonlocal last_update
+        now = time.monotonic()
+        if now - last_update < PROGRESS_INTERVAL and progress["processed"] < progress["total"]:
+            return
+        last_update = now
+        try:
+            await queue.update_progress(_task_id, progress)
+        except Exception as e:
+            # Progresso é informativo: não interromper o lote
+            logger.warning("task_import_documents_progress_failed", task_id=_task_id, error=str(e))
+    
+    try:
+        importer = BulkDocumentImporter()
+        result = await importer.import_path(source_path, document_type, on_progress)
+        
+        summary = result.to_dict()
+        logger.info(
+            "task_import_documents_completed",
+            task_id=_task_id,
+            total=summary["total"],
+            imported=summary["imported"],
+            duplicates=summary["duplicates"],
+            failed=summary["failed"]
+        )
+        
+        return {
+            "success": summary["failed"] < summary["total"] or summary["total"] == 0,
+            "org_id": org_id,
+            "branch_id": branch_id,
+            **summary
+        }
+        
+    except Exception as e:
+        logger.error(
+            "task_import_documents_failed",
+            task_id=_task_id,
+            error=str(e)
+        )
+        raise
+    
+    finally:
+        # Upload temporário; arquivos de DOCUMENT_IMPORT_DIRS nunca são apagados
+        if spool.contains(source_path) and os.path.isfile(source_path):
+            os.remove(source_path)
+
+
 # ===== RAG INDEXING =====
 
 async def index_documents_task(
@@ -369,8 +484,15 @@ async def send_notification_task(
 # Mapeamento de tasks para uso com ARQ
 TASK_FUNCTIONS = [
     process_document_task,
+    import_documents_task,
     index_documents_task,
     deliver_webhook_task,
     generate_report_task,
     send_notification_task
 ]
+
+# Tasks CPU-bound: no TaskWorker local rodam no pool de processos, fora
+# do event loop (TASK_CPU_BOUND_TASKS sobrescreve). Tasks que gravam
+# progresso só devem entrar aqui com Redis: o cache local do processo
+# filho não é visto pela API.
+CPU_BOUND_TASKS = {"generate_report_task"}
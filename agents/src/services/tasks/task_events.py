@@ -0,0 +1,130 @@
+"""
+Eventos de tasks via pub/sub.
+
+TaskQueue.wait_for consultava o status a cada 0.5s (um GET + decode de
+JSON por waiter por ciclo), e cada GET /tasks/{id}/wait aberto fazia o
+mesmo. Agora cada mudança de status ou progresso é publicada no canal
+tasks:events; um único listener por processo repassa os eventos para os
+waiters locais (registro task_id -> filas). Waiter parado não consulta
+o Redis, exceto uma rechecagem a cada TASK_WAIT_RECHECK_SECONDS: pub/sub
+é at-most-once, e a rechecagem cobre mensagem perdida em reconexão.
+
+Sem Redis, o pub/sub em memória do cache local atende o mesmo processo
+(API + TaskWorker local).
+"""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+class TaskEventBus:
+    """
+    Publicação e espera de eventos de tasks.
+
+    Uso:
+        bus = TaskEventBus(get_cache())
+        await bus.publish(task_id, {"type": "status", "status": "completed"})
+
+        async with bus.watch(task_id) as events:
+            event = await events.get()
+    """
+
+    CHANNEL = "tasks:events"
+    # Eventos acumulados por waiter; acima disso descarta os mais antigos
+    QUEUE_SIZE = 100
+    # Espera pela assinatura antes de seguir só com a rechecagem
+    READY_TIMEOUT = 2.0
+    RECONNECT_DELAY = 1.0
+    MAX_RECONNECT_DELAY = 30.0
+
+    def __init__(self, cache: Any):
+        self._cache = cache
+        self._watchers: dict[str, set[asyncio.Queue]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+
+    async def publish(self, task_id: str, event: dict[str, Any]) -> None:
+        """Publica evento da task (falha só é logada: o status já foi gravado)."""
+        try:
+            await self._cache.publish(
+                self.CHANNEL, json.dumps({"task_id": task_id, **event}, default=str)
+            )
+        except Exception as e:
+            logger.warning("task_event_publish_failed", task_id=task_id, error=str(e))
+
+    @asynccontextmanager
+    async def watch(self, task_id: str) -> AsyncIterator[asyncio.Queue]:
+        """
+        Fila com os eventos da task enquanto o contexto estiver aberto.
+
+        Ao entrar, a assinatura do canal já está ativa (ou desistiu após
+        READY_TIMEOUT): reler o status depois disso não perde eventos.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self._watchers.setdefault(task_id, set()).add(queue)
+        try:
+            await self._ensure_listener()
+            yield queue
+        finally:
+            watchers = self._watchers.get(task_id)
+            if watchers is not None:
+                watchers.discard(queue)
+                if not watchers:
+                    del self._watchers[task_id]
+
+    def watching(self) -> int:
+        """Waiters registrados neste processo."""
+        return sum(len(queues) for queues in self._watchers.values())
+
+    async def _ensure_listener(self) -> None:
+        loop = asyncio.get_running_loop()
+        if (
+            self._listener is None
+            or self._listener.done()
+            or self._listener.get_loop() is not loop
+        ):
+            self._ready = asyncio.Event()
+            self._listener = loop.create_task(self._listen())
+
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=self.READY_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("task_events_not_ready")
+
+    async def _listen(self) -> None:
+        """Listener do processo: assina o canal e reconecta com backoff."""
+        delay = self.RECONNECT_DELAY
+        while True:
+            try:
+                async with self._cache.subscribe(self.CHANNEL) as messages:
+                    self._ready.set()
+                    delay = self.RECONNECT_DELAY
+                    logger.info("task_events_subscribed")
+                    async for message in messages:
+                        self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("task_events_listener_error", error=str(e))
+
+            self._ready.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.MAX_RECONNECT_DELAY)
+
+    def _dispatch(self, message: str) -> None:
+        try:
+            event = json.loads(message)
+        except (TypeError, ValueError):
+            return
+
+        for queue in self._watchers.get(event.get("task_id"), ()):
+            if queue.full():
+                # Progresso é informativo: manter os mais recentes
+                queue.get_nowait()
+            queue.put_nowait(event)
@@ -4,13 +4,25 @@ Task Queue usando ARQ (Async Redis Queue).
 Features:
 - Tarefas assíncronas com Redis
 - Retry automático com backoff
-- Prioridades de execução
-- Monitoramento de status
+- Prioridades de execução: uma fila ARQ por prioridade
+  ("{queue}:{prioridade}"), com workers dedicados por fila; no fallback
+  local, fila por prioridade com round-robin entre tenants
+- Tempo de espera na fila por prioridade
+- Monitoramento de status: mudanças publicadas via pub/sub, sem polling
+  em wait_for (ver task_events)
+
+Registro da task: task:{id} (JSON gravado uma vez no enqueue: nome,
+argumentos, config, organização que enfileirou) + task:{id}:state
+(hash só com os campos que mudam: status, tentativas, progresso,
+resultado). Cada transição grava apenas os campos alterados.
 """
 
 import asyncio
+import json
+import os
+import time
 import uuid
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
@@ -26,6 +38,8 @@ except ImportError:
     ArqRedis = None
 
 from src.services.cache import get_cache
+from .priority_queue import FairPriorityQueue
+from .task_events import TaskEventBus
 
 logger = structlog.get_logger()
 
@@ -59,12 +73,29 @@ class TaskResult:
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     attempts: int = 0
+    progress: Optional[dict] = None
     
     @property
     def duration_ms(self) -> Optional[float]:
         if self.started_at and self.completed_at:
             return (self.completed_at - self.started_at).total_seconds() * 1000
         return None
+    
+    def to_dict(self) -> dict:
+        """Status serializável (resposta da API / evento SSE)."""
+        return {
+            "task_id": self.task_id,
+            "status": self.status.value,
+            "result": self.result,
+            "error": self.error,
+            "attempts": self.attempts,
+            "duration_ms": self.duration_ms,
+            "progress": self.progress
+        }
+
+
+# Estados em que a task não muda mais
+FINAL_STATUSES = {TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED}
 
 
 @dataclass
@@ -75,12 +106,45 @@ class TaskConfig:
     timeout: int = 300  # 5 minutos
     priority: TaskPriority = TaskPriority.NORMAL
     queue: str = "default"
+    tenant: Optional[str] = None  # justiça entre orgs (default: org_id dos argumentos)
+    org_id: Optional[int] = None  # organização autenticada que enfileirou
+
+
+@dataclass
+class QueuedTask:
+    """Task na fila local."""
+    task_id: str
+    task_name: str
+    kwargs: dict
+    config: TaskConfig
+    enqueued_at: float = field(default_factory=time.time)
+
+
+# Limites (ms) dos buckets de tempo de espera na fila
+WAIT_BUCKETS_MS = (100, 1000, 10000, 60000)
+WAIT_STATS_KEY = "tasks:queue_wait"
+# Lease das tasks em execução/retry: task_id -> prazo (epoch s)
+LEASES_KEY = "tasks:leases"
+TASK_TTL = 86400  # 24 horas
+
+
+def state_key(task_id: str) -> str:
+    """Hash com os campos mutáveis da task."""
+    return f"task:{task_id}:state"
+
+
+def lane_name(queue: str, priority: int) -> str:
+    """Fila ARQ de uma prioridade (ex: default:critical)."""
+    return f"{queue}:{TaskPriority(priority).name.lower()}"
 
 
 class TaskQueue:
     """
     Gerenciador de task queue.
     
+    Toda mudança de status passa por update_state, que publica o evento
+    para os waiters (wait_for, watch_events) de qualquer processo.
+    
     Uso:
         queue = get_task_queue()
         
@@ -99,6 +163,9 @@ class TaskQueue:
         result = await queue.wait_for(task_id, timeout=60)
     """
     
+    # Rechecagem do status por waiter parado (pub/sub é at-most-once)
+    WAIT_RECHECK_SECONDS = float(os.getenv("TASK_WAIT_RECHECK_SECONDS", "15"))
+    
     def __init__(
         self,
         redis_host: str = "localhost",
@@ -115,9 +182,8 @@ class TaskQueue:
         
         self._pool: Optional[Any] = None
         self._cache = get_cache()
-        # Lazy initialization para evitar RuntimeError em Python 3.11+
-        # asyncio.Queue() requer event loop ativo
-        self._local_queue: Optional[asyncio.Queue] = None
+        self._local_queue: Optional[FairPriorityQueue] = None
+        self._events = TaskEventBus(self._cache)
         self._use_local = not ARQ_AVAILABLE
         
         logger.info(
@@ -126,12 +192,18 @@ class TaskQueue:
             redis_host=redis_host
         )
     
-    def _get_local_queue(self) -> asyncio.Queue:
-        """Lazy initialization de asyncio.Queue (requer event loop ativo)."""
+    def _get_local_queue(self) -> FairPriorityQueue:
+        """Fila local (fallback sem ARQ), criada no primeiro uso."""
         if self._local_queue is None:
-            self._local_queue = asyncio.Queue()
+            self._local_queue = FairPriorityQueue()
         return self._local_queue
     
+    @staticmethod
+    def _tenant(config: TaskConfig, kwargs: dict) -> str:
+        """Tenant para a justiça da fila: config.tenant ou org dos argumentos."""
+        tenant = config.tenant or kwargs.get("org_id") or kwargs.get("organization_id")
+        return str(tenant) if tenant is not None else "default"
+    
     async def _get_pool(self) -> Any:
         """Obtém pool de conexão ARQ."""
         if self._use_local:
@@ -148,6 +220,14 @@ class TaskQueue:
         
         return self._pool
     
+    async def is_local(self) -> bool:
+        """
+        Fila em memória deste processo (sem ARQ ou Redis indisponível).
+        
+        Nesse caso as tasks só rodam num TaskWorker do mesmo processo.
+        """
+        return await self._get_pool() is None
+    
     # ===== ENFILEIRAMENTO =====
     
     async def enqueue(
@@ -169,6 +249,8 @@ class TaskQueue:
         """
         config = config or TaskConfig()
         task_id = str(uuid.uuid4())
+        lane = lane_name(config.queue, config.priority)
+        tenant = self._tenant(config, kwargs)
         
         # Registrar task no cache
         task_data = {
@@ -181,8 +263,11 @@ class TaskQueue:
                 "retry_delay": config.retry_delay,
                 "timeout": config.timeout,
                 "priority": config.priority.value,
-                "queue": config.queue
+                "queue": config.queue,
+                "lane": lane,
+                "tenant": tenant
             },
+            "org_id": config.org_id,
             "created_at": datetime.utcnow().isoformat(),
             "attempts": 0
         }
@@ -190,7 +275,7 @@ class TaskQueue:
         await self._cache.set_json(
             f"task:{task_id}",
             task_data,
-            ttl=86400  # 24 horas
+            ttl=TASK_TTL
         )
         
         pool = await self._get_pool()
@@ -198,37 +283,45 @@ class TaskQueue:
         if pool and not self._use_local:
             # Usar ARQ
             try:
+                # Antes do job: o worker pode marcar running logo em seguida
+                await self.update_state(task_id, status=TaskStatus.QUEUED.value)
                 await pool.enqueue_job(
                     task_name,
                     _task_id=task_id,
-                    _queue_name=config.queue,
+                    _job_id=task_id,
+                    _queue_name=lane,
                     _defer_by=timedelta(seconds=0),
                     **kwargs
                 )
                 
-                # Atualizar status
-                task_data["status"] = TaskStatus.QUEUED.value
-                await self._cache.set_json(f"task:{task_id}", task_data, ttl=86400)
-                
                 logger.info(
                     "task_enqueued",
                     task_id=task_id,
                     task_name=task_name,
-                    queue=config.queue,
+                    queue=lane,
                     priority=config.priority.name
                 )
                 
             except Exception as e:
                 logger.error("task_enqueue_failed", error=str(e))
-                task_data["status"] = TaskStatus.FAILED.value
-                task_data["error"] = str(e)
-                await self._cache.set_json(f"task:{task_id}", task_data, ttl=86400)
+                await self.update_state(
+                    task_id, status=TaskStatus.FAILED.value, error=str(e)
+                )
         else:
             # Fallback local (para desenvolvimento)
-            await self._get_local_queue().put((task_id, task_name, kwargs, config))
-            task_data["status"] = TaskStatus.QUEUED.value
-            await self._cache.set_json(f"task:{task_id}", task_data, ttl=86400)
-            logger.info("task_enqueued_local", task_id=task_id, task_name=task_name)
+            self._get_local_queue().put_nowait(
+                QueuedTask(task_id, task_name, kwargs, config),
+                config.priority,
+                tenant
+            )
+            await self.update_state(task_id, status=TaskStatus.QUEUED.value)
+            logger.info(
+                "task_enqueued_local",
+                task_id=task_id,
+                task_name=task_name,
+                priority=config.priority.name,
+                tenant=tenant
+            )
         
         return task_id
     
@@ -249,7 +342,8 @@ class TaskQueue:
             await pool.enqueue_job(
                 task_name,
                 _task_id=task_id,
-                _queue_name=config.queue,
+                _job_id=task_id,
+                _queue_name=lane_name(config.queue, config.priority),
                 _defer_by=timedelta(seconds=delay_seconds),
                 **kwargs
             )
@@ -276,13 +370,17 @@ class TaskQueue:
     ):
         """Helper para enfileiramento atrasado local."""
         await asyncio.sleep(delay)
-        await self._get_local_queue().put((task_id, task_name, kwargs, config))
+        self._get_local_queue().put_nowait(
+            QueuedTask(task_id, task_name, kwargs, config),
+            config.priority,
+            self._tenant(config, kwargs)
+        )
     
     # ===== STATUS =====
     
     async def get_status(self, task_id: str) -> Optional[TaskResult]:
         """Obtém status de uma task."""
-        task_data = await self._cache.get_json(f"task:{task_id}")
+        task_data = await self.get_task_data(task_id)
         
         if not task_data:
             return None
@@ -294,53 +392,193 @@ class TaskQueue:
             error=task_data.get("error"),
             started_at=datetime.fromisoformat(task_data["started_at"]) if task_data.get("started_at") else None,
             completed_at=datetime.fromisoformat(task_data["completed_at"]) if task_data.get("completed_at") else None,
-            attempts=task_data.get("attempts", 0)
+            attempts=task_data.get("attempts", 0),
+            progress=task_data.get("progress")
+        )
+    
+    async def get_task_data(self, task_id: str) -> Optional[dict]:
+        """Registro da task com os campos mutáveis (hash) aplicados."""
+        task_data = await self._cache.get_json(f"task:{task_id}")
+        if not task_data:
+            return None
+        
+        state = await self._cache.hgetall(state_key(task_id)) or {}
+        for name, value in state.items():
+            task_data[name] = json.loads(value)
+        return task_data
+    
+    async def update_state(self, task_id: str, **fields: Any) -> None:
+        """
+        Grava só os campos alterados da task e publica a mudança.
+        
+        Usado pela fila e pelo worker a cada transição (queued, running,
+        retrying, completed, failed, cancelled), sem reescrever o JSON
+        do registro (argumentos podem ter MBs).
+        
+        Args:
+            task_id: ID da task
+            **fields: Campos (status, attempts, error, result, ...)
+        """
+        await self._cache.hset(
+            state_key(task_id),
+            {name: json.dumps(value, default=str) for name, value in fields.items()},
+            ttl=TASK_TTL
+        )
+        if "status" in fields:
+            await self._events.publish(task_id, {"type": "status", "status": fields["status"]})
+    
+    async def update_progress(self, task_id: str, progress: dict) -> None:
+        """
+        Registra o progresso de uma task em execução.
+        
+        Tasks longas (ex: importação em lote) chamam periodicamente;
+        o valor aparece em get_status(task_id).progress e é publicado
+        para quem acompanha via watch_events.
+        """
+        await self._cache.hset(
+            state_key(task_id),
+            {"progress": json.dumps(progress, default=str)},
+            ttl=TASK_TTL
+        )
+        # Progresso só é gravado pela task em execução
+        await self._events.publish(
+            task_id,
+            {"type": "progress", "status": TaskStatus.RUNNING.value, "progress": progress}
+        )
+    
+    def requeue_local(self, task_data: dict) -> None:
+        """Devolve à fila local uma task a partir do registro (retry, lease vencido)."""
+        config = task_data["config"]
+        self._get_local_queue().put_nowait(
+            QueuedTask(
+                task_data["id"],
+                task_data["name"],
+                task_data["args"],
+                TaskConfig(
+                    max_retries=config["max_retries"],
+                    retry_delay=config["retry_delay"],
+                    timeout=config["timeout"],
+                    priority=TaskPriority(config["priority"]),
+                    queue=config["queue"],
+                    tenant=config.get("tenant"),
+                    org_id=task_data.get("org_id")
+                )
+            ),
+            config["priority"],
+            config.get("tenant", "default")
         )
     
     async def wait_for(
         self,
         task_id: str,
-        timeout: int = 60,
-        poll_interval: float = 0.5
+        timeout: int = 60
     ) -> Optional[TaskResult]:
         """
         Aguarda conclusão de uma task.
         
+        Acorda pelo evento publicado na conclusão (sem polling); o
+        status só é relido no evento final ou na rechecagem periódica.
+        
         Returns:
             TaskResult se task existe (completa, falha ou timeout)
             None se task não existe
         """
         # Verificar se task existe antes de esperar
-        initial_status = await self.get_status(task_id)
-        if initial_status is None:
+        result = await self.get_status(task_id)
+        if result is None:
             return None  # Task não existe - API retornará 404
+        if result.status in FINAL_STATUSES:
+            return result
         
-        start = datetime.utcnow()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
         
-        while (datetime.utcnow() - start).total_seconds() < timeout:
+        async with self._events.watch(task_id) as events:
+            # Reler já assinado: conclusão entre a leitura e a assinatura
             result = await self.get_status(task_id)
             
-            if result and result.status in [
-                TaskStatus.COMPLETED,
-                TaskStatus.FAILED,
-                TaskStatus.CANCELLED
-            ]:
-                return result
-            
-            await asyncio.sleep(poll_interval)
+            while result is not None and result.status not in FINAL_STATUSES:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    # Timeout - task existe mas não completou a tempo
+                    return TaskResult(
+                        task_id=task_id,
+                        status=TaskStatus.FAILED,
+                        error="Task execution timed out"
+                    )
+                
+                try:
+                    event = await asyncio.wait_for(
+                        events.get(), min(remaining, self.WAIT_RECHECK_SECONDS)
+                    )
+                    if not _is_final(event):
+                        continue
+                except asyncio.TimeoutError:
+                    pass  # Rechecagem
+                
+                result = await self.get_status(task_id)
         
-        # Timeout - task existe mas não completou a tempo
-        return TaskResult(
-            task_id=task_id,
-            status=TaskStatus.FAILED,
-            error="Task execution timed out"
-        )
+        return result
+    
+    async def watch_events(
+        self,
+        task_id: str,
+        timeout: int = 600
+    ) -> AsyncIterator[dict]:
+        """
+        Eventos da task até o estado final (usado pelo SSE).
+        
+        Yields:
+            {"type": "status", ...TaskResult.to_dict()} no início e no fim;
+            {"type": "progress", "status", "progress"} a cada progresso;
+            {"type": "keepalive"} a cada WAIT_RECHECK_SECONDS sem eventos;
+            {"type": "timeout"} se timeout passar antes do fim.
+            Nada se a task não existe.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        
+        async with self._events.watch(task_id) as events:
+            result = await self.get_status(task_id)
+            if result is None:
+                return
+            yield {"type": "status", **result.to_dict()}
+            
+            while result.status not in FINAL_STATUSES:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    yield {"type": "timeout", "task_id": task_id}
+                    return
+                
+                try:
+                    event = await asyncio.wait_for(
+                        events.get(), min(remaining, self.WAIT_RECHECK_SECONDS)
+                    )
+                except asyncio.TimeoutError:
+                    event = None
+                
+                if event is not None and event["type"] == "progress":
+                    yield event
+                    continue
+                if event is not None and not _is_final(event):
+                    yield event
+                    continue
+                
+                # Evento final ou rechecagem: reler o registro
+                latest = await self.get_status(task_id)
+                if latest is None:
+                    return
+                if latest.status in FINAL_STATUSES or event is not None:
+                    result = latest
+                    yield {"type": "status", **result.to_dict()}
+                else:
+                    yield {"type": "keepalive"}
     
     # ===== CANCELAMENTO =====
     
     async def cancel(self, task_id: str) -> bool:
         """Cancela uma task pendente."""
-        task_data = await self._cache.get_json(f"task:{task_id}")
+        task_data = await self.get_task_data(task_id)
         
         if not task_data:
             return False
@@ -348,33 +586,89 @@ class TaskQueue:
         if task_data["status"] in [TaskStatus.RUNNING.value, TaskStatus.COMPLETED.value]:
             return False
         
-        task_data["status"] = TaskStatus.CANCELLED.value
-        task_data["completed_at"] = datetime.utcnow().isoformat()
-        await self._cache.set_json(f"task:{task_id}", task_data, ttl=86400)
+        await self.update_state(
+            task_id,
+            status=TaskStatus.CANCELLED.value,
+            completed_at=datetime.utcnow().isoformat()
+        )
+        await self._cache.zrem(LEASES_KEY, task_id)
         
         logger.info("task_cancelled", task_id=task_id)
         return True
     
     # ===== MÉTRICAS =====
     
+    async def record_queue_wait(self, priority: int, wait_ms: float) -> None:
+        """
+        Registra quanto uma task esperou na fila antes de começar.
+        
+        Chamado pelos workers (local e ARQ); agregado por prioridade em
+        get_queue_stats()["queue_wait"].
+        """
+        name = TaskPriority(priority).name.lower()
+        bucket = next((f"le_{b}" for b in WAIT_BUCKETS_MS if wait_ms <= b), "inf")
+        try:
+            await self._cache.write_batch(counters={
+                WAIT_STATS_KEY: {
+                    f"{name}:count": 1,
+                    f"{name}:total_ms": float(wait_ms),
+                    f"{name}:{bucket}": 1
+                }
+            })
+        except Exception as e:
+            # Métrica é informativa: não falhar a task
+            logger.warning("task_queue_wait_record_failed", error=str(e))
+    
+    async def get_queue_wait_stats(self) -> dict:
+        """Tempo de espera na fila por prioridade (contagem, média, buckets)."""
+        fields = await self._cache.hgetall(WAIT_STATS_KEY) or {}
+        stats = {}
+        for priority in sorted(TaskPriority, reverse=True):
+            name = priority.name.lower()
+            count = int(fields.get(f"{name}:count", 0))
+            if not count:
+                continue
+            stats[name] = {
+                "count": count,
+                "avg_ms": round(float(fields.get(f"{name}:total_ms", 0)) / count, 2),
+                "buckets": {
+                    bucket: int(fields.get(f"{name}:{bucket}", 0))
+                    for bucket in [f"le_{b}" for b in WAIT_BUCKETS_MS] + ["inf"]
+                }
+            }
+        return stats
+    
     async def get_queue_stats(self) -> dict:
-        """Retorna estatísticas das filas."""
+        """Retorna estatísticas das filas (pendentes e espera por prioridade)."""
         pool = await self._get_pool()
+        queue_wait = await self.get_queue_wait_stats()
         
         if pool and not self._use_local:
             # ARQ stats
             try:
                 info = await pool.info()
+                lanes = {}
+                for priority in sorted(TaskPriority, reverse=True):
+                    lane = lane_name("default", priority)
+                    lanes[lane] = {"pending": await pool.zcard(lane)}
                 return {
                     "backend": "arq",
-                    "queues": info
+                    "queues": info,
+                    "lanes": lanes,
+                    "queue_wait": queue_wait
                 }
             except Exception:
                 pass
         
+        local_queue = self._local_queue
         return {
             "backend": "local",
-            "pending": self._get_local_queue().qsize() if self._local_queue else 0
+            "pending": local_queue.qsize() if local_queue else 0,
+            "lanes": {
+                TaskPriority(priority).name.lower(): lane
+                for priority, lane in (local_queue.stats() if local_queue else {}).items()
+            },
+            "queue_wait": queue_wait
         }
     
     async def health_check(self) -> dict:
@@ -402,6 +696,10 @@ class TaskQueue:
             }
 
 
+def _is_final(event: dict) -> bool:
+    return event.get("status") in {status.value for status in FINAL_STATUSES}
+
+
 # Singleton
 _task_queue: Optional[TaskQueue] = None
 
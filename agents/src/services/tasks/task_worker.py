@@ -1,140 +1,570 @@
 """
 Worker para processar tasks da fila.
+
+Com ARQ, cada prioridade tem sua fila (default:critical, default:high,
+...) e seu worker: max_jobs e intervalo de polling proporcionais ao peso
+da fila, então um lote LOW nunca ocupa as vagas de uma task CRITICAL.
+Os hooks de cada fila gravam running/completed/failed no registro da
+task via TaskQueue.update_state, que acorda wait_for e o SSE.
+`python -m src.services.tasks.task_worker` roda todas as filas num
+processo; as classes *WorkerSettings permitem escalar uma fila sozinha
+(ex: `arq src.services.tasks.task_worker.CriticalWorkerSettings`).
+
+Sem ARQ (on-prem, com ou sem Redis) a fila é a FairPriorityQueue em
+memória do processo da API, então o TaskWorker local roda dentro dela:
+o lifespan da API o inicia quando TaskQueue.is_local() e o drena no
+shutdown. Ele:
+
+- Executa até TASK_WORKER_CONCURRENCY tasks ao mesmo tempo
+- Roda as tasks de CPU_BOUND_TASKS num pool de processos
+- Refaz tasks que falharam até TaskConfig.max_retries, com backoff
+  exponencial a partir de TaskConfig.retry_delay
+- Mantém um lease por task em execução (tasks:leases), renovado pelo
+  heartbeat; lease vencido (worker morto) devolve a task à fila
+- No shutdown para de pegar tasks e espera as em execução por até
+  TASK_DRAIN_TIMEOUT; as que não terminam voltam para a fila
+
+Configuração:
+    TASK_WORKER_MAX_JOBS      jobs simultâneos somando as filas ARQ (default: 10)
+    TASK_WORKER_CONCURRENCY   tasks simultâneas do worker local (default: 4)
+    TASK_WORKER_PROCESSES     processos para tasks CPU-bound (default: 2)
+    TASK_CPU_BOUND_TASKS      nomes separados por vírgula (default: CPU_BOUND_TASKS)
+    TASK_LEASE_SECONDS        validade do lease sem heartbeat (default: 60)
+    TASK_DRAIN_TIMEOUT        espera pelas tasks no shutdown (default: 30)
 """
 
 import asyncio
+import functools
 import os
-from typing import Optional, Any
-from datetime import datetime
+import socket
+import time
+from typing import Any, Awaitable, Callable, Optional
+from datetime import datetime, timedelta
 import structlog
 
 try:
     from arq.connections import RedisSettings
+    from arq.worker import create_worker, func as arq_func
     ARQ_AVAILABLE = True
 except ImportError:
     ARQ_AVAILABLE = False
     RedisSettings = None
 
-from .task_definitions import TASK_FUNCTIONS
-from src.services.cache import get_cache
+from src.workers.task_runner import run_task, init_worker
+from .task_definitions import TASK_FUNCTIONS, CPU_BOUND_TASKS
+from .task_queue import (
+    FINAL_STATUSES,
+    LEASES_KEY,
+    QueuedTask,
+    TaskConfig,
+    TaskPriority,
+    TaskQueue,
+    TaskStatus,
+    lane_name,
+)
 
 logger = structlog.get_logger()
 
 
+def _cpu_bound_tasks() -> set[str]:
+    names = os.getenv("TASK_CPU_BOUND_TASKS")
+    if names is None:
+        return set(CPU_BOUND_TASKS)
+    return {name.strip() for name in names.split(",") if name.strip()}
+
+
 class TaskWorker:
     """
     Worker que processa tasks.
     
     Uso:
-        # Iniciar worker (produção)
-        arq src.services.tasks.task_worker.WorkerSettings
+        # Com ARQ (produção)
+        python -m src.services.tasks.task_worker
         
-        # Ou via código (desenvolvimento)
+        # Sem ARQ: no mesmo processo que enfileira (lifespan da API)
         worker = TaskWorker()
-        await worker.run()
+        runner = asyncio.create_task(worker.run())
+        ...
+        await worker.shutdown()
     """
     
-    def __init__(self):
+    CONCURRENCY = int(os.getenv("TASK_WORKER_CONCURRENCY", "4"))
+    PROCESSES = int(os.getenv("TASK_WORKER_PROCESSES", "2"))
+    LEASE_SECONDS = float(os.getenv("TASK_LEASE_SECONDS", "60"))
+    DRAIN_TIMEOUT = float(os.getenv("TASK_DRAIN_TIMEOUT", "30"))
+    MAX_RETRY_DELAY = 3600  # 1 hora
+    
+    def __init__(
+        self,
+        queue: Optional[TaskQueue] = None,
+        concurrency: Optional[int] = None,
+        processes: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+        cpu_bound: Optional[set[str]] = None
+    ):
+        """
+        Inicializa o worker.
+        
+        Args:
+            queue: TaskQueue (default: get_task_queue())
+            concurrency: Tasks simultâneas (default: TASK_WORKER_CONCURRENCY)
+            processes: Processos para tasks CPU-bound (default: TASK_WORKER_PROCESSES)
+            lease_seconds: Validade do lease (default: TASK_LEASE_SECONDS)
+            cpu_bound: Tasks enviadas ao pool de processos
+        """
         self._running = False
-        self._cache = get_cache()
+        self._queue = queue
+        self.concurrency = max(1, concurrency or self.CONCURRENCY)
+        self.processes = max(1, processes or self.PROCESSES)
+        self.lease_seconds = lease_seconds or self.LEASE_SECONDS
+        self.cpu_bound = _cpu_bound_tasks() if cpu_bound is None else set(cpu_bound)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        
+        # Mapeamento de nomes para funções
+        self._task_map = {func.__name__: func for func in TASK_FUNCTIONS}
+        self._slots: list[asyncio.Task] = []
+        # Vagas esperando task (canceladas direto no stop)
+        self._idle: set[asyncio.Task] = set()
+        # Tasks em execução neste worker (lease renovado pelo heartbeat)
+        self._active: set[str] = set()
+        # Retentativas agendadas: task_id -> timer
+        self._retries: dict[str, asyncio.TimerHandle] = {}
+        self._pool: Optional[Any] = None
+    
+    def _get_queue(self) -> TaskQueue:
+        if self._queue is None:
+            from .task_queue import get_task_queue
+            self._queue = get_task_queue()
+        return self._queue
+    
+    def _get_pool(self) -> Any:
+        """Pool de processos para tasks CPU-bound (criado no primeiro uso)."""
+        if self._pool is None:
+            from src.services.document_processing.conversion_pool import ConversionPool
+            self._pool = ConversionPool(initializer=init_worker, workers=self.processes)
+        return self._pool
     
     async def run(self):
-        """Executa worker local (desenvolvimento)."""
-        from .task_queue import get_task_queue
-        
-        queue = get_task_queue()
+        """Executa o worker local até stop()/shutdown()."""
+        queue = self._get_queue()
         self._running = True
         
-        logger.info("task_worker_started")
-        
-        # Mapeamento de nomes para funções
-        task_map = {func.__name__: func for func in TASK_FUNCTIONS}
+        logger.info(
+            "task_worker_started",
+            worker=self.worker_id,
+            concurrency=self.concurrency,
+            cpu_bound=sorted(self.cpu_bound)
+        )
         
+        self._slots = [
+            asyncio.create_task(self._slot(queue)) for _ in range(self.concurrency)
+        ]
+        heartbeat = asyncio.create_task(self._heartbeat(queue))
+        try:
+            await asyncio.gather(*self._slots, return_exceptions=True)
+        finally:
+            heartbeat.cancel()
+            for slot in self._slots:
+                slot.cancel()
+            await asyncio.gather(heartbeat, *self._slots, return_exceptions=True)
+    
+    async def _slot(self, queue: TaskQueue) -> None:
+        """Uma vaga de execução: pega a próxima task enquanto o worker roda."""
+        local = queue._get_local_queue()
+        slot = asyncio.current_task()
         while self._running:
+            # Maior prioridade, tenants em rodízio. Cancelar a espera não
+            # perde task: o item só sai da fila depois que get() retorna
+            self._idle.add(slot)
+            try:
+                queued = await local.get()
+            finally:
+                self._idle.discard(slot)
+            
             try:
-                # Pegar task da fila local (usa lazy init)
-                task_id, task_name, kwargs, config = await asyncio.wait_for(
-                    queue._get_local_queue().get(),
-                    timeout=1.0
+                await self._execute(queue, queued)
+            except Exception as e:
+                logger.error("task_worker_error", task_id=queued.task_id, error=str(e))
+            finally:
+                local.task_done()
+    
+    async def _execute(self, queue: TaskQueue, queued: QueuedTask) -> None:
+        task_id, task_name = queued.task_id, queued.task_name
+        config = queued.config
+        
+        task_data = await queue.get_task_data(task_id)
+        if not task_data or task_data["status"] == TaskStatus.CANCELLED.value:
+            return
+        
+        attempts = task_data.get("attempts", 0) + 1
+        state = {
+            "status": TaskStatus.RUNNING.value,
+            "started_at": datetime.utcnow().isoformat(),
+            "attempts": attempts,
+            "worker": self.worker_id
+        }
+        if attempts == 1:
+            wait_ms = (time.time() - queued.enqueued_at) * 1000
+            await queue.record_queue_wait(config.priority, wait_ms)
+            state["queue_wait_ms"] = round(wait_ms, 2)
+        
+        self._active.add(task_id)
+        try:
+            await queue._cache.zadd(LEASES_KEY, {task_id: time.time() + self.lease_seconds})
+            await queue.update_state(task_id, **state)
+            
+            func = self._task_map.get(task_name)
+            if func is None:
+                logger.error("task_not_found", task_name=task_name)
+                await self._finish_failed(queue, task_id, f"Task não registrada: {task_name}")
+                return
+            
+            # Mesmo ctx que o ARQ passa às tasks
+            ctx = {"job_id": task_id, "job_try": attempts}
+            if task_name in self.cpu_bound:
+                result = await self._get_pool().run(
+                    run_task, task_name, task_id, queued.kwargs, ctx,
+                    timeout=config.timeout
                 )
-                
-                # Atualizar status
-                task_data = await self._cache.get_json(f"task:{task_id}")
-                if task_data:
-                    task_data["status"] = "running"
-                    task_data["started_at"] = datetime.utcnow().isoformat()
-                    await self._cache.set_json(f"task:{task_id}", task_data, ttl=86400)
-                
-                # Executar task
-                func = task_map.get(task_name)
-                if func:
-                    try:
-                        result = await asyncio.wait_for(
-                            func({}, _task_id=task_id, **kwargs),
-                            timeout=config.timeout
-                        )
-                        
-                        # Atualizar sucesso
-                        if task_data:
-                            task_data["status"] = "completed"
-                            task_data["result"] = result
-                            task_data["completed_at"] = datetime.utcnow().isoformat()
-                            await self._cache.set_json(f"task:{task_id}", task_data, ttl=86400)
-                        
-                        logger.info("task_completed", task_id=task_id, task_name=task_name)
-                        
-                    except asyncio.TimeoutError:
-                        if task_data:
-                            task_data["status"] = "failed"
-                            task_data["error"] = "Task timeout"
-                            task_data["completed_at"] = datetime.utcnow().isoformat()
-                            await self._cache.set_json(f"task:{task_id}", task_data, ttl=86400)
-                        logger.error("task_timeout", task_id=task_id)
-                        
-                    except Exception as e:
-                        if task_data:
-                            task_data["status"] = "failed"
-                            task_data["error"] = str(e)
-                            task_data["completed_at"] = datetime.utcnow().isoformat()
-                            await self._cache.set_json(f"task:{task_id}", task_data, ttl=86400)
-                        logger.error("task_failed", task_id=task_id, error=str(e))
-                else:
-                    logger.error("task_not_found", task_name=task_name)
-                
-                queue._get_local_queue().task_done()
-                
-            except asyncio.TimeoutError:
-                continue
+            else:
+                result = await asyncio.wait_for(
+                    func(ctx, _task_id=task_id, **queued.kwargs),
+                    timeout=config.timeout
+                )
+        except asyncio.CancelledError:
+            # Drenagem esgotada: devolver a task para qualquer worker retomar
+            await self._release(queue, task_id)
+            raise
+        except Exception as e:
+            error = "Task timeout" if isinstance(e, (asyncio.TimeoutError, TimeoutError)) else str(e)
+            await self._handle_failure(queue, task_data, config, attempts, error)
+        else:
+            await queue.update_state(
+                task_id,
+                status=TaskStatus.COMPLETED.value,
+                result=result,
+                error=None,
+                completed_at=datetime.utcnow().isoformat()
+            )
+            await queue._cache.zrem(LEASES_KEY, task_id)
+            logger.info("task_completed", task_id=task_id, task_name=task_name, attempts=attempts)
+        finally:
+            self._active.discard(task_id)
+    
+    async def _handle_failure(
+        self,
+        queue: TaskQueue,
+        task_data: dict,
+        config: TaskConfig,
+        attempts: int,
+        error: str
+    ) -> None:
+        """Agenda nova tentativa (backoff exponencial) ou marca como falha."""
+        task_id = task_data["id"]
+        if attempts > config.max_retries:
+            await self._finish_failed(queue, task_id, error)
+            logger.error("task_failed", task_id=task_id, attempts=attempts, error=error)
+            return
+        
+        delay = min(config.retry_delay * 2 ** (attempts - 1), self.MAX_RETRY_DELAY)
+        retry_at = time.time() + delay
+        await queue.update_state(
+            task_id,
+            status=TaskStatus.RETRYING.value,
+            error=error,
+            retry_at=(datetime.utcnow() + timedelta(seconds=delay)).isoformat()
+        )
+        # Lease cobre a espera: se este worker morrer antes, outro retoma
+        await queue._cache.zadd(LEASES_KEY, {task_id: retry_at + self.lease_seconds})
+        
+        self._retries[task_id] = asyncio.get_running_loop().call_later(
+            delay, self._requeue, queue, task_data
+        )
+        logger.warning(
+            "task_retry_scheduled",
+            task_id=task_id,
+            attempts=attempts,
+            delay_s=delay,
+            error=error
+        )
+    
+    def _requeue(self, queue: TaskQueue, task_data: dict) -> None:
+        self._retries.pop(task_data["id"], None)
+        queue.requeue_local(task_data)
+    
+    async def _finish_failed(self, queue: TaskQueue, task_id: str, error: str) -> None:
+        await queue.update_state(
+            task_id,
+            status=TaskStatus.FAILED.value,
+            error=error,
+            completed_at=datetime.utcnow().isoformat()
+        )
+        await queue._cache.zrem(LEASES_KEY, task_id)
+    
+    async def _release(self, queue: TaskQueue, task_id: str) -> None:
+        """Devolve a task interrompida: status queued e lease já vencido."""
+        try:
+            await queue.update_state(task_id, status=TaskStatus.QUEUED.value)
+            await queue._cache.zadd(LEASES_KEY, {task_id: 0})
+            logger.warning("task_released", task_id=task_id)
+        except Exception as e:
+            logger.error("task_release_failed", task_id=task_id, error=str(e))
+    
+    async def _heartbeat(self, queue: TaskQueue) -> None:
+        """Renova os leases das tasks em execução e recupera os vencidos."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                now = time.time()
+                if self._active:
+                    await queue._cache.zadd(
+                        LEASES_KEY,
+                        {task_id: now + self.lease_seconds for task_id in self._active}
+                    )
+                if self._running:
+                    await self.recover_expired(queue, now)
             except Exception as e:
-                logger.error("task_worker_error", error=str(e))
+                logger.warning("task_worker_heartbeat_failed", error=str(e))
+    
+    async def recover_expired(self, queue: TaskQueue, now: Optional[float] = None) -> int:
+        """
+        Devolve à fila as tasks com lease vencido (worker morto ou travado).
+        
+        Returns:
+            Quantas tasks foram recuperadas
+        """
+        expired = await queue._cache.zrangebyscore(LEASES_KEY, 0, now or time.time())
+        recovered = 0
+        for task_id in expired:
+            if task_id in self._active or task_id in self._retries:
+                continue
+            # zrem é atômico: só um worker retoma cada task
+            if not await queue._cache.zrem(LEASES_KEY, task_id):
+                continue
+            
+            task_data = await queue.get_task_data(task_id)
+            if not task_data or TaskStatus(task_data["status"]) in FINAL_STATUSES:
+                continue
+            
+            if task_data.get("attempts", 0) > task_data["config"]["max_retries"]:
+                await self._finish_failed(queue, task_id, "Worker interrompido")
+                continue
+            
+            await queue.update_state(task_id, status=TaskStatus.QUEUED.value)
+            queue.requeue_local(task_data)
+            recovered += 1
+            logger.warning("task_lease_recovered", task_id=task_id, status=task_data["status"])
+        return recovered
     
     def stop(self):
-        """Para o worker."""
+        """Para de pegar novas tasks (as em execução terminam)."""
         self._running = False
+        for slot in list(self._idle):
+            slot.cancel()
         logger.info("task_worker_stopped")
+    
+    async def shutdown(self, timeout: Optional[float] = None) -> None:
+        """
+        Drena o worker: para de pegar tasks e espera as em execução.
+        
+        Após o timeout, as tasks restantes são canceladas e devolvidas à
+        fila (lease vencido). Retentativas agendadas ficam como retrying
+        e são retomadas pelo lease por outro worker.
+        
+        Args:
+            timeout: Espera máxima em segundos (default: TASK_DRAIN_TIMEOUT)
+        """
+        self.stop()
+        timeout = self.DRAIN_TIMEOUT if timeout is None else timeout
+        
+        for handle in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        
+        slots = [slot for slot in self._slots if not slot.done()]
+        if slots:
+            _, pending = await asyncio.wait(slots, timeout=timeout)
+            for slot in pending:
+                slot.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if pending:
+                logger.warning("task_worker_drain_timeout", interrupted=len(pending))
+        
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        logger.info("task_worker_drained", worker=self.worker_id)
 
 
 # ===== ARQ WORKER SETTINGS =====
 
-if ARQ_AVAILABLE and RedisSettings:
-    class WorkerSettings:
-        """Configurações do worker ARQ."""
+# Peso de cada fila: fatia de TASK_WORKER_MAX_JOBS e frequência de polling
+LANE_WEIGHTS = {
+    TaskPriority.CRITICAL: 4,
+    TaskPriority.HIGH: 3,
+    TaskPriority.NORMAL: 2,
+    TaskPriority.LOW: 1,
+}
+MAX_JOBS = int(os.getenv("TASK_WORKER_MAX_JOBS", "10"))
+ARQ_JOB_TIMEOUT = 300  # 5 minutos
+
+
+def _lane_max_jobs(priority: TaskPriority) -> int:
+    return max(1, MAX_JOBS * LANE_WEIGHTS[priority] // sum(LANE_WEIGHTS.values()))
+
+
+async def _update_job_state(task_id: str, **fields: Any) -> None:
+    """Grava o estado do job ARQ no registro da task (sem derrubar o job)."""
+    from .task_queue import get_task_queue
+    try:
+        await get_task_queue().update_state(task_id, **fields)
+    except Exception as e:
+        logger.warning("arq_task_state_failed", task_id=task_id, error=str(e))
+
+
+async def _arq_job_start(ctx: dict, priority: TaskPriority) -> None:
+    """Hook on_job_start: espera na fila e status running."""
+    from .task_queue import get_task_queue
+    # score = quando o job ficou disponível (ms), já conta _defer_by
+    wait_ms = max(0.0, time.time() * 1000 - ctx["score"])
+    await get_task_queue().record_queue_wait(priority, wait_ms)
+    await _update_job_state(
+        ctx["job_id"],
+        status=TaskStatus.RUNNING.value,
+        started_at=datetime.utcnow().isoformat(),
+        attempts=ctx.get("job_try", 1),
+        queue_wait_ms=round(wait_ms, 2)
+    )
+
+
+def _arq_tracked(
+    func: Callable[..., Awaitable[Any]],
+    job_timeout: float = ARQ_JOB_TIMEOUT
+) -> Callable[..., Awaitable[Any]]:
+    """
+    Task para o ARQ que grava o desfecho no registro da task.
+    
+    O ARQ guarda o resultado só no próprio job; sem isto o registro
+    ficaria em queued e os waiters só veriam timeout. Cancelamento por
+    timeout do job vira failed; os demais (shutdown do worker) voltam a
+    queued, pois o ARQ roda o job de novo.
+    """
+    @functools.wraps(func)
+    async def run(ctx: dict, *args: Any, **kwargs: Any) -> Any:
+        task_id = kwargs.get("_task_id") or ctx["job_id"]
+        start = time.monotonic()
+        try:
+            result = await func(ctx, *args, **kwargs)
+        except asyncio.CancelledError:
+            if time.monotonic() - start >= job_timeout:
+                await _update_job_state(
+                    task_id,
+                    status=TaskStatus.FAILED.value,
+                    error="Task timeout",
+                    completed_at=datetime.utcnow().isoformat()
+                )
+            else:
+                await _update_job_state(task_id, status=TaskStatus.QUEUED.value)
+            raise
+        except Exception as e:
+            await _update_job_state(
+                task_id,
+                status=TaskStatus.FAILED.value,
+                error=str(e),
+                completed_at=datetime.utcnow().isoformat()
+            )
+            raise
         
-        redis_settings = RedisSettings(
-            host=os.getenv("REDIS_HOST", "localhost"),
-            port=int(os.getenv("REDIS_PORT", "6379")),
-            password=os.getenv("REDIS_PASSWORD")
+        await _update_job_state(
+            task_id,
+            status=TaskStatus.COMPLETED.value,
+            result=result,
+            error=None,
+            completed_at=datetime.utcnow().isoformat()
         )
+        return result
+    
+    return run
+
+
+if ARQ_AVAILABLE and RedisSettings:
+    async def _on_startup(ctx: dict):
+        logger.info("arq_worker_started")
+    
+    async def _on_shutdown(ctx: dict):
+        logger.info("arq_worker_stopped")
+    
+    def _lane_settings(priority: TaskPriority) -> type:
+        """
+        WorkerSettings da fila de uma prioridade.
         
-        functions = TASK_FUNCTIONS
-        
-        max_jobs = 10
-        job_timeout = 300  # 5 minutos
-        
-        @staticmethod
-        async def on_startup(ctx: dict):
-            logger.info("arq_worker_started")
+        O ARQ lê só os atributos da própria classe (__dict__), por isso
+        cada fila recebe a configuração completa em vez de herdar.
+        """
+        async def on_job_start(ctx: dict):
+            await _arq_job_start(ctx, priority)
         
-        @staticmethod
-        async def on_shutdown(ctx: dict):
-            logger.info("arq_worker_stopped")
+        return type(
+            f"{priority.name.title()}WorkerSettings",
+            (),
+            {
+                "__doc__": f"Configurações do worker ARQ da fila {priority.name}.",
+                "redis_settings": RedisSettings(
+                    host=os.getenv("REDIS_HOST", "localhost"),
+                    port=int(os.getenv("REDIS_PORT", "6379")),
+                    password=os.getenv("REDIS_PASSWORD")
+                ),
+                "functions": [
+                    arq_func(_arq_tracked(task), name=task.__name__)
+                    for task in TASK_FUNCTIONS
+                ],
+                "queue_name": lane_name("default", priority),
+                "max_jobs": _lane_max_jobs(priority),
+                "poll_delay": 1.0 / LANE_WEIGHTS[priority],
+                "job_timeout": ARQ_JOB_TIMEOUT,
+                "on_startup": staticmethod(_on_startup),
+                "on_shutdown": staticmethod(_on_shutdown),
+                "on_job_start": staticmethod(on_job_start),
+            }
+        )
+    
+    CriticalWorkerSettings = _lane_settings(TaskPriority.CRITICAL)
+    HighWorkerSettings = _lane_settings(TaskPriority.HIGH)
+    NormalWorkerSettings = _lane_settings(TaskPriority.NORMAL)
+    LowWorkerSettings = _lane_settings(TaskPriority.LOW)
+    
+    # Compatibilidade: `arq ...WorkerSettings` atende a fila NORMAL
+    WorkerSettings = NormalWorkerSettings
+    
+    LANE_SETTINGS = [
+        CriticalWorkerSettings,
+        HighWorkerSettings,
+        NormalWorkerSettings,
+        LowWorkerSettings,
+    ]
+    
+    async def run_lanes() -> None:
+        """Roda um worker ARQ por fila de prioridade neste processo."""
+        workers = [
+            create_worker(settings, handle_signals=False)
+            for settings in LANE_SETTINGS
+        ]
+        logger.info(
+            "arq_lanes_started",
+            lanes={w.queue_name: w.max_jobs for w in workers}
+        )
+        try:
+            await asyncio.gather(*(w.async_run() for w in workers))
+        finally:
+            await asyncio.gather(*(w.close() for w in workers), return_exceptions=True)
+
+
+if __name__ == "__main__":
+    if ARQ_AVAILABLE and RedisSettings:
+        asyncio.run(run_lanes())
+    else:
+        # A fila local só existe no processo da API, que roda o TaskWorker
+        logger.error("task_worker_requires_arq")
+        raise SystemExit(
+            "ARQ não disponível: as tasks rodam no TaskWorker do processo da API"
+        )
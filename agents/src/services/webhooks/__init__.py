@@ -3,11 +3,13 @@
 from .webhook_service import WebhookService, get_webhook_service
 from .webhook_events import WebhookEvent, EventType
 from .webhook_delivery import WebhookDelivery
+from .webhook_endpoints import WebhookEndpoint
 
 __all__ = [
     "WebhookService",
     "get_webhook_service",
     "WebhookEvent",
     "EventType",
-    "WebhookDelivery"
+    "WebhookDelivery",
+    "WebhookEndpoint"
 ]
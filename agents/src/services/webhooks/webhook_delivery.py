@@ -5,7 +5,8 @@ Entrega de webhooks com retry e logging.
 import asyncio
 import hashlib
 import hmac
-from typing import Optional
+import uuid
+from typing import Any, Optional
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
@@ -26,6 +27,41 @@ class DeliveryStatus(str, Enum):
     RETRYING = "retrying"
 
 
+def sign_payload(secret: Optional[str], payload: str) -> str:
+    """Assinatura HMAC-SHA256 do payload ("" sem secret)."""
+    if not secret:
+        return ""
+    
+    signature = hmac.new(
+        secret.encode(),
+        payload.encode(),
+        hashlib.sha256
+    ).hexdigest()
+    
+    return f"sha256={signature}"
+
+
+class SignatureCache:
+    """
+    Assinaturas de um lote de entregas: uma por (evento, secret).
+    
+    Entregas do mesmo evento para endpoints com o mesmo secret
+    compartilham o HMAC em vez de recalculá-lo.
+    """
+    
+    def __init__(self) -> None:
+        self._signatures: dict[tuple[str, str], str] = {}
+    
+    def get(self, event: WebhookEvent, secret: Optional[str]) -> str:
+        if not secret:
+            return ""
+        key = (event.id, secret)
+        signature = self._signatures.get(key)
+        if signature is None:
+            signature = self._signatures[key] = sign_payload(secret, event.to_json())
+        return signature
+
+
 @dataclass
 class DeliveryAttempt:
     """Tentativa de entrega."""
@@ -34,12 +70,35 @@ class DeliveryAttempt:
     response_body: Optional[str]
     error: Optional[str]
     duration_ms: float
+    
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "timestamp": self.timestamp.isoformat(),
+            "status_code": self.status_code,
+            "response_body": self.response_body,
+            "error": self.error,
+            "duration_ms": round(self.duration_ms, 2)
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "DeliveryAttempt":
+        return cls(
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            status_code=data.get("status_code"),
+            response_body=data.get("response_body"),
+            error=data.get("error"),
+            duration_ms=data.get("duration_ms", 0.0)
+        )
 
 
 @dataclass
 class WebhookDelivery:
     """
     Gerencia entrega de webhook com retry.
+    
+    Payload e headers são montados uma vez e reutilizados nos retries;
+    `signature` pode vir pré-calculada (SignatureCache) por quem cria
+    várias entregas do mesmo evento.
     """
     
     event: WebhookEvent
@@ -56,28 +115,32 @@ class WebhookDelivery:
     attempts: list[DeliveryAttempt] = field(default_factory=list)
     delivered_at: Optional[datetime] = None
     
+    # Agendamento (preenchido pelo engine)
+    endpoint_id: Optional[str] = None
+    enqueued_at: float = 0.0  # time.monotonic() ao entrar na fila
+    
+    # Registro durável (outbox)
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    organization_id: Optional[int] = None  # organização do endpoint
+    attempt_offset: int = 0  # tentativas anteriores a um replay
+    
+    # Assinatura pré-calculada (None = calcular na primeira tentativa)
+    signature: Optional[str] = field(default=None, repr=False)
+    _headers: Optional[dict[str, str]] = field(default=None, init=False, repr=False, compare=False)
+    
     def _generate_signature(self, payload: str) -> str:
         """Gera assinatura HMAC-SHA256."""
-        if not self.secret:
-            return ""
-        
-        signature = hmac.new(
-            self.secret.encode(),
-            payload.encode(),
-            hashlib.sha256
-        ).hexdigest()
-        
-        return f"sha256={signature}"
+        return sign_payload(self.secret, payload)
     
-    async def deliver(self) -> bool:
-        """
-        Entrega o webhook com retry.
-        
-        Returns:
-            True se entregue com sucesso
-        """
+    def _build_request(self) -> tuple[str, dict[str, str]]:
+        """Payload e headers da entrega (montados uma vez por entrega)."""
         payload = self.event.to_json()
-        signature = self._generate_signature(payload)
+        if self._headers is not None:
+            return payload, self._headers
+        
+        if self.signature is None:
+            self.signature = self._generate_signature(payload)
+        signature = self.signature
         
         headers = {
             "Content-Type": "application/json",
@@ -89,81 +152,105 @@ class WebhookDelivery:
         if signature:
             headers["X-Webhook-Signature"] = signature
         
-        for attempt in range(self.max_retries):
-            self.status = DeliveryStatus.RETRYING if attempt > 0 else DeliveryStatus.PENDING
+        self._headers = headers
+        return payload, headers
+    
+    @property
+    def retries_left(self) -> bool:
+        return len(self.attempts) - self.attempt_offset < self.max_retries
+    
+    def next_retry_delay(self) -> float:
+        """Backoff exponencial a partir da última tentativa."""
+        return self.retry_delay_seconds * (
+            2 ** max(len(self.attempts) - self.attempt_offset - 1, 0)
+        )
+    
+    def reset_for_replay(self) -> None:
+        """Concede um novo ciclo de tentativas, preservando o histórico."""
+        self.attempt_offset = len(self.attempts)
+        self.status = DeliveryStatus.PENDING
+        self.delivered_at = None
+    
+    async def attempt(self, client: httpx.AsyncClient) -> Optional[bool]:
+        """
+        Executa uma única tentativa de entrega.
+        
+        Returns:
+            True se entregue, False se falha definitiva (4xx),
+            None se a falha permite retry (5xx, timeout, conexão)
+        """
+        payload, headers = self._build_request()
+        attempt_number = len(self.attempts) + 1
+        self.status = DeliveryStatus.RETRYING if attempt_number > 1 else DeliveryStatus.PENDING
+        
+        start_time = datetime.utcnow()
+        
+        try:
+            response = await client.post(
+                self.endpoint_url,
+                content=payload,
+                headers=headers,
+                timeout=self.timeout_seconds
+            )
+        except Exception as e:
+            duration_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
             
-            start_time = datetime.utcnow()
+            self.attempts.append(DeliveryAttempt(
+                timestamp=start_time,
+                status_code=None,
+                response_body=None,
+                error=str(e),
+                duration_ms=duration_ms
+            ))
             
-            try:
-                async with httpx.AsyncClient(timeout=self.timeout_seconds) as client:
-                    response = await client.post(
-                        self.endpoint_url,
-                        content=payload,
-                        headers=headers
-                    )
-                
-                duration_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
-                
-                attempt_record = DeliveryAttempt(
-                    timestamp=start_time,
-                    status_code=response.status_code,
-                    response_body=response.text[:500] if response.text else None,
-                    error=None,
-                    duration_ms=duration_ms
-                )
-                self.attempts.append(attempt_record)
-                
-                # 2xx é sucesso
-                if 200 <= response.status_code < 300:
-                    self.status = DeliveryStatus.SUCCESS
-                    self.delivered_at = datetime.utcnow()
-                    
-                    logger.info(
-                        "webhook_delivered",
-                        event_id=self.event.id,
-                        event_type=self.event.type.value,
-                        endpoint=self.endpoint_url,
-                        status_code=response.status_code,
-                        attempts=attempt + 1
-                    )
-                    
-                    return True
-                
-                # 4xx não faz retry (erro do cliente)
-                if 400 <= response.status_code < 500:
-                    self.status = DeliveryStatus.FAILED
-                    logger.warning(
-                        "webhook_client_error",
-                        event_id=self.event.id,
-                        status_code=response.status_code
-                    )
-                    return False
-                
-            except Exception as e:
-                duration_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
-                
-                attempt_record = DeliveryAttempt(
-                    timestamp=start_time,
-                    status_code=None,
-                    response_body=None,
-                    error=str(e),
-                    duration_ms=duration_ms
-                )
-                self.attempts.append(attempt_record)
-                
-                logger.warning(
-                    "webhook_delivery_error",
-                    event_id=self.event.id,
-                    attempt=attempt + 1,
-                    error=str(e)
-                )
+            logger.warning(
+                "webhook_delivery_error",
+                event_id=self.event.id,
+                attempt=attempt_number,
+                error=str(e)
+            )
+            return None
+        
+        duration_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
+        
+        self.attempts.append(DeliveryAttempt(
+            timestamp=start_time,
+            status_code=response.status_code,
+            response_body=response.text[:500] if response.text else None,
+            error=None,
+            duration_ms=duration_ms
+        ))
+        
+        # 2xx é sucesso
+        if 200 <= response.status_code < 300:
+            self.status = DeliveryStatus.SUCCESS
+            self.delivered_at = datetime.utcnow()
             
-            # Esperar antes de retry
-            if attempt < self.max_retries - 1:
-                delay = self.retry_delay_seconds * (2 ** attempt)  # Exponential backoff
-                await asyncio.sleep(delay)
+            logger.info(
+                "webhook_delivered",
+                event_id=self.event.id,
+                event_type=self.event.type.value,
+                endpoint=self.endpoint_url,
+                status_code=response.status_code,
+                attempts=attempt_number
+            )
+            
+            return True
         
-        # Todas as tentativas falharam
+        # 4xx não faz retry (erro do cliente)
+        if 400 <= response.status_code < 500:
+            self.status = DeliveryStatus.FAILED
+            logger.warning(
+                "webhook_client_error",
+                event_id=self.event.id,
+                status_code=response.status_code
+            )
+            return False
+        
+        return None
+    
+    def mark_failed(self) -> None:
+        """Marca a entrega como falha definitiva (tentativas esgotadas)."""
         self.status = DeliveryStatus.FAILED
         logger.error(
             "webhook_delivery_failed",
@@ -171,5 +258,82 @@ class WebhookDelivery:
             endpoint=self.endpoint_url,
             attempts=len(self.attempts)
         )
+    
+    def to_dict(self, include_event: bool = True) -> dict[str, Any]:
+        """
+        Registro persistível da entrega (sem o secret).
+        
+        Args:
+            include_event: False grava só event_id (o payload do evento é
+                persistido uma vez e compartilhado pelas entregas)
+        """
+        return {
+            "id": self.id,
+            "event_id": self.event.id,
+            **({"event": self.event.to_dict()} if include_event else {}),
+            "endpoint_id": self.endpoint_id,
+            "organization_id": self.organization_id,
+            "endpoint_url": self.endpoint_url,
+            "max_retries": self.max_retries,
+            "retry_delay_seconds": self.retry_delay_seconds,
+            "timeout_seconds": self.timeout_seconds,
+            "status": self.status.value,
+            "attempts": [a.to_dict() for a in self.attempts],
+            "attempt_offset": self.attempt_offset,
+            "delivered_at": self.delivered_at.isoformat() if self.delivered_at else None,
+        }
+    
+    @classmethod
+    def from_dict(
+        cls,
+        data: dict[str, Any],
+        secret: Optional[str] = None,
+        event: Optional[WebhookEvent] = None
+    ) -> "WebhookDelivery":
+        """
+        Reconstrói entrega. `event` é obrigatório se o registro foi gravado
+        com include_event=False.
+        """
+        delivered_at = data.get("delivered_at")
+        return cls(
+            id=data["id"],
+            event=event or WebhookEvent.from_dict(data["event"]),
+            endpoint_id=data.get("endpoint_id"),
+            organization_id=data.get("organization_id"),
+            endpoint_url=data["endpoint_url"],
+            secret=secret,
+            max_retries=data.get("max_retries", 3),
+            retry_delay_seconds=data.get("retry_delay_seconds", 5),
+            timeout_seconds=data.get("timeout_seconds", 30),
+            status=DeliveryStatus(data.get("status", DeliveryStatus.PENDING.value)),
+            attempts=[DeliveryAttempt.from_dict(a) for a in data.get("attempts", [])],
+            attempt_offset=data.get("attempt_offset", 0),
+            delivered_at=datetime.fromisoformat(delivered_at) if delivered_at else None,
+        )
+    
+    async def deliver(self, client: Optional[httpx.AsyncClient] = None) -> bool:
+        """
+        Entrega o webhook com retry inline (uso pontual: teste, task).
+        
+        Entregas em volume passam pelo WebhookDeliveryEngine, que agenda
+        os retries em vez de dormir.
         
+        Returns:
+            True se entregue com sucesso
+        """
+        if client is None:
+            async with httpx.AsyncClient(timeout=self.timeout_seconds) as own_client:
+                return await self.deliver(own_client)
+        
+        while self.retries_left:
+            result = await self.attempt(client)
+            if result is not None:
+                return result
+            
+            # Esperar antes de retry
+            if self.retries_left:
+                await asyncio.sleep(self.next_retry_delay())
+        
+        # Todas as tentativas falharam
+        self.mark_failed()
         return False
@@ -0,0 +1,194 @@
+"""
+Registro compartilhado de endpoints de webhook.
+
+Endpoints ficam no Redis (sem TTL) e são vistos por todos os pods:
+
+    webhook:endpoint:{id}              JSON do endpoint (inclui secret)
+    webhook:endpoints:{org}:{branch}   set de IDs (listagem)
+    webhook:subs:{org}:{event_type}    set de IDs inscritos no evento
+    webhook:subs:{org}:*               set de IDs inscritos em todos os eventos
+    webhook:orgs                       set de organizações com endpoints
+
+emit consulta apenas os sets de inscrição da organização/evento (um
+SUNION + um MGET), em vez de varrer todos os endpoints. O resultado fica
+em cache local por SUBSCRIBERS_TTL segundos: eventos frequentes
+(agent.message.processed) não vão ao Redis a cada emissão. Alterações
+feitas no próprio pod invalidam o cache na hora; as de outros pods
+aparecem em até SUBSCRIBERS_TTL.
+"""
+
+import json
+import time
+from typing import Any, Optional
+from dataclasses import dataclass, field
+from datetime import datetime
+import structlog
+
+from .webhook_events import EventType
+from src.services.cache import get_cache
+
+logger = structlog.get_logger()
+
+# Inscrição em AGENT_MESSAGE_PROCESSED recebe todos os eventos
+ALL_EVENTS = "*"
+
+
+@dataclass
+class WebhookEndpoint:
+    """Endpoint registrado para webhooks."""
+    id: str
+    url: str
+    secret: Optional[str]
+    events: list[EventType]
+    organization_id: int
+    branch_id: int
+    is_active: bool = True
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+    def subscribes_to(self, event_type: EventType) -> bool:
+        """Verifica se endpoint está inscrito no evento."""
+        return event_type in self.events or EventType.AGENT_MESSAGE_PROCESSED in self.events
+
+    def subscription_keys(self) -> list[str]:
+        """Chaves do índice de inscrição que contêm este endpoint."""
+        if EventType.AGENT_MESSAGE_PROCESSED in self.events:
+            return [subs_key(self.organization_id, ALL_EVENTS)]
+        return [subs_key(self.organization_id, e.value) for e in self.events]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "url": self.url,
+            "secret": self.secret,
+            "events": [e.value for e in self.events],
+            "organization_id": self.organization_id,
+            "branch_id": self.branch_id,
+            "is_active": self.is_active,
+            "created_at": self.created_at.isoformat()
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "WebhookEndpoint":
+        return cls(
+            id=data["id"],
+            url=data["url"],
+            secret=data.get("secret"),
+            events=[EventType(e) for e in data.get("events", [])],
+            organization_id=data["organization_id"],
+            branch_id=data["branch_id"],
+            is_active=data.get("is_active", True),
+            created_at=datetime.fromisoformat(data["created_at"])
+        )
+
+
+def endpoint_key(endpoint_id: str) -> str:
+    return f"webhook:endpoint:{endpoint_id}"
+
+
+def subs_key(org_id: int, event_type: str) -> str:
+    return f"webhook:subs:{org_id}:{event_type}"
+
+
+def listing_key(org_id: int, branch_id: int) -> str:
+    return f"webhook:endpoints:{org_id}:{branch_id}"
+
+
+ORGS_KEY = "webhook:orgs"
+
+
+class WebhookEndpointStore:
+    """
+    Persistência e índice de inscrição de endpoints.
+
+    Uso:
+        store = WebhookEndpointStore()
+        await store.save(endpoint)
+
+        endpoints = await store.subscribers(org_id=1, event_type=EventType.DOCUMENT_IMPORTED)
+    """
+
+    SUBSCRIBERS_TTL = 5.0
+
+    def __init__(self):
+        self._cache = get_cache()
+        # (org_id, event_type) -> (expira_em, endpoints)
+        self._subscribers: dict[tuple[Optional[int], str], tuple[float, list[WebhookEndpoint]]] = {}
+
+    def _invalidate(self, org_id: int) -> None:
+        for key in [k for k in self._subscribers if k[0] in (org_id, None)]:
+            del self._subscribers[key]
+
+    async def save(self, endpoint: WebhookEndpoint) -> None:
+        """Grava endpoint e o adiciona aos índices."""
+        await self._cache.set_json(endpoint_key(endpoint.id), endpoint.to_dict(), ttl=None)
+        await self._cache.sadd(
+            listing_key(endpoint.organization_id, endpoint.branch_id), endpoint.id
+        )
+        for key in endpoint.subscription_keys():
+            await self._cache.sadd(key, endpoint.id)
+        await self._cache.sadd(ORGS_KEY, str(endpoint.organization_id))
+        self._invalidate(endpoint.organization_id)
+
+    async def delete(self, endpoint: WebhookEndpoint) -> None:
+        """Remove endpoint e suas entradas de índice."""
+        for key in endpoint.subscription_keys():
+            await self._cache.srem(key, endpoint.id)
+        await self._cache.srem(
+            listing_key(endpoint.organization_id, endpoint.branch_id), endpoint.id
+        )
+        await self._cache.delete(endpoint_key(endpoint.id))
+        self._invalidate(endpoint.organization_id)
+
+    async def get(self, endpoint_id: str) -> Optional[WebhookEndpoint]:
+        data = await self._cache.get_json(endpoint_key(endpoint_id))
+        return WebhookEndpoint.from_dict(data) if data else None
+
+    async def get_many(self, endpoint_ids: list[str]) -> list[WebhookEndpoint]:
+        """Carrega vários endpoints num único MGET (IDs ausentes são ignorados)."""
+        if not endpoint_ids:
+            return []
+        values = await self._cache.mget([endpoint_key(i) for i in endpoint_ids])
+        return [
+            WebhookEndpoint.from_dict(json.loads(value))
+            for value in values if value
+        ]
+
+    async def list_branch(self, org_id: int, branch_id: int) -> list[WebhookEndpoint]:
+        """Endpoints de uma organização/filial."""
+        ids = await self._cache.smembers(listing_key(org_id, branch_id))
+        endpoints = await self.get_many(sorted(ids))
+        return sorted(endpoints, key=lambda ep: ep.created_at)
+
+    async def subscribers(
+        self,
+        org_id: Optional[int],
+        event_type: EventType
+    ) -> list[WebhookEndpoint]:
+        """
+        Endpoints ativos inscritos no evento.
+
+        Args:
+            org_id: Organização do evento (None = todas as organizações)
+            event_type: Tipo do evento
+        """
+        cache_key = (org_id, event_type.value)
+        cached = self._subscribers.get(cache_key)
+        now = time.monotonic()
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        if org_id is None:
+            orgs = [int(o) for o in await self._cache.smembers(ORGS_KEY)]
+        else:
+            orgs = [org_id]
+
+        keys = [
+            key for org in orgs
+            for key in (subs_key(org, event_type.value), subs_key(org, ALL_EVENTS))
+        ]
+        ids = await self._cache.sunion(keys)
+
+        endpoints = await self.get_many(sorted(ids))
+        active = [ep for ep in endpoints if ep.is_active]
+        self._subscribers[cache_key] = (now + self.SUBSCRIBERS_TTL, active)
+        return active
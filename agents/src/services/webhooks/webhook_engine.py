@@ -0,0 +1,377 @@
+"""
+Engine de entrega de webhooks.
+
+Características:
+- N workers concorrentes consumindo uma fila única
+- Um httpx.AsyncClient (pool de conexões keep-alive) por host, com
+  limite de concorrência por host: um assinante lento ocupa no máximo
+  HOST_CONCURRENCY workers; o excedente espera num backlog do host
+  (sem prender workers) e o resto continua entregando
+- Retries agendados numa fila de atraso (heap), sem dormir o worker
+- Circuit breaker por endpoint: após falhas seguidas, entregas para o
+  endpoint são adiadas até o período de reset, e então uma única
+  tentativa de prova decide se o circuito fecha
+- Métricas de atraso da fila (lag) e profundidade
+- Callback opcional de resultado (on_outcome): com ele, retries e
+  falhas definitivas são decididos por quem persiste as entregas
+  (WebhookOutbox) em vez da fila de atraso em memória
+"""
+
+import asyncio
+import heapq
+from collections import deque
+import itertools
+import os
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlsplit
+import structlog
+
+import httpx
+
+from .webhook_delivery import WebhookDelivery
+from src.core.observability import (
+    WEBHOOK_DELIVERIES,
+    WEBHOOK_QUEUE_LAG,
+    WEBHOOK_QUEUE_DEPTH,
+)
+
+logger = structlog.get_logger()
+
+
+class CircuitState(str, Enum):
+    """Estado do circuit breaker."""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass
+class CircuitBreaker:
+    """Circuit breaker de um endpoint."""
+
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+    state: CircuitState = CircuitState.CLOSED
+    failures: int = 0
+    opened_at: float = 0.0
+    probing: bool = False
+
+    def allow(self, now: float) -> bool:
+        """Verifica se uma tentativa pode ser feita agora."""
+        if self.state == CircuitState.CLOSED:
+            return True
+
+        if self.state == CircuitState.OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = CircuitState.HALF_OPEN
+            self.probing = False
+
+        if self.state == CircuitState.HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+
+        return False
+
+    def retry_in(self, now: float) -> float:
+        """Segundos até a próxima tentativa permitida."""
+        if self.state == CircuitState.OPEN:
+            return max(self.reset_timeout - (now - self.opened_at), 0.0)
+        return min(self.reset_timeout, 1.0)  # prova em andamento
+
+    def record_success(self) -> None:
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self, now: float) -> None:
+        self.failures += 1
+        self.probing = False
+        if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = CircuitState.OPEN
+            self.opened_at = now
+
+
+class DeliveryOutcome(str, Enum):
+    """Resultado de uma tentativa, informado a on_outcome."""
+    DELIVERED = "delivered"
+    FAILED = "failed"
+    RETRY = "retry"
+
+
+OutcomeCallback = Callable[[WebhookDelivery, DeliveryOutcome], Awaitable[None]]
+
+
+class WebhookDeliveryEngine:
+    """
+    Entrega concorrente de webhooks.
+
+    Uso:
+        engine = WebhookDeliveryEngine()
+        await engine.start()
+
+        await engine.submit(delivery)
+
+        engine.get_stats()
+        await engine.stop()
+    """
+
+    WORKERS = int(os.getenv("WEBHOOK_WORKERS", "64"))
+    HOST_CONCURRENCY = int(os.getenv("WEBHOOK_HOST_CONCURRENCY", "16"))
+    MAX_QUEUE_SIZE = 100_000
+    KEEPALIVE_EXPIRY = 30.0
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        host_concurrency: Optional[int] = None,
+        on_outcome: Optional[OutcomeCallback] = None
+    ) -> None:
+        self.workers = workers or self.WORKERS
+        self.host_concurrency = host_concurrency or self.HOST_CONCURRENCY
+        self.on_outcome = on_outcome
+
+        self._ready: asyncio.Queue[WebhookDelivery] = asyncio.Queue(maxsize=self.MAX_QUEUE_SIZE)
+        self._delayed: list[tuple[float, int, WebhookDelivery]] = []
+        self._delayed_changed = asyncio.Event()
+        self._sequence = itertools.count()
+
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._host_active: dict[str, int] = {}
+        self._host_backlog: dict[str, deque[WebhookDelivery]] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+        self._tasks: list[asyncio.Task] = []
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        # Métricas
+        self._delivered = 0
+        self._failed = 0
+        self._retried = 0
+        self._short_circuited = 0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+
+    # ===== CICLO DE VIDA =====
+
+    async def start(self) -> None:
+        """Inicia workers e o agendador de retries."""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._scheduler()))
+        logger.info(
+            "webhook_engine_started",
+            workers=self.workers,
+            host_concurrency=self.host_concurrency
+        )
+
+    async def stop(self) -> None:
+        """Para workers e fecha os pools de conexão."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+        logger.info("webhook_engine_stopped", **self.get_stats())
+
+    # ===== ENFILEIRAMENTO =====
+
+    async def submit(self, delivery: WebhookDelivery) -> None:
+        """Enfileira entrega (aguarda se a fila estiver cheia)."""
+        delivery.enqueued_at = time.monotonic()
+        self._idle.clear()
+        await self._ready.put(delivery)
+        WEBHOOK_QUEUE_DEPTH.labels(queue="ready").set(self._ready.qsize())
+
+    def schedule(self, delivery: WebhookDelivery, delay: float) -> None:
+        """Agenda entrega para daqui a `delay` segundos."""
+        self._idle.clear()
+        heapq.heappush(
+            self._delayed,
+            (time.monotonic() + delay, next(self._sequence), delivery)
+        )
+        self._delayed_changed.set()
+        WEBHOOK_QUEUE_DEPTH.labels(queue="delayed").set(len(self._delayed))
+
+    async def wait_idle(self) -> None:
+        """Aguarda até não haver entregas pendentes, agendadas ou em andamento."""
+        await self._idle.wait()
+
+    def _check_idle(self) -> None:
+        if (
+            not self._in_flight
+            and self._ready.empty()
+            and not self._delayed
+            and not any(self._host_backlog.values())
+        ):
+            self._idle.set()
+
+    async def _scheduler(self) -> None:
+        """Move entregas agendadas para a fila quando vencem."""
+        while True:
+            self._delayed_changed.clear()
+            now = time.monotonic()
+
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, delivery = heapq.heappop(self._delayed)
+                delivery.enqueued_at = now
+                await self._ready.put(delivery)
+            WEBHOOK_QUEUE_DEPTH.labels(queue="delayed").set(len(self._delayed))
+
+            timeout = self._delayed[0][0] - now if self._delayed else None
+            try:
+                await asyncio.wait_for(self._delayed_changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    # ===== ENTREGA =====
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def _client(self, host: str) -> httpx.AsyncClient:
+        """Pool de conexões do host (criado sob demanda)."""
+        client = self._clients.get(host)
+        if client is None:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.host_concurrency,
+                    max_keepalive_connections=self.host_concurrency,
+                    keepalive_expiry=self.KEEPALIVE_EXPIRY
+                )
+            )
+            self._clients[host] = client
+        return client
+
+    def _breaker(self, delivery: WebhookDelivery) -> CircuitBreaker:
+        key = delivery.endpoint_id or delivery.endpoint_url
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker()
+        return breaker
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            delivery = await self._ready.get()
+            self._in_flight += 1
+            try:
+                await self._process(delivery)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("webhook_worker_error", worker=worker_id, error=str(e))
+            finally:
+                self._in_flight -= 1
+                self._ready.task_done()
+                self._check_idle()
+
+    async def _process(self, delivery: WebhookDelivery) -> None:
+        lag = time.monotonic() - delivery.enqueued_at
+        self._last_lag = lag
+        self._max_lag = max(self._max_lag, lag)
+        WEBHOOK_QUEUE_LAG.observe(lag)
+
+        host = self._host(delivery.endpoint_url)
+        if self._host_active.get(host, 0) >= self.host_concurrency:
+            # Host saturado: esperar no backlog sem ocupar o worker
+            self._host_backlog.setdefault(host, deque()).append(delivery)
+            return
+
+        self._host_active[host] = self._host_active.get(host, 0) + 1
+        try:
+            # Slot liberado continua com o backlog do próprio host
+            next_delivery: Optional[WebhookDelivery] = delivery
+            while next_delivery is not None:
+                await self._attempt(next_delivery, host)
+                backlog = self._host_backlog.get(host)
+                next_delivery = backlog.popleft() if backlog else None
+        finally:
+            self._host_active[host] -= 1
+
+    async def _attempt(self, delivery: WebhookDelivery, host: str) -> None:
+        now = time.monotonic()
+        breaker = self._breaker(delivery)
+        if not breaker.allow(now):
+            # Circuito aberto: adiar sem consumir tentativa
+            self._short_circuited += 1
+            WEBHOOK_DELIVERIES.labels(status="short_circuit").inc()
+            self.schedule(delivery, breaker.retry_in(now))
+            return
+
+        result = await delivery.attempt(self._client(host))
+
+        if result is True:
+            breaker.record_success()
+            self._delivered += 1
+            WEBHOOK_DELIVERIES.labels(status="success").inc()
+            await self._report(delivery, DeliveryOutcome.DELIVERED)
+            return
+
+        if result is False:
+            # 4xx: o endpoint respondeu, o circuito continua saudável
+            breaker.record_success()
+            self._failed += 1
+            WEBHOOK_DELIVERIES.labels(status="failed").inc()
+            await self._report(delivery, DeliveryOutcome.FAILED)
+            return
+
+        breaker.record_failure(time.monotonic())
+        if delivery.retries_left:
+            self._retried += 1
+            WEBHOOK_DELIVERIES.labels(status="retry").inc()
+            if self.on_outcome is None:
+                self.schedule(delivery, delivery.next_retry_delay())
+            else:
+                await self._report(delivery, DeliveryOutcome.RETRY)
+        else:
+            delivery.mark_failed()
+            self._failed += 1
+            WEBHOOK_DELIVERIES.labels(status="failed").inc()
+            await self._report(delivery, DeliveryOutcome.FAILED)
+
+    async def _report(self, delivery: WebhookDelivery, outcome: DeliveryOutcome) -> None:
+        if self.on_outcome is None:
+            return
+        try:
+            await self.on_outcome(delivery, outcome)
+        except Exception as e:
+            # Sem confirmação a entrada segue pendente e será reprocessada
+            logger.error(
+                "webhook_outcome_error",
+                delivery_id=delivery.id,
+                outcome=outcome.value,
+                error=str(e)
+            )
+
+    # ===== MÉTRICAS =====
+
+    def get_stats(self) -> dict:
+        """Estatísticas do engine."""
+        return {
+            "queued": self._ready.qsize(),
+            "scheduled": len(self._delayed),
+            "in_flight": self._in_flight,
+            "delivered": self._delivered,
+            "failed": self._failed,
+            "retried": self._retried,
+            "short_circuited": self._short_circuited,
+            "queue_lag_ms": round(self._last_lag * 1000, 2),
+            "max_queue_lag_ms": round(self._max_lag * 1000, 2),
+            "open_circuits": sum(
+                1 for b in self._breakers.values() if b.state != CircuitState.CLOSED
+            ),
+            "host_backlog": sum(len(b) for b in self._host_backlog.values()),
+            "hosts": len(self._clients),
+        }
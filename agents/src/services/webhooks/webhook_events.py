@@ -2,6 +2,7 @@
 Definição de eventos de webhook.
 """
 
+import json
 from enum import Enum
 from typing import Any, Optional
 from dataclasses import dataclass, field
@@ -48,6 +49,10 @@ class WebhookEvent:
     Evento de webhook.
     
     Estrutura enviada para endpoints registrados.
+    
+    O JSON é gerado uma única vez (na primeira chamada a to_json) e
+    compartilhado por todas as entregas do evento: alterar o evento
+    depois de emitido não muda o payload.
     """
     
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
@@ -62,6 +67,8 @@ class WebhookEvent:
     user_id: Optional[str] = None
     session_id: Optional[str] = None
     
+    _payload: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    
     def to_dict(self) -> dict[str, Any]:
         """Converte para dicionário."""
         return {
@@ -78,7 +85,31 @@ class WebhookEvent:
             }
         }
     
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "WebhookEvent":
+        """Reconstrói evento a partir de to_dict()."""
+        context = data.get("context", {})
+        return cls(
+            id=data["id"],
+            type=EventType(data["type"]),
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            data=data.get("data", {}),
+            metadata=data.get("metadata", {}),
+            organization_id=context.get("organization_id"),
+            branch_id=context.get("branch_id"),
+            user_id=context.get("user_id"),
+            session_id=context.get("session_id"),
+        )
+    
+    @classmethod
+    def from_json(cls, payload: str) -> "WebhookEvent":
+        """Reconstrói evento preservando o payload original (mesmos bytes assinados)."""
+        event = cls.from_dict(json.loads(payload))
+        event._payload = payload
+        return event
+    
     def to_json(self) -> str:
-        """Converte para JSON."""
-        import json
-        return json.dumps(self.to_dict(), default=str)
+        """Converte para JSON (serializado uma vez por evento)."""
+        if self._payload is None:
+            self._payload = json.dumps(self.to_dict(), default=str)
+        return self._payload
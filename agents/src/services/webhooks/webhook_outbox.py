@@ -0,0 +1,388 @@
+"""
+Outbox durável de webhooks (Redis Streams).
+
+Fluxo:
+    emit -> payload do evento (webhook:event:{id}, gravado uma vez e
+            compartilhado pelas entregas) + registro de cada entrega
+            (webhook:delivery:{id}) + XADD webhook:outbox
+    consumer group "webhook-delivery" (um consumer por pod) -> engine
+    resultado -> registro atualizado, depois XACK
+
+    - retry: ZADD webhook:retry (score = vencimento, backoff exponencial);
+      o promotor de qualquer pod devolve ao stream quando vence
+    - falha definitiva: ZADD webhook:dead:{org} (dead-letter, replay manual)
+
+Entregas só são confirmadas (XACK) depois de persistidas: se o pod cair,
+as entradas ficam pendentes no grupo e são assumidas por outro pod via
+XAUTOCLAIM após CLAIM_IDLE_MS. A entrega é at-least-once; o receptor
+deduplica pelo header X-Webhook-ID.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import time
+from typing import Optional
+import structlog
+
+from .webhook_delivery import WebhookDelivery, DeliveryStatus, SignatureCache
+from .webhook_events import WebhookEvent
+from .webhook_endpoints import WebhookEndpointStore
+from .webhook_engine import WebhookDeliveryEngine, DeliveryOutcome
+from src.services.cache import get_cache
+
+logger = structlog.get_logger()
+
+
+def record_key(delivery_id: str) -> str:
+    return f"webhook:delivery:{delivery_id}"
+
+
+def event_key(event_id: str) -> str:
+    return f"webhook:event:{event_id}"
+
+
+def history_key(org_id: Optional[int]) -> str:
+    return f"webhook:deliveries:{org_id}"
+
+
+def dead_key(org_id: Optional[int]) -> str:
+    return f"webhook:dead:{org_id}"
+
+
+class WebhookOutbox:
+    """
+    Fila durável de entregas compartilhada entre pods.
+
+    Uso:
+        outbox = WebhookOutbox(engine, endpoints)
+        await outbox.start()
+
+        await outbox.enqueue(deliveries)
+
+        await outbox.replay(delivery_id, org_id)
+        await outbox.stop()
+    """
+
+    STREAM_KEY = "webhook:outbox"
+    GROUP = "webhook-delivery"
+    RETRY_KEY = "webhook:retry"
+    RECORD_TTL = 86400 * 30
+    STREAM_MAXLEN = 1_000_000
+
+    READ_COUNT = 100
+    BLOCK_MS = 1000
+    MAX_OUTSTANDING = 2000
+    CLAIM_IDLE_MS = 300_000
+    PROMOTE_INTERVAL = 1.0
+    RECLAIM_INTERVAL = 60.0
+
+    def __init__(
+        self,
+        engine: WebhookDeliveryEngine,
+        endpoints: WebhookEndpointStore,
+        consumer: Optional[str] = None
+    ) -> None:
+        self._engine = engine
+        self._engine.on_outcome = self._on_outcome
+        self._endpoints = endpoints
+        self._cache = get_cache()
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+
+        # delivery_id -> ID da entrada no stream (entregas em andamento neste pod)
+        self._entries: dict[str, str] = {}
+        self._has_capacity = asyncio.Event()
+        self._has_capacity.set()
+        self._tasks: list[asyncio.Task] = []
+
+    # ===== CICLO DE VIDA =====
+
+    async def start(self) -> None:
+        """Cria o consumer group e inicia consumo, promotor e reclaimer."""
+        if self._tasks:
+            return
+        await self._cache.xgroup_create(self.STREAM_KEY, self.GROUP)
+        self._tasks = [
+            asyncio.create_task(self._consume()),
+            asyncio.create_task(self._promote_retries()),
+            asyncio.create_task(self._reclaim()),
+        ]
+        logger.info("webhook_outbox_started", consumer=self.consumer)
+
+    async def stop(self) -> None:
+        """Para o consumo. Entregas não confirmadas ficam pendentes no grupo."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("webhook_outbox_stopped", outstanding=len(self._entries))
+
+    # ===== ENFILEIRAMENTO =====
+
+    async def _save(self, delivery: WebhookDelivery) -> None:
+        await self._cache.set_json(
+            record_key(delivery.id),
+            delivery.to_dict(include_event=False),
+            ttl=self.RECORD_TTL
+        )
+
+    async def _save_event(self, event: WebhookEvent) -> None:
+        await self._cache.set(event_key(event.id), event.to_json(), ttl=self.RECORD_TTL)
+
+    async def enqueue(self, deliveries: list[WebhookDelivery]) -> None:
+        """Persiste as entregas e as publica no stream."""
+        now = time.time()
+        events = {d.event.id: d.event for d in deliveries}
+        for event in events.values():
+            await self._save_event(event)
+        for delivery in deliveries:
+            await self._save(delivery)
+            await self._cache.zadd(
+                history_key(delivery.organization_id),
+                {delivery.id: now},
+                ttl=self.RECORD_TTL
+            )
+        for delivery in deliveries:
+            await self._publish(delivery.id)
+
+    async def _publish(self, delivery_id: str) -> None:
+        await self._cache.xadd(
+            self.STREAM_KEY, {"delivery_id": delivery_id}, maxlen=self.STREAM_MAXLEN
+        )
+
+    # ===== CONSUMO =====
+
+    async def _consume(self) -> None:
+        while True:
+            try:
+                free = self.MAX_OUTSTANDING - len(self._entries)
+                if free <= 0:
+                    self._has_capacity.clear()
+                    await self._has_capacity.wait()
+                    continue
+
+                entries = await self._cache.xreadgroup(
+                    self.STREAM_KEY,
+                    self.GROUP,
+                    self.consumer,
+                    count=min(self.READ_COUNT, free),
+                    block_ms=self.BLOCK_MS
+                )
+                await self._dispatch(entries)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("webhook_outbox_consume_error", error=str(e))
+                await asyncio.sleep(1)
+
+    async def _dispatch(self, entries: list[tuple[str, dict[str, str]]]) -> None:
+        """Carrega registros e secrets das entradas e as envia ao engine."""
+        entries = [
+            (entry_id, fields["delivery_id"])
+            for entry_id, fields in entries
+            if fields.get("delivery_id") not in self._entries
+        ]
+        if not entries:
+            return
+
+        deliveries = await self._load_aligned([d for _, d in entries])
+        loaded = []
+        for (entry_id, delivery_id), delivery in zip(entries, deliveries):
+            if delivery is None:
+                logger.warning("webhook_delivery_record_missing", delivery_id=delivery_id)
+                await self._cache.xack(self.STREAM_KEY, self.GROUP, entry_id)
+                continue
+            loaded.append((entry_id, delivery))
+
+        endpoint_ids = sorted({d.endpoint_id for _, d in loaded if d.endpoint_id})
+        endpoints = {
+            ep.id: ep for ep in await self._endpoints.get_many(endpoint_ids)
+        }
+
+        signatures = SignatureCache()
+        for entry_id, delivery in loaded:
+            endpoint = endpoints.get(delivery.endpoint_id)
+            if delivery.status == DeliveryStatus.SUCCESS or endpoint is None:
+                # Já entregue (duplicata) ou endpoint removido
+                await self._cache.xack(self.STREAM_KEY, self.GROUP, entry_id)
+                continue
+
+            delivery.secret = endpoint.secret
+            delivery.signature = signatures.get(delivery.event, endpoint.secret)
+            delivery.endpoint_url = endpoint.url
+            self._entries[delivery.id] = entry_id
+            await self._engine.submit(delivery)
+
+    async def _on_outcome(self, delivery: WebhookDelivery, outcome: DeliveryOutcome) -> None:
+        """Persiste o resultado e confirma a entrada no stream."""
+        if outcome == DeliveryOutcome.RETRY:
+            delivery.status = DeliveryStatus.RETRYING
+            await self._save(delivery)
+            await self._cache.zadd(
+                self.RETRY_KEY, {delivery.id: time.time() + delivery.next_retry_delay()}
+            )
+        elif outcome == DeliveryOutcome.FAILED:
+            await self._save(delivery)
+            await self._cache.zadd(
+                dead_key(delivery.organization_id),
+                {delivery.id: time.time()},
+                ttl=self.RECORD_TTL
+            )
+        else:
+            await self._save(delivery)
+
+        entry_id = self._entries.pop(delivery.id, None)
+        if entry_id is not None:
+            await self._cache.xack(self.STREAM_KEY, self.GROUP, entry_id)
+        self._has_capacity.set()
+
+    async def _promote_retries(self) -> None:
+        """Devolve ao stream os retries vencidos (qualquer pod pode promover)."""
+        while True:
+            try:
+                due = await self._cache.zrangebyscore(
+                    self.RETRY_KEY, "-inf", time.time(), offset=0, count=self.READ_COUNT
+                )
+                for delivery_id in due:
+                    # ZREM bem-sucedido = este pod ganhou a promoção
+                    if await self._cache.zrem(self.RETRY_KEY, delivery_id):
+                        await self._publish(delivery_id)
+                if len(due) == self.READ_COUNT:
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("webhook_outbox_promote_error", error=str(e))
+            await asyncio.sleep(self.PROMOTE_INTERVAL)
+
+    async def _reclaim(self) -> None:
+        """Assume entradas pendentes de consumers inativos (pod reiniciado)."""
+        while True:
+            await asyncio.sleep(self.RECLAIM_INTERVAL)
+            try:
+                entries = await self._cache.xautoclaim(
+                    self.STREAM_KEY,
+                    self.GROUP,
+                    self.consumer,
+                    self.CLAIM_IDLE_MS,
+                    count=self.READ_COUNT
+                )
+                if entries:
+                    logger.info("webhook_outbox_reclaimed", count=len(entries))
+                    await self._dispatch(entries)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("webhook_outbox_reclaim_error", error=str(e))
+
+    # ===== CONSULTA E REPLAY =====
+
+    async def get_delivery(self, delivery_id: str) -> Optional[WebhookDelivery]:
+        [delivery] = await self._load_aligned([delivery_id])
+        return delivery
+
+    async def list_deliveries(
+        self,
+        org_id: int,
+        status: Optional[DeliveryStatus] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> list[WebhookDelivery]:
+        """
+        Entregas da organização, mais recentes primeiro.
+
+        status=FAILED lista o dead-letter.
+        """
+        key = dead_key(org_id) if status == DeliveryStatus.FAILED else history_key(org_id)
+        await self._cache.zremrangebyscore(key, "-inf", time.time() - self.RECORD_TTL)
+
+        if status is None or status == DeliveryStatus.FAILED:
+            ids = await self._cache.zrevrangebyscore(
+                key, "+inf", "-inf", offset=offset, count=limit
+            )
+            return await self._load(ids)
+
+        # Filtro por status sobre o histórico, paginado no resultado
+        ids = await self._cache.zrevrangebyscore(key, "+inf", "-inf")
+        matching = [d for d in await self._load(ids) if d.status == status]
+        return matching[offset:offset + limit]
+
+    async def _load(self, delivery_ids: list[str]) -> list[WebhookDelivery]:
+        return [d for d in await self._load_aligned(delivery_ids) if d is not None]
+
+    async def _load_aligned(self, delivery_ids: list[str]) -> list[Optional[WebhookDelivery]]:
+        """
+        Carrega entregas (None onde o registro ou o evento expirou).
+
+        Dois MGETs: registros e, depois, os eventos distintos, cada um
+        desserializado uma única vez.
+        """
+        if not delivery_ids:
+            return []
+        raw_records = await self._cache.mget([record_key(i) for i in delivery_ids])
+        records = [json.loads(raw) if raw else None for raw in raw_records]
+
+        event_ids = sorted({r["event_id"] for r in records if r and "event" not in r})
+        payloads = await self._cache.mget([event_key(i) for i in event_ids]) if event_ids else []
+        events = {
+            event_id: WebhookEvent.from_json(payload)
+            for event_id, payload in zip(event_ids, payloads) if payload
+        }
+
+        deliveries: list[Optional[WebhookDelivery]] = []
+        for record in records:
+            if record is None or ("event" not in record and record["event_id"] not in events):
+                deliveries.append(None)
+                continue
+            deliveries.append(
+                WebhookDelivery.from_dict(record, event=events.get(record.get("event_id")))
+            )
+        return deliveries
+
+    async def replay(self, delivery_id: str, org_id: int) -> Optional[WebhookDelivery]:
+        """
+        Reenfileira uma entrega com novo ciclo de tentativas.
+
+        Returns:
+            A entrega, ou None se não existir / for de outra organização
+        """
+        delivery = await self.get_delivery(delivery_id)
+        if delivery is None or delivery.organization_id != org_id:
+            return None
+
+        delivery.reset_for_replay()
+        await self._save_event(delivery.event)
+        await self._save(delivery)
+        await self._cache.zrem(dead_key(org_id), delivery_id)
+        await self._cache.zrem(self.RETRY_KEY, delivery_id)
+        await self._publish(delivery_id)
+
+        logger.info("webhook_delivery_replayed", delivery_id=delivery_id, org_id=org_id)
+        return delivery
+
+    async def replay_dead(self, org_id: int, limit: int = 100) -> int:
+        """Reenfileira até `limit` entregas do dead-letter da organização."""
+        ids = await self._cache.zrangebyscore(
+            dead_key(org_id), "-inf", "+inf", offset=0, count=limit
+        )
+        replayed = 0
+        for delivery_id in ids:
+            if await self.replay(delivery_id, org_id):
+                replayed += 1
+            else:
+                await self._cache.zrem(dead_key(org_id), delivery_id)
+        return replayed
+
+    # ===== MÉTRICAS =====
+
+    async def get_stats(self) -> dict:
+        """Tamanho do stream, pendentes, retries agendados e em andamento."""
+        stream = await self._cache.xstream_stats(self.STREAM_KEY, self.GROUP)
+        return {
+            "stream_length": stream["length"],
+            "pending": stream["pending"],
+            "scheduled_retries": await self._cache.zcard(self.RETRY_KEY),
+            "outstanding": len(self._entries),
+            "consumer": self.consumer,
+        }
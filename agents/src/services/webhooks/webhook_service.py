@@ -1,38 +1,24 @@
 """
 Serviço central de webhooks.
+
+Endpoints e entregas vivem no Redis (WebhookEndpointStore e
+WebhookOutbox), então qualquer pod registra, emite e entrega.
 """
 
 import asyncio
 from typing import Optional
-from dataclasses import dataclass, field
-from datetime import datetime
 import uuid
 import structlog
 
 from .webhook_events import WebhookEvent, EventType
-from .webhook_delivery import WebhookDelivery
-from src.services.cache import get_cache
+from .webhook_delivery import WebhookDelivery, DeliveryStatus, SignatureCache
+from .webhook_endpoints import WebhookEndpoint, WebhookEndpointStore
+from .webhook_engine import WebhookDeliveryEngine
+from .webhook_outbox import WebhookOutbox
 
 logger = structlog.get_logger()
 
 
-@dataclass
-class WebhookEndpoint:
-    """Endpoint registrado para webhooks."""
-    id: str
-    url: str
-    secret: Optional[str]
-    events: list[EventType]
-    organization_id: int
-    branch_id: int
-    is_active: bool = True
-    created_at: datetime = field(default_factory=datetime.utcnow)
-    
-    def subscribes_to(self, event_type: EventType) -> bool:
-        """Verifica se endpoint está inscrito no evento."""
-        return event_type in self.events or EventType.AGENT_MESSAGE_PROCESSED in self.events
-
-
 class WebhookService:
     """
     Serviço de gerenciamento e disparo de webhooks.
@@ -57,41 +43,31 @@ class WebhookService:
     """
     
     def __init__(self):
-        self._endpoints: dict[str, WebhookEndpoint] = {}
-        self._delivery_queue: asyncio.Queue[WebhookDelivery] = asyncio.Queue()
-        self._worker_task: Optional[asyncio.Task] = None
-        self._cache = get_cache()
+        self._endpoints = WebhookEndpointStore()
+        self._engine = WebhookDeliveryEngine()
+        self._outbox = WebhookOutbox(self._engine, self._endpoints)
         
         logger.info("webhook_service_initialized")
     
+    @property
+    def engine(self) -> WebhookDeliveryEngine:
+        """Engine de entrega."""
+        return self._engine
+    
+    @property
+    def outbox(self) -> WebhookOutbox:
+        """Outbox durável de entregas."""
+        return self._outbox
+    
     async def start(self):
-        """Inicia worker de entrega."""
-        if self._worker_task is None:
-            self._worker_task = asyncio.create_task(self._delivery_worker())
-            logger.info("webhook_delivery_worker_started")
+        """Inicia workers de entrega e consumo do outbox."""
+        await self._engine.start()
+        await self._outbox.start()
     
     async def stop(self):
-        """Para worker de entrega."""
-        if self._worker_task:
-            self._worker_task.cancel()
-            try:
-                await self._worker_task
-            except asyncio.CancelledError:
-                pass
-            self._worker_task = None
-            logger.info("webhook_delivery_worker_stopped")
-    
-    async def _delivery_worker(self):
-        """Worker que processa entregas da fila."""
-        while True:
-            try:
-                delivery = await self._delivery_queue.get()
-                await delivery.deliver()
-                self._delivery_queue.task_done()
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error("webhook_worker_error", error=str(e))
+        """Para consumo do outbox e workers de entrega."""
+        await self._outbox.stop()
+        await self._engine.stop()
     
     # ===== CRUD DE ENDPOINTS =====
     
@@ -113,22 +89,7 @@ class WebhookService:
             branch_id=branch_id
         )
         
-        self._endpoints[endpoint.id] = endpoint
-        
-        # Persistir no cache (1 semana)
-        await self._cache.set_json(
-            f"webhook:endpoint:{endpoint.id}",
-            {
-                "id": endpoint.id,
-                "url": endpoint.url,
-                "events": [e.value for e in endpoint.events],
-                "organization_id": endpoint.organization_id,
-                "branch_id": endpoint.branch_id,
-                "is_active": endpoint.is_active,
-                "created_at": endpoint.created_at.isoformat()
-            },
-            ttl=604800
-        )
+        await self._endpoints.save(endpoint)
         
         logger.info(
             "webhook_endpoint_registered",
@@ -141,12 +102,12 @@ class WebhookService:
     
     async def unregister_endpoint(self, endpoint_id: str) -> bool:
         """Remove endpoint."""
-        if endpoint_id in self._endpoints:
-            del self._endpoints[endpoint_id]
-            await self._cache.delete(f"webhook:endpoint:{endpoint_id}")
-            logger.info("webhook_endpoint_unregistered", endpoint_id=endpoint_id)
-            return True
-        return False
+        endpoint = await self._endpoints.get(endpoint_id)
+        if endpoint is None:
+            return False
+        await self._endpoints.delete(endpoint)
+        logger.info("webhook_endpoint_unregistered", endpoint_id=endpoint_id)
+        return True
     
     async def list_endpoints(
         self,
@@ -154,14 +115,11 @@ class WebhookService:
         branch_id: int
     ) -> list[WebhookEndpoint]:
         """Lista endpoints de uma organização."""
-        return [
-            ep for ep in self._endpoints.values()
-            if ep.organization_id == org_id and ep.branch_id == branch_id
-        ]
+        return await self._endpoints.list_branch(org_id, branch_id)
     
     async def get_endpoint(self, endpoint_id: str) -> Optional[WebhookEndpoint]:
         """Obtém endpoint por ID."""
-        return self._endpoints.get(endpoint_id)
+        return await self._endpoints.get(endpoint_id)
     
     # ===== EMISSÃO DE EVENTOS =====
     
@@ -180,38 +138,38 @@ class WebhookService:
         Returns:
             Número de endpoints notificados
         """
-        # Encontrar endpoints inscritos
-        endpoints = [
-            ep for ep in self._endpoints.values()
-            if ep.is_active and ep.subscribes_to(event.type)
-            and (event.organization_id is None or ep.organization_id == event.organization_id)
-        ]
+        # Endpoints inscritos (índice por organização e tipo de evento)
+        endpoints = await self._endpoints.subscribers(event.organization_id, event.type)
         
         if not endpoints:
             logger.debug("webhook_no_subscribers", event_type=event.type.value)
             return 0
         
-        # Criar entregas
+        # Criar entregas (o payload do evento é serializado uma única vez)
         deliveries = [
             WebhookDelivery(
                 event=event,
                 endpoint_url=ep.url,
-                secret=ep.secret
+                secret=ep.secret,
+                endpoint_id=ep.id,
+                organization_id=ep.organization_id
             )
             for ep in endpoints
         ]
         
         if sync:
-            # Entregar sincronamente
+            # Entregar sincronamente (HMAC calculado uma vez por secret)
+            signatures = SignatureCache()
+            for delivery in deliveries:
+                delivery.signature = signatures.get(event, delivery.secret)
             results = await asyncio.gather(
                 *[d.deliver() for d in deliveries],
                 return_exceptions=True
             )
             return sum(1 for r in results if r is True)
         else:
-            # Enfileirar para entrega assíncrona
-            for delivery in deliveries:
-                await self._delivery_queue.put(delivery)
+            # Persistir no outbox; qualquer pod pode entregar
+            await self._outbox.enqueue(deliveries)
             
             logger.info(
                 "webhook_events_queued",
@@ -221,6 +179,30 @@ class WebhookService:
             
             return len(deliveries)
     
+    # ===== ENTREGAS =====
+    
+    async def list_deliveries(
+        self,
+        org_id: int,
+        status: Optional[DeliveryStatus] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> list[WebhookDelivery]:
+        """Histórico de entregas (status=FAILED = dead-letter)."""
+        return await self._outbox.list_deliveries(org_id, status, limit, offset)
+    
+    async def get_delivery(self, delivery_id: str) -> Optional[WebhookDelivery]:
+        """Obtém registro de entrega por ID."""
+        return await self._outbox.get_delivery(delivery_id)
+    
+    async def replay_delivery(self, delivery_id: str, org_id: int) -> Optional[WebhookDelivery]:
+        """Reenfileira uma entrega."""
+        return await self._outbox.replay(delivery_id, org_id)
+    
+    async def replay_dead_letters(self, org_id: int, limit: int = 100) -> int:
+        """Reenfileira entregas do dead-letter. Returns: quantas."""
+        return await self._outbox.replay_dead(org_id, limit)
+    
     # ===== HELPERS =====
     
     async def emit_agent_processed(
@@ -1,6 +1,7 @@
 """
 Tool: Document Importer
-Importa documentos fiscais (DANFe, DACTe) de PDFs usando Docling.
+Importa documentos fiscais (DANFe, DACTe) de PDFs usando Docling,
+ou direto do XML autorizado de NF-e/CT-e (sem OCR).
 
 Risk Level: MEDIUM (extrai e pode criar registros no sistema)
 
@@ -8,20 +9,49 @@ Docling é uma biblioteca da IBM para extração de dados de PDFs
 com alta precisão em tabelas (97.9%).
 """
 
-import base64
+import asyncio
+import os
+import zipfile
 from typing import Any, Optional
 
 from src.core.guardrails import GuardrailLevel
 from src.core.observability import get_logger, get_observability
 from src.services.document_processing import (
+    DanfeData,
     DanfeExtractor,
+    DacteData,
     DacteExtractor,
+    FiscalXmlParser,
+    FiscalXmlResult,
+    ImportSourceNotAllowedError,
+    SpooledFile,
+    UploadTooLargeError,
     get_docling_processor,
+    get_upload_spool,
+    is_xml_source,
+    is_zip_source,
+    resolve_import_source,
 )
+from src.services.tasks import TaskConfig, get_task_queue
 
 logger = get_logger(__name__)
 obs = get_observability()
 
+# Tipo do XML -> document_type da tool
+XML_KIND_TO_TYPE = {"nfe": "danfe", "cte": "dacte"}
+
+# Lotes com PDFs: timeout da task
+BULK_IMPORT_TIMEOUT = int(os.getenv("BULK_IMPORT_TIMEOUT", "14400"))
+
+
+def _zip_has_pdfs(zip_path: str) -> bool:
+    """O .zip contém PDFs (precisa de OCR, vai para a fila)."""
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            return any(name.lower().endswith(".pdf") for name in archive.namelist())
+    except zipfile.BadZipFile:
+        return False
+
 
 class DocumentImporterTool:
     """Importa documentos fiscais de PDFs usando Docling."""
@@ -42,12 +72,18 @@ class DocumentImporterTool:
     
     Parâmetros:
     - document_type: "danfe", "dacte" ou "auto" (default: auto)
-    - file_path: Caminho do arquivo PDF local
-    - file_base64: Conteúdo do PDF em base64 (alternativa)
+    - file_path: Caminho do arquivo local (PDF, XML, .zip ou diretório)
+    - file_base64: Conteúdo do arquivo em base64 (alternativa; arquivos
+      grandes: POST /v1/documents/import, upload em streaming)
     - validate_sefaz: Validar chave na SEFAZ (default: True)
     - create_record: Criar registro no sistema (default: False)
     - dry_run: Apenas extrair sem criar registro (default: True)
     
+    XML autorizado de NF-e/CT-e (procNFe, cteProc) é lido direto, sem
+    OCR, com confiança 1.0. Um .zip só de XMLs é importado na hora;
+    diretório ou .zip com PDFs vira uma task em background (retorna
+    task_id; progresso e resultado por documento em /tasks/{task_id}).
+    
     Retorna:
     - Dados extraídos do documento
     - Score de confiança da extração
@@ -59,6 +95,8 @@ class DocumentImporterTool:
         self.processor = get_docling_processor()
         self.danfe_extractor = DanfeExtractor(self.processor)
         self.dacte_extractor = DacteExtractor(self.processor)
+        self.xml_parser = FiscalXmlParser()
+        self.spool = get_upload_spool()
     
     async def run(
         self,
@@ -98,9 +136,6 @@ class DocumentImporterTool:
             }
         )
         
-        errors: list[str] = []
-        warnings: list[str] = []
-        
         # Validar input
         if not any([file_path, file_base64, file_url]):
             return {
@@ -109,41 +144,114 @@ class DocumentImporterTool:
                 "message": "Nenhuma fonte de documento fornecida"
             }
         
-        # Decodificar base64 se fornecido
-        file_content: Optional[bytes] = None
-        filename = "document.pdf"
+        # URL não suportada ainda
+        if file_url and not file_path and not file_base64:
+            return {
+                "success": False,
+                "errors": ["URL não suportada ainda"],
+                "message": "Use file_path ou file_base64"
+            }
         
+        # base64: decodificado em blocos direto para o spool de uploads
+        # (sem os bytes inteiros em memória nem segundo arquivo temporário)
         if file_base64:
             try:
-                file_content = base64.b64decode(file_base64)
-            except Exception as e:
+                spooled = await asyncio.to_thread(
+                    self.spool.write_base64, file_base64, "document.pdf"
+                )
+            except UploadTooLargeError as e:
+                return {
+                    "success": False,
+                    "errors": [str(e)],
+                    "message": "Arquivo muito grande"
+                }
+            except ValueError as e:
                 return {
                     "success": False,
                     "errors": [f"Erro ao decodificar base64: {e}"],
                     "message": "Base64 inválido"
                 }
+            return await self.import_spooled(
+                spooled, document_type, validate_sefaz, create_record, dry_run,
+                organization_id, branch_id
+            )
         
-        # URL não suportada ainda
-        if file_url and not file_path and not file_content:
-            return {
-                "success": False,
-                "errors": ["URL não suportada ainda"],
-                "message": "Use file_path ou file_base64"
-            }
+        # Lote com PDFs (diretório ou .zip): importação em background
+        if os.path.isdir(file_path):
+            return await self._enqueue_bulk(file_path, document_type, organization_id, branch_id)
+        
+        # XML autorizado (ou .zip de XMLs): leitura direta, sem OCR
+        if is_zip_source(file_path, None):
+            if await asyncio.to_thread(_zip_has_pdfs, file_path):
+                return await self._enqueue_bulk(file_path, document_type, organization_id, branch_id)
+            return await self._import_xml_batch(file_path)
+        if is_xml_source(file_path, None):
+            return await self._import_xml(
+                file_path, document_type, validate_sefaz, create_record, dry_run
+            )
+        
+        return await self._import_pdf(
+            file_path, document_type, validate_sefaz, create_record, dry_run
+        )
+    
+    async def import_spooled(
+        self,
+        spooled: SpooledFile,
+        document_type: str = "auto",
+        validate_sefaz: bool = True,
+        create_record: bool = False,
+        dry_run: bool = True,
+        organization_id: Optional[int] = None,
+        branch_id: Optional[int] = None
+    ) -> dict[str, Any]:
+        """
+        Importa um arquivo do spool de uploads e o remove ao final.
+        
+        Usado pelo upload em streaming (POST /v1/documents/import) e pelo
+        file_base64. O tipo vem dos primeiros bytes; num lote com PDFs o
+        arquivo fica para a task, que o remove ao terminar.
+        """
+        remove = True
+        try:
+            if is_zip_source(None, spooled.head):
+                if await asyncio.to_thread(_zip_has_pdfs, spooled.path):
+                    # A task apaga o .zip do spool ao terminar
+                    response = await self._enqueue_bulk(
+                        spooled.path, document_type, organization_id, branch_id
+                    )
+                    remove = False
+                    return response
+                return await self._import_xml_batch(spooled.path)
+            if is_xml_source(None, spooled.head):
+                return await self._import_xml(
+                    spooled.path, document_type, validate_sefaz, create_record, dry_run
+                )
+            return await self._import_pdf(
+                spooled.path, document_type, validate_sefaz, create_record, dry_run,
+                content_hash=spooled.sha256
+            )
+        finally:
+            if remove:
+                await asyncio.to_thread(spooled.remove)
+    
+    # ===== PDF (Docling) =====
+    
+    async def _import_pdf(
+        self,
+        file_path: str,
+        document_type: str,
+        validate_sefaz: bool,
+        create_record: bool,
+        dry_run: bool,
+        content_hash: Optional[str] = None
+    ) -> dict[str, Any]:
+        """Importa DANFe/DACTe em PDF (conversão pelo Docling)."""
+        warnings: list[str] = []
         
         try:
             # Extrair dados baseado no tipo
             if document_type in ["danfe", "auto"]:
-                if file_content:
-                    result = await self.danfe_extractor.extract_from_bytes(file_content, filename)
-                elif file_path:
-                    result = await self.danfe_extractor.extract_from_file(file_path)
-                else:
-                    return {
-                        "success": False,
-                        "errors": ["Nenhum conteúdo de arquivo fornecido"],
-                        "message": "Forneça file_path ou file_base64"
-                    }
+                result = await self.danfe_extractor.extract_from_file(file_path, content_hash)
                 
                 if not result.success:
                     return {
@@ -152,82 +260,14 @@ class DocumentImporterTool:
                         "message": "Falha ao extrair dados do documento"
                     }
                 
-                data = result.data
-                if data:
-                    warnings.extend(data.warnings)
-                    
-                    # Formatar output
-                    extracted = {
-                        "document_type": "NFE",
-                        "access_key": data.chave_acesso,
-                        "number": data.numero,
-                        "series": data.serie,
-                        "issue_date": data.data_emissao,
-                        "issuer_document": data.emitente.cnpj if data.emitente else None,
-                        "issuer_name": data.emitente.razao_social if data.emitente else None,
-                        "recipient_document": data.destinatario.documento if data.destinatario else None,
-                        "recipient_name": data.destinatario.nome if data.destinatario else None,
-                        "total_products": float(data.valor_produtos),
-                        "total_value": float(data.valor_total),
-                        "icms_value": float(data.icms_valor),
-                        "items_count": len(data.itens),
-                        "items": [
-                            {
-                                "codigo": item.codigo,
-                                "descricao": item.descricao,
-                                "quantidade": float(item.quantidade),
-                                "valor_total": float(item.valor_total)
-                            }
-                            for item in data.itens[:10]  # Limitar a 10 itens
-                        ],
-                        "confidence_score": data.confidence_score,
-                        "warnings": data.warnings
-                    }
-                    
-                    # Validar na SEFAZ (simulado por enquanto)
-                    sefaz_valid = None
-                    sefaz_status = None
-                    
-                    if validate_sefaz and data.chave_acesso:
-                        # Integração real com SEFAZ será implementada
-                        sefaz_valid = True
-                        sefaz_status = "Autorizada (simulado)"
-                        warnings.append("Validação SEFAZ simulada - integração real pendente")
-                    
-                    # Criar registro (se solicitado e não dry_run)
-                    created_id = None
-                    if create_record and not dry_run:
-                        # Integração com API do AuraCore será implementada
-                        created_id = None
-                        warnings.append("Criação de registro não implementada ainda")
-                    
-                    chave_preview = data.chave_acesso[:20] + "..." if data.chave_acesso else "N/A"
-                    
-                    # Registrar métrica de sucesso
-                    obs.record_document_import("danfe", "success")
-                    
-                    return {
-                        "success": True,
-                        "extracted_data": extracted,
-                        "created_record_id": created_id,
-                        "sefaz_valid": sefaz_valid,
-                        "sefaz_status": sefaz_status,
-                        "warnings": warnings,
-                        "message": f"DANFe extraída. Chave: {chave_preview} Confiança: {data.confidence_score:.0%}"
-                    }
+                if result.data:
+                    return self._success_response(
+                        "danfe", result.data, warnings, validate_sefaz, create_record, dry_run
+                    )
             
             elif document_type == "dacte":
                 # Extrair DACTe
-                if file_content:
-                    result = await self.dacte_extractor.extract_from_bytes(file_content, filename)
-                elif file_path:
-                    result = await self.dacte_extractor.extract_from_file(file_path)
-                else:
-                    return {
-                        "success": False,
-                        "errors": ["Nenhum conteúdo de arquivo fornecido"],
-                        "message": "Forneça file_path ou file_base64"
-                    }
+                result = await self.dacte_extractor.extract_from_file(file_path, content_hash)
                 
                 if not result.success:
                     return {
@@ -236,61 +276,10 @@ class DocumentImporterTool:
                         "message": "Falha ao extrair dados do DACTe"
                     }
                 
-                data = result.data
-                if data:
-                    warnings.extend(data.warnings)
-                    
-                    # Formatar output para DACTe/CTe
-                    extracted = {
-                        "document_type": "CTE",
-                        "access_key": data.chave_acesso,
-                        "number": data.numero,
-                        "series": data.serie,
-                        "issue_date": data.data_emissao,
-                        "cfop": data.cfop,
-                        "modal": data.modal,
-                        "issuer_document": data.emitente.cnpj if data.emitente else None,
-                        "issuer_name": data.emitente.razao_social if data.emitente else None,
-                        "sender_document": data.remetente.documento if data.remetente else None,
-                        "sender_name": data.remetente.nome if data.remetente else None,
-                        "recipient_document": data.destinatario.documento if data.destinatario else None,
-                        "recipient_name": data.destinatario.nome if data.destinatario else None,
-                        "cargo_value": float(data.carga.valor_carga) if data.carga else None,
-                        "cargo_weight": float(data.carga.peso_bruto) if data.carga else None,
-                        "total_value": float(data.valor_total_servico),
-                        "icms_value": float(data.valor_icms),
-                        "linked_nfes": data.nfes_vinculadas[:10],  # Limitar a 10
-                        "linked_nfes_count": len(data.nfes_vinculadas),
-                        "vehicle_plate": data.veiculo.placa if data.veiculo else None,
-                        "route_start_uf": data.uf_inicio,
-                        "route_end_uf": data.uf_fim,
-                        "confidence_score": data.confidence_score,
-                        "warnings": data.warnings
-                    }
-                    
-                    # Validar na SEFAZ (simulado)
-                    sefaz_valid = None
-                    sefaz_status = None
-                    
-                    if validate_sefaz and data.chave_acesso:
-                        sefaz_valid = True
-                        sefaz_status = "Autorizada (simulado)"
-                        warnings.append("Validação SEFAZ simulada - integração real pendente")
-                    
-                    chave_preview = data.chave_acesso[:20] + "..." if data.chave_acesso else "N/A"
-                    
-                    # Registrar métrica de sucesso
-                    obs.record_document_import("dacte", "success")
-                    
-                    return {
-                        "success": True,
-                        "extracted_data": extracted,
-                        "created_record_id": None,
-                        "sefaz_valid": sefaz_valid,
-                        "sefaz_status": sefaz_status,
-                        "warnings": warnings,
-                        "message": f"DACTe extraído. Chave: {chave_preview} Confiança: {data.confidence_score:.0%}"
-                    }
+                if result.data:
+                    return self._success_response(
+                        "dacte", result.data, warnings, validate_sefaz, create_record, dry_run
+                    )
             
             else:
                 return {
@@ -308,3 +297,257 @@ class DocumentImporterTool:
                 "errors": [str(e)],
                 "message": "Erro ao processar documento"
             }
+    
+    # ===== LOTE =====
+    
+    async def _enqueue_bulk(
+        self,
+        source_path: str,
+        document_type: str,
+        organization_id: Optional[int],
+        branch_id: Optional[int]
+    ) -> dict[str, Any]:
+        """Enfileira importação em lote; progresso via GET /tasks/{task_id}."""
+        try:
+            resolve_import_source(source_path, self.spool)
+        except ImportSourceNotAllowedError as e:
+            return {
+                "success": False,
+                "errors": [str(e)],
+                "message": "Configure DOCUMENT_IMPORT_DIRS ou envie o arquivo por upload"
+            }
+        
+        queue = get_task_queue()
+        task_id = await queue.enqueue(
+            "import_documents_task",
+            config=TaskConfig(
+                timeout=BULK_IMPORT_TIMEOUT, max_retries=0, org_id=organization_id
+            ),
+            source_path=source_path,
+            document_type=document_type,
+            org_id=organization_id,
+            branch_id=branch_id
+        )
+        
+        logger.info(
+            "bulk_import_enqueued",
+            extra={"task_id": task_id, "source_path": source_path}
+        )
+        
+        return {
+            "success": True,
+            "source": "batch",
+            "task_id": task_id,
+            "status": "queued",
+            "message": f"Importação em lote enfileirada. Progresso em /tasks/{task_id}"
+        }
+    
+    # ===== XML (NF-e / CT-e) =====
+    
+    async def _import_xml(
+        self,
+        file_path: str,
+        document_type: str,
+        validate_sefaz: bool,
+        create_record: bool,
+        dry_run: bool
+    ) -> dict[str, Any]:
+        """Importa um XML de NF-e/CT-e (confiança 1.0, sem Docling)."""
+        result = await asyncio.to_thread(self._parse_xml_file, file_path)
+        
+        if not result.success:
+            obs.record_document_import("xml", "error")
+            return {
+                "success": False,
+                "errors": [result.error or "Erro na leitura do XML"],
+                "message": "Falha ao ler XML fiscal"
+            }
+        
+        kind = XML_KIND_TO_TYPE[result.kind]
+        if document_type not in ("auto", kind):
+            return {
+                "success": False,
+                "errors": [f"XML é {kind}, mas document_type={document_type}"],
+                "message": "Tipo de documento não confere com o XML"
+            }
+        
+        return self._success_response(
+            kind, result.data, [], validate_sefaz, create_record, dry_run, source="xml"
+        )
+    
+    def _parse_xml_file(self, file_path: str) -> FiscalXmlResult:
+        with open(file_path, "rb") as f:
+            return self.xml_parser.parse(f, file_path)
+    
+    async def _import_xml_batch(self, source: Any) -> dict[str, Any]:
+        """
+        Importa um .zip de XMLs de NF-e/CT-e.
+        
+        Lê os membros um a um em thread separada (o zip pode ter milhares
+        de documentos) e retorna um resumo com os documentos lidos.
+        """
+        def read_all() -> list[FiscalXmlResult]:
+            return list(self.xml_parser.iter_zip(source))
+        
+        try:
+            results = await asyncio.to_thread(read_all)
+        except zipfile.BadZipFile as e:
+            return {
+                "success": False,
+                "errors": [f"Arquivo zip inválido: {e}"],
+                "message": "Falha ao abrir lote de XMLs"
+            }
+        
+        documents = []
+        errors = []
+        seen: set[str] = set()
+        duplicates = 0
+        
+        for result in results:
+            if not result.success:
+                errors.append({"file": result.source, "error": result.error})
+                continue
+            if result.data.chave_acesso in seen:
+                duplicates += 1
+                continue
+            seen.add(result.data.chave_acesso)
+            
+            kind = XML_KIND_TO_TYPE[result.kind]
+            formatter = self._format_danfe if kind == "danfe" else self._format_dacte
+            documents.append({"file": result.source, **formatter(result.data, max_items=0)})
+            obs.record_document_import(kind, "success")
+        
+        logger.info(
+            "xml_batch_imported",
+            extra={
+                "documents": len(documents),
+                "errors": len(errors),
+                "duplicates": duplicates
+            }
+        )
+        
+        return {
+            "success": bool(documents) or not errors,
+            "source": "xml",
+            "total_files": len(results),
+            "imported": len(documents),
+            "duplicates": duplicates,
+            "failed": len(errors),
+            "documents": documents,
+            "errors": errors,
+            "message": (
+                f"Lote XML: {len(documents)} documentos importados, "
+                f"{duplicates} duplicados, {len(errors)} com erro"
+            )
+        }
+    
+    # ===== Formatação =====
+    
+    @staticmethod
+    def _format_danfe(data: DanfeData, max_items: int = 10) -> dict[str, Any]:
+        """Dados da DANFe/NF-e no formato de saída da tool."""
+        return {
+            "document_type": "NFE",
+            "access_key": data.chave_acesso,
+            "number": data.numero,
+            "series": data.serie,
+            "issue_date": data.data_emissao,
+            "issuer_document": data.emitente.cnpj if data.emitente else None,
+            "issuer_name": data.emitente.razao_social if data.emitente else None,
+            "recipient_document": data.destinatario.documento if data.destinatario else None,
+            "recipient_name": data.destinatario.nome if data.destinatario else None,
+            "total_products": float(data.valor_produtos),
+            "total_value": float(data.valor_total),
+            "icms_value": float(data.icms_valor),
+            "items_count": len(data.itens),
+            "items": [
+                {
+                    "codigo": item.codigo,
+                    "descricao": item.descricao,
+                    "quantidade": float(item.quantidade),
+                    "valor_total": float(item.valor_total)
+                }
+                for item in data.itens[:max_items]
+            ],
+            "confidence_score": data.confidence_score,
+            "warnings": data.warnings
+        }
+    
+    @staticmethod
+    def _format_dacte(data: DacteData, max_items: int = 10) -> dict[str, Any]:
+        """Dados do DACTe/CT-e no formato de saída da tool."""
+        return {
+            "document_type": "CTE",
+            "access_key": data.chave_acesso,
+            "number": data.numero,
+            "series": data.serie,
+            "issue_date": data.data_emissao,
+            "cfop": data.cfop,
+            "modal": data.modal,
+            "issuer_document": data.emitente.cnpj if data.emitente else None,
+            "issuer_name": data.emitente.razao_social if data.emitente else None,
+            "sender_document": data.remetente.documento if data.remetente else None,
+            "sender_name": data.remetente.nome if data.remetente else None,
+            "recipient_document": data.destinatario.documento if data.destinatario else None,
+            "recipient_name": data.destinatario.nome if data.destinatario else None,
+            "cargo_value": float(data.carga.valor_carga) if data.carga else None,
+            "cargo_weight": float(data.carga.peso_bruto) if data.carga else None,
+            "total_value": float(data.valor_total_servico),
+            "icms_value": float(data.valor_icms),
+            "linked_nfes": data.nfes_vinculadas[:max_items],
+            "linked_nfes_count": len(data.nfes_vinculadas),
+            "vehicle_plate": data.veiculo.placa if data.veiculo else None,
+            "route_start_uf": data.uf_inicio,
+            "route_end_uf": data.uf_fim,
+            "confidence_score": data.confidence_score,
+            "warnings": data.warnings
+        }
+    
+    def _success_response(
+        self,
+        kind: str,
+        data: Any,
+        warnings: list[str],
+        validate_sefaz: bool,
+        create_record: bool,
+        dry_run: bool,
+        source: str = "pdf"
+    ) -> dict[str, Any]:
+        """Resposta de sucesso comum a DANFe/DACTe (PDF ou XML)."""
+        warnings.extend(data.warnings)
+        extracted = (
+            self._format_danfe(data) if kind == "danfe" else self._format_dacte(data)
+        )
+        
+        # Validar na SEFAZ (simulado por enquanto)
+        sefaz_valid = None
+        sefaz_status = None
+        
+        if validate_sefaz and data.chave_acesso:
+            # Integração real com SEFAZ será implementada
+            sefaz_valid = True
+            sefaz_status = "Autorizada (simulado)"
+            warnings.append("Validação SEFAZ simulada - integração real pendente")
+        
+        # Criar registro (se solicitado e não dry_run)
+        created_id = None
+        if kind == "danfe" and create_record and not dry_run:
+            # Integração com API do AuraCore será implementada
+            warnings.append("Criação de registro não implementada ainda")
+        
+        chave_preview = data.chave_acesso[:20] + "..." if data.chave_acesso else "N/A"
+        label = "DANFe extraída" if kind == "danfe" else "DACTe extraído"
+        
+        # Registrar métrica de sucesso
+        obs.record_document_import(kind, "success")
+        
+        return {
+            "success": True,
+            "source": source,
+            "extracted_data": extracted,
+            "created_record_id": created_id,
+            "sefaz_valid": sefaz_valid,
+            "sefaz_status": sefaz_status,
+            "warnings": warnings,
+            "message": f"{label}. Chave: {chave_preview} Confiança: {data.confidence_score:.0%}"
+        }
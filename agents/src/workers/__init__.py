@@ -0,0 +1,7 @@
+"""
+Funções executadas em processos worker.
+
+Os módulos deste pacote são importados pelos processos filhos (spawn) e
+por isso não dependem de src.core nem de src.services: um worker carrega
+apenas o que precisa para o job, não a aplicação inteira.
+"""
@@ -0,0 +1,106 @@
+"""
+Conversão Docling dentro de um processo worker.
+
+init_worker roda uma vez por processo e deixa o DocumentConverter
+carregado (modelos de OCR e estrutura de tabela); convert_document usa
+esse converter e devolve apenas tipos simples (str, int, listas), que
+passam por pickle para o processo principal e por JSON para o cache de
+resultados.
+"""
+
+import os
+from typing import Any, Optional
+import structlog
+
+logger = structlog.get_logger()
+
+try:
+    from docling.document_converter import DocumentConverter
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions
+    DOCLING_AVAILABLE = True
+except ImportError:
+    DOCLING_AVAILABLE = False
+    DocumentConverter = None
+    InputFormat = None
+    PdfPipelineOptions = None
+
+# Converter aquecido do processo atual
+_converter: Optional["DocumentConverter"] = None
+
+
+def build_converter() -> "DocumentConverter":
+    """Cria DocumentConverter com OCR e estrutura de tabelas."""
+    if not DOCLING_AVAILABLE:
+        raise RuntimeError("Docling não está instalado")
+
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.do_ocr = True
+    pipeline_options.do_table_structure = True
+
+    return DocumentConverter(
+        allowed_formats=[InputFormat.PDF, InputFormat.IMAGE],
+        pipeline_options=pipeline_options
+    )
+
+
+def init_worker(cache_dir: str) -> None:
+    """Initializer do pool: carrega o converter antes do primeiro job."""
+    global _converter
+    os.environ.setdefault("DOCLING_CACHE_DIR", cache_dir)
+    if DOCLING_AVAILABLE and _converter is None:
+        _converter = build_converter()
+        logger.info("docling_worker_ready", pid=os.getpid())
+
+
+def _table_rows(table: Any) -> list[list[str]]:
+    """Tabela como lista de linhas de texto (primeira linha = cabeçalho)."""
+    try:
+        df = table.export_to_dataframe()
+        return [
+            [str(col) for col in df.columns.tolist()],
+            *[[str(cell) for cell in row] for row in df.values.tolist()],
+        ]
+    except Exception:
+        try:
+            return [[str(cell) for cell in row] for row in table.data]
+        except TypeError:
+            return []
+
+
+def convert_document(file_path: str, extract_tables: bool = True) -> dict[str, Any]:
+    """
+    Converte um documento no processo atual.
+
+    Returns:
+        Dict com text, markdown, tables e pages
+    """
+    global _converter
+    if _converter is None:
+        _converter = build_converter()
+
+    result = _converter.convert(file_path)
+
+    tables = []
+    if extract_tables:
+        for table in result.document.tables:
+            rows = _table_rows(table)
+            table_data = {
+                "rows": len(rows),
+                "cols": len(rows[0]) if rows else 0,
+                "data": rows,
+            }
+            if getattr(table, 'caption', None) is not None:
+                table_data["caption"] = str(table.caption)
+            tables.append(table_data)
+
+    pages = getattr(result.document, "num_pages", None)
+    if callable(pages):
+        pages = pages()
+
+    return {
+        "text": result.document.export_to_text(),
+        "markdown": result.document.export_to_markdown(),
+        "tables": tables,
+        "pages": pages,
+    }
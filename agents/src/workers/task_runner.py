@@ -0,0 +1,36 @@
+"""
+Execução de tasks CPU-bound dentro de um processo worker.
+
+O TaskWorker local envia para cá as tasks de CPU_BOUND_TASKS, que
+travariam o event loop das demais. Diferente do docling_worker, as
+tasks usam serviços da aplicação: init_worker importa src.core antes
+das definições (mesma ordem da aplicação, evita o import circular
+services -> core), uma vez por processo, não na importação deste módulo.
+"""
+
+import asyncio
+import os
+from typing import Any, Callable, Optional
+import structlog
+
+logger = structlog.get_logger()
+
+# Funções de task do processo atual (nome -> função)
+_functions: Optional[dict[str, Callable[..., Any]]] = None
+
+
+def init_worker() -> None:
+    """Initializer do pool: carrega as definições de tasks."""
+    global _functions
+    if _functions is None:
+        import src.core  # noqa: F401
+        from src.services.tasks.task_definitions import TASK_FUNCTIONS
+
+        _functions = {func.__name__: func for func in TASK_FUNCTIONS}
+        logger.info("task_runner_ready", pid=os.getpid())
+
+
+def run_task(task_name: str, task_id: str, kwargs: dict, ctx: dict) -> Any:
+    """Executa a task num event loop próprio e devolve o resultado (pickle)."""
+    init_worker()
+    return asyncio.run(_functions[task_name](ctx, _task_id=task_id, **kwargs))
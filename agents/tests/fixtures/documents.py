@@ -5,7 +5,9 @@ Fixtures de documentos.
 
 import pytest
 import base64
+import json
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, Any
 
 
@@ -125,3 +127,35 @@ def synthesis_result() -> Dict[str, Any]:
         "duration_seconds": 2.0,
         "sample_rate": 24000
     }
+
+
+# ===== Corpus de textos DANFe/DACTe (anonimizados) =====
+
+FISCAL_TEXTS_DIR = Path(__file__).parent / "fiscal_texts"
+
+
+@pytest.fixture(scope="session")
+def fiscal_text_corpus() -> Dict[str, str]:
+    """Textos extraídos de DANFe/DACTe (dados fictícios), por nome do arquivo."""
+    return {
+        path.stem: path.read_text(encoding="utf-8")
+        for path in sorted(FISCAL_TEXTS_DIR.glob("*.txt"))
+    }
+
+
+@pytest.fixture(scope="session")
+def fiscal_text_expected() -> Dict[str, Dict[str, Any]]:
+    """Valores esperados de cada documento do corpus."""
+    return json.loads((FISCAL_TEXTS_DIR / "expected.json").read_text(encoding="utf-8"))
+
+
+@pytest.fixture
+def sample_danfe_text(fiscal_text_corpus) -> str:
+    """Texto de uma DANFe completa."""
+    return fiscal_text_corpus["danfe_01"]
+
+
+@pytest.fixture
+def sample_dacte_text(fiscal_text_corpus) -> str:
+    """Texto de um DACTe completo."""
+    return fiscal_text_corpus["dacte_01"]
@@ -0,0 +1,55 @@
+# agents/tests/load/test_extraction_benchmark.py
+"""
+Benchmark da extração de campos de DANFe/DACTe.
+
+Roda os extratores sobre o corpus de tests/fixtures/fiscal_texts
+(textos maiores simulam documentos de várias páginas) e reporta
+documentos por segundo.
+
+    pytest tests/load/test_extraction_benchmark.py -m load -s
+"""
+
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.services.document_processing.dacte_extractor import DacteExtractor
+from src.services.document_processing.danfe_extractor import DanfeExtractor
+from src.services.document_processing.docling_processor import ProcessedDocument
+
+
+ROUNDS = 200
+# Repetição do corpo do documento (DACTe com dezenas de NF-e, DANFe longa)
+PAGES = 20
+
+
+class TestExtractionBenchmark:
+    """Throughput da extração sobre o corpus."""
+
+    @pytest.mark.slow
+    @pytest.mark.load
+    def test_extraction_throughput(self, fiscal_text_corpus) -> None:
+        """Extração de um documento de várias páginas deve levar poucos ms."""
+        danfe = DanfeExtractor(processor=MagicMock())
+        dacte = DacteExtractor(processor=MagicMock())
+
+        docs = [
+            (
+                dacte if name.startswith("dacte") else danfe,
+                ProcessedDocument(success=True, text="\n".join([text] * PAGES), markdown=""),
+            )
+            for name, text in fiscal_text_corpus.items()
+        ]
+
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            for extractor, doc in docs:
+                assert extractor._extract_data(doc).success
+        elapsed = time.perf_counter() - start
+
+        total = ROUNDS * len(docs)
+        per_doc_ms = elapsed / total * 1000
+        print(f"\nExtração: {total} docs em {elapsed:.2f}s ({per_doc_ms:.3f} ms/doc)")
+
+        assert per_doc_ms < 20
@@ -0,0 +1,329 @@
+# agents/tests/services/test_analytics.py
+"""
+Testes de analytics (cache local, sem Redis).
+"""
+
+import pytest
+from datetime import date, datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+from src.services.cache.redis_cache import RedisCache
+from src.services.analytics.event_tracker import EventTracker
+from src.services.analytics.usage_aggregator import UsageAggregator
+from src.services.analytics import rollups
+from src.services.analytics.sketches import LatencySketch
+from src.services.analytics import columnar_sink
+from src.services.analytics.columnar_sink import ColumnarSink, PYARROW_AVAILABLE
+from src.services.analytics.events import AnalyticsEvent, EventType
+from src.services.analytics.analytics_service import _quarter_range
+
+
+@pytest.fixture
+def local_cache():
+    """RedisCache forçado para o fallback local."""
+    cache = RedisCache()
+    cache._use_local = True
+    return cache
+
+
+@pytest.fixture
+def tracker(local_cache):
+    with patch("src.services.analytics.event_tracker.get_cache", return_value=local_cache):
+        yield EventTracker()
+
+
+@pytest.fixture
+def aggregator(local_cache):
+    with patch("src.services.analytics.usage_aggregator.get_cache", return_value=local_cache):
+        yield UsageAggregator()
+
+
+class TestEventIngestion:
+    """Testes da ingestão append-only."""
+
+    @pytest.mark.unit
+    async def test_flushes_append_per_branch(self, tracker, aggregator):
+        for i in range(5):
+            await tracker.track_agent_response(1, 1, "fiscal", 100.0, 10, 20)
+        await tracker.track_agent_response(1, 2, "fiscal", 100.0, 10, 20)
+        await tracker._flush()
+        await tracker.track_agent_response(1, 1, "fiscal", 100.0, 10, 20)
+        await tracker._flush()
+
+        stats = await aggregator.get_daily_stats(1, 1, datetime.utcnow())
+
+        assert stats.total_requests == 6
+        assert stats.total_tokens_input == 60
+        assert tracker.get_stats()["flushed"] == 7
+
+    @pytest.mark.unit
+    async def test_failed_flush_requeues(self, tracker, local_cache):
+        await tracker.track_agent_request(1, 1, "fiscal")
+
+        with patch.object(local_cache, "write_batch", AsyncMock(side_effect=ConnectionError)):
+            await tracker._flush()
+
+        assert tracker.get_stats()["buffered"] == 1
+        assert tracker.get_stats()["flush_errors"] == 1
+
+        await tracker._flush()
+        assert tracker.get_stats() == {
+            "buffered": 0, "flushed": 1, "dropped": 0, "flush_errors": 1
+        }
+
+    @pytest.mark.unit
+    async def test_full_buffer_counts_drops(self, tracker, local_cache):
+        tracker.MAX_BUFFER_SIZE = 3
+        tracker.BATCH_SIZE = 100
+        tracker.BACKPRESSURE_TIMEOUT = 0.01
+
+        with patch.object(local_cache, "write_batch", AsyncMock(side_effect=ConnectionError)):
+            for _ in range(5):
+                await tracker.track_agent_request(1, 1, "fiscal")
+
+        stats = tracker.get_stats()
+        assert stats["buffered"] == 3
+        assert stats["dropped"] == 2
+
+
+class TestRollups:
+    """Testes dos rollups pré-agregados."""
+
+    @pytest.mark.unit
+    def test_bucket_plan_uses_days_inside_and_hours_at_edges(self):
+        start = datetime(2026, 1, 1, 22, 30)
+        end = datetime(2026, 1, 4, 1, 15)
+
+        keys = rollups.bucket_keys(1, 1, start, end)
+
+        assert keys == [
+            "analytics:rollup:h:1:1:2026-01-01T22",
+            "analytics:rollup:h:1:1:2026-01-01T23",
+            "analytics:rollup:d:1:1:2026-01-02",
+            "analytics:rollup:d:1:1:2026-01-03",
+            "analytics:rollup:h:1:1:2026-01-04T00",
+            "analytics:rollup:h:1:1:2026-01-04T01",
+        ]
+
+    @pytest.mark.unit
+    async def test_rollups_match_raw_aggregation(self, tracker, aggregator, local_cache):
+        for i in range(6):
+            await tracker.track_agent_response(
+                1, 1, "fiscal" if i % 2 else "financeiro", 100.0 * (i + 1), 10, 20,
+                success=i != 5, user_id=f"u{i % 2}"
+            )
+            await tracker.track_tool_call(1, 1, "fiscal", "calculate_icms", 40.0, success=i != 0)
+        await tracker._flush()
+
+        today = datetime.utcnow()
+        stats = await aggregator.get_daily_stats(1, 1, today)
+        raw = aggregator._aggregate_events(
+            await aggregator.get_day_events(1, 1, today, limit=100), today, today
+        )
+
+        assert stats.requests_by_agent == raw.requests_by_agent == {"fiscal": 2, "financeiro": 3}
+        assert stats.total_errors == raw.total_errors == 2
+        assert stats.calls_by_tool == {"calculate_icms": 6}
+        assert stats.latency_by_agent == raw.latency_by_agent
+        assert stats.active_users == 2
+
+        top = await aggregator.get_top_tools(1, 1, today - timedelta(days=1), today)
+        assert top[0]["calls"] == 6 and top[0]["errors"] == 1
+        assert top[0]["p50_latency_ms"] == pytest.approx(40.0, rel=0.02)
+
+    @pytest.mark.unit
+    async def test_legacy_blob_still_counted(self, aggregator, local_cache):
+        today = datetime.utcnow()
+        await local_cache.set_json(f"analytics:1:{today.strftime('%Y-%m-%d')}", [
+            {"type": "agent.request", "branch_id": 1, "agent_name": "fiscal"},
+            {"type": "agent.request", "branch_id": 2, "agent_name": "fiscal"},
+        ])
+
+        stats = await aggregator.get_daily_stats(1, 1, today)
+
+        assert stats.requests_by_agent == {"fiscal": 1}
+
+
+class TestLatencySketch:
+    """Testes do sketch de quantis."""
+
+    @pytest.mark.unit
+    def test_quantiles_within_relative_error(self):
+        sketch = LatencySketch()
+        values = [float(v) for v in range(1, 10001)]
+        for v in values:
+            sketch.add(v)
+
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            assert sketch.quantile(q) == pytest.approx(exact, rel=LatencySketch.RELATIVE_ACCURACY)
+        assert len(sketch.to_fields()) < 500
+
+    @pytest.mark.unit
+    def test_merge_equals_single_sketch(self):
+        a, b, both = LatencySketch(), LatencySketch(), LatencySketch()
+        for v in range(1, 500):
+            (a if v % 2 else b).add(v * 3.7)
+            both.add(v * 3.7)
+
+        a.merge(LatencySketch.from_fields(b.to_fields()))
+
+        assert a.bins == both.bins
+        assert a.percentiles() == both.percentiles()
+
+
+@pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow não instalado")
+class TestColumnarSink:
+    """Testes do sink colunar (Parquet local)."""
+
+    @pytest.mark.unit
+    async def test_columnar_stats_match_rollups(self, tracker, local_cache, tmp_path):
+        sink = ColumnarSink(str(tmp_path))
+        tracker.add_callback(sink.add)
+
+        for i in range(6):
+            await tracker.track_agent_response(
+                1, 1, "fiscal" if i % 2 else "financeiro", 100.0 * (i + 1), 10, 20,
+                success=i != 5, user_id=f"u{i % 2}"
+            )
+            await tracker.track_tool_call(1, 1, "fiscal", "calculate_icms", 40.0 + i, success=i != 0)
+        await tracker.track_agent_response(2, 1, "fiscal", 100.0, 10, 20)
+        await tracker.track_agent_response(1, 2, "fiscal", 100.0, 10, 20)
+        await tracker._flush()
+        assert await sink.roll() == 14
+
+        today = datetime.utcnow()
+        with patch("src.services.analytics.usage_aggregator.get_cache", return_value=local_cache):
+            aggregator = UsageAggregator(columnar_sink=sink)
+        rollup_stats = await aggregator.get_daily_stats(1, 1, today)
+        columnar_stats = await aggregator.get_period_stats(
+            1, 1,
+            datetime.combine(today, datetime.min.time()),
+            datetime.combine(today, datetime.max.time()),
+            source="columnar"
+        )
+
+        for attr in (
+            "total_requests", "total_tokens_input", "total_errors", "requests_by_agent",
+            "errors_by_tool", "calls_by_tool", "requests_by_user",
+            "latency_percentiles_by_agent", "latency_percentiles_by_tool",
+        ):
+            assert getattr(columnar_stats, attr) == getattr(rollup_stats, attr), attr
+        assert columnar_stats.latency_by_agent == pytest.approx(rollup_stats.latency_by_agent)
+
+    @pytest.mark.unit
+    async def test_failed_roll_keeps_buffer_bounded(self, tracker, tmp_path):
+        sink = ColumnarSink(str(tmp_path))
+        sink.MAX_BUFFER_SIZE = 3
+        tracker.add_callback(sink.add)
+
+        for _ in range(2):
+            await tracker.track_agent_request(1, 1, "fiscal")
+        with patch.object(sink, "_write", side_effect=OSError("disk full")):
+            assert await sink.roll() == 0
+        for _ in range(3):
+            await tracker.track_agent_request(1, 1, "fiscal")
+
+        assert sink.get_stats() == {
+            "buffered": 3, "rolled": 0, "dropped": 2, "roll_errors": 1
+        }
+        assert await sink.roll() == 3
+
+    @staticmethod
+    def _files(base, org_id: int, day: date) -> list[str]:
+        directory = base / f"org_id={org_id}" / f"day={day.isoformat()}"
+        return sorted(path.name for path in directory.iterdir())
+
+    @pytest.mark.unit
+    async def test_query_lists_only_org_days_and_compacts_closed_days(self, tmp_path):
+        sink = ColumnarSink(str(tmp_path))
+        today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+        yesterday = today - timedelta(days=1)
+
+        # Vários rolls: um part-* por roll e dia; outra org com um mês de dados
+        for when in (yesterday, yesterday, today, today):
+            for org_id in (1, 2):
+                await sink.add(AnalyticsEvent(
+                    id=f"{org_id}-{when}-{len(sink._buffer)}",
+                    type=EventType.AGENT_REQUEST,
+                    timestamp=when,
+                    organization_id=org_id,
+                    branch_id=1,
+                    agent_name="fiscal",
+                ))
+            await sink.roll()
+        for offset in range(2, 30):
+            await sink.add(AnalyticsEvent(
+                id=f"old-{offset}", type=EventType.AGENT_REQUEST,
+                timestamp=today - timedelta(days=offset), organization_id=2, branch_id=1
+            ))
+        await sink.roll()
+
+        start = datetime.combine(yesterday.date(), datetime.min.time())
+        end = datetime.combine(today.date(), datetime.max.time())
+        with patch.object(
+            columnar_sink.pafs, "FileSelector", wraps=columnar_sink.pafs.FileSelector
+        ) as selector:
+            before = await sink.query_totals(1, 1, start, end)
+        listed = [call.args[0] for call in selector.call_args_list]
+        assert listed[0] == f"{tmp_path}/org_id=1"
+        assert all(path.startswith(f"{tmp_path}/org_id=1") for path in listed)
+        assert len(listed) == 3  # org + dois dias do período
+        assert before["requests"] == 4
+
+        assert len(self._files(tmp_path, 1, yesterday.date())) == 2
+        assert await sink.compact() == 2  # ontem das orgs 1 e 2
+        [compacted] = self._files(tmp_path, 1, yesterday.date())
+        assert compacted.startswith("compacted-") and compacted.endswith(".parquet")
+        assert len(self._files(tmp_path, 1, today.date())) == 2  # dia aberto
+        assert await sink.compact() == 0
+        assert await sink.query_totals(1, 1, start, end) == before
+
+    @pytest.mark.unit
+    async def test_interrupted_compaction_is_finished(self, tmp_path):
+        sink = ColumnarSink(str(tmp_path))
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        for i in range(3):
+            await sink.add(AnalyticsEvent(
+                id=str(i), type=EventType.AGENT_REQUEST, timestamp=yesterday,
+                organization_id=1, branch_id=1, agent_name="fiscal"
+            ))
+            await sink.roll()
+        day = datetime.combine(yesterday.date(), datetime.min.time())
+
+        # Parou depois de gravar o .ready e apagar só um dos parts
+        with patch.object(sink, "_finish_compaction", side_effect=RuntimeError("crash")):
+            with pytest.raises(RuntimeError):
+                await sink.compact()
+        directory = tmp_path / "org_id=1" / f"day={yesterday.date().isoformat()}"
+        parts = sorted(directory.glob("part-*.parquet"))
+        parts[0].unlink()
+
+        assert await sink.compact() == 1
+        [compacted] = self._files(tmp_path, 1, yesterday.date())
+        assert compacted.endswith(".parquet")
+        totals = await sink.query_totals(1, 1, day, day + timedelta(days=1))
+        assert totals["requests"] == 3
+
+    @pytest.mark.unit
+    async def test_columnar_source_requires_sink(self, aggregator):
+        aggregator._columnar = None
+        today = datetime.utcnow()
+
+        with pytest.raises(RuntimeError):
+            await aggregator.get_period_stats(1, 1, today, today, source="columnar")
+
+
+class TestReportPeriods:
+    """Testes dos intervalos de relatório."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("ref, first, last", [
+        (date(2026, 2, 14), date(2026, 1, 1), date(2026, 3, 31)),
+        (date(2026, 6, 30), date(2026, 4, 1), date(2026, 6, 30)),
+        (date(2026, 11, 5), date(2026, 10, 1), date(2026, 12, 31)),
+    ])
+    def test_quarter_range(self, ref, first, last):
+        start, end = _quarter_range(ref)
+        assert start == datetime.combine(first, datetime.min.time())
+        assert end == datetime.combine(last, datetime.max.time())
@@ -0,0 +1,433 @@
+# agents/tests/services/test_audit_storage.py
+"""
+Testes do storage de audit logs (cache local, sem Redis).
+"""
+
+import asyncio
+import pytest
+import json
+import uuid
+import zlib
+from datetime import datetime, time, timedelta
+from unittest.mock import patch
+
+from src.services.cache.redis_cache import RedisCache
+from src.services.audit.audit_storage import AuditStorage, AuditQuery
+from src.services.audit.audit_events import AuditEvent, AuditAction, AuditResource
+from src.services.audit.audit_export import AuditExporter
+from src.services.audit.audit_checkpoints import merkle_root, merkle_proof, verify_merkle_proof
+from src.services.audit import audit_codec
+
+
+def make_event(i: int = 0, **kwargs) -> AuditEvent:
+    """Cria evento de teste."""
+    data = {
+        "id": str(uuid.uuid4()),
+        "organization_id": 1,
+        "branch_id": 1,
+        "action": AuditAction.CREATE,
+        "resource": AuditResource.NFE,
+        "resource_id": str(i),
+        "actor_id": f"user_{i % 3}",
+    }
+    data.update(kwargs)
+    return AuditEvent(**data)
+
+
+@pytest.fixture
+def local_cache():
+    """RedisCache forçado para o fallback local."""
+    cache = RedisCache()
+    cache._use_local = True
+    return cache
+
+
+@pytest.fixture
+def storage(local_cache, tmp_path):
+    """Storage com segmentos em diretório temporário."""
+    with patch("src.services.audit.audit_storage.get_cache", return_value=local_cache):
+        yield AuditStorage(segment_dir=str(tmp_path))
+
+
+@pytest.fixture
+def period():
+    now = datetime.utcnow()
+    return now - timedelta(days=1), now + timedelta(days=1)
+
+
+class TestAuditAppend:
+    """Testes do append-only com hash chain."""
+
+    @pytest.mark.unit
+    async def test_append_links_chain(self, storage, period):
+        first = await storage.append(make_event(1))
+        second = await storage.append(make_event(2))
+
+        assert first.previous_hash is None
+        assert second.previous_hash == first.hash
+
+        is_valid, errors = await storage.verify_chain_integrity(1, 1, *period)
+        assert is_valid, errors
+
+    @pytest.mark.unit
+    async def test_new_instance_continues_chain(self, storage, local_cache, period):
+        last = await storage.append(make_event(1))
+
+        with patch("src.services.audit.audit_storage.get_cache", return_value=local_cache):
+            other = AuditStorage()
+        event = await other.append(make_event(2))
+
+        assert event.previous_hash == last.hash
+
+    @pytest.mark.unit
+    async def test_segments_written_in_order(self, storage):
+        events = [await storage.append(make_event(i)) for i in range(5)]
+        day = events[0].timestamp.strftime("%Y-%m-%d")
+
+        ids = [data["id"] for data in storage._segments.iter_day(1, 1, day)]
+        assert ids == [e.id for e in events]
+
+    @pytest.mark.unit
+    async def test_concurrent_appends_keep_segment_chain_order(self, storage):
+        """Appends simultâneos: segmento na mesma ordem da hash chain."""
+        segment_append = storage._segments.append
+
+        async def jittered_append(event):
+            # Escrita em disco com latência variável
+            await asyncio.sleep(int(event.hash[:2], 16) % 5 / 1000)
+            await segment_append(event)
+
+        with patch.object(storage._segments, "append", jittered_append):
+            events = await asyncio.gather(*(storage.append(make_event(i)) for i in range(50)))
+        day = events[0].timestamp.strftime("%Y-%m-%d")
+
+        stored = list(storage._segments.iter_day(1, 1, day))
+        assert len(stored) == 50
+        for previous, current in zip(stored, stored[1:]):
+            assert current["previous_hash"] == previous["hash"]
+
+    @pytest.mark.unit
+    async def test_segment_chain_survives_redis_loss(self, storage, tmp_path):
+        events = [await storage.append(make_event(i)) for i in range(3)]
+        empty_cache = RedisCache()
+        empty_cache._use_local = True
+
+        with patch("src.services.audit.audit_storage.get_cache", return_value=empty_cache):
+            restarted = AuditStorage(segment_dir=str(tmp_path))
+        start = events[0].timestamp - timedelta(minutes=1)
+        is_valid, errors = await restarted.verify_chain_integrity(1, 1, start, datetime.utcnow())
+        event = await restarted.append(make_event(3))
+
+        assert is_valid and errors == []
+        assert event.previous_hash == events[-1].hash
+
+    @pytest.mark.unit
+    async def test_backdated_event_partitioned_after_head(self, storage, local_cache):
+        """Evento de dia anterior ao head (inclusive de outro pod) vai para o dia do head."""
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        first = await storage.append(make_event(1, timestamp=yesterday))
+
+        with patch("src.services.audit.audit_storage.get_cache", return_value=local_cache):
+            other = AuditStorage()
+        head = await other.append(make_event(2))
+        late = await storage.append(make_event(3, timestamp=yesterday))
+
+        assert late.previous_hash == head.hash
+        assert late.timestamp == head.timestamp and late.verify_integrity()
+        days = {
+            day: await local_cache.lrange(storage._day_list_key(1, 1, day), 0, -1)
+            for day in (yesterday.strftime("%Y-%m-%d"), head.timestamp.strftime("%Y-%m-%d"))
+        }
+        assert list(days.values()) == [[first.id], [head.id, late.id]]
+        is_valid, errors = await storage.verify_chain_integrity(
+            1, 1, yesterday - timedelta(minutes=1), datetime.utcnow()
+        )
+        assert is_valid, errors
+
+
+class TestAuditCodec:
+    """Testes do codec binário e do hash sob demanda."""
+
+    @pytest.mark.unit
+    def test_binary_roundtrip_keeps_stored_hash(self):
+        events = [
+            make_event(i, old_value={"v": i}, metadata={"ç": "ã"}, success=bool(i % 2))
+            for i in range(3)
+        ]
+        events[1].hash = "stored"
+
+        buffer = audit_codec.encode_many(events)
+        decoded = list(audit_codec.decode_batch(buffer + buffer[:10]))
+
+        assert [e.to_dict() for e in decoded] == [e.to_dict() for e in events]
+        assert not decoded[1].verify_integrity()
+        assert audit_codec.decode(audit_codec.encode(events[0])) == events[0]
+
+    @pytest.mark.unit
+    def test_corrupt_record_skipped_not_aborting(self):
+        events = [make_event(i) for i in range(3)]
+        records = [bytearray(audit_codec.encode(e)) for e in events]
+        records[1][4] = 99  # versão inválida
+        records[1][-20:] = b"\xff" * 20
+
+        decoded = list(audit_codec.decode_batch(b"".join(records)))
+
+        assert [e.id for e in decoded] == [events[0].id, events[2].id]
+
+    @pytest.mark.unit
+    async def test_torn_tail_truncated_before_next_append(self, storage):
+        first, second = make_event(1), make_event(2)
+        await storage._segments.append(first)
+        day = first.timestamp.strftime("%Y-%m-%d")
+        path = storage._segments.segment_path(1, 1, day)
+        with open(path, "ab") as f:
+            f.write(audit_codec.encode(make_event(9))[:15])
+
+        fresh = type(storage._segments)(str(storage._segments.base_dir))
+        await fresh.append(second)
+
+        events = await fresh.read_day(1, 1, day)
+        assert [e.id for e in events] == [first.id, second.id]
+
+    @pytest.mark.unit
+    def test_hash_is_lazy_and_then_fixed(self):
+        event = make_event()
+        event.previous_hash = "abc"
+        first = event.hash
+
+        event.resource_id = "changed"
+
+        assert event.hash == first
+        assert not event.verify_integrity()
+        assert AuditEvent.from_dict({**event.to_dict(), "hash": None}).hash is None
+
+
+class TestAuditQuery:
+    """Testes da query indexada com paginação por cursor."""
+
+    @pytest.fixture
+    async def populated(self, storage):
+        base = datetime.utcnow() - timedelta(hours=1)
+        for i in range(20):
+            await storage.append(make_event(
+                i,
+                id=f"evt_{i:03d}",
+                # 4 eventos por segundo: força empates de score
+                timestamp=base + timedelta(seconds=i // 4),
+                action=AuditAction.CREATE if i % 2 else AuditAction.READ,
+            ))
+        return storage
+
+    async def _collect(self, storage, **filters):
+        ids, cursor = [], None
+        while True:
+            page = await storage.query_page(AuditQuery(
+                organization_id=1, branch_id=1, page_size=3, cursor=cursor, **filters
+            ))
+            ids.extend(e.id for e in page.events)
+            cursor = page.next_cursor
+            if not cursor:
+                return ids, page.total
+
+    @pytest.mark.unit
+    async def test_cursor_pagination_covers_all(self, populated):
+        ids, total = await self._collect(populated)
+
+        assert total == 20
+        assert len(ids) == len(set(ids)) == 20
+        assert ids[0] == "evt_019"
+
+    @pytest.mark.unit
+    async def test_filtered_count_and_pages(self, populated):
+        ids, total = await self._collect(populated, action=AuditAction.CREATE, actor_id="user_1")
+
+        assert total == len(ids) == 4
+        assert ids == ["evt_019", "evt_013", "evt_007", "evt_001"]
+
+    @pytest.mark.unit
+    async def test_intersection_plan_matches_scan(self, populated):
+        scan_ids, _ = await self._collect(populated, action=AuditAction.READ, actor_id="user_0")
+        populated.SCAN_THRESHOLD = 0
+        intersect_ids, _ = await self._collect(populated, action=AuditAction.READ, actor_id="user_0")
+
+        assert scan_ids == intersect_ids
+
+
+class TestAuditIndexBackfill:
+    """Testes do backfill de índices para eventos anteriores a eles."""
+
+    @pytest.mark.unit
+    async def test_backfill_indexes_pre_index_events_and_chains(self, storage, period):
+        cache = storage._cache
+        base = datetime.utcnow() - timedelta(hours=2)
+        # Formato antigo: lista do dia (org 1) e array JSON (org 2), sem índices
+        for org_id, day_key in ((1, "audit:log"), (2, "audit:day")):
+            events = [
+                make_event(i, organization_id=org_id, timestamp=base + timedelta(minutes=i))
+                for i in range(3)
+            ]
+            for event in events:
+                await cache.set_json(f"audit:event:{event.id}", event.to_dict())
+            key = f"{day_key}:{org_id}:1:{base.strftime('%Y-%m-%d')}"
+            if day_key == "audit:log":
+                await cache.rpush(key, *[e.id for e in events])
+            else:
+                await cache.set_json(key, [e.id for e in events])
+
+        query = AuditQuery(organization_id=2, branch_id=1, start_date=period[0])
+        assert (await storage.query_page(query)).total == 0
+
+        assert await storage.backfill_indexes() == 6
+        assert await storage.backfill_indexes() == 0
+
+        page = await storage.query_page(query)
+        assert page.total == 3
+        assert await storage.list_chains() == [(1, 1), (2, 1)]
+
+
+    """Testes do export em streaming."""
+
+    @staticmethod
+    def _records(data: bytes) -> list[dict]:
+        records = []
+        while data:
+            decompressor = zlib.decompressobj(wbits=31)
+            out = decompressor.decompress(data)
+            records.extend(json.loads(line) for line in out.decode().splitlines())
+            data = decompressor.unused_data
+        return records
+
+    @pytest.fixture
+    async def populated(self, storage):
+        base = datetime.utcnow() - timedelta(days=2)
+        for i in range(12):
+            await storage.append(make_event(i, timestamp=base + timedelta(hours=4 * i)))
+        return storage, base
+
+    @pytest.mark.unit
+    async def test_ndjson_stream_verifies_chain(self, populated):
+        storage, base = populated
+        exporter = AuditExporter(storage)
+        job = await exporter.start(1, 1, base, datetime.utcnow())
+
+        records = self._records(b"".join([c async for c in exporter.stream(job)]))
+
+        assert records[0]["type"] == "header"
+        assert sum(r["type"] == "event" for r in records) == 12
+        assert records[-1]["type"] == "trailer"
+        assert records[-1]["chain_integrity"]["valid"] is True
+
+    @pytest.mark.unit
+    async def test_resume_from_checkpoint(self, populated):
+        storage, base = populated
+        exporter = AuditExporter(storage)
+        job = await exporter.start(1, 1, base, datetime.utcnow())
+
+        # Cliente recebe só o primeiro dia e a conexão cai
+        stream = exporter.stream(job)
+        first_day = await stream.__anext__()
+        await stream.aclose()
+        received = self._records(first_day)
+        token = received[-1]["resume_token"]
+
+        resumed = await exporter.start(1, 1, base, datetime.utcnow(), resume_token=token)
+        rest = self._records(b"".join([c async for c in exporter.stream(resumed)]))
+
+        events = [r for r in received + rest if r["type"] == "event"]
+        assert len(events) == len({r["event"]["id"] for r in events}) == 12
+        assert rest[-1]["chain_integrity"]["valid"] is True
+
+
+class TestAuditCheckpoints:
+    """Testes dos checkpoints Merkle."""
+
+    @pytest.fixture
+    async def sealed(self, storage):
+        # 4 eventos em cada um de dois dias fechados
+        base = datetime.combine((datetime.utcnow() - timedelta(days=3)).date(), time(1))
+        events = [
+            await storage.append(make_event(i, timestamp=base + timedelta(hours=6 * i)))
+            for i in range(8)
+        ]
+        assert await storage.checkpoints.checkpoint_pending() == 2
+        return storage, base, events
+
+    @pytest.mark.unit
+    def test_merkle_proofs_all_leaves(self):
+        hashes = [f"{i:064x}" for i in range(7)]
+        root = merkle_root(hashes)
+
+        for i, leaf in enumerate(hashes):
+            path = merkle_proof(hashes, i)
+            assert len(path) <= 3
+            assert verify_merkle_proof(leaf, path, root)
+        assert not verify_merkle_proof(hashes[0], merkle_proof(hashes, 1), root)
+
+    @pytest.mark.unit
+    async def test_verify_sealed_days_by_marker(self, sealed):
+        """Dias selados sem append desde o checkpoint: nenhum evento lido."""
+        storage, base, events = sealed
+
+        with patch.object(
+            storage, "iter_day_events", wraps=storage.iter_day_events
+        ) as iter_day_events, patch(
+            "src.services.audit.audit_checkpoints.ChainVerifier.feed_segment",
+            autospec=True,
+            return_value=True
+        ) as feed_segment:
+            is_valid, errors = await storage.verify_chain_integrity(1, 1, base, datetime.utcnow())
+
+        assert is_valid, errors
+        assert feed_segment.call_count == 2
+        read_days = {call.args[2] for call in iter_day_events.call_args_list}
+        assert not read_days & {base.strftime("%Y-%m-%d"), (base + timedelta(days=1)).strftime("%Y-%m-%d")}
+
+    @pytest.mark.unit
+    async def test_day_without_marker_read_once_then_marked(self, sealed):
+        """Dia gravado antes dos marcadores: uma passada, depois O(1)."""
+        storage, base, events = sealed
+        day = base.strftime("%Y-%m-%d")
+        await storage._cache.delete(storage._day_marker_key(1, 1, day))
+
+        for expected_reads in (1, 0):
+            with patch.object(
+                storage, "iter_day_events", wraps=storage.iter_day_events
+            ) as iter_day_events:
+                is_valid, errors = await storage.verify_chain_integrity(
+                    1, 1, base, base + timedelta(hours=1)
+                )
+            assert is_valid, errors
+            assert iter_day_events.call_count == expected_reads
+
+    @pytest.mark.unit
+    async def test_append_to_sealed_day_detected_without_deep(self, sealed):
+        """Append num dia selado muda o marcador: o dia é lido e a raiz acusa."""
+        storage, base, events = sealed
+
+        await storage.append(make_event(99, timestamp=base + timedelta(hours=2)))
+
+        is_valid, errors = await storage.verify_chain_integrity(1, 1, base, datetime.utcnow())
+
+        assert not is_valid
+        assert any("changed since checkpoint" in e for e in errors)
+
+    @pytest.mark.unit
+    async def test_tampered_event_detected_by_proof_and_deep(self, sealed):
+        storage, base, events = sealed
+        target = events[1]
+
+        proof = await storage.checkpoints.prove_event(target.id, 1, 1)
+        assert storage.checkpoints.verify_proof(proof)
+
+        data = target.to_dict()
+        data["actor_id"] = "intruder"
+        await storage._cache.set_json(f"audit:event:{target.id}", data)
+
+        proof = await storage.checkpoints.prove_event(target.id, 1, 1)
+        assert not storage.checkpoints.verify_proof(proof)
+
+        is_valid, errors = await storage.verify_chain_integrity(
+            1, 1, base, datetime.utcnow(), deep=True
+        )
+        assert not is_valid
+        assert any("changed since checkpoint" in e for e in errors)
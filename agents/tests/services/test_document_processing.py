@@ -3,6 +3,15 @@
 Testes dos serviços de processamento de documentos (Docling, DANFe, DACTe).
 """
 
+import asyncio
+import base64
+import hashlib
+import io
+import operator
+import os
+import time
+import zipfile
+
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
 from decimal import Decimal
@@ -10,6 +19,23 @@ from decimal import Decimal
 from src.services.document_processing.danfe_extractor import DanfeExtractor
 from src.services.document_processing.dacte_extractor import DacteExtractor
 from src.services.document_processing.docling_processor import DoclingProcessor
+from src.services.document_processing.conversion_pool import ConversionPool
+from src.services.document_processing.conversion_cache import ConversionCache
+from src.services.document_processing.fiscal_xml import FiscalXmlParser
+from src.services.document_processing.bulk_importer import (
+    BulkDocumentImporter,
+    ImportSourceNotAllowedError,
+    resolve_import_source,
+)
+from src.services.document_processing.docling_processor import ProcessedDocument
+from src.services.document_processing.text_index import TextIndex
+from src.services.document_processing.upload_spool import UploadSpool, UploadTooLargeError
+from src.services.document_processing.multipart_upload import (
+    MultipartUpload,
+    MultipartUploadError,
+)
+from src.services.document_processing import docling_processor
+from src.services.document_processing.docling_processor import ProcessingOptions
 
 
 class TestDoclingProcessor:
@@ -33,6 +59,552 @@ class TestDoclingProcessor:
         assert hasattr(processor, 'process_file') or hasattr(processor, 'process_bytes')
 
 
+class TestConversionPool:
+    """Testes do pool de processos (funções da stdlib como jobs)."""
+    
+    @pytest.mark.unit
+    async def test_job_runs_off_event_loop(self):
+        """Job bloqueante não trava o event loop."""
+        pool = ConversionPool(workers=1, job_timeout=30)
+        ticks = 0
+        
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        
+        task = asyncio.create_task(ticker())
+        try:
+            await pool.run(time.sleep, 0.5)
+            assert await pool.run(operator.add, 2, 3) == 5
+        finally:
+            task.cancel()
+            pool.shutdown()
+        
+        assert ticks >= 20
+    
+    @pytest.mark.unit
+    async def test_timeout_recycles_pool(self):
+        """Job que estoura o timeout recicla o pool; o próximo funciona."""
+        pool = ConversionPool(workers=1, job_timeout=30)
+        try:
+            await pool.run(os.getpid)  # aquecer
+            
+            with pytest.raises(TimeoutError):
+                await pool.run(time.sleep, 30, timeout=0.5)
+            
+            assert await pool.run(operator.add, 1, 2) == 3
+        finally:
+            pool.shutdown()
+        
+        stats = pool.get_stats()
+        assert stats["timeouts"] == 1
+        assert stats["recycles"] == 1
+        assert stats["completed"] == 2
+    
+    @pytest.mark.unit
+    async def test_workers_recycled_after_max_tasks(self):
+        """max_tasks_per_child troca o processo worker."""
+        pool = ConversionPool(workers=1, max_tasks_per_child=2)
+        try:
+            pids = [await pool.run(os.getpid) for _ in range(4)]
+        finally:
+            pool.shutdown()
+        
+        assert len(set(pids)) == 2
+    
+    @pytest.mark.unit
+    async def test_queue_depth(self):
+        """Jobs além do número de workers aguardam na fila."""
+        pool = ConversionPool(workers=1, job_timeout=30)
+        try:
+            jobs = [asyncio.create_task(pool.run(time.sleep, 0.3)) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            
+            stats = pool.get_stats()
+            assert stats["running"] == 1
+            assert stats["queue_depth"] == 2
+            
+            await asyncio.gather(*jobs)
+        finally:
+            pool.shutdown()
+        
+        assert pool.get_stats()["queue_depth"] == 0
+
+
+class TestConversionCache:
+    """Testes do cache de resultados por conteúdo."""
+    
+    @pytest.mark.unit
+    async def test_roundtrip_and_options_in_key(self, tmp_path):
+        """Resultado volta igual; opções diferentes geram outra chave."""
+        cache = ConversionCache(str(tmp_path))
+        key = cache.key("abc", ProcessingOptions())
+        data = {"text": "NF-e 123", "markdown": "# NF-e", "tables": [[["a", "b"]]], "metadata": {}}
+        
+        assert await cache.get(key) is None
+        await cache.put(key, data)
+        
+        assert await cache.get(key) == data
+        assert cache.key("abc", ProcessingOptions(extract_tables=False)) != key
+        assert cache.get_stats()["hits"] == 1
+    
+    @pytest.mark.unit
+    async def test_lru_eviction(self, tmp_path):
+        """Acima do limite, remove os menos usados recentemente."""
+        cache = ConversionCache(str(tmp_path))
+        payload = {"text": os.urandom(600).hex()}
+        
+        for i in range(3):
+            await cache.put(f"k{i}", payload)
+            if i == 0:
+                # Cabem 3 entradas e meia
+                cache.max_bytes = int(cache._path("k0").stat().st_size * 3.5)
+            # Gravadas no passado, em ordem
+            past = time.time() - 100 + i
+            os.utime(cache._path(f"k{i}"), (past, past))
+        
+        # k0 lido agora: deixa de ser o menos usado
+        await cache.get("k0")
+        
+        await cache.put("k3", payload)
+        
+        assert await cache.get("k1") is None
+        assert await cache.get("k0") is not None
+        assert await cache.get("k3") is not None
+        assert cache.get_stats()["evictions"] >= 1
+    
+    @pytest.mark.unit
+    async def test_repeat_upload_skips_conversion(self, tmp_path):
+        """Segundo envio do mesmo conteúdo não chama o pool."""
+        pool = MagicMock()
+        pool.run = AsyncMock(return_value={
+            "text": "DANFE",
+            "markdown": "# DANFE",
+            "tables": [],
+            "pages": 1
+        })
+        processor = DoclingProcessor(
+            cache_dir=str(tmp_path),
+            pool=pool,
+            result_cache=ConversionCache(str(tmp_path))
+        )
+        
+        with patch.object(docling_processor, "DOCLING_AVAILABLE", True):
+            first = await processor.process_bytes(b"%PDF-1.4 danfe", "a.pdf")
+            second = await processor.process_bytes(b"%PDF-1.4 danfe", "b.pdf")
+        
+        assert pool.run.await_count == 1
+        assert first.success and second.success
+        assert second.text == "DANFE"
+        assert second.metadata["cache_hit"] is True
+        assert second.metadata["file_name"] == "b.pdf"
+
+
+NFE_CHAVE = "35240112345678000195550010000001231234567890"
+CTE_CHAVE = "35240198765432000110570010000004561234567890"
+
+NFE_XML = f"""<?xml version="1.0" encoding="UTF-8"?>
+<nfeProc xmlns="http://www.portalfiscal.inf.br/nfe" versao="4.00">
+  <NFe>
+    <infNFe Id="NFe{NFE_CHAVE}" versao="4.00">
+      <ide><serie>1</serie><nNF>123</nNF><dhEmi>2024-01-15T10:30:00-03:00</dhEmi></ide>
+      <emit>
+        <CNPJ>12345678000195</CNPJ><xNome>EMPRESA TESTE LTDA</xNome>
+        <enderEmit><xLgr>RUA A</xLgr><nro>10</nro><xMun>SAO PAULO</xMun><UF>SP</UF></enderEmit>
+      </emit>
+      <dest><CPF>12345678909</CPF><xNome>CLIENTE TESTE</xNome></dest>
+      <det nItem="1">
+        <prod>
+          <cProd>P001</cProd><xProd>PARAFUSO</xProd><NCM>73181500</NCM><CFOP>5102</CFOP>
+          <uCom>UN</uCom><qCom>10.0000</qCom><vUnCom>1.50</vUnCom><vProd>15.00</vProd>
+        </prod>
+        <imposto><ICMS><ICMS00><vBC>15.00</vBC><pICMS>18.00</pICMS><vICMS>2.70</vICMS></ICMS00></ICMS></imposto>
+      </det>
+      <total><ICMSTot><vBC>15.00</vBC><vICMS>2.70</vICMS><vProd>15.00</vProd><vNF>15.00</vNF></ICMSTot></total>
+    </infNFe>
+  </NFe>
+  <protNFe versao="4.00">
+    <infProt><chNFe>{NFE_CHAVE}</chNFe><nProt>135240000000001</nProt><cStat>100</cStat></infProt>
+  </protNFe>
+</nfeProc>"""
+
+CTE_XML = f"""<?xml version="1.0" encoding="UTF-8"?>
+<cteProc xmlns="http://www.portalfiscal.inf.br/cte" versao="4.00">
+  <CTe>
+    <infCte Id="CTe{CTE_CHAVE}" versao="4.00">
+      <ide>
+        <CFOP>5353</CFOP><natOp>PRESTACAO DE SERVICO</natOp><serie>1</serie><nCT>456</nCT>
+        <dhEmi>2024-01-16T08:00:00-03:00</dhEmi><modal>01</modal><tpCTe>0</tpCTe>
+        <UFIni>SP</UFIni><UFFim>RJ</UFFim>
+      </ide>
+      <emit><CNPJ>98765432000110</CNPJ><xNome>TRANSPORTADORA TESTE</xNome></emit>
+      <rem><CNPJ>12345678000195</CNPJ><xNome>EMPRESA TESTE LTDA</xNome></rem>
+      <dest><CPF>12345678909</CPF><xNome>CLIENTE TESTE</xNome></dest>
+      <vPrest><vTPrest>350.00</vTPrest><vRec>350.00</vRec></vPrest>
+      <imp><ICMS><ICMS00><vBC>350.00</vBC><pICMS>12.00</pICMS><vICMS>42.00</vICMS></ICMS00></ICMS></imp>
+      <infCTeNorm>
+        <infCarga>
+          <vCarga>15.00</vCarga><proPred>PARAFUSOS</proPred>
+          <infQ><cUnid>01</cUnid><tpMed>PESO BRUTO</tpMed><qCarga>120.5000</qCarga></infQ>
+        </infCarga>
+        <infDoc><infNFe><chave>{NFE_CHAVE}</chave></infNFe></infDoc>
+        <infModal versaoModal="4.00"><rodo><RNTRC>12345678</RNTRC></rodo></infModal>
+      </infCTeNorm>
+    </infCte>
+  </CTe>
+  <protCTe versao="4.00">
+    <infProt><chCTe>{CTE_CHAVE}</chCTe><nProt>135240000000002</nProt><cStat>100</cStat></infProt>
+  </protCTe>
+</cteProc>"""
+
+
+class TestFiscalXmlParser:
+    """Testes da leitura direta de XML de NF-e/CT-e."""
+    
+    @pytest.fixture
+    def parser(self):
+        return FiscalXmlParser()
+    
+    @pytest.mark.unit
+    def test_parse_nfe(self, parser):
+        """procNFe gera DanfeData completa com confiança 1.0."""
+        result = parser.parse(NFE_XML.encode())
+        
+        assert result.success, result.error
+        assert result.kind == "nfe"
+        data = result.data
+        assert data.chave_acesso == NFE_CHAVE
+        assert data.numero == "123"
+        assert data.data_emissao == "15/01/2024"
+        assert data.emitente.cnpj == "12345678000195"
+        assert data.destinatario.documento == "12345678909"
+        assert len(data.itens) == 1
+        assert data.itens[0].quantidade == Decimal("10.0000")
+        assert data.itens[0].icms_valor == Decimal("2.70")
+        assert data.valor_total == Decimal("15.00")
+        assert data.confidence_score == 1.0
+        assert data.warnings == []
+    
+    @pytest.mark.unit
+    def test_parse_cte(self, parser):
+        """cteProc gera DacteData; infNFe de infDoc não muda o tipo."""
+        result = parser.parse(CTE_XML)
+        
+        assert result.success, result.error
+        assert result.kind == "cte"
+        data = result.data
+        assert data.chave_acesso == CTE_CHAVE
+        assert data.cfop == "5353"
+        assert data.modal == "RODOVIARIO"
+        assert data.remetente.documento == "12345678000195"
+        assert data.valor_total_servico == Decimal("350.00")
+        assert data.valor_icms == Decimal("42.00")
+        assert data.carga.peso_bruto == Decimal("120.5000")
+        assert data.nfes_vinculadas == [NFE_CHAVE]
+    
+    @pytest.mark.unit
+    def test_parse_without_protocol_and_invalid(self, parser):
+        """Sem protocolo gera warning; XML quebrado ou de outro tipo falha."""
+        unsigned = NFE_XML.split("<protNFe")[0] + "</nfeProc>"
+        result = parser.parse(unsigned)
+        assert result.success
+        assert result.data.warnings == ["XML sem protocolo de autorização"]
+        
+        assert not parser.parse(b"<nfeProc><NFe>").success
+        assert not parser.parse(b"<pedido><id>1</id></pedido>").success
+    
+    @pytest.mark.unit
+    def test_iter_zip(self, parser):
+        """Lote .zip é lido membro a membro, ignorando não-XML."""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("janeiro/nfe.xml", NFE_XML)
+            archive.writestr("janeiro/cte.XML", CTE_XML)
+            archive.writestr("janeiro/quebrado.xml", "<nfeProc>")
+            archive.writestr("leia-me.txt", "ignorar")
+        buffer.seek(0)
+        
+        results = {r.source: r for r in parser.iter_zip(buffer)}
+        
+        assert set(results) == {"janeiro/nfe.xml", "janeiro/cte.XML", "janeiro/quebrado.xml"}
+        assert results["janeiro/nfe.xml"].kind == "nfe"
+        assert results["janeiro/cte.XML"].kind == "cte"
+        assert not results["janeiro/quebrado.xml"].success
+
+
+class TestUploadSpool:
+    """Testes do spool de uploads (streaming direto para disco)."""
+    
+    @pytest.mark.unit
+    def test_base64_decoded_in_chunks(self, tmp_path):
+        """base64 com quebras de linha, decodificado em blocos pequenos."""
+        content = b"%PDF-1.4 " + bytes(range(256)) * 40
+        encoded = base64.encodebytes(content).decode()  # linhas de 76 chars
+        spool = UploadSpool(str(tmp_path))
+        spool.BASE64_CHUNK = 8
+        
+        spooled = spool.write_base64(encoded, "document")
+        
+        with open(spooled.path, "rb") as f:
+            assert f.read() == content
+        assert spooled.sha256 == hashlib.sha256(content).hexdigest()
+        assert spooled.size == len(content)
+        assert spooled.path.endswith(".pdf")
+        assert spooled.head.startswith(b"%PDF")
+        assert spooled.relative_path == os.path.basename(spooled.path)
+        
+        with pytest.raises(ValueError):
+            spool.write_base64("@@@@", "x.pdf")
+        assert sorted(os.listdir(tmp_path)) == [spooled.relative_path]
+    
+    @pytest.mark.unit
+    async def test_stream_limit_removes_partial_file(self, tmp_path):
+        """Stream acima do limite: erro e nenhum arquivo deixado no spool."""
+        spool = UploadSpool(str(tmp_path), max_bytes=10)
+        
+        async def chunks():
+            for _ in range(3):
+                yield b"<nfeProc>"
+        
+        with pytest.raises(UploadTooLargeError):
+            await spool.write_stream(chunks(), "nota.xml")
+        assert os.listdir(tmp_path) == []
+        
+        spooled = await UploadSpool(str(tmp_path)).write_stream(chunks(), "nota")
+        assert spooled.path.endswith(".xml")
+        assert spooled.size == 27
+    
+    @pytest.mark.unit
+    def test_import_source_must_be_in_allowed_dirs(self, tmp_path, monkeypatch):
+        """Origem do lote: .zip do spool ou DOCUMENT_IMPORT_DIRS, após resolver .. e symlinks."""
+        spool = UploadSpool(str(tmp_path / "spool"))
+        imports = tmp_path / "imports"
+        imports.mkdir()
+        monkeypatch.setenv("DOCUMENT_IMPORT_DIRS", str(imports))
+        
+        upload = spool.root / "lote.zip"
+        upload.write_bytes(b"PK")
+        (spool.root / "pendentes").mkdir()
+        (spool.root / "nota.xml").write_bytes(b"<x/>")
+        assert resolve_import_source(str(upload), spool) == str(upload.resolve())
+        assert resolve_import_source(str(imports / "janeiro"), spool)
+        
+        # Uploads pendentes de outras organizações ficam na raiz do spool
+        for path in (
+            "/etc/passwd",
+            str(spool.root / ".." / "outro.zip"),
+            str(spool.root),
+            str(spool.root / "pendentes"),
+            str(spool.root / "nota.xml"),
+            str(spool.root / "ausente.zip"),
+        ):
+            with pytest.raises(ImportSourceNotAllowedError):
+                resolve_import_source(path, spool)
+        
+        (spool.root / "atalho").symlink_to("/etc")
+        with pytest.raises(ImportSourceNotAllowedError):
+            resolve_import_source(str(spool.root / "atalho" / "passwd"), spool)
+    
+    @pytest.mark.unit
+    async def test_import_task_only_removes_spooled_source(self, tmp_path, monkeypatch):
+        """Task enfileirada pela API não lê nem apaga arquivos fora do spool."""
+        from src.services.tasks.task_definitions import import_documents_task
+        
+        spool = UploadSpool(str(tmp_path / "spool"))
+        imports = tmp_path / "imports"
+        imports.mkdir()
+        monkeypatch.setenv("DOCUMENT_IMPORT_DIRS", str(imports))
+        outside = tmp_path / "segredo.zip"
+        allowed = imports / "lote.zip"
+        uploaded = spool.root / "upload.zip"
+        for path in (outside, allowed, uploaded):
+            with zipfile.ZipFile(path, "w") as zf:
+                zf.writestr("nota.xml", NFE_XML)
+        
+        queue = MagicMock()
+        queue.get_task_data = AsyncMock(return_value={"id": "t", "org_id": 1})
+        queue.update_progress = AsyncMock()
+        
+        with patch(
+            "src.services.document_processing.upload_spool._spool", spool
+        ), patch("src.services.tasks.task_queue.get_task_queue", return_value=queue):
+            with pytest.raises(ImportSourceNotAllowedError):
+                await import_documents_task({}, "t1", source_path=str(outside))
+            with pytest.raises(ImportSourceNotAllowedError):
+                await import_documents_task({}, "t1", source_path=str(spool.root))
+            with pytest.raises(TypeError):
+                await import_documents_task(
+                    {}, "t2", source_path=str(uploaded), remove_source=True
+                )
+            
+            for path in (allowed, uploaded):
+                result = await import_documents_task({}, "t3", source_path=str(path))
+                assert result["imported"] == 1
+        
+        assert outside.exists()
+        assert allowed.exists()
+        assert not uploaded.exists()
+    
+    @pytest.mark.unit
+    async def test_import_task_checks_enqueuing_org(self, tmp_path):
+        """Task sem organização autenticada ou de outra organização não lê a origem."""
+        from src.services.tasks.task_definitions import import_documents_task
+        
+        spool = UploadSpool(str(tmp_path / "spool"))
+        uploaded = spool.root / "upload.zip"
+        with zipfile.ZipFile(uploaded, "w") as zf:
+            zf.writestr("nota.xml", NFE_XML)
+        queue = MagicMock()
+        queue.update_progress = AsyncMock()
+        
+        with patch(
+            "src.services.document_processing.upload_spool._spool", spool
+        ), patch("src.services.tasks.task_queue.get_task_queue", return_value=queue):
+            for record in (None, {"id": "t", "org_id": None}, {"id": "t", "org_id": 2}):
+                queue.get_task_data = AsyncMock(return_value=record)
+                with pytest.raises(ImportSourceNotAllowedError):
+                    await import_documents_task(
+                        {}, "t", source_path=str(uploaded), org_id=1
+                    )
+                assert uploaded.exists()
+            
+            queue.get_task_data = AsyncMock(return_value={"id": "t", "org_id": 2})
+            result = await import_documents_task({}, "t", source_path=str(uploaded))
+        
+        assert result["org_id"] == 2
+        assert result["imported"] == 1
+
+
+BOUNDARY = "----auracore"
+
+
+def _multipart(content: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="document_type"\r\n\r\n'
+        "dacte\r\n"
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="dacte_0001.pdf"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode() + content + (
+        f"\r\n--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="dry_run"\r\n\r\n'
+        "false\r\n"
+        f"--{BOUNDARY}--\r\n"
+    ).encode()
+
+
+class TestMultipartUpload:
+    """Testes do parser multipart em streaming."""
+
+    @pytest.mark.unit
+    async def test_file_and_fields_from_small_chunks(self):
+        """Arquivo sai em blocos, campos antes e depois dele são lidos."""
+        content = b"%PDF-1.4\r\n" + b"x" * 5000 + b"\r\n%%EOF"
+        body = _multipart(content)
+        upload = MultipartUpload(f"multipart/form-data; boundary={BOUNDARY}")
+
+        async def stream():
+            for start in range(0, len(body), 100):
+                yield body[start:start + 100]
+
+        received = b"".join([bytes(piece) async for piece in upload.file_chunks(stream())])
+
+        assert received == content
+        assert upload.filename == "dacte_0001.pdf"
+        assert upload.fields == {"document_type": "dacte", "dry_run": "false"}
+
+    @pytest.mark.unit
+    async def test_file_part_streamed_into_spool(self, tmp_path):
+        """Parte de arquivo vai direto para o spool, com o sha256 do conteúdo."""
+        content = b"%PDF-1.4\r\n" + bytes(range(256)) * 64
+        body = _multipart(content)
+        upload = MultipartUpload(f"multipart/form-data; boundary={BOUNDARY}")
+        spool = UploadSpool(str(tmp_path))
+
+        async def stream():
+            for start in range(0, len(body), 4096):
+                yield body[start:start + 4096]
+
+        spooled = await spool.write_stream(upload.file_chunks(stream()), "document")
+
+        assert spooled.size == len(content)
+        assert spooled.sha256 == hashlib.sha256(content).hexdigest()
+
+    @pytest.mark.unit
+    def test_missing_boundary_rejected(self):
+        with pytest.raises(MultipartUploadError):
+            MultipartUpload("multipart/form-data")
+
+
+class TestBulkDocumentImporter:
+    """Testes da importação em lote (diretório / .zip)."""
+    
+    @pytest.fixture
+    def importer(self):
+        processor = MagicMock()
+        processor.process_file = AsyncMock()
+        return BulkDocumentImporter(processor=processor, concurrency=4)
+    
+    @pytest.mark.unit
+    async def test_directory_dedupe_and_progress(self, importer, tmp_path):
+        """Diretório: XMLs lidos sem OCR, chave repetida vira duplicate."""
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "a_nfe.xml").write_text(NFE_XML)
+        (tmp_path / "b_cte.xml").write_text(CTE_XML)
+        (tmp_path / "sub" / "c_nfe_copia.xml").write_text(NFE_XML)
+        (tmp_path / "d_quebrado.xml").write_text("<nfeProc>")
+        (tmp_path / "leia-me.txt").write_text("ignorar")
+        
+        progress = []
+        
+        async def on_progress(p):
+            progress.append(p)
+        
+        result = await importer.import_path(str(tmp_path), on_progress=on_progress)
+        summary = result.to_dict()
+        
+        assert summary["total"] == 4
+        assert (summary["imported"], summary["duplicates"], summary["failed"]) == (2, 1, 1)
+        # Ordem dos arquivos preservada
+        assert [item.file for item in result.items] == [
+            "a_nfe.xml", "b_cte.xml", "d_quebrado.xml", os.path.join("sub", "c_nfe_copia.xml")
+        ]
+        assert result.items[1].document_type == "dacte"
+        assert result.items[3].status == "duplicate"
+        assert len(progress) == 4
+        assert progress[-1]["processed"] == 4
+        importer.processor.process_file.assert_not_called()
+    
+    @pytest.mark.unit
+    async def test_zip_pdf_auto_detects_dacte(self, importer, tmp_path):
+        """PDF com chave modelo 57 vai para o extrator de DACTe (uma conversão)."""
+        importer.processor.process_file.return_value = ProcessedDocument(
+            success=True,
+            text=f"DACTE\nCHAVE DE ACESSO {CTE_CHAVE}\n",
+            markdown=""
+        )
+        zip_path = tmp_path / "lote.zip"
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            archive.writestr("janeiro/dacte.pdf", b"%PDF-1.4")
+            archive.writestr("janeiro/nfe.xml", NFE_XML)
+        
+        with patch.object(importer.dacte_extractor, "extract_from_document", new=AsyncMock()) as dacte, \
+                patch.object(importer.danfe_extractor, "extract_from_document", new=AsyncMock()) as danfe:
+            dacte.return_value = MagicMock(success=False, data=None, error="sem dados")
+            result = await importer.import_path(str(zip_path))
+        
+        pdf_item = next(item for item in result.items if item.file.endswith(".pdf"))
+        assert pdf_item.document_type == "dacte"
+        assert pdf_item.status == "failed"
+        dacte.assert_awaited_once()
+        danfe.assert_not_called()
+        assert importer.processor.process_file.await_count == 1
+        assert result.to_dict()["imported"] == 1
+
+
 class TestDanfeExtractor:
     """Testes do extrator de DANFe."""
     
@@ -172,6 +744,76 @@ class TestDacteExtractor:
         assert emitente.cnpj is not None
 
 
+class TestTextIndex:
+    """Testes do índice de rótulos e da extração sobre o corpus."""
+    
+    @pytest.mark.unit
+    def test_section_stops_at_next_label(self):
+        """Seção vai do rótulo até o próximo rótulo de parada."""
+        index = TextIndex("REMETENTE\nCNPJ: 1\nDESTINATARIO\nCPF: 2\nDADOS DA CARGA")
+        
+        start, end = index.section("REM", stops=("DEST", "DADOS"))
+        assert index.text[start:end] == "REMETENTE\nCNPJ: 1\n"
+        start, end = index.section("DEST", stops=("REM", "DADOS"))
+        assert index.text[start:end] == "DESTINATARIO\nCPF: 2\n"
+        assert index.section("EXPED", stops=("DADOS",)) is None
+    
+    @pytest.mark.unit
+    def test_danfe_corpus(self, fiscal_text_corpus, fiscal_text_expected):
+        """Campos das DANFe do corpus batem com os valores esperados."""
+        extractor = DanfeExtractor(processor=MagicMock())
+        
+        for name, text in fiscal_text_corpus.items():
+            if not name.startswith("danfe"):
+                continue
+            expected = fiscal_text_expected[name]
+            data = extractor._extract_data(
+                ProcessedDocument(success=True, text=text, markdown="")
+            ).data
+            
+            assert {
+                "chave_acesso": data.chave_acesso,
+                "numero": data.numero,
+                "serie": data.serie,
+                "data_emissao": data.data_emissao,
+                "data_saida": data.data_saida,
+                "emitente_cnpj": data.emitente.cnpj,
+                "destinatario_documento": data.destinatario.documento,
+                "valor_total": str(data.valor_total),
+                "icms_valor": str(data.icms_valor),
+            } == expected, name
+    
+    @pytest.mark.unit
+    def test_dacte_corpus(self, fiscal_text_corpus, fiscal_text_expected):
+        """Campos dos DACTe do corpus batem com os valores esperados."""
+        extractor = DacteExtractor(processor=MagicMock())
+        
+        for name, text in fiscal_text_corpus.items():
+            if not name.startswith("dacte"):
+                continue
+            expected = fiscal_text_expected[name]
+            data = extractor._extract_data(
+                ProcessedDocument(success=True, text=text, markdown="")
+            ).data
+            
+            assert {
+                "chave_acesso": data.chave_acesso,
+                "numero": data.numero,
+                "serie": data.serie,
+                "cfop": data.cfop,
+                "data_emissao": data.data_emissao,
+                "emitente_cnpj": data.emitente.cnpj,
+                "remetente_documento": data.remetente.documento,
+                "destinatario_documento": data.destinatario.documento,
+                "valor_total_servico": str(data.valor_total_servico),
+                "peso_bruto": str(data.carga.peso_bruto),
+                "placa": data.veiculo.placa if data.veiculo else None,
+                "uf_inicio": data.uf_inicio,
+                "uf_fim": data.uf_fim,
+                "nfes_vinculadas": data.nfes_vinculadas,
+            } == expected, name
+
+
 class TestChaveAcessoValidation:
     """Testes de validação de chave de acesso."""
     
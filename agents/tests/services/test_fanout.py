@@ -0,0 +1,200 @@
+# agents/tests/services/test_fanout.py
+"""
+Testes do fan-out concorrente (IntegrationHub.broadcast e push).
+"""
+
+import asyncio
+import time
+from typing import Optional
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from src.services.integrations.base import (
+    IntegrationProvider,
+    IntegrationType,
+    Message,
+    MessagePriority,
+    SendResult,
+)
+from src.services.integrations import integration_hub
+from src.services.integrations.integration_hub import IntegrationHub
+from src.services.pwa import push_notifications
+from src.services.pwa.push_notifications import PushNotificationService, PushPayload
+from src.services.fanout import FanOutExecutor, TokenBucket
+from src.services.cache.redis_cache import RedisCache
+
+
+@pytest.fixture
+def local_cache():
+    """RedisCache forçado para o fallback local."""
+    cache = RedisCache()
+    cache._use_local = True
+    return cache
+
+
+class SlowProvider(IntegrationProvider):
+    """Provider simulado: demora 0.2s; falha se a URL pedir."""
+
+    async def send(self, message: Message) -> SendResult:
+        await asyncio.sleep(0.2)
+        if self.config.credentials.get("webhook_url") == "broken":
+            raise RuntimeError("provider down")
+        return SendResult(success=True, message_id=message.id)
+
+    async def validate_config(self) -> tuple[bool, Optional[str]]:
+        return True, None
+
+    async def test_connection(self) -> tuple[bool, Optional[str]]:
+        return True, None
+
+
+class TestFanOutExecutor:
+    """Testes do executor compartilhado."""
+
+    @pytest.mark.unit
+    async def test_bounded_concurrency_and_ordered_results(self):
+        executor = FanOutExecutor(max_concurrency=5)
+        active = {"now": 0, "max": 0}
+
+        async def work(i: int) -> int:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+            await asyncio.sleep(0.02)
+            active["now"] -= 1
+            if i == 3:
+                raise ValueError("boom")
+            return i * 10
+
+        results = await executor.map(
+            range(20), work, on_error=lambda i, e: f"erro:{i}:{e}"
+        )
+
+        assert active["max"] == 5
+        assert results[3] == "erro:3:boom"
+        assert results[:3] == [0, 10, 20] and results[19] == 190
+
+    @pytest.mark.unit
+    async def test_token_bucket_waits_unless_urgent(self):
+        bucket = TokenBucket(rate=20, burst=2)
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        assert time.monotonic() - start >= 0.05
+
+        urgent = TokenBucket(rate=20, burst=2)
+        start = time.monotonic()
+        for _ in range(4):
+            await urgent.acquire(urgent=True)
+        assert time.monotonic() - start < 0.05
+
+    @pytest.mark.unit
+    async def test_non_positive_rate_limit_means_unlimited(self):
+        executor = FanOutExecutor(max_concurrency=10)
+
+        async def send(i: int) -> int:
+            return i
+
+        for per_minute in (0, -1):
+            results = await executor.map(
+                range(5), send,
+                on_error=lambda i, e: f"erro:{i}:{e!r}",
+                limit=lambda i: ("webhook:sem-limite", per_minute)
+            )
+            assert results == list(range(5))
+        assert "webhook:sem-limite" not in executor._buckets
+
+    @pytest.mark.unit
+    async def test_blocking_calls_run_off_loop(self):
+        executor = FanOutExecutor(max_concurrency=10, blocking_threads=10)
+
+        async def blocking(i: int) -> int:
+            return await executor.run_blocking(time.sleep, 0.1) or i
+
+        start = time.monotonic()
+        results = await executor.map(range(10), blocking, on_error=lambda i, e: None)
+        assert results == list(range(10))
+        assert time.monotonic() - start < 0.5
+
+
+class TestBroadcasts:
+    """Broadcasts de integrações e push sobre o fan-out."""
+
+    @pytest.mark.unit
+    async def test_integration_broadcast_is_concurrent(self, local_cache):
+        with patch.object(integration_hub, "get_cache", return_value=local_cache), \
+                patch.dict(integration_hub.PROVIDER_MAP, {IntegrationType.SLACK: SlowProvider}):
+            hub = IntegrationHub()
+            for url in ("a", "b", "broken", "c"):
+                await hub.create_integration(
+                    type=IntegrationType.SLACK,
+                    name=url,
+                    org_id=1,
+                    branch_id=1,
+                    credentials={"webhook_url": url},
+                    settings={"default_recipient": "#alerts"}
+                )
+
+            start = time.monotonic()
+            results = await hub.broadcast(
+                org_id=1, content="War Room aberta", priority=MessagePriority.URGENT
+            )
+
+        assert time.monotonic() - start < 0.4
+        assert sum(r.success for r in results) == 3
+        assert [r.error for r in results if not r.success] == ["provider down"]
+
+    @pytest.mark.unit
+    async def test_push_broadcast_to_organization(self, local_cache):
+        def response(status_code: int) -> requests.Response:
+            # Como o pywebpush: Response real (falsy para 4xx/5xx)
+            resp = requests.Response()
+            resp.status_code = status_code
+            return resp
+
+        def fake_webpush(subscription_info, **kwargs):
+            time.sleep(0.1)  # SDK síncrono
+            gone = subscription_info["endpoint"].endswith("/gone")
+            if gone:
+                raise push_notifications.WebPushException("gone", response=response(410))
+            return response(201)
+
+        class FakeWebPushError(Exception):
+            def __init__(self, message, response=None):
+                super().__init__(message)
+                self.response = response
+
+        with patch.object(push_notifications, "get_cache", return_value=local_cache), \
+                patch.object(push_notifications, "WEBPUSH_AVAILABLE", True), \
+                patch.object(push_notifications, "WebPushException", FakeWebPushError), \
+                patch.object(push_notifications, "webpush", fake_webpush, create=True):
+            service = PushNotificationService(vapid_private_key="key")
+            for i in range(8):
+                await service.register_subscription(
+                    user_id=f"user{i}",
+                    org_id=1,
+                    branch_id=1,
+                    endpoint=f"https://push.example.com/{'gone' if i == 0 else i}",
+                    keys={"p256dh": "x", "auth": "y"}
+                )
+            await service.register_subscription(
+                user_id="other", org_id=1, branch_id=2,
+                endpoint="https://push.example.com/b2", keys={}
+            )
+
+            start = time.monotonic()
+            results = await service.broadcast_to_organization(
+                1, 1, PushPayload(title="Alerta", body="Crise"), urgent=True
+            )
+            elapsed = time.monotonic() - start
+
+            assert len(results) == 8
+            assert sum(r.success for r in results) == 7
+            assert elapsed < 0.5
+
+            # Subscription 410 removida dos índices
+            remaining = await service.broadcast_to_organization(
+                1, 1, PushPayload(title="Alerta", body="Crise")
+            )
+            assert len(remaining) == 7
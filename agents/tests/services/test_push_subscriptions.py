@@ -0,0 +1,156 @@
+# agents/tests/services/test_push_subscriptions.py
+"""
+Testes dos índices de subscriptions de push (usuário, filial, endpoint).
+"""
+
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+
+from src.services.pwa import push_notifications, subscription_manager
+from src.services.pwa.push_notifications import PushNotificationService
+from src.services.pwa.subscription_manager import SubscriptionManager
+from src.services.cache.redis_cache import RedisCache
+
+
+@pytest.fixture
+def local_cache():
+    """RedisCache forçado para o fallback local."""
+    cache = RedisCache()
+    cache._use_local = True
+    return cache
+
+
+@pytest.fixture
+def service(local_cache):
+    with patch.object(push_notifications, "get_cache", return_value=local_cache):
+        yield PushNotificationService()
+
+
+async def register(service, user_id, endpoint, branch_id=1):
+    return await service.register_subscription(
+        user_id=user_id,
+        org_id=1,
+        branch_id=branch_id,
+        endpoint=endpoint,
+        keys={"p256dh": "x", "auth": "y"}
+    )
+
+
+class TestSubscriptionIndexes:
+    """Índices em set e unicidade de endpoint."""
+
+    @pytest.mark.unit
+    async def test_duplicate_endpoint_returns_existing(self, service):
+        first = await register(service, "u1", "https://push.example.com/a")
+        again = await register(service, "u1", "https://push.example.com/a")
+
+        assert again.id == first.id
+        assert [s.id for s in await service.get_user_subscriptions("u1")] == [first.id]
+
+    @pytest.mark.unit
+    async def test_endpoint_moves_to_new_user(self, service):
+        old = await register(service, "u1", "https://push.example.com/a")
+        new = await register(service, "u2", "https://push.example.com/a")
+
+        assert new.id != old.id
+        assert await service.get_user_subscriptions("u1") == []
+        assert await service.get_subscription(old.id) is None
+        assert [s.id for s in await service.get_organization_subscriptions(1, 1)] == [new.id]
+
+    @pytest.mark.unit
+    async def test_batch_unregister_cleans_every_index(self, service, local_cache):
+        subs = [
+            await register(service, f"u{i % 2}", f"https://push.example.com/{i}")
+            for i in range(6)
+        ]
+        removed = await service.unregister_subscriptions(
+            [s.id for s in subs[:4]] + ["missing"]
+        )
+
+        assert removed == 4
+        assert {s.id for s in await service.get_organization_subscriptions(1, 1)} == {
+            subs[4].id, subs[5].id
+        }
+        assert [s.id for s in await service.get_user_subscriptions("u0")] == [subs[4].id]
+        assert await local_cache.zcard(service.ACTIVITY_KEY) == 2
+
+        # Endpoint liberado pode ser registrado de novo
+        fresh = await register(service, "u0", "https://push.example.com/0")
+        assert fresh.id != subs[0].id
+
+    @pytest.mark.unit
+    async def test_legacy_user_index_is_migrated(self, service, local_cache):
+        sub = await register(service, "u1", "https://push.example.com/a")
+        await local_cache.delete(service._user_index_key("u1"))
+        await local_cache.set_json("push:user:u1", {"subscription_ids": [sub.id, "gone"]})
+
+        assert [s.id for s in await service.get_user_subscriptions("u1")] == [sub.id]
+        assert await local_cache.get_json("push:user:u1") is None
+        assert await local_cache.smembers(service._user_index_key("u1")) == {sub.id}
+
+
+class TestSubscriptionManager:
+    """Cleanup e deduplicação em lote."""
+
+    @pytest.mark.unit
+    async def test_cleanup_and_dedupe(self, service, local_cache):
+        with patch.object(subscription_manager, "get_cache", return_value=local_cache), \
+                patch.object(subscription_manager, "get_push_service", return_value=service):
+            manager = SubscriptionManager()
+            manager.CLEANUP_BATCH = 2
+
+            subs = [
+                await register(service, "u1", f"https://push.example.com/{i}")
+                for i in range(5)
+            ]
+            stale = time.time() - 100 * 86400
+            await local_cache.zadd(service.ACTIVITY_KEY, {s.id: stale for s in subs[:3]})
+
+            assert await manager.cleanup_expired() == 3
+            stats = await manager.get_stats(1, 1)
+            assert stats["total_subscriptions"] == 2
+
+            # Duplicata legada (mesmo endpoint, registrada antes do índice)
+            legacy = await register(service, "u1", "https://push.example.com/legacy")
+            legacy.id = "legacy-dup"
+            legacy.created_at -= timedelta(days=1)
+            await service._cache.set_json(
+                service._sub_key(legacy.id), service._subscription_to_dict(legacy)
+            )
+            await local_cache.sadd(service._user_index_key("u1"), legacy.id)
+
+            assert await manager.deduplicate_user_subscriptions("u1") == 1
+            assert len(await service.get_user_subscriptions("u1")) == 3
+            # O índice de endpoint continua apontando para a que ficou
+            again = await register(service, "u1", "https://push.example.com/legacy")
+            assert len(await service.get_user_subscriptions("u1")) == 3
+            assert again.id in {s.id for s in await service.get_user_subscriptions("u1")}
+
+    @pytest.mark.unit
+    async def test_cleanup_follows_ttl_and_clears_expired_ids(self, service, local_cache):
+        with patch.object(subscription_manager, "get_cache", return_value=local_cache), \
+                patch.object(subscription_manager, "get_push_service", return_value=service):
+            manager = SubscriptionManager()
+
+            subs = [
+                await register(service, "u1", f"https://push.example.com/{i}")
+                for i in range(3)
+            ]
+            # Registro já expirado pelo TTL; sobrou o id nos sets
+            await local_cache.delete(service._sub_key(subs[0].id))
+            now = time.time()
+            await local_cache.zadd(service.ACTIVITY_KEY, {
+                subs[0].id: now - service.SUBSCRIPTION_TTL - 86400,
+                subs[1].id: now - service.SUBSCRIPTION_TTL + 86400,
+            })
+
+            await manager.cleanup_expired()
+
+            kept = {subs[1].id, subs[2].id}
+            assert await local_cache.smembers(service._user_index_key("u1")) == kept
+            assert await local_cache.smembers(service._org_index_key(1, 1)) == kept
+            assert await local_cache.get(service._owner_key(subs[0].id)) is None
+            assert await local_cache.zcard(service.ACTIVITY_KEY) == 2
@@ -0,0 +1,403 @@
+# agents/tests/services/test_task_queue.py
+"""
+Testes da fila de tasks: prioridade, justiça entre tenants, espera e
+worker local (concorrência, retentativas, lease e drenagem).
+"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.services.cache.redis_cache import RedisCache
+from src.services.tasks.priority_queue import FairPriorityQueue
+from src.services.tasks.task_queue import (
+    LEASES_KEY,
+    TaskConfig,
+    TaskPriority,
+    TaskQueue,
+    lane_name,
+    state_key,
+)
+from src.services.tasks.task_worker import TaskWorker, _arq_job_start, _arq_tracked
+
+
+@pytest.fixture
+def local_cache():
+    """RedisCache forçado para o fallback local."""
+    cache = RedisCache()
+    cache._use_local = True
+    return cache
+
+
+@pytest.fixture
+def local_queue(local_cache):
+    """TaskQueue no fallback local (sem ARQ)."""
+    with patch("src.services.tasks.task_queue.get_cache", return_value=local_cache):
+        queue = TaskQueue()
+    queue._use_local = True
+    return queue
+
+
+class TestFairPriorityQueue:
+    """Testes da fila local."""
+
+    @pytest.mark.unit
+    async def test_higher_priority_first(self):
+        queue = FairPriorityQueue()
+        queue.put_nowait("index", TaskPriority.LOW)
+        queue.put_nowait("report", TaskPriority.NORMAL)
+        queue.put_nowait("webhook", TaskPriority.CRITICAL)
+
+        assert [await queue.get() for _ in range(3)] == ["webhook", "report", "index"]
+
+    @pytest.mark.unit
+    async def test_round_robin_between_tenants(self):
+        """Lote grande de uma org não trava a task da outra."""
+        queue = FairPriorityQueue()
+        for i in range(100):
+            queue.put_nowait(f"bulk-{i}", TaskPriority.NORMAL, tenant="org-1")
+        queue.put_nowait("small", TaskPriority.NORMAL, tenant="org-2")
+
+        first = [queue.get_nowait() for _ in range(3)]
+
+        assert first == ["bulk-0", "small", "bulk-1"]
+        assert queue.qsize() == 98
+
+    @pytest.mark.unit
+    async def test_aging_promotes_waiting_task(self):
+        queue = FairPriorityQueue(aging_seconds=0.05)
+        queue.put_nowait("low", TaskPriority.LOW)
+        await asyncio.sleep(0.06)
+        queue.put_nowait("normal", TaskPriority.NORMAL)
+        queue.put_nowait("critical", TaskPriority.CRITICAL)
+
+        # Envelheceu o suficiente para passar NORMAL, não CRITICAL
+        assert [queue.get_nowait() for _ in range(3)] == ["critical", "low", "normal"]
+
+    @pytest.mark.unit
+    async def test_aged_batch_does_not_starve_critical(self):
+        """Lote LOW envelhecido não passa inteiro na frente de uma CRITICAL."""
+        queue = FairPriorityQueue(aging_seconds=0.05)
+        for i in range(100):
+            queue.put_nowait(f"low-{i}", TaskPriority.LOW)
+        await asyncio.sleep(0.06)
+        queue.put_nowait("critical", TaskPriority.CRITICAL)
+
+        assert queue.get_nowait() == "critical"
+
+        # Espera longa o bastante: a LOW mais antiga passa uma CRITICAL nova
+        await asyncio.sleep(0.2)
+        queue.put_nowait("critical-2", TaskPriority.CRITICAL)
+        assert queue.get_nowait() == "low-0"
+
+    @pytest.mark.unit
+    async def test_get_waits_and_survives_cancellation(self):
+        queue = FairPriorityQueue()
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(queue.get(), timeout=0.01)
+
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        queue.put_nowait("job", TaskPriority.HIGH)
+
+        assert await asyncio.wait_for(getter, timeout=1) == "job"
+        assert queue.empty()
+
+
+class TestTaskQueuePriority:
+    """Testes da TaskQueue com prioridade."""
+
+    @pytest.mark.unit
+    def test_lane_name(self):
+        assert lane_name("default", TaskPriority.CRITICAL) == "default:critical"
+
+    @pytest.mark.unit
+    async def test_local_enqueue_respects_priority_and_tenant(self, local_queue):
+        for _ in range(3):
+            await local_queue.enqueue("index_documents_task", org_id=1)
+        await local_queue.enqueue("index_documents_task", org_id=2)
+        await local_queue.enqueue(
+            "send_notification_task",
+            config=TaskConfig(priority=TaskPriority.CRITICAL),
+            org_id=1
+        )
+
+        local = local_queue._get_local_queue()
+        order = [local.get_nowait() for _ in range(5)]
+
+        assert order[0].task_name == "send_notification_task"
+        assert [item.kwargs["org_id"] for item in order[1:]] == [1, 2, 1, 1]
+
+    @pytest.mark.unit
+    async def test_enqueuing_org_recorded_and_kept_on_requeue(self, local_queue):
+        task_id = await local_queue.enqueue(
+            "import_documents_task", config=TaskConfig(org_id=7), source_path="/tmp/x.zip"
+        )
+
+        task_data = await local_queue.get_task_data(task_id)
+        assert task_data["org_id"] == 7
+
+        local = local_queue._get_local_queue()
+        local.get_nowait()
+        local_queue.requeue_local(task_data)
+        assert local.get_nowait().config.org_id == 7
+
+    @pytest.mark.unit
+    async def test_queue_wait_stats_per_priority(self, local_queue):
+        await local_queue.record_queue_wait(TaskPriority.CRITICAL, 50)
+        await local_queue.record_queue_wait(TaskPriority.CRITICAL, 150)
+        await local_queue.record_queue_wait(TaskPriority.LOW, 120000)
+
+        stats = await local_queue.get_queue_stats()
+
+        critical = stats["queue_wait"]["critical"]
+        assert critical["count"] == 2
+        assert critical["avg_ms"] == 100
+        assert critical["buckets"]["le_100"] == 1
+        assert critical["buckets"]["le_1000"] == 1
+        assert stats["queue_wait"]["low"]["buckets"]["inf"] == 1
+        assert "normal" not in stats["queue_wait"]
+
+
+class TestTaskEvents:
+    """Testes da notificação de conclusão via pub/sub."""
+
+    async def _finish(self, queue: TaskQueue, task_id: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await queue.update_progress(task_id, {"processed": 1, "total": 2})
+        await queue.update_state(task_id, status="completed", result={"ok": True})
+
+    @pytest.mark.unit
+    async def test_wait_for_wakes_on_completion_without_polling(self, local_queue):
+        local_queue.WAIT_RECHECK_SECONDS = 30
+        task_id = await local_queue.enqueue("generate_report_task")
+        finisher = asyncio.create_task(self._finish(local_queue, task_id, 0.05))
+
+        start = asyncio.get_running_loop().time()
+        with patch.object(local_queue, "get_status", wraps=local_queue.get_status) as get_status:
+            result = await local_queue.wait_for(task_id, timeout=5)
+        await finisher
+
+        assert result.status.value == "completed"
+        assert result.result == {"ok": True}
+        assert asyncio.get_running_loop().time() - start < 1
+        # Inicial, releitura após assinar e releitura no evento final
+        assert get_status.call_count == 3
+        assert local_queue._events.watching() == 0
+
+    @pytest.mark.unit
+    async def test_wait_for_timeout_and_missing_task(self, local_queue):
+        task_id = await local_queue.enqueue("generate_report_task")
+
+        result = await local_queue.wait_for(task_id, timeout=0.05)
+
+        assert result.status.value == "failed"
+        assert result.error == "Task execution timed out"
+        assert await local_queue.wait_for("inexistente", timeout=1) is None
+
+    @pytest.mark.unit
+    async def test_watch_events_streams_progress_until_final(self, local_queue):
+        task_id = await local_queue.enqueue("import_documents_task", source_path="/tmp/x.zip")
+        finisher = asyncio.create_task(self._finish(local_queue, task_id, 0.05))
+
+        events = [event async for event in local_queue.watch_events(task_id, timeout=5)]
+        await finisher
+
+        assert [e["type"] for e in events] == ["status", "progress", "status"]
+        assert events[0]["status"] == "queued"
+        assert events[1]["progress"] == {"processed": 1, "total": 2}
+        assert events[-1]["status"] == "completed"
+        assert events[-1]["result"] == {"ok": True}
+
+
+@pytest.fixture
+def worker(local_queue):
+    """TaskWorker local com tasks de teste."""
+    worker = TaskWorker(queue=local_queue, concurrency=3, lease_seconds=30, cpu_bound=set())
+    worker.running_now = 0
+    worker.max_running = 0
+    worker.calls = 0
+
+    async def slow_task(ctx, _task_id, delay=0.05):
+        worker.running_now += 1
+        worker.max_running = max(worker.max_running, worker.running_now)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            worker.running_now -= 1
+        return {"try": ctx["job_try"]}
+
+    async def flaky_task(ctx, _task_id, failures):
+        worker.calls += 1
+        if ctx["job_try"] <= failures:
+            raise RuntimeError(f"falha {ctx['job_try']}")
+        return {"ok": True}
+
+    worker._task_map = {"slow_task": slow_task, "flaky_task": flaky_task}
+    return worker
+
+
+class TestTaskWorker:
+    """Testes do worker local."""
+
+    async def _run_until_final(self, worker: TaskWorker, task_ids: list[str]) -> list:
+        runner = asyncio.create_task(worker.run())
+        try:
+            return [await worker._queue.wait_for(task_id, timeout=5) for task_id in task_ids]
+        finally:
+            await worker.shutdown(timeout=1)
+            await runner
+
+    @pytest.mark.unit
+    async def test_runs_tasks_concurrently(self, worker, local_queue):
+        task_ids = [await local_queue.enqueue("slow_task", delay=0.1) for _ in range(6)]
+
+        start = asyncio.get_running_loop().time()
+        results = await self._run_until_final(worker, task_ids)
+
+        assert [r.status.value for r in results] == ["completed"] * 6
+        assert worker.max_running == 3
+        assert asyncio.get_running_loop().time() - start < 0.5
+        assert await local_queue._cache.zcard(LEASES_KEY) == 0
+
+    @pytest.mark.unit
+    async def test_local_queue_served_by_same_process_worker(self, worker, local_queue):
+        """Sem ARQ: o worker do processo que enfileira (lifespan da API) executa."""
+        assert await local_queue.is_local()
+        task_id = await local_queue.enqueue("slow_task", delay=0.01)
+
+        [result] = await self._run_until_final(worker, [task_id])
+
+        assert result.status.value == "completed"
+
+    @pytest.mark.unit
+    async def test_retries_with_backoff_until_success(self, worker, local_queue):
+        task_id = await local_queue.enqueue(
+            "flaky_task", config=TaskConfig(max_retries=2, retry_delay=0.01), failures=2
+        )
+
+        [result] = await self._run_until_final(worker, [task_id])
+
+        assert result.status.value == "completed"
+        assert result.attempts == 3
+        assert result.error is None
+        assert worker.calls == 3
+
+    @pytest.mark.unit
+    async def test_fails_after_max_retries(self, worker, local_queue):
+        task_id = await local_queue.enqueue(
+            "flaky_task", config=TaskConfig(max_retries=1, retry_delay=0.01), failures=5
+        )
+
+        [result] = await self._run_until_final(worker, [task_id])
+
+        assert result.status.value == "failed"
+        assert result.error == "falha 2"
+        assert worker.calls == 2
+
+    @pytest.mark.unit
+    async def test_status_updates_do_not_rewrite_record(self, worker, local_queue):
+        task_id = await local_queue.enqueue("slow_task", delay=0.01)
+
+        with patch.object(local_queue._cache, "set_json", wraps=local_queue._cache.set_json) as set_json:
+            [result] = await self._run_until_final(worker, [task_id])
+            await local_queue.update_progress(task_id, {"processed": 1})
+
+        assert result.status.value == "completed"
+        assert set_json.call_count == 0
+        state = await local_queue._cache.hgetall(state_key(task_id))
+        assert {"status", "attempts", "result", "progress", "worker"} <= set(state)
+
+    @pytest.mark.unit
+    async def test_recovers_task_with_expired_lease(self, worker, local_queue):
+        task_id = await local_queue.enqueue("slow_task")
+        # Outro worker pegou a task e morreu sem renovar o lease
+        local_queue._get_local_queue().get_nowait()
+        await local_queue.update_state(task_id, status="running", attempts=1)
+        await local_queue._cache.zadd(LEASES_KEY, {task_id: 1})
+
+        assert await worker.recover_expired(local_queue) == 1
+        assert await worker.recover_expired(local_queue) == 0
+
+        requeued = local_queue._get_local_queue().get_nowait()
+        assert requeued.task_id == task_id
+        assert requeued.kwargs == {}
+        assert (await local_queue.get_status(task_id)).status.value == "queued"
+
+    @pytest.mark.unit
+    async def test_shutdown_drains_and_releases_unfinished(self, worker, local_queue):
+        quick = await local_queue.enqueue("slow_task", delay=0.05)
+        stuck = await local_queue.enqueue("slow_task", delay=10)
+        runner = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.01)
+
+        await worker.shutdown(timeout=0.2)
+        await runner
+
+        assert (await local_queue.get_status(quick)).status.value == "completed"
+        assert (await local_queue.get_status(stuck)).status.value == "queued"
+        # Lease vencido: qualquer worker retoma a task interrompida
+        assert await local_queue._cache.zrangebyscore(LEASES_KEY, 0, 0) == [stuck]
+
+
+class TestArqLaneHooks:
+    """Hooks das filas ARQ: estado gravado no registro e waiters acordados."""
+
+    @pytest.fixture
+    def arq_queue(self, local_queue):
+        local_queue.WAIT_RECHECK_SECONDS = 30
+        with patch("src.services.tasks.task_queue.get_task_queue", return_value=local_queue):
+            yield local_queue
+
+    @staticmethod
+    def _ctx(task_id: str) -> dict:
+        return {"job_id": task_id, "job_try": 1, "score": time.time() * 1000 - 50}
+
+    @pytest.mark.unit
+    async def test_job_hooks_record_state_and_wake_waiters(self, arq_queue):
+        task_id = await arq_queue.enqueue("generate_report_task")
+        waiter = asyncio.create_task(arq_queue.wait_for(task_id, timeout=5))
+        await asyncio.sleep(0.01)
+
+        async def report(ctx: dict, _task_id: str, month: int) -> dict:
+            assert (await arq_queue.get_status(_task_id)).status.value == "running"
+            return {"month": month}
+
+        ctx = self._ctx(task_id)
+        await _arq_job_start(ctx, TaskPriority.HIGH)
+        assert await _arq_tracked(report)(ctx, _task_id=task_id, month=3) == {"month": 3}
+
+        result = await asyncio.wait_for(waiter, timeout=1)
+        assert result.status.value == "completed"
+        assert result.result == {"month": 3}
+        assert result.attempts == 1
+        assert result.duration_ms is not None
+        assert (await arq_queue.get_queue_wait_stats())["high"]["count"] == 1
+
+    @pytest.mark.unit
+    async def test_job_failure_and_timeout_recorded(self, arq_queue):
+        failing_id = await arq_queue.enqueue("generate_report_task")
+        slow_id = await arq_queue.enqueue("generate_report_task")
+
+        async def failing(ctx: dict, _task_id: str) -> None:
+            raise RuntimeError("sem dados")
+
+        async def slow(ctx: dict, _task_id: str) -> None:
+            await asyncio.sleep(10)
+
+        with pytest.raises(RuntimeError):
+            await _arq_tracked(failing)(self._ctx(failing_id), _task_id=failing_id)
+        # Timeout do job: o ARQ cancela a task
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                _arq_tracked(slow, job_timeout=0.05)(self._ctx(slow_id), _task_id=slow_id),
+                timeout=0.05
+            )
+
+        failed = await arq_queue.wait_for(failing_id, timeout=1)
+        assert (failed.status.value, failed.error) == ("failed", "sem dados")
+        timed_out = await arq_queue.wait_for(slow_id, timeout=1)
+        assert (timed_out.status.value, timed_out.error) == ("failed", "Task timeout")
@@ -0,0 +1,338 @@
+# agents/tests/services/test_webhooks.py
+"""
+Testes do engine de entrega e do outbox de webhooks (transporte httpx
+simulado, Redis no fallback local).
+"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from src.services.webhooks.webhook_events import WebhookEvent, EventType
+from src.services.webhooks import webhook_delivery
+from src.services.webhooks.webhook_delivery import WebhookDelivery, DeliveryStatus, sign_payload
+from src.services.webhooks.webhook_endpoints import WebhookEndpoint, WebhookEndpointStore
+from src.services.webhooks.webhook_engine import (
+    WebhookDeliveryEngine,
+    CircuitBreaker,
+    CircuitState,
+)
+from src.services.webhooks.webhook_outbox import WebhookOutbox, event_key, record_key
+from src.services.cache.redis_cache import RedisCache
+
+
+def make_delivery(url: str, **kwargs) -> WebhookDelivery:
+    return WebhookDelivery(event=WebhookEvent(organization_id=1), endpoint_url=url, **kwargs)
+
+
+async def wait_until(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not await predicate():
+        assert time.monotonic() < deadline, "condição não atingida"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def local_cache():
+    """RedisCache forçado para o fallback local."""
+    cache = RedisCache()
+    cache._use_local = True
+    return cache
+
+
+@pytest.fixture
+def endpoint_store(local_cache):
+    with patch("src.services.webhooks.webhook_endpoints.get_cache", return_value=local_cache):
+        yield WebhookEndpointStore()
+
+
+@pytest.fixture
+async def outbox_factory(local_cache, endpoint_store):
+    """Outbox com intervalos curtos; parado ao final."""
+    outboxes = []
+
+    async def factory(engine: WebhookDeliveryEngine, **attrs) -> WebhookOutbox:
+        with patch("src.services.webhooks.webhook_outbox.get_cache", return_value=local_cache):
+            outbox = WebhookOutbox(engine, endpoint_store, consumer=f"pod-{len(outboxes)}")
+        outbox.PROMOTE_INTERVAL = 0.01
+        for name, value in attrs.items():
+            setattr(outbox, name, value)
+        await outbox.start()
+        outboxes.append(outbox)
+        return outbox
+
+    yield factory
+
+    for outbox in outboxes:
+        await outbox.stop()
+
+
+def make_endpoint(endpoint_id: str, org_id: int, events: list[EventType], **kwargs) -> WebhookEndpoint:
+    return WebhookEndpoint(
+        id=endpoint_id,
+        url=f"https://{endpoint_id}.example.com/hook",
+        secret="s3cret",
+        events=events,
+        organization_id=org_id,
+        branch_id=1,
+        **kwargs
+    )
+
+
+@pytest.fixture
+async def engine_factory():
+    """Engine com transporte simulado; parado ao final."""
+    engines = []
+
+    async def factory(handler, **kwargs) -> WebhookDeliveryEngine:
+        engine = WebhookDeliveryEngine(**kwargs)
+        transport = httpx.MockTransport(handler)
+        engine._client = lambda host: engine._clients.setdefault(
+            host, httpx.AsyncClient(transport=transport)
+        )
+        await engine.start()
+        engines.append(engine)
+        return engine
+
+    yield factory
+
+    for engine in engines:
+        await engine.stop()
+
+
+class TestDeliveryEngine:
+    """Testes do engine concorrente."""
+
+    @pytest.mark.unit
+    async def test_slow_host_does_not_stall_others(self, engine_factory):
+        fast_done: list[float] = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "slow.example.com":
+                await asyncio.sleep(0.3)
+            else:
+                fast_done.append(time.monotonic())
+            return httpx.Response(200)
+
+        engine = await engine_factory(handler, workers=4, host_concurrency=2)
+        start = time.monotonic()
+        slow = [make_delivery("https://slow.example.com/hook") for _ in range(6)]
+        fast = [make_delivery("https://fast.example.com/hook") for _ in range(20)]
+        for delivery in slow + fast:
+            await engine.submit(delivery)
+
+        await asyncio.wait_for(engine.wait_idle(), 5)
+
+        assert all(d.status == DeliveryStatus.SUCCESS for d in slow + fast)
+        assert max(fast_done) - start < 0.3
+        assert engine.get_stats()["delivered"] == 26
+
+    @pytest.mark.unit
+    async def test_retries_are_scheduled_not_slept(self, engine_factory):
+        calls = {"count": 0}
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host != "flaky.example.com":
+                return httpx.Response(200)
+            calls["count"] += 1
+            return httpx.Response(503 if calls["count"] <= 2 else 200)
+
+        engine = await engine_factory(handler, workers=1)
+        flaky = make_delivery("https://flaky.example.com/hook", retry_delay_seconds=0.05)
+        await engine.submit(flaky)
+        await asyncio.sleep(0.01)
+
+        # Enquanto o retry está agendado, o único worker segue livre
+        other = make_delivery("https://other.example.com/hook")
+        await engine.submit(other)
+        await asyncio.sleep(0.02)
+        assert other.status == DeliveryStatus.SUCCESS
+
+        await asyncio.wait_for(engine.wait_idle(), 5)
+        assert flaky.status == DeliveryStatus.SUCCESS
+        assert len(flaky.attempts) == 3
+        assert engine.get_stats()["retried"] == 2
+
+    @pytest.mark.unit
+    def test_circuit_breaker_opens_and_probes(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+        breaker.record_failure(now=0)
+        assert breaker.allow(now=0)
+        breaker.record_failure(now=1)
+        assert breaker.state == CircuitState.OPEN
+        assert not breaker.allow(now=5)
+        assert breaker.retry_in(now=5) == 6
+
+        assert breaker.allow(now=11)  # prova
+        assert not breaker.allow(now=11)
+        breaker.record_failure(now=12)
+        assert breaker.state == CircuitState.OPEN
+
+        assert breaker.allow(now=22)
+        breaker.record_success()
+        assert breaker.state == CircuitState.CLOSED
+
+
+class TestWebhookOutbox:
+    """Testes do registro de endpoints e do outbox durável."""
+
+    @pytest.mark.unit
+    async def test_subscribers_come_from_org_event_index(self, endpoint_store):
+        await endpoint_store.save(make_endpoint("docs", 1, [EventType.DOCUMENT_IMPORTED]))
+        await endpoint_store.save(make_endpoint("all", 1, [EventType.AGENT_MESSAGE_PROCESSED]))
+        await endpoint_store.save(make_endpoint("other-org", 2, [EventType.DOCUMENT_IMPORTED]))
+        await endpoint_store.save(
+            make_endpoint("inactive", 1, [EventType.DOCUMENT_IMPORTED], is_active=False)
+        )
+
+        async def ids(org_id, event_type):
+            return sorted(ep.id for ep in await endpoint_store.subscribers(org_id, event_type))
+
+        assert await ids(1, EventType.DOCUMENT_IMPORTED) == ["all", "docs"]
+        assert await ids(1, EventType.FISCAL_NFE_VALIDATED) == ["all"]
+        assert await ids(None, EventType.DOCUMENT_IMPORTED) == ["all", "docs", "other-org"]
+
+        docs = await endpoint_store.get("docs")
+        assert docs.secret == "s3cret"
+        await endpoint_store.delete(docs)
+        assert await ids(1, EventType.DOCUMENT_IMPORTED) == ["all"]
+
+    @pytest.mark.unit
+    async def test_retry_dead_letter_and_replay(self, engine_factory, outbox_factory, endpoint_store):
+        healthy = {"value": False}
+        signatures = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            signatures.append(request.headers.get("X-Webhook-Signature"))
+            return httpx.Response(200 if healthy["value"] else 503)
+
+        endpoint = make_endpoint("flaky", 1, [EventType.DOCUMENT_IMPORTED])
+        await endpoint_store.save(endpoint)
+        outbox = await outbox_factory(await engine_factory(handler, workers=2))
+
+        delivery = WebhookDelivery(
+            event=WebhookEvent(type=EventType.DOCUMENT_IMPORTED, organization_id=1),
+            endpoint_url=endpoint.url,
+            endpoint_id=endpoint.id,
+            organization_id=1,
+            max_retries=2,
+            retry_delay_seconds=0.01
+        )
+        await outbox.enqueue([delivery])
+
+        async def dead_letters():
+            return await outbox.list_deliveries(1, DeliveryStatus.FAILED)
+
+        await wait_until(dead_letters)
+        [failed] = await dead_letters()
+        assert failed.id == delivery.id
+        assert [a.status_code for a in failed.attempts] == [503, 503]
+        # Secret vem do registro do endpoint, não do registro da entrega
+        assert signatures[0].startswith("sha256=")
+
+        healthy["value"] = True
+        assert await outbox.replay_dead(1) == 1
+
+        async def delivered():
+            record = await outbox.get_delivery(delivery.id)
+            return record.status == DeliveryStatus.SUCCESS
+
+        await wait_until(delivered)
+        record = await outbox.get_delivery(delivery.id)
+        assert [a.status_code for a in record.attempts] == [503, 503, 200]
+        assert await dead_letters() == []
+        assert (await outbox.get_stats())["pending"] == 0
+
+    @pytest.mark.unit
+    async def test_pending_entries_survive_consumer_loss(
+        self, engine_factory, outbox_factory, endpoint_store, local_cache
+    ):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200)
+
+        endpoint = make_endpoint("steady", 1, [EventType.DOCUMENT_IMPORTED])
+        await endpoint_store.save(endpoint)
+
+        # Pod que leu a entrada e caiu antes de confirmar
+        await local_cache.xgroup_create(WebhookOutbox.STREAM_KEY, WebhookOutbox.GROUP)
+        with patch("src.services.webhooks.webhook_outbox.get_cache", return_value=local_cache):
+            crashed = WebhookOutbox(WebhookDeliveryEngine(workers=1), endpoint_store)
+        delivery = WebhookDelivery(
+            event=WebhookEvent(type=EventType.DOCUMENT_IMPORTED, organization_id=1),
+            endpoint_url=endpoint.url,
+            endpoint_id=endpoint.id,
+            organization_id=1
+        )
+        await crashed.enqueue([delivery])
+        read = await local_cache.xreadgroup(
+            WebhookOutbox.STREAM_KEY, WebhookOutbox.GROUP, "crashed-pod", count=10
+        )
+        assert len(read) == 1
+
+        await outbox_factory(
+            await engine_factory(handler, workers=1),
+            CLAIM_IDLE_MS=0,
+            RECLAIM_INTERVAL=0.01
+        )
+
+        async def delivered():
+            record = await crashed.get_delivery(delivery.id)
+            return record.status == DeliveryStatus.SUCCESS
+
+        await wait_until(delivered)
+
+    @pytest.mark.unit
+    async def test_payload_and_signature_shared_per_event(
+        self, engine_factory, outbox_factory, endpoint_store, local_cache
+    ):
+        received = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            received.append((request.content, request.headers["X-Webhook-Signature"]))
+            return httpx.Response(200)
+
+        endpoints = [
+            make_endpoint(f"ep{i}", 1, [EventType.DOCUMENT_IMPORTED]) for i in range(3)
+        ]
+        endpoints.append(WebhookEndpoint(
+            id="ep-b", url="https://ep-b.example.com/hook", secret="outro",
+            events=[EventType.DOCUMENT_IMPORTED], organization_id=1, branch_id=1
+        ))
+        for endpoint in endpoints:
+            await endpoint_store.save(endpoint)
+
+        event = WebhookEvent(type=EventType.DOCUMENT_IMPORTED, organization_id=1)
+        subscribers = await endpoint_store.subscribers(1, event.type)
+        assert len(subscribers) == 4
+        deliveries = [
+            WebhookDelivery(
+                event=event, endpoint_url=ep.url, endpoint_id=ep.id, organization_id=1
+            )
+            for ep in subscribers
+        ]
+
+        with patch.object(webhook_delivery, "sign_payload", wraps=sign_payload) as signer:
+            outbox = await outbox_factory(await engine_factory(handler, workers=4))
+            await outbox.enqueue(deliveries)
+
+            async def all_received():
+                return len(received) == 4
+
+            await wait_until(all_received)
+
+        # Um HMAC por secret distinto, um único corpo para todas as entregas
+        assert signer.call_count == 2
+        assert len({body for body, _ in received}) == 1
+        body = received[0][0].decode()
+        assert {sig for _, sig in received} == {
+            sign_payload("s3cret", body), sign_payload("outro", body)
+        }
+
+        # O payload é gravado uma vez; os registros só referenciam o evento
+        assert await local_cache.get(event_key(event.id)) == body
+        record = await local_cache.get_json(record_key(deliveries[0].id))
+        assert record["event_id"] == event.id and "event" not in record
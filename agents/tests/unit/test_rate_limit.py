@@ -0,0 +1,49 @@
+"""Testes unitários do rate limiter (fallback local)."""
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.middleware.rate_limit import RateLimiter, RateLimitConfig
+
+
+@pytest.fixture
+def local_cache():
+    """Cache sem Redis (força token buckets locais)."""
+    cache = MagicMock()
+    cache._use_local = True
+    return cache
+
+
+class TestRateLimiter:
+    """Testes do RateLimiter sem Redis."""
+
+    async def test_burst_limit(self, local_cache):
+        limiter = RateLimiter(RateLimitConfig(requests_per_minute=100, burst_size=3))
+        with patch("src.middleware.rate_limit.get_cache", return_value=local_cache):
+            results = [(await limiter.is_allowed("ip"))[0] for _ in range(4)]
+
+        assert results == [True, True, True, False]
+
+    async def test_cost_weighted(self, local_cache):
+        limiter = RateLimiter(RateLimitConfig(requests_per_minute=10, burst_size=10))
+        with patch("src.middleware.rate_limit.get_cache", return_value=local_cache):
+            allowed, _ = await limiter.is_allowed("ip", cost=8)
+            denied, info = await limiter.is_allowed("ip", cost=5)
+
+        assert allowed is True
+        assert denied is False
+        assert info["remaining"] == 2
+
+    async def test_tier_config_overrides_default(self, local_cache):
+        limiter = RateLimiter(RateLimitConfig(requests_per_minute=1, burst_size=1))
+        tier = RateLimitConfig(requests_per_minute=50, burst_size=5)
+        with patch("src.middleware.rate_limit.get_cache", return_value=local_cache):
+            results = [(await limiter.is_allowed("apikey:1", config=tier))[0] for _ in range(5)]
+
+        assert all(results)
+
+    async def test_disabled(self, local_cache):
+        limiter = RateLimiter(RateLimitConfig(enabled=False))
+        allowed, info = await limiter.is_allowed("ip", cost=1000)
+
+        assert allowed is True
+        assert info["window"] == "disabled"
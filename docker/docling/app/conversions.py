@@ -0,0 +1,207 @@
+"""
+Conversions
+===========
+
+Conversão de documentos por página, em paralelo no pool.
+
+PDFs grandes (DACTe com dezenas de NF-e, relatórios escaneados) eram
+convertidos inteiros num único worker: o chamador esperava a última
+página para ver a primeira. Aqui o PDF é dividido em intervalos de
+DOCLING_PAGES_PER_JOB páginas, cada intervalo vira um job do
+ConversionPool, e as páginas saem em ordem assim que o intervalo delas
+termina (stream, usado pelo NDJSON de /process/stream).
+
+- Modelos por endpoint: texto não roda estrutura de tabelas; ocr=False
+  dispensa o OCR em PDF nativo
+- Resultado em cache por conteúdo + modelos; um resultado com tabelas
+  também atende quem só pediu texto
+- Requisições simultâneas do mesmo arquivo aguardam a conversão em
+  andamento em vez de converter de novo
+
+Configuração:
+    DOCLING_PAGES_PER_JOB   páginas por job (default: 8)
+
+@module docling/app/conversions
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, AsyncIterator
+
+from .pool import ConversionPool
+from .processor import (
+    count_pages,
+    get_docling_version,
+    join_pages_tables,
+    join_pages_text,
+    split_pages,
+)
+from .result_cache import ResultCache
+
+logger = logging.getLogger("docling-conversions")
+
+
+class _Interrupted(Exception):
+    """Conversão em andamento abandonada (cliente do stream desconectou)."""
+
+
+class DocumentConversions:
+    """
+    Conversões por página, com cache e deduplicação das em andamento.
+
+    Uso:
+        conversions = DocumentConversions(pool, result_cache)
+        async for event in conversions.stream(full_path, tables=False):
+            ...  # {"type": "page", ...} em ordem, por fim {"type": "done", ...}
+    """
+
+    PAGES_PER_JOB = int(os.getenv("DOCLING_PAGES_PER_JOB", "8"))
+
+    def __init__(
+        self,
+        pool: ConversionPool,
+        cache: ResultCache,
+        pages_per_job: int | None = None,
+    ) -> None:
+        """
+        Inicializa as conversões.
+
+        Args:
+            pool: Pool de processos com Docling
+            cache: Cache de resultados por conteúdo
+            pages_per_job: Páginas por job (default: DOCLING_PAGES_PER_JOB)
+        """
+        self.pool = pool
+        self.cache = cache
+        self.pages_per_job = max(1, pages_per_job or self.PAGES_PER_JOB)
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _key(content_hash: str, ocr: bool, tables: bool) -> str:
+        return ResultCache.key(
+            content_hash, {"docling": get_docling_version(), "ocr": ocr, "tables": tables}
+        )
+
+    async def stream(
+        self, full_path: str, ocr: bool = True, tables: bool = True
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Páginas do documento em ordem, à medida que ficam prontas.
+
+        Args:
+            full_path: Caminho absoluto validado
+            ocr: Rodar OCR
+            tables: Rodar o modelo de estrutura de tabelas
+
+        Yields:
+            {"type": "page", "page", "text", "tables"} por página e, por
+            fim, {"type": "done", "metadata", "cached"}
+
+        Raises:
+            TimeoutError: Um intervalo excedeu DOCLING_JOB_TIMEOUT
+        """
+        content_hash = await asyncio.to_thread(ResultCache.file_sha256, full_path)
+        own_key = self._key(content_hash, ocr, tables)
+        # Resultado com tabelas também serve para quem só quer texto
+        keys = [own_key] if tables else [self._key(content_hash, ocr, True), own_key]
+
+        for key in keys:
+            result = await self.cache.get(key)
+            if result is None and key in self._inflight:
+                logger.info(f"Aguardando conversão em andamento: {full_path}")
+                try:
+                    result = await asyncio.shield(self._inflight[key])
+                except _Interrupted:
+                    result = None
+            if result is not None:
+                for page in result["pages"]:
+                    yield {"type": "page", **page}
+                yield {"type": "done", "metadata": result["metadata"], "cached": True}
+                return
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[own_key] = future
+        try:
+            result = {"pages": [], "metadata": None}
+            async for page in self._convert(full_path, ocr, tables, result):
+                yield {"type": "page", **page}
+            await self.cache.put(own_key, result)
+            future.set_result(result)
+        except BaseException as e:
+            future.set_exception(e if isinstance(e, Exception) else _Interrupted())
+            # Marca como lida: sem ninguém aguardando, não gera aviso
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(own_key, None)
+
+        yield {"type": "done", "metadata": result["metadata"], "cached": False}
+
+    async def convert(
+        self, full_path: str, ocr: bool = True, tables: bool = True
+    ) -> dict[str, Any]:
+        """
+        Documento completo (junta as páginas do stream).
+
+        Returns:
+            Dict com text, tables, metadata e cached
+        """
+        pages: list[dict[str, Any]] = []
+        done: dict[str, Any] = {}
+        async for event in self.stream(full_path, ocr, tables):
+            if event["type"] == "page":
+                pages.append(event)
+            else:
+                done = event
+
+        return {
+            "text": join_pages_text(pages),
+            "tables": join_pages_tables(pages) if tables else [],
+            "metadata": done["metadata"],
+            "cached": done["cached"],
+        }
+
+    async def _convert(
+        self, full_path: str, ocr: bool, tables: bool, result: dict[str, Any]
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Converte os intervalos em paralelo e entrega as páginas em ordem.
+
+        Preenche result (pages e metadata) para o cache.
+        """
+        page_count = await asyncio.to_thread(count_pages, full_path)
+        ranges = split_pages(page_count, self.pages_per_job)
+        if len(ranges) > 1:
+            logger.info(f"{full_path}: {page_count} páginas em {len(ranges)} jobs")
+
+        # Todos os intervalos entram na fila do pool de uma vez; o
+        # semáforo do pool limita quantos rodam ao mesmo tempo
+        jobs = [
+            asyncio.create_task(
+                self.pool.run("convert_pages", full_path, *(pages or (None, None)), ocr, tables)
+            )
+            for pages in ranges
+        ]
+        table_index = 0
+        try:
+            for job in jobs:
+                chunk = await job
+                if result["metadata"] is None:
+                    result["metadata"] = chunk["metadata"]
+                for page in chunk["pages"]:
+                    # Índice das tabelas no documento, não no intervalo
+                    page["tables"] = [
+                        {**table, "index": table_index + offset}
+                        for offset, table in enumerate(page["tables"])
+                    ]
+                    table_index += len(page["tables"])
+                    result["pages"].append(page)
+                    yield page
+        finally:
+            for job in jobs:
+                job.cancel()
+            await asyncio.gather(*jobs, return_exceptions=True)
+
+        if page_count:
+            result["metadata"]["page_count"] = page_count
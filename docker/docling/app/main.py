@@ -7,23 +7,36 @@ usando a biblioteca Docling da IBM.
 
 Endpoints:
 - POST /process: Processa PDF completo (texto + tabelas + metadata)
+- POST /process/stream: Mesmo resultado, página a página em NDJSON
 - POST /extract-tables: Extrai apenas tabelas
-- POST /extract-text: Extrai apenas texto
+- POST /extract-text: Extrai apenas texto (sem o modelo de tabelas)
 - GET /health: Health check
 
+O Docling roda num pool de processos (app.pool): os handlers apenas
+aguardam o resultado e o event loop continua atendendo. PDFs grandes são
+convertidos em intervalos de páginas em paralelo (app.conversions).
+Resultados ficam em cache por conteúdo (app.result_cache); /process e
+/extract-tables usam a mesma conversão, e /extract-text reaproveita
+qualquer uma delas.
+
 @module docling/app/main
 @see E-Agent-Fase-D1
 """
 
 import logging
 import os
+import json
 import time
-from typing import Optional
+from typing import Any, AsyncIterator, Optional
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-from .processor import DoclingProcessor
+from .conversions import DocumentConversions
+from .pool import ConversionPool
+from .processor import get_docling_version
+from .result_cache import ResultCache
 
 # ============================================================================
 # LOGGING
@@ -48,8 +61,14 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
-# Processor singleton
-processor = DoclingProcessor()
+# Pool de conversão (workers com Docling carregado)
+pool = ConversionPool()
+
+# Cache de resultados por conteúdo
+result_cache = ResultCache()
+
+# Conversão por página (pool + cache)
+conversions = DocumentConversions(pool, result_cache)
 
 # Track startup time for uptime calculation
 startup_time = time.time()
@@ -68,6 +87,16 @@ class ProcessRequest(BaseModel):
         description="Caminho do arquivo PDF dentro do volume /app/uploads",
         examples=["documents/danfe_001.pdf"],
     )
+    ocr: bool = Field(
+        True,
+        description="Rodar OCR (false para PDF nativo, bem mais rápido)",
+    )
+
+
+class StreamRequest(ProcessRequest):
+    """Requisição de processamento em stream."""
+
+    tables: bool = Field(True, description="Extrair tabelas (modelo de estrutura)")
 
 
 # ============================================================================
@@ -138,6 +167,12 @@ class HealthResponse(BaseModel):
     version: str = Field(..., description="Versão do serviço")
     uptime: float = Field(..., description="Tempo online em segundos")
     docling_version: str = Field(..., description="Versão do Docling")
+    pool: dict[str, int] = Field(
+        default_factory=dict, description="Métricas do pool de conversão"
+    )
+    cache: dict[str, int] = Field(
+        default_factory=dict, description="Métricas do cache de resultados"
+    )
 
 
 class ErrorResponse(BaseModel):
@@ -163,7 +198,9 @@ async def health_check() -> HealthResponse:
         status="healthy",
         version="1.0.0",
         uptime=time.time() - startup_time,
-        docling_version=processor.get_docling_version(),
+        docling_version=get_docling_version(),
+        pool=pool.get_stats(),
+        cache=result_cache.get_stats(),
     )
 
 
@@ -173,6 +210,7 @@ async def health_check() -> HealthResponse:
     responses={
         400: {"model": ErrorResponse, "description": "Arquivo não encontrado"},
         500: {"model": ErrorResponse, "description": "Erro de processamento"},
+        504: {"model": ErrorResponse, "description": "Tempo de processamento excedido"},
     },
     tags=["Processing"],
 )
@@ -189,7 +227,7 @@ async def process_document(request: ProcessRequest) -> ProcessResponse:
     full_path = _resolve_file_path(request.file_path)
 
     try:
-        result = processor.process_document(full_path)
+        result = await conversions.convert(full_path, ocr=request.ocr)
         processing_time_ms = int((time.time() - start_time) * 1000)
 
         return ProcessResponse(
@@ -207,17 +245,53 @@ async def process_document(request: ProcessRequest) -> ProcessResponse:
             metadata=DocumentMetadata(**result["metadata"]),
             processing_time_ms=processing_time_ms,
         )
+    except TimeoutError as e:
+        logger.error(f"Timeout ao processar: {full_path}")
+        raise HTTPException(status_code=504, detail=str(e)) from e
     except Exception as e:
         logger.exception(f"Erro ao processar documento: {full_path}")
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+@app.post(
+    "/process/stream",
+    responses={
+        200: {"content": {"application/x-ndjson": {}}, "description": "Uma linha JSON por página"},
+        400: {"model": ErrorResponse, "description": "Arquivo não encontrado"},
+    },
+    tags=["Processing"],
+)
+async def process_document_stream(request: StreamRequest) -> StreamingResponse:
+    """
+    Processa documento e devolve as páginas em NDJSON, em ordem.
+
+    Cada página sai assim que o intervalo dela termina, então o chamador
+    começa a ler a página 1 enquanto a 40 ainda converte. Linhas:
+
+    - {"type": "page", "page": 1, "text": "...", "tables": [...]}
+    - {"type": "done", "metadata": {...}, "cached": false, "processing_time_ms": 1234}
+    - {"type": "error", "error": "..."} (falha no meio do stream)
+    """
+    start_time = time.time()
+
+    full_path = _resolve_file_path(request.file_path)
+
+    async def events() -> AsyncIterator[dict[str, Any]]:
+        async for event in conversions.stream(full_path, request.ocr, request.tables):
+            if event["type"] == "done":
+                event["processing_time_ms"] = int((time.time() - start_time) * 1000)
+            yield event
+
+    return StreamingResponse(_ndjson(events(), full_path), media_type="application/x-ndjson")
+
+
 @app.post(
     "/extract-tables",
     response_model=ExtractTablesResponse,
     responses={
         400: {"model": ErrorResponse, "description": "Arquivo não encontrado"},
         500: {"model": ErrorResponse, "description": "Erro de processamento"},
+        504: {"model": ErrorResponse, "description": "Tempo de processamento excedido"},
     },
     tags=["Processing"],
 )
@@ -232,7 +306,7 @@ async def extract_tables(request: ProcessRequest) -> ExtractTablesResponse:
     full_path = _resolve_file_path(request.file_path)
 
     try:
-        tables = processor.extract_tables(full_path)
+        tables = (await conversions.convert(full_path, ocr=request.ocr))["tables"]
         processing_time_ms = int((time.time() - start_time) * 1000)
 
         return ExtractTablesResponse(
@@ -248,6 +322,9 @@ async def extract_tables(request: ProcessRequest) -> ExtractTablesResponse:
             ],
             processing_time_ms=processing_time_ms,
         )
+    except TimeoutError as e:
+        logger.error(f"Timeout ao processar: {full_path}")
+        raise HTTPException(status_code=504, detail=str(e)) from e
     except Exception as e:
         logger.exception(f"Erro ao extrair tabelas: {full_path}")
         raise HTTPException(status_code=500, detail=str(e)) from e
@@ -259,6 +336,7 @@ async def extract_tables(request: ProcessRequest) -> ExtractTablesResponse:
     responses={
         400: {"model": ErrorResponse, "description": "Arquivo não encontrado"},
         500: {"model": ErrorResponse, "description": "Erro de processamento"},
+        504: {"model": ErrorResponse, "description": "Tempo de processamento excedido"},
     },
     tags=["Processing"],
 )
@@ -266,20 +344,25 @@ async def extract_text(request: ProcessRequest) -> ExtractTextResponse:
     """
     Extrai apenas texto do documento.
 
-    Otimizado para quando apenas texto corrido é necessário.
+    Não roda o modelo de estrutura de tabelas; se o documento já foi
+    processado por completo, responde do cache.
     """
     start_time = time.time()
 
     full_path = _resolve_file_path(request.file_path)
 
     try:
-        text = processor.extract_text(full_path)
+        result = await conversions.convert(full_path, ocr=request.ocr, tables=False)
+        text = result["text"]
         processing_time_ms = int((time.time() - start_time) * 1000)
 
         return ExtractTextResponse(
             text=text,
             processing_time_ms=processing_time_ms,
         )
+    except TimeoutError as e:
+        logger.error(f"Timeout ao processar: {full_path}")
+        raise HTTPException(status_code=504, detail=str(e)) from e
     except Exception as e:
         logger.exception(f"Erro ao extrair texto: {full_path}")
         raise HTTPException(status_code=500, detail=str(e)) from e
@@ -290,6 +373,21 @@ async def extract_text(request: ProcessRequest) -> ExtractTextResponse:
 # ============================================================================
 
 
+async def _ndjson(events: AsyncIterator[dict[str, Any]], full_path: str) -> AsyncIterator[bytes]:
+    """
+    Serializa os eventos do stream em NDJSON.
+
+    O status HTTP já foi enviado com a primeira linha: erros viram uma
+    linha {"type": "error"} no fim.
+    """
+    try:
+        async for event in events:
+            yield json.dumps(event, ensure_ascii=False).encode() + b"\n"
+    except Exception as e:
+        logger.exception(f"Erro no stream de páginas: {full_path}")
+        yield json.dumps({"type": "error", "error": str(e)}, ensure_ascii=False).encode() + b"\n"
+
+
 def _resolve_file_path(file_path: str) -> str:
     """
     Resolve e valida caminho do arquivo.
@@ -336,7 +434,8 @@ def _resolve_file_path(file_path: str) -> str:
 async def startup_event() -> None:
     """Evento de inicialização do servidor."""
     logger.info("🚀 Docling Service iniciando...")
-    logger.info(f"📦 Docling version: {processor.get_docling_version()}")
+    logger.info(f"📦 Docling version: {get_docling_version()}")
+    logger.info(f"⚙️ Pool de conversão: {pool.workers} workers")
     logger.info("✅ Serviço pronto para receber requisições")
 
 
@@ -344,3 +443,4 @@ async def startup_event() -> None:
 async def shutdown_event() -> None:
     """Evento de encerramento do servidor."""
     logger.info("🛑 Docling Service encerrando...")
+    pool.shutdown()
@@ -0,0 +1,165 @@
+"""
+Conversion Pool
+===============
+
+Pool de processos para as conversões Docling do serviço.
+
+Os handlers async chamavam o Docling direto no event loop: um PDF
+escaneado grande bloqueava o /health e todas as outras requisições.
+Mesmo desenho do ConversionPool do serviço de agents:
+
+- Workers (spawn) com DocumentConverter carregado no initializer
+- No máximo um job por worker; os demais aguardam na fila local,
+  então o timeout mede só a execução
+- Job que estoura o timeout recicla o pool; jobs afetados pela
+  reciclagem são reenviados uma vez
+- max_tasks_per_child recicla cada worker após N documentos
+- Métricas de fila expostas no /health
+
+Configuração:
+    DOCLING_WORKERS              processos (default: min(2, CPUs))
+    DOCLING_JOB_TIMEOUT          segundos por documento (default: 300)
+    DOCLING_MAX_TASKS_PER_CHILD  documentos por worker (default: 50)
+
+@module docling/app/pool
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from .processor import init_worker, run_job
+
+logger = logging.getLogger("docling-pool")
+
+
+class ConversionPool:
+    """Pool de processos com timeout por job e reciclagem de workers."""
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        job_timeout: float | None = None,
+        max_tasks_per_child: int | None = None,
+    ) -> None:
+        """Inicializa o pool (processos são criados no primeiro job)."""
+        self.workers = workers or int(
+            os.getenv("DOCLING_WORKERS", str(min(2, os.cpu_count() or 1)))
+        )
+        self.job_timeout = job_timeout or float(os.getenv("DOCLING_JOB_TIMEOUT", "300"))
+        self.max_tasks_per_child = max_tasks_per_child or int(
+            os.getenv("DOCLING_MAX_TASKS_PER_CHILD", "50")
+        )
+
+        self._executor: ProcessPoolExecutor | None = None
+        self._generation = 0
+        self._semaphore: asyncio.Semaphore | None = None
+        self._queued = 0
+        self._running = 0
+        self._stats: dict[str, int] = {
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "recycles": 0,
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Retorna o executor atual, criando um novo após reciclagem."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                max_tasks_per_child=self.max_tasks_per_child,
+            )
+            self._generation += 1
+        return self._executor
+
+    def _recycle(self, generation: int, reason: str) -> None:
+        """Termina os processos do pool (uma vez por geração)."""
+        if generation != self._generation or self._executor is None:
+            return
+
+        executor, self._executor = self._executor, None
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False)
+
+        self._stats["recycles"] += 1
+        logger.warning(f"Pool reciclado ({reason}), {self._running} jobs em execução")
+
+    async def run(self, method: str, file_path: str, *args: Any) -> Any:
+        """
+        Executa um método do DoclingProcessor num worker.
+
+        Args:
+            method: convert_pages, process_document, extract_tables ou extract_text
+            file_path: Caminho absoluto do arquivo
+            *args: Argumentos adicionais (ex: intervalo de páginas, modelos)
+
+        Returns:
+            Resultado do método
+
+        Raises:
+            TimeoutError: Job excedeu DOCLING_JOB_TIMEOUT
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+
+        self._queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+
+        self._running += 1
+        start_time = time.time()
+        try:
+            for attempt in range(2):
+                executor = self._get_executor()
+                generation = self._generation
+                future = asyncio.wrap_future(executor.submit(run_job, method, file_path, *args))
+
+                try:
+                    result = await asyncio.wait_for(future, self.job_timeout)
+                except asyncio.TimeoutError:
+                    self._stats["timeouts"] += 1
+                    self._recycle(generation, "timeout")
+                    raise TimeoutError(
+                        f"Processamento excedeu {self.job_timeout:.0f}s: {file_path}"
+                    )
+                except BrokenProcessPool:
+                    self._recycle(generation, "broken")
+                    if attempt:
+                        raise
+                    continue
+
+                self._stats["completed"] += 1
+                logger.info(f"{method} concluído em {time.time() - start_time:.1f}s")
+                return result
+        except BaseException:
+            self._stats["failed"] += 1
+            raise
+        finally:
+            self._running -= 1
+            self._semaphore.release()
+
+    def get_stats(self) -> dict[str, int]:
+        """Retorna métricas do pool."""
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queue_depth": self._queued,
+            **self._stats,
+        }
+
+    def shutdown(self) -> None:
+        """Encerra o pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
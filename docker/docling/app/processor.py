@@ -5,6 +5,10 @@ Docling Processor
 Encapsula a lógica de processamento de documentos usando Docling.
 Provê métodos para extração de texto, tabelas e metadados.
 
+A conversão é feita por página (convert_pages): o serviço divide PDFs
+grandes em intervalos de páginas convertidos em paralelo no pool, e
+cada endpoint liga só os modelos de que precisa.
+
 @module docling/app/processor
 @see E-Agent-Fase-D1
 """
@@ -21,23 +25,26 @@ class DoclingProcessor:
     Processador de documentos usando Docling.
 
     Fornece métodos para:
+    - Conversão por página, opcionalmente de um intervalo de páginas
+      (convert_pages, usado pelo serviço)
     - Processamento completo (texto + tabelas + metadata)
     - Extração de tabelas
     - Extração de texto
+
+    Um conversor por combinação de modelos: texto não roda o modelo de
+    estrutura de tabelas, e PDF nativo pode dispensar o OCR.
     """
 
     def __init__(self) -> None:
         """Inicializa o processador Docling."""
-        self._converter: Any = None
+        self._converters: dict[tuple[bool, bool], Any] = {}
         self._docling_version: str = "unknown"
         self._initialize()
 
     def _initialize(self) -> None:
-        """Inicializa o conversor Docling (lazy loading)."""
+        """Inicializa o conversor Docling completo (OCR + tabelas)."""
         try:
-            from docling.document_converter import DocumentConverter
-
-            self._converter = DocumentConverter()
+            self._get_converter(ocr=True, tables=True)
 
             # Obter versão do docling
             try:
@@ -54,10 +61,77 @@ class DoclingProcessor:
                 "Docling não instalado. Verifique requirements.txt"
             ) from e
 
+    def _get_converter(self, ocr: bool, tables: bool) -> Any:
+        """Conversor com os modelos pedidos (criado uma vez por combinação)."""
+        converter = self._converters.get((ocr, tables))
+        if converter is None:
+            from docling.datamodel.base_models import InputFormat
+            from docling.datamodel.pipeline_options import PdfPipelineOptions
+            from docling.document_converter import DocumentConverter, PdfFormatOption
+
+            options = PdfPipelineOptions(do_ocr=ocr, do_table_structure=tables)
+            converter = DocumentConverter(
+                format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=options)}
+            )
+            self._converters[(ocr, tables)] = converter
+        return converter
+
     def get_docling_version(self) -> str:
         """Retorna versão do Docling."""
         return self._docling_version
 
+    def convert_pages(
+        self,
+        file_path: str,
+        first_page: int | None = None,
+        last_page: int | None = None,
+        ocr: bool = True,
+        tables: bool = True,
+    ) -> dict[str, Any]:
+        """
+        Converte o documento (ou um intervalo de páginas) uma única vez.
+
+        Args:
+            file_path: Caminho absoluto do arquivo
+            first_page: Primeira página (1-based), None = documento inteiro
+            last_page: Última página (inclusive)
+            ocr: Rodar OCR (desnecessário em PDF nativo)
+            tables: Rodar o modelo de estrutura de tabelas
+
+        Returns:
+            Dict com pages ([{page, text, tables}] em ordem) e metadata
+        """
+        logger.info(f"Convertendo {file_path} páginas {first_page or 1}-{last_page or 'fim'}")
+
+        converter = self._get_converter(ocr, tables)
+        if first_page is not None:
+            result = converter.convert(file_path, page_range=(first_page, last_page))
+        else:
+            result = converter.convert(file_path)
+
+        page_numbers = sorted(getattr(result.document, "pages", None) or {}) or [first_page or 1]
+
+        tables_by_page: dict[int, list[dict[str, Any]]] = {}
+        if tables:
+            for table in self._extract_tables_from_result(result):
+                # Sem proveniência: tabela fica na primeira página do intervalo
+                if table["page_number"] not in page_numbers:
+                    table["page_number"] = page_numbers[0]
+                tables_by_page.setdefault(table["page_number"], []).append(table)
+        pages = [
+            {
+                "page": page_no,
+                "text": result.document.export_to_markdown(page_no=page_no),
+                "tables": tables_by_page.get(page_no, []),
+            }
+            for page_no in page_numbers
+        ]
+
+        return {
+            "pages": pages,
+            "metadata": self._extract_metadata(file_path, result),
+        }
+
     def process_document(self, file_path: str) -> dict[str, Any]:
         """
         Processa documento completo.
@@ -70,17 +144,10 @@ class DoclingProcessor:
         """
         logger.info(f"Processando documento: {file_path}")
 
-        # Converter documento
-        result = self._converter.convert(file_path)
-
-        # Extrair texto
-        text = result.document.export_to_markdown()
-
-        # Extrair tabelas
-        tables = self._extract_tables_from_result(result)
-
-        # Extrair metadados
-        metadata = self._extract_metadata(file_path, result)
+        converted = self.convert_pages(file_path)
+        text = join_pages_text(converted["pages"])
+        tables = join_pages_tables(converted["pages"])
+        metadata = converted["metadata"]
 
         logger.info(
             f"Documento processado: {len(text)} chars, "
@@ -105,15 +172,14 @@ class DoclingProcessor:
         """
         logger.info(f"Extraindo tabelas: {file_path}")
 
-        result = self._converter.convert(file_path)
-        tables = self._extract_tables_from_result(result)
+        tables = join_pages_tables(self.convert_pages(file_path)["pages"])
 
         logger.info(f"Tabelas extraídas: {len(tables)}")
         return tables
 
     def extract_text(self, file_path: str) -> str:
         """
-        Extrai apenas texto do documento.
+        Extrai apenas texto do documento (sem o modelo de tabelas).
 
         Args:
             file_path: Caminho absoluto do arquivo PDF
@@ -123,8 +189,7 @@ class DoclingProcessor:
         """
         logger.info(f"Extraindo texto: {file_path}")
 
-        result = self._converter.convert(file_path)
-        text = result.document.export_to_markdown()
+        text = join_pages_text(self.convert_pages(file_path, tables=False)["pages"])
 
         logger.info(f"Texto extraído: {len(text)} chars")
         return text
@@ -246,3 +311,94 @@ class DoclingProcessor:
             "creation_date": creation_date,
             "file_size": file_size,
         }
+
+
+# ============================================================================
+# PÁGINAS
+# ============================================================================
+
+
+def count_pages(file_path: str) -> int | None:
+    """
+    Número de páginas de um PDF, sem carregar o Docling.
+
+    Returns:
+        Páginas, ou None se não for PDF legível (imagem, DOCX, ...)
+    """
+    try:
+        import pypdfium2
+
+        pdf = pypdfium2.PdfDocument(file_path)
+    except Exception:
+        return None
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def split_pages(page_count: int | None, pages_per_job: int) -> list[tuple[int, int] | None]:
+    """
+    Intervalos de páginas (1-based, inclusivos) para conversão em paralelo.
+
+    Documento pequeno ou de tamanho desconhecido: um único job ([None]).
+    """
+    if not page_count or page_count <= pages_per_job:
+        return [None]
+    return [
+        (first, min(first + pages_per_job - 1, page_count))
+        for first in range(1, page_count + 1, pages_per_job)
+    ]
+
+
+def join_pages_text(pages: list[dict[str, Any]]) -> str:
+    """Texto do documento a partir das páginas."""
+    return "\n\n".join(page["text"] for page in pages if page["text"])
+
+
+def join_pages_tables(pages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Tabelas do documento, reindexadas na ordem das páginas."""
+    tables = [table for page in pages for table in page["tables"]]
+    return [{**table, "index": index} for index, table in enumerate(tables)]
+
+
+# ============================================================================
+# WORKER (processos do ConversionPool)
+# ============================================================================
+
+# Processador aquecido do processo worker atual
+_worker_processor: DoclingProcessor | None = None
+
+
+def init_worker() -> None:
+    """Initializer do pool: carrega o Docling uma vez por processo."""
+    global _worker_processor
+    _worker_processor = DoclingProcessor()
+
+
+def run_job(method: str, file_path: str, *args: Any) -> Any:
+    """
+    Executa um método do processador no worker atual.
+
+    Args:
+        method: convert_pages, process_document, extract_tables ou extract_text
+        file_path: Caminho absoluto do arquivo PDF
+        *args: Argumentos adicionais do método (ex: intervalo de páginas)
+
+    Returns:
+        Resultado do método (dict, lista ou str, serializável por pickle)
+    """
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = DoclingProcessor()
+    return getattr(_worker_processor, method)(file_path, *args)
+
+
+def get_docling_version() -> str:
+    """Retorna versão do Docling instalado sem carregar os modelos."""
+    try:
+        from importlib.metadata import version
+
+        return version("docling")
+    except Exception:
+        return "2.0.0+"
@@ -0,0 +1,145 @@
+"""
+Result Cache
+============
+
+Cache em disco de resultados de conversão, indexado por conteúdo.
+
+Mesmo formato do cache de conversão do serviço de agents: JSON
+comprimido com gzip em {DOCLING_CACHE_DIR}/results/{hash[:2]}/,
+chave = sha256 do arquivo + hash das opções (versão do Docling e
+modelos usados: OCR, tabelas), gravação atômica e despejo LRU por tamanho.
+
+Configuração:
+    DOCLING_CACHE_DIR            diretório base (default: /app/cache)
+    DOCLING_RESULT_CACHE_MB      tamanho máximo (default: 512)
+
+@module docling/app/result_cache
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger("docling-cache")
+
+# 2: resultado por página (pages + metadata)
+CACHE_VERSION = 2
+
+
+class ResultCache:
+    """Cache LRU em disco de resultados de conversão."""
+
+    def __init__(self, cache_dir: str | None = None, max_bytes: int | None = None) -> None:
+        """Inicializa o cache (cria o diretório se necessário)."""
+        base = cache_dir or os.getenv("DOCLING_CACHE_DIR", "/app/cache")
+        self.root = Path(base) / "results"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or int(os.getenv("DOCLING_RESULT_CACHE_MB", "512")) * 1024 * 1024
+        self._total_bytes: int | None = None
+        self._stats: dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def key(content_hash: str, options: Any) -> str:
+        """Chave = hash do conteúdo + hash das opções."""
+        fingerprint = json.dumps({"v": CACHE_VERSION, "options": options}, sort_keys=True)
+        return f"{content_hash}-{hashlib.sha256(fingerprint.encode()).hexdigest()[:16]}"
+
+    @staticmethod
+    def file_sha256(file_path: str) -> str:
+        """sha256 do arquivo, lido em blocos de 1MB."""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json.gz"
+
+    def _read(self, key: str) -> Any:
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrada de cache corrompida {key}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _write(self, key: str, data: Any) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        payload = gzip.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._entries())
+        else:
+            self._total_bytes += len(payload)
+
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.root.glob("*/*.json.gz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self) -> None:
+        """Remove os menos usados até 90% do limite."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+
+        for _, size, path in entries:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self._stats["evictions"] += 1
+
+        self._total_bytes = total
+
+    async def get(self, key: str) -> Any:
+        """Resultado em cache, ou None."""
+        data = await asyncio.to_thread(self._read, key)
+        self._stats["hits" if data is not None else "misses"] += 1
+        return data
+
+    async def put(self, key: str, data: Any) -> None:
+        """Grava resultado (falhas de disco são apenas registradas)."""
+        try:
+            await asyncio.to_thread(self._write, key, data)
+        except OSError as e:
+            logger.warning(f"Erro ao gravar cache {key}: {e}")
+
+    def get_stats(self) -> dict[str, int]:
+        """Retorna métricas do cache."""
+        return {**self._stats, "size_bytes": self._total_bytes or 0}